@@ -0,0 +1,93 @@
+# chem_assistant/core/crystallography/crystal.py
+# 晶胞与晶体结构的基础数据模型
+
+import numpy as np
+
+
+class UnitCell:
+    """晶胞参数 (a, b, c 单位 Å；alpha, beta, gamma 单位 度)"""
+
+    def __init__(self, a, b, c, alpha=90.0, beta=90.0, gamma=90.0):
+        self.a, self.b, self.c = float(a), float(b), float(c)
+        self.alpha, self.beta, self.gamma = float(alpha), float(beta), float(gamma)
+        self.matrix = self._build_matrix()
+        # 倒易基矢 (不含2π)，每一行分别是 a*, b*, c*
+        self.reciprocal_matrix = np.linalg.inv(self.matrix).T
+
+    def _build_matrix(self):
+        """按常用约定构造晶胞矩阵：a 沿 x 轴，b 位于 xy 平面，每一行是一个基矢"""
+        alpha, beta, gamma = np.radians([self.alpha, self.beta, self.gamma])
+        cos_a, cos_b, cos_g = np.cos(alpha), np.cos(beta), np.cos(gamma)
+        sin_g = np.sin(gamma)
+        cy = (cos_a - cos_b * cos_g) / sin_g
+        cz_sq = 1.0 - cos_b ** 2 - cy ** 2
+        if cz_sq <= 0:
+            raise ValueError("晶胞角度不合理，无法构成三维晶胞。")
+        return np.array([
+            [self.a, 0.0, 0.0],
+            [self.b * cos_g, self.b * sin_g, 0.0],
+            [self.c * cos_b, self.c * cy, self.c * np.sqrt(cz_sq)],
+        ])
+
+    @property
+    def volume(self):
+        return abs(np.linalg.det(self.matrix))
+
+    @property
+    def parameters(self):
+        return (self.a, self.b, self.c, self.alpha, self.beta, self.gamma)
+
+    def frac_to_cart(self, frac_coords):
+        """分数坐标 -> 笛卡尔坐标 (Å)"""
+        return np.asarray(frac_coords, dtype=float) @ self.matrix
+
+    def cart_to_frac(self, cart_coords):
+        """笛卡尔坐标 (Å) -> 分数坐标"""
+        return np.asarray(cart_coords, dtype=float) @ np.linalg.inv(self.matrix)
+
+    def d_spacing(self, hkl):
+        """计算晶面间距 d(hkl)，hkl 可以是 (3,) 或 (n, 3) 数组"""
+        g = np.asarray(hkl, dtype=float) @ self.reciprocal_matrix
+        return 1.0 / np.linalg.norm(g, axis=-1)
+
+    def __repr__(self):
+        return "UnitCell(a={:.4f}, b={:.4f}, c={:.4f}, alpha={:.2f}, beta={:.2f}, gamma={:.2f})".format(*self.parameters)
+
+
+class CrystalStructure:
+    """晶体结构：晶胞 + 原子基元 (分数坐标)"""
+
+    def __init__(self, cell, elements, frac_coords, occupancies=None, b_iso=None, labels=None, title=""):
+        self.cell = cell
+        self.elements = np.asarray(elements, dtype=object)
+        self.frac_coords = np.asarray(frac_coords, dtype=float).reshape(-1, 3)
+        n_sites = len(self.frac_coords)
+        if len(self.elements) != n_sites:
+            raise ValueError("元素数量与坐标数量不一致。")
+        self.occupancies = np.ones(n_sites) if occupancies is None else np.asarray(occupancies, dtype=float)
+        # 各向同性温度因子 B (Å²)，未知时为 NaN，由调用方决定默认值
+        self.b_iso = np.full(n_sites, np.nan) if b_iso is None else np.asarray(b_iso, dtype=float)
+        self.labels = np.asarray(labels, dtype=object) if labels is not None else self.elements.copy()
+        self.title = title
+
+    def __len__(self):
+        return len(self.frac_coords)
+
+    @property
+    def cart_coords(self):
+        return self.cell.frac_to_cart(self.frac_coords)
+
+    @property
+    def formula(self):
+        """按元素出现顺序给出晶胞内的化学组成 (考虑占有率)"""
+        counts = {}
+        for element, occ in zip(self.elements, self.occupancies):
+            counts[element] = counts.get(element, 0.0) + occ
+        parts = []
+        for element, count in counts.items():
+            count = round(count, 3)
+            parts.append(element if count == 1 else f"{element}{count:g}")
+        return "".join(parts)
+
+    def __repr__(self):
+        return f"CrystalStructure('{self.title or self.formula}', {len(self)} sites, {self.cell!r})"
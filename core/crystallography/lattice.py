@@ -0,0 +1,41 @@
+# chem_assistant/core/crystallography/lattice.py
+# 晶格生成：把晶胞内原子平移复制为用于显示/计算的超胞
+
+import itertools
+import numpy as np
+
+
+def generate_lattice(structure, repeats=(1, 1, 1), include_boundary=True, tolerance=1e-4):
+    """
+    沿三个晶轴复制晶胞内的原子。
+    :param structure: CrystalStructure 对象
+    :param repeats: 三个方向的晶胞重复次数
+    :param include_boundary: 为 True 时补齐位于面、棱、顶点上的等价原子，使显示的晶胞是"闭合"的
+    :return: (元素数组 (m,), 笛卡尔坐标 (m, 3), 对应的原始原子序号 (m,))
+    """
+    repeats = np.asarray(repeats, dtype=int)
+    if repeats.shape != (3,) or np.any(repeats < 1):
+        raise ValueError("晶胞重复次数必须是三个正整数。")
+
+    if include_boundary:
+        ranges = [range(-1, r + 1) for r in repeats]
+    else:
+        ranges = [range(r) for r in repeats]
+    shifts = np.array(list(itertools.product(*ranges)), dtype=float)
+    # (n_shifts, n_atoms, 3) 一次性生成所有平移后的分数坐标
+    frac = structure.frac_coords[None, :, :] + shifts[:, None, :]
+    upper = frac <= repeats + tolerance if include_boundary else frac < repeats - tolerance
+    inside = np.all((frac >= -tolerance) & upper, axis=2)
+
+    shift_index, site_index = np.nonzero(inside)
+    frac = frac[shift_index, site_index]
+    return structure.elements[site_index], structure.cell.frac_to_cart(frac), site_index
+
+
+def cell_edges(cell, repeats=(1, 1, 1)):
+    """返回 (超)晶胞外框的 8 个顶点与 12 条棱 (顶点序号对)"""
+    corners = np.array(list(itertools.product((0, 1), repeat=3)), dtype=float)
+    points = cell.frac_to_cart(corners * np.asarray(repeats, dtype=float))
+    edges = [(i, j) for i, j in itertools.combinations(range(8), 2)
+             if np.count_nonzero(corners[i] != corners[j]) == 1]
+    return points, np.array(edges)
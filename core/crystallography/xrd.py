@@ -0,0 +1,341 @@
+# chem_assistant/core/crystallography/xrd.py
+# 粉末X射线衍射 (PXRD) 谱图模拟
+
+import itertools
+import numpy as np
+from scipy.spatial import cKDTree
+
+# 常用靶材 Kα1 波长 (Å)
+WAVELENGTHS = {
+    'CuKa': 1.54056,
+    'MoKa': 0.70930,
+    'CoKa': 1.78897,
+    'FeKa': 1.93604,
+    'CrKa': 2.28970,
+    'AgKa': 0.55941,
+}
+
+# Cromer-Mann 原子散射因子系数 (International Tables Vol. C)
+# f(s) = Σ a_i·exp(-b_i·s²) + c，其中 s = sinθ/λ
+# 格式: 元素: (a1, b1, a2, b2, a3, b3, a4, b4, c)
+CROMER_MANN = {
+    'H':  (0.489918, 20.6593, 0.262003, 7.74039, 0.196767, 49.5519, 0.049879, 2.20159, 0.001305),
+    'He': (0.8734, 9.1037, 0.6309, 3.3568, 0.3112, 22.9276, 0.1780, 0.9821, 0.0064),
+    'Li': (1.1282, 3.9546, 0.7508, 1.0524, 0.6175, 85.3905, 0.4653, 168.261, 0.0377),
+    'Be': (1.5919, 43.6427, 1.1278, 1.8623, 0.5391, 103.483, 0.7029, 0.5420, 0.0385),
+    'B':  (2.0545, 23.2185, 1.3326, 1.0210, 1.0979, 60.3498, 0.7068, 0.1403, -0.1932),
+    'C':  (2.3100, 20.8439, 1.0200, 10.2075, 1.5886, 0.5687, 0.8650, 51.6512, 0.2156),
+    'N':  (12.2126, 0.0057, 3.1322, 9.8933, 2.0125, 28.9975, 1.1663, 0.5826, -11.529),
+    'O':  (3.0485, 13.2771, 2.2868, 5.7011, 1.5463, 0.3239, 0.8670, 32.9089, 0.2508),
+    'F':  (3.5392, 10.2825, 2.6412, 4.2944, 1.5170, 0.2615, 1.0243, 26.1476, 0.2776),
+    'Ne': (3.9553, 8.4042, 3.1125, 3.4262, 1.4546, 0.2306, 1.1251, 21.7184, 0.3515),
+    'Na': (4.7626, 3.2850, 3.1736, 8.8422, 1.2674, 0.3136, 1.1128, 129.424, 0.6760),
+    'Mg': (5.4204, 2.8275, 2.1735, 79.2611, 1.2269, 0.3808, 2.3073, 7.1937, 0.8584),
+    'Al': (6.4202, 3.0387, 1.9002, 0.7426, 1.5936, 31.5472, 1.9646, 85.0886, 1.1151),
+    'Si': (6.2915, 2.4386, 3.0353, 32.3337, 1.9891, 0.6785, 1.5410, 81.6937, 1.1407),
+    'P':  (6.4345, 1.9067, 4.1791, 27.1570, 1.7800, 0.5260, 1.4908, 68.1645, 1.1149),
+    'S':  (6.9053, 1.4679, 5.2034, 22.2151, 1.4379, 0.2536, 1.5863, 56.1720, 0.8669),
+    'Cl': (11.4604, 0.0104, 7.1962, 1.1662, 6.2556, 18.5194, 1.6455, 47.7784, -9.5574),
+    'Ar': (7.4845, 0.9072, 6.7723, 14.8407, 0.6539, 43.8983, 1.6442, 33.3929, 1.4445),
+    'K':  (8.2186, 12.7949, 7.4398, 0.7748, 1.0519, 213.187, 0.8659, 41.6841, 1.4228),
+    'Ca': (8.6266, 10.4421, 7.3873, 0.6599, 1.5899, 85.7484, 1.0211, 178.437, 1.3751),
+    'Sc': (9.1890, 9.0213, 7.3679, 0.5729, 1.6409, 136.108, 1.4680, 51.3531, 1.3329),
+    'Ti': (9.7595, 7.8508, 7.3558, 0.5000, 1.6991, 35.6338, 1.9021, 116.105, 1.2807),
+    'V':  (10.2971, 6.8657, 7.3511, 0.4385, 2.0703, 26.8938, 2.0571, 102.478, 1.2199),
+    'Cr': (10.6406, 6.1038, 7.3537, 0.3920, 3.3240, 20.2626, 1.4922, 98.7399, 1.1832),
+    'Mn': (11.2819, 5.3409, 7.3573, 0.3432, 3.0193, 17.8674, 2.2441, 83.7543, 1.0896),
+    'Fe': (11.7695, 4.7611, 7.3573, 0.3072, 3.5222, 15.3535, 2.3045, 76.8805, 1.0369),
+    'Co': (12.2841, 4.2791, 7.3409, 0.2784, 4.0034, 13.5359, 2.3488, 71.1692, 1.0118),
+    'Ni': (12.8376, 3.8785, 7.2920, 0.2565, 4.4438, 12.1763, 2.3800, 66.3421, 1.0341),
+    'Cu': (13.3380, 3.5828, 7.1676, 0.2470, 5.6158, 11.3966, 1.6735, 64.8126, 1.1910),
+    'Zn': (14.0743, 3.2655, 7.0318, 0.2333, 5.1652, 10.3163, 2.4100, 58.7097, 1.3041),
+    'Ga': (15.2354, 3.0669, 6.7006, 0.2412, 4.3591, 10.7805, 2.9623, 61.4135, 1.7189),
+    'Ge': (16.0816, 2.8509, 6.3747, 0.2516, 3.7068, 11.4468, 3.6830, 54.7625, 2.1313),
+    'As': (16.6723, 2.6345, 6.0701, 0.2647, 3.4313, 12.9479, 4.2779, 47.7972, 2.5310),
+    'Se': (17.0006, 2.4098, 5.8196, 0.2726, 3.9731, 15.2372, 4.3543, 43.8163, 2.8409),
+    'Br': (17.1789, 2.1723, 5.2358, 16.5796, 5.6377, 0.2609, 3.9851, 41.4328, 2.9557),
+    'Kr': (17.3555, 1.9384, 6.7286, 16.5623, 5.5493, 0.2261, 3.5375, 39.3972, 2.8250),
+    'Rb': (17.1784, 1.7888, 9.6435, 17.3151, 5.1399, 0.2748, 1.5292, 164.934, 3.4873),
+    'Sr': (17.5663, 1.5564, 9.8184, 14.0988, 5.4220, 0.1664, 2.6694, 132.376, 2.5064),
+    'Y':  (17.7760, 1.4029, 10.2946, 12.8006, 5.72629, 0.125599, 3.26588, 104.354, 1.91213),
+    'Zr': (17.8765, 1.27618, 10.9480, 11.9160, 5.41732, 0.117622, 3.65721, 87.6627, 2.06929),
+    'Nb': (17.6142, 1.18865, 12.0144, 11.7660, 4.04183, 0.204785, 3.53346, 69.7957, 3.75591),
+    'Mo': (3.7025, 0.2772, 17.2356, 1.0958, 12.8876, 11.0040, 3.7429, 61.6584, 4.3875),
+    'Ag': (19.2808, 0.6446, 16.6885, 7.4726, 4.8045, 24.6605, 1.0463, 99.8156, 5.1790),
+    'Cd': (19.2214, 0.5946, 17.6444, 6.9089, 4.4610, 24.7008, 1.6029, 87.4825, 5.0694),
+    'In': (19.1624, 0.5476, 18.5596, 6.3776, 4.2948, 25.8499, 2.0396, 92.8029, 4.9391),
+    'Sn': (19.1889, 5.8303, 19.1005, 0.5031, 4.4585, 26.8909, 2.4663, 83.9571, 4.7821),
+    'Sb': (19.6418, 5.3034, 19.0455, 0.4607, 5.0371, 27.9074, 2.6827, 75.2825, 4.5909),
+    'Te': (19.9644, 4.81742, 19.0138, 0.420885, 6.14487, 28.5284, 2.5239, 70.8403, 4.3520),
+    'I':  (20.1472, 4.3470, 18.9949, 0.3814, 7.5138, 27.7660, 2.2735, 66.8776, 4.0712),
+    'Xe': (20.2933, 3.9282, 19.0298, 0.3440, 8.9767, 26.4659, 1.9900, 64.2658, 3.7118),
+    'Cs': (20.3892, 3.5690, 19.1062, 0.3107, 10.6620, 24.3879, 1.4953, 213.904, 3.3352),
+    'Ba': (20.3361, 3.2160, 19.2970, 0.2756, 10.8880, 20.2073, 2.6959, 167.202, 2.7731),
+    'La': (20.5780, 2.94817, 19.5990, 0.244475, 11.3727, 18.7726, 3.28719, 133.124, 2.14678),
+    'W':  (29.0818, 1.72029, 15.4300, 9.2259, 14.4327, 0.321703, 5.11982, 57.0560, 9.8875),
+    'Pt': (27.0059, 1.51293, 17.7639, 8.81174, 15.7131, 0.424593, 5.7837, 38.6103, 11.6883),
+    'Au': (16.8819, 0.4611, 18.5913, 8.6216, 25.5582, 1.4826, 5.8600, 36.3956, 12.0658),
+    'Hg': (20.6809, 0.5450, 19.0417, 8.4484, 21.6575, 1.5729, 5.9676, 38.3246, 12.6089),
+    'Pb': (31.0617, 0.6902, 13.0637, 2.3576, 18.4420, 8.6180, 5.9696, 47.2579, 13.4118),
+    'Bi': (33.3689, 0.7040, 12.9510, 2.9238, 16.5877, 8.7937, 6.4692, 48.0093, 13.5782),
+    'U':  (36.0228, 0.5293, 23.4128, 3.3253, 14.9491, 16.0927, 4.1880, 100.613, 13.3966),
+}
+
+# 未给出温度因子时使用的默认各向同性 B 值 (Å²)
+DEFAULT_B_ISO = 0.5
+# 判断对称操作时原子位置的容差 (分数坐标)
+SYMMETRY_TOLERANCE = 1e-3
+
+
+def atomic_scattering_factors(elements, s):
+    """
+    批量计算原子散射因子。
+    :param elements: 元素符号序列 (长度 m)
+    :param s: sinθ/λ 数组 (长度 n)
+    :return: (m, n) 数组
+    """
+    missing = [e for e in elements if e not in CROMER_MANN]
+    if missing:
+        raise ValueError(f"缺少元素 {', '.join(sorted(set(missing)))} 的原子散射因子参数。")
+    coeffs = np.array([CROMER_MANN[e] for e in elements])        # (m, 9)
+    a, b, c = coeffs[:, 0:8:2], coeffs[:, 1:8:2], coeffs[:, 8]    # (m, 4), (m, 4), (m,)
+    s2 = np.asarray(s, dtype=float) ** 2
+    # (m, 4, 1) * (1, 1, n) -> 对四项求和
+    return np.einsum('ij,ijn->in', a, np.exp(-b[:, :, None] * s2[None, None, :])) + c[:, None]
+
+
+def lattice_rotations(cell, tolerance=1e-4):
+    """
+    晶格的全部点对称操作：元素为 -1/0/1、作用于分数坐标 (x' = W·x) 且保持度规 WᵀGW = G 的整数矩阵 W。
+    :return: (n_ops, 3, 3) 整数数组，第一个是单位矩阵
+    """
+    candidates = np.array(list(itertools.product((-1, 0, 1), repeat=9))).reshape(-1, 3, 3)
+    candidates = candidates[np.abs(np.rint(np.linalg.det(candidates))) == 1]
+    metric = cell.matrix @ cell.matrix.T
+    transformed = np.einsum('nji,jk,nkl->nil', candidates, metric, candidates)
+    keep = np.all(np.abs(transformed - metric) <= tolerance * np.abs(metric).max(), axis=(1, 2))
+    rotations = candidates[keep]
+    identity = np.all(rotations == np.eye(3, dtype=int), axis=(1, 2))
+    return np.concatenate([rotations[identity], rotations[~identity]])
+
+
+def structure_rotations(structure, tolerance=SYMMETRY_TOLERANCE):
+    """
+    晶体结构的点群操作 (只取旋转部分)：配上某个平移后能把每个原子映射到同种、同占有率原子上的晶格对称操作。
+    展开后的 CrystalStructure 不保留 CIF 中的对称操作，这里从原子坐标重新求出。
+    :return: (n_ops, 3, 3) 整数数组
+    """
+    rotations = lattice_rotations(structure.cell)
+    if len(structure) == 0:
+        return rotations
+    frac = structure.frac_coords % 1.0 % 1.0
+    kinds = [f"{e}:{o:.3f}" for e, o in zip(structure.elements, structure.occupancies)]
+    _, kind = np.unique(kinds, return_inverse=True)
+    kind = kind.ravel()
+    # 原子种类作为第四个坐标，种类不同的原子相距至少 2，不会被当作匹配
+    spread = 2.0 * (kind.max() + 1)
+    tree = cKDTree(np.column_stack([frac, 2.0 * kind]), boxsize=[1.0, 1.0, 1.0, spread])
+    # 候选平移：把最少的一种原子中的第一个映射到同种原子上
+    rarest = np.argmin(np.bincount(kind))
+    anchor = np.flatnonzero(kind == rarest)
+
+    def matches(rotated, shifts, atoms):
+        """各平移下 atoms 中的原子是否都落在同种原子上"""
+        moved = (rotated[atoms][None, :, :] + shifts[:, None, :]) % 1.0 % 1.0
+        labels = np.broadcast_to(2.0 * kind[atoms][None, :, None], moved.shape[:2] + (1,))
+        distances, _ = tree.query(np.concatenate([moved, labels], axis=2).reshape(-1, 4), distance_upper_bound=tolerance)
+        return np.all(np.isfinite(distances).reshape(len(shifts), -1), axis=1)
+
+    # 先用少数原子筛掉大部分平移，再逐批对剩下的平移检查全部原子，找到一个即可
+    probe, atoms = np.arange(min(len(frac), 8)), np.arange(len(frac))
+    kept = []
+    for rotation in rotations:
+        rotated = frac @ rotation.T
+        shifts = frac[anchor] - rotated[anchor[0]]
+        shifts = shifts[matches(rotated, shifts, probe)]
+        if any(matches(rotated, shifts[start:start + 8], atoms).any() for start in range(0, len(shifts), 8)):
+            kept.append(rotation)
+    return np.array(kept)
+
+
+def equivalent_reflection_keys(hkl, rotations):
+    """
+    按劳厄群 (点群 + 反演) 给每个 hkl 一个整数键，等价衍射的键相同。
+    W 是原子坐标的对称操作时，|F(h)| = |F(Wᵀh)|，行向量写法即 h·W。
+    """
+    images = np.einsum('ni,rij->rnj', np.asarray(hkl, dtype=np.int64), rotations.astype(np.int64))
+    images = np.concatenate([images, -images])
+    span = int(np.abs(images).max()) if images.size else 0
+    base = 2 * span + 1
+    codes = ((images[..., 0] + span) * base + images[..., 1] + span) * base + images[..., 2] + span
+    return codes.max(axis=0)
+
+
+def enumerate_reflections(cell, wavelength, two_theta_max):
+    """
+    枚举 2θ 上限以内的所有 hkl (只保留 Friedel 对中的一半)。
+    :return: (hkl 整数数组 (n, 3), d 间距数组 (n,))
+    """
+    d_star_max = 2.0 * np.sin(np.radians(two_theta_max) / 2.0) / wavelength
+    # |h| = |g·a| <= |g|·|a|，据此得到各轴的搜索范围
+    h_max = np.ceil(d_star_max * np.linalg.norm(cell.matrix, axis=1)).astype(int)
+    ranges = [np.arange(-m, m + 1) for m in h_max]
+    hkl = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    h, k, l = hkl.T
+    half = (h > 0) | ((h == 0) & (k > 0)) | ((h == 0) & (k == 0) & (l > 0))
+    hkl = hkl[half]
+
+    d_star = np.linalg.norm(hkl @ cell.reciprocal_matrix, axis=1)
+    keep = d_star <= d_star_max
+    return hkl[keep], 1.0 / d_star[keep]
+
+
+def structure_factors(structure, hkl, s, default_b_iso=DEFAULT_B_ISO, chunk_size=2_000_000):
+    """
+    向量化计算结构因子 F(hkl) = Σ_j occ_j·f_j(s)·exp(-B_j·s²)·exp(2πi·h·x_j)。
+    复指数按 (反射 × 原子) 的矩阵一次性计算，大体系按反射分块以控制内存。
+    """
+    elements, type_index = np.unique(structure.elements.astype(str), return_inverse=True)
+    f0 = atomic_scattering_factors(list(elements), s)                      # (n_types, n_refl)
+    b_iso = np.where(np.isnan(structure.b_iso), default_b_iso, structure.b_iso)
+    frac = structure.frac_coords
+    occ = structure.occupancies
+
+    n_refl, n_atoms = len(hkl), len(frac)
+    step = max(1, chunk_size // max(n_atoms, 1))
+    F = np.empty(n_refl, dtype=complex)
+    for start in range(0, n_refl, step):
+        sl = slice(start, start + step)
+        phase = 2.0 * np.pi * (hkl[sl] @ frac.T)                          # (chunk, n_atoms)
+        debye_waller = np.exp(-np.outer(s[sl] ** 2, b_iso))               # (chunk, n_atoms)
+        weights = f0[type_index, sl].T * occ * debye_waller               # (chunk, n_atoms)
+        F[sl] = np.sum(weights * np.exp(1j * phase), axis=1)
+    return F
+
+
+def lorentz_polarization(two_theta, monochromator_two_theta=None):
+    """洛伦兹-偏振因子；可选地考虑晶体单色器 (2θm，单位 度)"""
+    tt = np.radians(two_theta)
+    theta = tt / 2.0
+    if monochromator_two_theta:
+        cos2m = np.cos(np.radians(monochromator_two_theta)) ** 2
+        polarization = (1.0 + np.cos(tt) ** 2 * cos2m) / (1.0 + cos2m)
+    else:
+        polarization = (1.0 + np.cos(tt) ** 2) / 2.0
+    return polarization / (np.sin(theta) ** 2 * np.cos(theta))
+
+
+def pseudo_voigt(x, fwhm, eta):
+    """面积归一化的赝Voigt峰形 (中心在0)"""
+    sigma = fwhm / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+    gamma = fwhm / 2.0
+    gauss = np.exp(-0.5 * (x / sigma) ** 2) / (sigma * np.sqrt(2.0 * np.pi))
+    lorentz = gamma / (np.pi * (x ** 2 + gamma ** 2))
+    return eta * lorentz + (1.0 - eta) * gauss
+
+
+def broaden_sticks(positions, intensities, grid_start, step, n_points, fwhm, eta=0.5):
+    """
+    把衍射线 (stick) 按线性插值分配到等间距网格，再用FFT卷积展宽为连续谱图。
+    """
+    idx = (np.asarray(positions) - grid_start) / step
+    lower = np.floor(idx).astype(int)
+    frac = idx - lower
+    sticks = np.zeros(n_points)
+    for offset, weight in ((0, 1.0 - frac), (1, frac)):
+        target = lower + offset
+        valid = (target >= 0) & (target < n_points)
+        sticks += np.bincount(target[valid], weights=intensities[valid] * weight[valid], minlength=n_points)
+
+    half_width = int(np.ceil(10.0 * fwhm / step))
+    kernel = pseudo_voigt(np.arange(-half_width, half_width + 1) * step, fwhm, eta)
+    kernel /= kernel.sum()
+
+    n_fft = 1 << int(np.ceil(np.log2(n_points + len(kernel) - 1)))
+    spectrum = np.fft.irfft(np.fft.rfft(sticks, n_fft) * np.fft.rfft(kernel, n_fft), n_fft)
+    return spectrum[half_width:half_width + n_points]
+
+
+def simulate_powder_pattern(structure, wavelength='CuKa', two_theta_range=(5.0, 90.0), step=0.02,
+                            fwhm=0.1, eta=0.5, default_b_iso=DEFAULT_B_ISO, monochromator_two_theta=None):
+    """
+    模拟粉末衍射谱图。
+    :param structure: CrystalStructure 对象
+    :param wavelength: 波长 (Å) 或 WAVELENGTHS 中的靶材名称
+    :param two_theta_range: (2θ下限, 2θ上限)，单位 度
+    :param step: 输出网格步长 (度)
+    :param fwhm: 峰的半高宽 (度)
+    :param eta: 赝Voigt中洛伦兹成分比例 (0~1)
+    :return: 字典 {'two_theta', 'intensity', 'reflections', 'wavelength'}
+             intensity 归一化为最大值100；reflections 为按 2θ 排序的衍射峰列表
+    """
+    if isinstance(wavelength, str):
+        if wavelength not in WAVELENGTHS:
+            raise ValueError(f"未知的靶材 '{wavelength}'，可选: {', '.join(WAVELENGTHS)}")
+        wavelength = WAVELENGTHS[wavelength]
+    tt_min, tt_max = two_theta_range
+    if not 0 < tt_min < tt_max < 180:
+        raise ValueError("2θ范围必须满足 0 < 下限 < 上限 < 180。")
+
+    hkl, d = enumerate_reflections(structure.cell, wavelength, tt_max)
+    two_theta = np.degrees(2.0 * np.arcsin(wavelength / (2.0 * d)))
+    in_range = two_theta >= tt_min
+    hkl, d, two_theta = hkl[in_range], d[in_range], two_theta[in_range]
+    grid = np.arange(tt_min, tt_max + step / 2.0, step)
+
+    reflections = []
+    intensity = np.zeros(len(grid))
+    if len(hkl):
+        s = 1.0 / (2.0 * d)
+        F2 = np.abs(structure_factors(structure, hkl, s, default_b_iso)) ** 2
+
+        # 合并等效衍射：在劳厄群下等价的 hkl 为同一晶面族，计数即为多重度。
+        # 不能按 (d, |F|²) 分组：立方晶系中 (333) 与 (511) 这类偶合衍射的 d、|F|² 都相同，但属于不同晶面族
+        present = F2 > 1e-8 * F2.max() if F2.max() > 0 else np.zeros(len(F2), dtype=bool)
+        hkl, d, two_theta, F2 = hkl[present], d[present], two_theta[present], F2[present]
+        keys = equivalent_reflection_keys(hkl, structure_rotations(structure))
+        _, group, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        group = group.ravel()
+        # 每组选 (h, k, l) 字典序最大的作为代表
+        order = np.lexsort((-hkl[:, 2], -hkl[:, 1], -hkl[:, 0], group))
+        _, first = np.unique(group[order], return_index=True)
+        rep = order[first]
+
+        multiplicity = 2 * counts  # 加上被省略的 Friedel 对
+        lp = lorentz_polarization(two_theta[rep], monochromator_two_theta)
+        peak_intensity = multiplicity * F2[rep] * lp
+
+        scale = 100.0 / peak_intensity.max()
+        intensity = broaden_sticks(two_theta[rep], peak_intensity, tt_min, step, len(grid), fwhm, eta)
+        if intensity.max() > 0:
+            intensity *= 100.0 / intensity.max()
+
+        for i in np.argsort(two_theta[rep]):
+            j = rep[i]
+            reflections.append({
+                'hkl': tuple(int(v) for v in hkl[j]),
+                'd': float(d[j]),
+                'two_theta': float(two_theta[j]),
+                'multiplicity': int(multiplicity[i]),
+                'F2': float(F2[j]),
+                'intensity': float(peak_intensity[i] * scale),
+            })
+
+    return {
+        'two_theta': grid,
+        'intensity': intensity,
+        'reflections': reflections,
+        'wavelength': wavelength,
+    }
+
+
+def format_reflection_table(reflections, min_intensity=1.0):
+    """把衍射峰列表格式化为文本表格"""
+    lines = [f"{'h k l':<12}{'d (Å)':<10}{'2θ (°)':<10}{'多重度':<8}{'I/I0':<8}", "-" * 48]
+    for r in reflections:
+        if r['intensity'] < min_intensity:
+            continue
+        hkl = " ".join(str(v) for v in r['hkl'])
+        lines.append(f"{hkl:<12}{r['d']:<10.4f}{r['two_theta']:<10.3f}{r['multiplicity']:<8}{r['intensity']:<8.1f}")
+    return "\n".join(lines)
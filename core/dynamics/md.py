@@ -0,0 +1,412 @@
+# chem_assistant/core/dynamics/md.py
+# 分子动力学：Lennard-Jones + 离子体系，周期性边界、网格邻居表、速度 Verlet 积分、Berendsen/Langevin 控温
+# 单位: 长度 Å，时间 fs，质量 amu，能量 eV，电荷 e
+
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+from scipy.special import erfc
+
+from core.crystallography.crystal import CrystalStructure, UnitCell
+from core.crystallography.lattice import generate_lattice
+from core.structure.bonds import pairs_between_cells
+from utils.chem_utils.element_data import atomic_mass
+
+BOLTZMANN = 8.617333e-5       # eV/K
+COULOMB = 14.399645           # e²/(4πε0)，eV·Å
+FORCE_TO_ACCELERATION = 9.648533e-3  # (eV/Å)/amu -> Å/fs²
+PRESSURE_TO_BAR = 1.602177e6  # eV/Å³ -> bar
+
+# LJ 参数 (ε/eV, σ/Å)：稀有气体取经典液体参数，离子取 Joung-Cheatham (TIP3P) 参数
+LJ_PARAMETERS = {
+    'Ne': (0.00312, 2.74), 'Ar': (0.01034, 3.40), 'Kr': (0.01420, 3.65), 'Xe': (0.01930, 3.98),
+    'Li': (0.01460, 1.41), 'Na': (0.00379, 2.44), 'K': (0.00840, 3.04),
+    'F': (0.00032, 4.02), 'Cl': (0.00154, 4.48), 'Br': (0.00117, 4.65),
+}
+DEFAULT_CHARGES = {'Li': 1.0, 'Na': 1.0, 'K': 1.0, 'F': -1.0, 'Cl': -1.0, 'Br': -1.0}
+
+# 截断半径：纯 LJ 体系取 2.5σ，带电体系取 COULOMB_CUTOFF (阻尼平移力库仑)
+LJ_CUTOFF_SIGMA = 2.5
+COULOMB_CUTOFF = 10.0
+# 阻尼平移力 (DSF) 库仑的阻尼参数 α (1/Å)
+DSF_ALPHA = 0.2
+NEIGHBOR_SKIN = 1.0
+RDF_R_MAX = 12.0  # Å，径向分布函数的缺省最大距离 (每个原子的近邻对数与体系大小无关)
+
+# 立方晶格的分数坐标基元
+FCC_BASIS = [[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]]
+ROCKSALT_ANION_BASIS = [[0.5, 0.5, 0.5], [0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5]]
+
+# 以下半壳层偏移与 bonds.py 相同，只是邻居格子按周期性边界取模
+_HALF_SHELL = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) > (0, 0, 0)]
+
+_TRACE_FIELDS = ('step', 'time', 'kinetic', 'potential', 'total', 'temperature', 'pressure')
+MDResult = namedtuple('MDResult', ['system', 'traces', 'rdf', 'steps', 'elapsed', 'particle_steps_per_second'])
+
+
+class MDSystem:
+    """周期性正交盒子中的原子集合：位置、速度、质量、电荷和 LJ 参数"""
+
+    def __init__(self, elements, positions, box, charges=None, velocities=None, title=""):
+        self.elements = np.asarray(elements).astype(str)
+        self.box = np.asarray(box, dtype=float).reshape(3)
+        self.positions = np.mod(np.asarray(positions, dtype=float).reshape(-1, 3), self.box)
+        n = len(self.elements)
+        if len(self.positions) != n:
+            raise ValueError(f"元素数 ({n}) 与坐标数 ({len(self.positions)}) 不一致。")
+        if np.any(self.box <= 0):
+            raise ValueError("盒子边长必须为正数。")
+        missing = sorted(set(self.elements) - set(LJ_PARAMETERS))
+        if missing:
+            raise ValueError(f"缺少这些元素的 LJ 参数: {', '.join(missing)}")
+        self.masses = np.array([atomic_mass(s) for s in self.elements])
+        self.epsilon = np.array([LJ_PARAMETERS[s][0] for s in self.elements])
+        self.sigma = np.array([LJ_PARAMETERS[s][1] for s in self.elements])
+        if charges is None:
+            charges = [DEFAULT_CHARGES.get(s, 0.0) for s in self.elements]
+        self.charges = np.asarray(charges, dtype=float)
+        if abs(self.charges.sum()) > 1e-6:
+            raise ValueError(f"体系总电荷为 {self.charges.sum():+g}，周期性体系必须电中性。")
+        self.velocities = np.zeros((n, 3)) if velocities is None else np.asarray(velocities, dtype=float).reshape(n, 3)
+        self.title = title
+
+    def __len__(self):
+        return len(self.elements)
+
+    @property
+    def volume(self):
+        return float(np.prod(self.box))
+
+    @property
+    def degrees_of_freedom(self):
+        return max(3 * len(self) - 3, 1)
+
+    def kinetic_energy(self):
+        return 0.5 * float(np.sum(self.masses[:, None] * self.velocities ** 2)) / FORCE_TO_ACCELERATION
+
+    def temperature(self):
+        return 2.0 * self.kinetic_energy() / (self.degrees_of_freedom * BOLTZMANN)
+
+    def assign_velocities(self, temperature, seed=None):
+        """按 Maxwell-Boltzmann 分布取速度，去掉质心运动后精确缩放到目标温度"""
+        rng = np.random.default_rng(seed)
+        scale = np.sqrt(BOLTZMANN * temperature * FORCE_TO_ACCELERATION / self.masses)
+        velocities = rng.normal(size=(len(self), 3)) * scale[:, None]
+        velocities -= np.sum(self.masses[:, None] * velocities, axis=0) / self.masses.sum()
+        self.velocities = velocities
+        current = self.temperature()
+        if current > 0:
+            self.velocities *= math.sqrt(temperature / current)
+
+
+def system_from_crystal(structure, repeats=(1, 1, 1), charges=None):
+    """由正交晶胞的晶体结构生成超胞 MD 体系 (电荷默认按 DEFAULT_CHARGES)"""
+    if not np.allclose(structure.cell.parameters[3:], 90.0):
+        raise ValueError("分子动力学目前只支持正交晶胞 (α = β = γ = 90°)。")
+    elements, positions, _ = generate_lattice(structure, repeats, include_boundary=False)
+    box = np.array(structure.cell.parameters[:3]) * np.asarray(repeats)
+    return MDSystem(elements, positions, box, charges=charges, title=structure.title or structure.formula)
+
+
+def fcc_system(element, lattice_constant, cells=4):
+    """面心立方晶格 (如 Ar 的初始构型)，共 4·cells³ 个原子"""
+    structure = CrystalStructure(UnitCell(lattice_constant, lattice_constant, lattice_constant),
+                                 [element] * 4, FCC_BASIS, title=element)
+    return system_from_crystal(structure, (cells,) * 3)
+
+
+def rocksalt_system(cation, anion, lattice_constant, cells=3):
+    """岩盐结构 (如 NaCl)，共 8·cells³ 个离子"""
+    structure = CrystalStructure(UnitCell(lattice_constant, lattice_constant, lattice_constant),
+                                 [cation] * 4 + [anion] * 4, FCC_BASIS + ROCKSALT_ANION_BASIS,
+                                 title=f"{cation}{anion}")
+    return system_from_crystal(structure, (cells,) * 3)
+
+
+# 界面中的预设体系: 名称 -> (构造函数, 默认温度 K, 时间步长 fs)
+PRESETS = {
+    'Ar 液体 (LJ)': (lambda: fcc_system('Ar', 5.7, cells=6), 120.0, 5.0),
+    'NaCl 熔体 (离子)': (lambda: rocksalt_system('Na', 'Cl', 5.9, cells=4), 1500.0, 2.0),
+}
+
+
+def minimum_image(delta, box):
+    return delta - box * np.round(delta / box)
+
+
+def periodic_pairs(positions, box, cutoff):
+    """
+    周期性边界下的网格邻居表：找出最小镜像距离小于 cutoff 的全部原子对 (每对只出现一次)。
+    每个方向至少要能分出 3 个格子，否则退化为全部原子对。
+    :return: (i, j, 距离)
+    """
+    positions = np.mod(np.asarray(positions, dtype=float), box)
+    n = len(positions)
+    n_cells = np.floor(box / cutoff).astype(np.int64)
+    if n < 2 or np.any(n_cells < 3):
+        i, j = np.triu_indices(n, 1)
+    else:
+        cells = np.minimum((positions / box * n_cells).astype(np.int64), n_cells - 1)
+        keys = (cells[:, 0] * n_cells[1] + cells[:, 1]) * n_cells[2] + cells[:, 2]
+        order = np.argsort(keys, kind='stable')
+        # 每个格子在排序后数组中的起点与原子数 (空格子计数为 0)
+        counts = np.bincount(keys, minlength=int(np.prod(n_cells)))
+        starts = np.cumsum(counts) - counts
+        occupied = np.nonzero(counts)[0]
+        coords = np.column_stack(np.unravel_index(occupied, n_cells))
+
+        pair_i, pair_j = [], []
+        i, j = pairs_between_cells(starts[occupied], counts[occupied], starts[occupied], counts[occupied])
+        upper = i < j
+        pair_i.append(i[upper]); pair_j.append(j[upper])
+        for offset in _HALF_SHELL:
+            neighbor = np.mod(coords + offset, n_cells)
+            neighbor_keys = (neighbor[:, 0] * n_cells[1] + neighbor[:, 1]) * n_cells[2] + neighbor[:, 2]
+            i, j = pairs_between_cells(starts[occupied], counts[occupied], starts[neighbor_keys], counts[neighbor_keys])
+            pair_i.append(i); pair_j.append(j)
+        i, j = order[np.concatenate(pair_i)], order[np.concatenate(pair_j)]
+
+    distances = np.linalg.norm(minimum_image(positions[i] - positions[j], box), axis=1)
+    close = distances < cutoff
+    return i[close], j[close], distances[close]
+
+
+def dsf_self_energy(charges, cutoff, alpha=DSF_ALPHA):
+    """DSF 库仑的自能修正 (常数项)"""
+    return -COULOMB * (erfc(alpha * cutoff) / (2 * cutoff) + alpha / math.sqrt(math.pi)) * float(np.sum(charges ** 2))
+
+
+def pair_parameters(sigma, epsilon, charges, i, j, cutoff):
+    """
+    邻居对的势参数 (建邻居表时计算一次，之后每步复用)：LJ 按 Lorentz-Berthelot 规则混合。
+    :return: (σ², 4ε, 截断处的 LJ 能量平移, k·q_i·q_j)
+    """
+    sig2 = (0.5 * (sigma[i] + sigma[j])) ** 2
+    eps4 = 4.0 * np.sqrt(epsilon[i] * epsilon[j])
+    s6_cut = (sig2 / (cutoff * cutoff)) ** 3
+    return sig2, eps4, eps4 * (s6_cut * s6_cut - s6_cut), COULOMB * charges[i] * charges[j]
+
+
+def pair_forces(positions, box, i, j, parameters, cutoff, alpha=DSF_ALPHA):
+    """
+    对邻居对 (i, j) 整体计算截断平移 LJ + 阻尼平移力库仑 (Fennell-Gezelter DSF)。
+    :param parameters: pair_parameters 的返回值
+    :return: (势能, (n, 3) 力, 维里 Σ r·F)
+    """
+    delta = minimum_image(positions[i] - positions[j], box)
+    r2 = np.einsum('ij,ij->i', delta, delta)
+    inside = r2 < cutoff * cutoff
+    i, j, delta, r2 = i[inside], j[inside], delta[inside], r2[inside]
+    sig2, eps4, lj_shift, qq = (p[inside] for p in parameters)
+
+    s6 = (sig2 / r2) ** 3
+    energy = float(np.sum(eps4 * (s6 * s6 - s6) - lj_shift))
+    # F·r / r² (力沿 delta 方向的系数)
+    f_over_r = 6.0 * eps4 * (2.0 * s6 * s6 - s6) / r2
+
+    charged = qq != 0.0
+    if np.any(charged):
+        # 离子体系中几乎所有对都带电，此时不必再按掩码取子数组
+        every = bool(np.all(charged))
+        qq, r2_q = (qq, r2) if every else (qq[charged], r2[charged])
+        r = np.sqrt(r2_q)
+        erfc_cut = erfc(alpha * cutoff) / cutoff
+        gauss = 2.0 * alpha / math.sqrt(math.pi)
+        shift = erfc_cut / cutoff + gauss * math.exp(-(alpha * cutoff) ** 2) / cutoff
+        erfc_r = erfc(alpha * r) / r
+        energy += float(np.sum(qq * (erfc_r - erfc_cut + shift * (r - cutoff))))
+        coulomb = qq * (erfc_r / r + gauss * np.exp(-(alpha * r) ** 2) / r - shift) / r
+        if every:
+            f_over_r += coulomb
+        else:
+            f_over_r[charged] += coulomb
+
+    force = f_over_r[:, None] * delta
+    n = len(positions)
+    forces = np.column_stack([np.bincount(i, force[:, k], minlength=n) - np.bincount(j, force[:, k], minlength=n)
+                              for k in range(3)])
+    return energy, forces, float(np.sum(f_over_r * r2))
+
+
+class BerendsenThermostat:
+    """弱耦合控温：每半步把速度按 λ² = 1 + (dt/τ)(T0/T - 1) 缩放"""
+
+    def __init__(self, temperature, tau=100.0):
+        self.temperature, self.tau = temperature, tau
+
+    def half_step(self, system, dt):
+        current = system.temperature()
+        if current > 0:
+            system.velocities *= math.sqrt(max(1.0 + dt / self.tau * (self.temperature / current - 1.0), 0.0))
+
+
+class LangevinThermostat:
+    """Langevin 控温 (OBABO 分裂)：每半步做一次 Ornstein-Uhlenbeck 速度更新"""
+
+    def __init__(self, temperature, friction=0.01, seed=None):
+        self.temperature, self.friction = temperature, friction
+        self.rng = np.random.default_rng(seed)
+
+    def half_step(self, system, dt):
+        c1 = math.exp(-self.friction * dt)
+        sigma = np.sqrt((1.0 - c1 * c1) * BOLTZMANN * self.temperature * FORCE_TO_ACCELERATION / system.masses)
+        system.velocities = c1 * system.velocities + sigma[:, None] * self.rng.normal(size=system.velocities.shape)
+
+
+class RDFAccumulator:
+    """
+    累加各元素对的径向分布函数 g(r)。
+    r_max 不超过最短盒长的 1/3，使每个方向至少能分出 3 个格子，近邻对总是由网格邻居表给出 (不会退化为全部原子对)。
+    """
+
+    def __init__(self, elements, box, r_max=None, n_bins=200):
+        self.elements = np.asarray(elements).astype(str)
+        self.box = np.asarray(box, dtype=float)
+        self.r_max = min(r_max or RDF_R_MAX, float(self.box.min()) / 3.0 * (1.0 - 1e-9))
+        self.edges = np.linspace(0.0, self.r_max, n_bins + 1)
+        self.species = sorted(set(self.elements.tolist()))
+        self._codes = np.searchsorted(self.species, self.elements)
+        self.histograms = {}
+        self.frames = 0
+
+    def add(self, positions):
+        i, j, distances = periodic_pairs(positions, self.box, self.r_max)
+        a, b = np.minimum(self._codes[i], self._codes[j]), np.maximum(self._codes[i], self._codes[j])
+        n_species = len(self.species)
+        for key in range(n_species * n_species):
+            select = a * n_species + b == key
+            if np.any(select):
+                pair = (self.species[key // n_species], self.species[key % n_species])
+                counts, _ = np.histogram(distances[select], bins=self.edges)
+                self.histograms[pair] = self.histograms.get(pair, 0) + counts
+        self.frames += 1
+
+    def result(self):
+        """:return: (r 中点, {(元素A, 元素B): g(r)}，另含 'total' 为全部原子的 g(r))"""
+        r = 0.5 * (self.edges[1:] + self.edges[:-1])
+        shell = 4.0 / 3.0 * math.pi * (self.edges[1:] ** 3 - self.edges[:-1] ** 3)
+        volume = float(np.prod(self.box))
+        counts = {s: int(np.sum(self.elements == s)) for s in self.species}
+        frames = max(self.frames, 1)
+        rdf = {}
+        for (a, b), hist in self.histograms.items():
+            # 理想气体中 A-B 对数的期望值；同种元素对每对只计一次
+            ideal_pairs = counts[a] * (counts[b] - 1) / 2 if a == b else counts[a] * counts[b]
+            rdf[a, b] = hist / (frames * ideal_pairs * shell / volume)
+        n = len(self.elements)
+        total = sum(self.histograms.values()) if self.histograms else np.zeros(len(r))
+        rdf['total'] = total / (frames * n * (n - 1) / 2 * shell / volume)
+        return r, rdf
+
+
+class MDSimulation:
+    """
+    速度 Verlet 积分器 + 可选控温器。邻居表带缓冲层，累计位移超过 skin/2 才重建。
+    :param thermostat: None (NVE)、BerendsenThermostat 或 LangevinThermostat
+    :param workers: 大于 1 时把力的计算按空间板层分给多个子进程 (见 parallel.py)
+    """
+
+    def __init__(self, system, timestep=2.0, thermostat=None, cutoff=None, skin=NEIGHBOR_SKIN, workers=1):
+        self.system = system
+        self.timestep = timestep
+        self.thermostat = thermostat
+        if cutoff is None:
+            cutoff = COULOMB_CUTOFF if np.any(system.charges) else LJ_CUTOFF_SIGMA * float(system.sigma.max())
+        # 最小镜像约定要求截断 (含缓冲层) 不超过盒子边长的一半
+        self.cutoff = min(cutoff, 0.5 * float(system.box.min()) - skin)
+        if self.cutoff <= 0:
+            raise ValueError("模拟盒子太小，无法容纳截断半径。")
+        self.skin = skin
+        self.self_energy = dsf_self_energy(system.charges, self.cutoff) if np.any(system.charges) else 0.0
+        self._pairs = None
+        self._displacement = np.zeros_like(system.positions)
+        self._parallel = None
+        if workers > 1:
+            from core.dynamics.parallel import ParallelForces
+            self._parallel = ParallelForces(system, self.cutoff, workers)
+        self.potential_energy, self.forces, self.virial = self._compute_forces()
+
+    def close(self):
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+
+    def _neighbor_pairs(self):
+        if self._pairs is None or np.max(np.sum(self._displacement ** 2, axis=1)) > (0.5 * self.skin) ** 2:
+            system = self.system
+            i, j, _ = periodic_pairs(system.positions, system.box, self.cutoff + self.skin)
+            parameters = pair_parameters(system.sigma, system.epsilon, system.charges, i, j, self.cutoff)
+            self._pairs = (i, j, parameters)
+            self._displacement[:] = 0.0
+            if self._parallel is not None:
+                self._parallel.set_pairs(system.positions, i, j, parameters)
+        return self._pairs
+
+    def _compute_forces(self):
+        i, j, parameters = self._neighbor_pairs()
+        system = self.system
+        if self._parallel is not None:
+            energy, forces, virial = self._parallel.compute(system.positions)
+        else:
+            energy, forces, virial = pair_forces(system.positions, system.box, i, j, parameters, self.cutoff)
+        return energy + self.self_energy, forces, virial
+
+    def pressure(self):
+        """维里压强 (bar)"""
+        system = self.system
+        kinetic = 2.0 * system.kinetic_energy() / 3.0
+        return (kinetic + self.virial / 3.0) / system.volume * PRESSURE_TO_BAR
+
+    def step(self):
+        system, dt = self.system, self.timestep
+        if self.thermostat is not None:
+            self.thermostat.half_step(system, 0.5 * dt)
+        acceleration = self.forces / system.masses[:, None] * FORCE_TO_ACCELERATION
+        system.velocities += 0.5 * dt * acceleration
+        move = dt * system.velocities
+        system.positions = np.mod(system.positions + move, system.box)
+        self._displacement += move
+        self.potential_energy, self.forces, self.virial = self._compute_forces()
+        system.velocities += 0.5 * dt * self.forces / system.masses[:, None] * FORCE_TO_ACCELERATION
+        if self.thermostat is not None:
+            self.thermostat.half_step(system, 0.5 * dt)
+
+    def _sample(self, steps):
+        system = self.system
+        kinetic = system.kinetic_energy()
+        return (steps, steps * self.timestep, kinetic, self.potential_energy, kinetic + self.potential_energy,
+                system.temperature(), self.pressure())
+
+    def run(self, n_steps, sample_interval=10, rdf_interval=50, rdf_r_max=None, callback=None, frame_interval=20):
+        """
+        积分 n_steps 步。
+        :param callback: callback(步数, 坐标, 当前的能量字典)，每 frame_interval 步调用一次 (如把帧发给查看器)；返回 True 时提前结束
+        :param rdf_r_max: g(r) 的最大距离，缺省为 RDF_R_MAX，且不超过最短盒长的 1/3
+        :return: MDResult；traces 为各采样点的 step/time/kinetic/potential/total/temperature/pressure 数组
+        """
+        system = self.system
+        rdf = RDFAccumulator(system.elements, system.box, rdf_r_max)
+        samples = []
+        start = time.perf_counter()
+        steps = 0
+        for steps in range(1, n_steps + 1):
+            self.step()
+            if steps % sample_interval == 0 or steps == n_steps:
+                samples.append(self._sample(steps))
+            if rdf_interval and steps % rdf_interval == 0:
+                rdf.add(system.positions)
+            if callback is not None and steps % frame_interval == 0:
+                # 帧间隔可以比采样间隔短，能量字典按当前状态计算
+                sample = samples[-1] if samples and samples[-1][0] == steps else self._sample(steps)
+                if callback(steps, system.positions.copy(), dict(zip(_TRACE_FIELDS, sample))) is True:
+                    break
+        elapsed = time.perf_counter() - start
+        if rdf.frames == 0:
+            rdf.add(system.positions)
+        columns = np.array(samples, dtype=float).reshape(-1, len(_TRACE_FIELDS)).T
+        traces = dict(zip(_TRACE_FIELDS, columns))
+        throughput = len(system) * steps / elapsed if elapsed > 0 else float('inf')
+        return MDResult(system, traces, rdf.result(), steps, elapsed, throughput)
+
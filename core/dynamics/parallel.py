@@ -0,0 +1,129 @@
+# chem_assistant/core/dynamics/parallel.py
+# 多进程力计算：按原子 i 所在的 x 方向板层把邻居对分给子进程 (空间区域分解)；坐标、邻居对和力都放在共享内存里
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.dynamics.md import pair_forces
+
+# 邻居对表每行: i, j, σ², 4ε, LJ 平移, kq_iq_j
+_PAIR_COLUMNS = 6
+
+
+def _view(block, shape, offset=0):
+    return np.ndarray(shape, dtype=np.float64, buffer=block.buf, offset=offset)
+
+
+def _worker(conn, index, n_atoms, box, cutoff, positions_name, forces_name):
+    positions_block = shared_memory.SharedMemory(name=positions_name)
+    forces_block = shared_memory.SharedMemory(name=forces_name)
+    positions = _view(positions_block, (n_atoms, 3))
+    forces = _view(forces_block, (n_atoms, 3), offset=index * n_atoms * 3 * 8)
+    pair_block = None
+    i = j = parameters = None
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'pairs':
+                _, name, n_pairs, start, stop = message
+                if pair_block is None or pair_block.name != name:
+                    if pair_block is not None:
+                        pair_block.close()
+                    pair_block = shared_memory.SharedMemory(name=name)
+                # 本进程负责的一段邻居对复制到私有内存，之后每步只读坐标
+                table = _view(pair_block, (n_pairs, _PAIR_COLUMNS))[start:stop].copy()
+                i, j = table[:, 0].astype(np.int64), table[:, 1].astype(np.int64)
+                parameters = tuple(table[:, k] for k in range(2, _PAIR_COLUMNS))
+            elif message[0] == 'step':
+                energy, partial, virial = pair_forces(positions, box, i, j, parameters, cutoff)
+                forces[:] = partial
+                conn.send((energy, virial))
+            elif message[0] == 'quit':
+                break
+    except (EOFError, OSError):
+        pass
+    finally:
+        del positions, forces
+        positions_block.close(); forces_block.close()
+        if pair_block is not None:
+            pair_block.close()
+
+
+class ParallelForces:
+    """
+    常驻子进程池：建邻居表时按板层把邻居对分段写入共享内存，每步只通知子进程读取新坐标并各自写回部分力。
+    原子数较少时进程间同步的开销会超过收益，适合上万原子的体系。
+    """
+
+    def __init__(self, system, cutoff, workers):
+        n = len(system)
+        self.n_workers = workers
+        self.box = system.box.copy()
+        self._positions_block = shared_memory.SharedMemory(create=True, size=n * 3 * 8)
+        self._forces_block = shared_memory.SharedMemory(create=True, size=workers * n * 3 * 8)
+        self._positions = _view(self._positions_block, (n, 3))
+        self._forces = _view(self._forces_block, (workers, n, 3))
+        self._pair_block = None
+        self._pipes, self._processes = [], []
+        context = multiprocessing.get_context('spawn')
+        for index in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(child, index, n, self.box, cutoff,
+                                            self._positions_block.name, self._forces_block.name))
+            process.start()
+            child.close()
+            self._pipes.append(parent); self._processes.append(process)
+
+    def set_pairs(self, positions, i, j, parameters):
+        """区域分解：按原子 i 的 x 坐标把邻居对分成 n_workers 个板层"""
+        slab = np.minimum((positions[i, 0] / self.box[0] * self.n_workers).astype(np.int64), self.n_workers - 1)
+        order = np.argsort(slab, kind='stable')
+        bounds = np.searchsorted(slab[order], np.arange(self.n_workers + 1))
+        size = max(len(i), 1) * _PAIR_COLUMNS * 8
+        if self._pair_block is None or self._pair_block.size < size:
+            self._release_pairs()
+            # 预留一半余量，避免邻居数稍有增加就重新分配
+            self._pair_block = shared_memory.SharedMemory(create=True, size=int(size * 1.5))
+        table = _view(self._pair_block, (len(i), _PAIR_COLUMNS))
+        table[:, 0], table[:, 1] = i[order], j[order]
+        for k, values in enumerate(parameters, start=2):
+            table[:, k] = values[order]
+        del table
+        for index, conn in enumerate(self._pipes):
+            conn.send(('pairs', self._pair_block.name, len(i), int(bounds[index]), int(bounds[index + 1])))
+
+    def compute(self, positions):
+        self._positions[:] = positions
+        for conn in self._pipes:
+            conn.send(('step',))
+        energy = virial = 0.0
+        for conn in self._pipes:
+            partial_energy, partial_virial = conn.recv()
+            energy += partial_energy; virial += partial_virial
+        return energy, self._forces.sum(axis=0), virial
+
+    def _release_pairs(self):
+        if self._pair_block is not None:
+            self._pair_block.close(); self._pair_block.unlink()
+            self._pair_block = None
+
+    def close(self):
+        for conn in self._pipes:
+            try:
+                conn.send(('quit',))
+            except (OSError, BrokenPipeError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._pipes:
+            conn.close()
+        self._pipes, self._processes = [], []
+        del self._positions, self._forces
+        for block in (self._positions_block, self._forces_block):
+            block.close(); block.unlink()
+        self._release_pairs()
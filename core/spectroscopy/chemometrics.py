@@ -0,0 +1,311 @@
+# chem_assistant/core/spectroscopy/chemometrics.py
+# 化学计量学：PCA 与 PLS 回归。散射校正 (SNV/MSC) 逐条谱图进行，按列中心化/自标度化以隐式算子的形式参与矩阵乘法，
+# 不生成中心化后的副本；PCA 用随机化截断 SVD，PLS 用 SIMPLS，交叉验证的各折在线程池中并行 (矩阵乘法释放 GIL)
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SCATTER_METHODS = ('none', 'snv', 'msc')
+# center: 均值中心化；autoscale: 中心化后再除以各列标准差
+SCALING_METHODS = ('center', 'autoscale')
+# venetian: 第 i 条谱图归入第 i mod k 折；contiguous: 连续分块；random: 随机打乱后按 venetian 分
+CV_SPLITS = ('venetian', 'contiguous', 'random')
+# 矩阵元素数不超过该值时直接做完整 SVD，否则用随机化 SVD
+FULL_SVD_MAX_ELEMENTS = 4_000_000
+# 随机化 SVD 的过采样列数和幂迭代次数 (谱图的奇异值衰减较慢，幂迭代使前几个成分精确到机器精度附近)
+SVD_OVERSAMPLE = 10
+SVD_POWER_ITERATIONS = 4
+# 逐块统计列均值/方差时每块的行数
+_ROW_CHUNK = 1024
+
+PCAResult = namedtuple('PCAResult', ['scores', 'loadings', 'singular_values', 'explained_variance', 'explained_ratio',
+                                     'preprocessor'])
+# x_weights: R (点数, 成分数)，X 的得分 T = X̃R (各列单位长度)；y_loadings: Q (响应数, 成分数)
+PLSModel = namedtuple('PLSModel', ['x_weights', 'x_scores', 'x_loadings', 'y_loadings', 'y_mean', 'preprocessor',
+                                   'n_components'])
+# rmsecv / r2cv: (成分数, 响应数)；predictions: (样本数, 成分数, 响应数)；folds: 每条谱图所在的折
+CrossValidation = namedtuple('CrossValidation', ['rmsecv', 'r2cv', 'predictions', 'folds', 'best_components'])
+
+
+def _as_matrix(X):
+    X = np.asarray(X, dtype=float)
+    if X.ndim != 2 or len(X) < 2:
+        raise ValueError("数据必须为 (谱图数, 点数) 的二维数组，且至少有 2 条谱图。")
+    if not np.isfinite(X).all():
+        raise ValueError("数据中含有 NaN 或无穷大 (请只取各谱图共同覆盖的范围)。")
+    return X
+
+
+def snv(X):
+    """标准正态变量变换：每条谱图减去自身均值、除以自身标准差"""
+    X = np.asarray(X, dtype=float)
+    std = X.std(axis=1, keepdims=True)
+    return (X - X.mean(axis=1, keepdims=True)) / np.where(std > 0, std, 1.0)
+
+
+def msc(X, reference):
+    """多元散射校正：每条谱图对参比谱做线性回归 x ≈ a + b·ref，校正为 (x - a) / b"""
+    X = np.asarray(X, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    centered = reference - reference.mean()
+    b = X @ centered / max(centered @ centered, 1e-300)
+    a = X.mean(axis=1) - b * reference.mean()
+    return (X - a[:, None]) / np.where(np.abs(b) > 1e-12, b, 1.0)[:, None]
+
+
+def _column_moments(data, rows=None):
+    """指定行的各列均值和样本标准差；逐块累加，不复制整个矩阵 (以第一行为偏移，避免大均值时的相消误差)"""
+    rows = np.arange(len(data)) if rows is None else rows
+    shift = data[rows[0]]
+    total, squares = np.zeros(data.shape[1]), np.zeros(data.shape[1])
+    for start in range(0, len(rows), _ROW_CHUNK):
+        block = data[rows[start:start + _ROW_CHUNK]] - shift
+        total += block.sum(axis=0)
+        squares += np.einsum('ij,ij->j', block, block)
+    n = len(rows)
+    mean = total / n
+    variance = np.clip(squares - n * mean * mean, 0.0, None) / max(n - 1, 1)
+    return mean + shift, np.sqrt(variance)
+
+
+class _Operator:
+    """
+    (data[rows] - mean) / scale 的隐式表示，只提供与稠密矩阵的乘法。取部分行时对全部行相乘后再取行
+    (多算 1/k 的乘法，但不复制数据)。
+    """
+
+    def __init__(self, data, rows, mean, scale):
+        self.data, self.rows, self.mean, self.scale = data, rows, mean, scale
+        self.shape = (len(data) if rows is None else len(rows), data.shape[1])
+
+    def matmat(self, m):
+        """(X̃ @ m)，m 为 (点数, l)"""
+        m = m / self.scale[:, None]
+        out = self.data @ m
+        if self.rows is not None:
+            out = out[self.rows]
+        return out - self.mean @ m
+
+    def rmatmat(self, n):
+        """(X̃ᵀ @ n)，n 为 (行数, l)"""
+        if self.rows is not None:
+            full = np.zeros((len(self.data), n.shape[1]))
+            full[self.rows] = n
+            out = self.data.T @ full
+        else:
+            out = self.data.T @ n
+        return (out - np.outer(self.mean, n.sum(axis=0))) / self.scale[:, None]
+
+    def dense(self):
+        data = self.data if self.rows is None else self.data[self.rows]
+        return (data - self.mean) / self.scale
+
+
+class Preprocessor:
+    """
+    散射校正 (逐条谱图，MSC 的参比谱取拟合数据的平均谱) + 按列中心化/自标度化。
+    fit 记下参比谱、各列均值和标准差，transform 对新样本做同样的变换。
+    """
+
+    def __init__(self, scatter='none', scaling='center'):
+        if scatter not in SCATTER_METHODS:
+            raise ValueError(f"未知的散射校正方法 '{scatter}'，可选: {', '.join(SCATTER_METHODS)}")
+        if scaling not in SCALING_METHODS:
+            raise ValueError(f"未知的标度方法 '{scaling}'，可选: {', '.join(SCALING_METHODS)}")
+        self.scatter, self.scaling = scatter, scaling
+        self.reference = self.mean = self.scale = None
+
+    def correct(self, X):
+        """只做散射校正；MSC 第一次调用时以 X 的平均谱为参比"""
+        if self.scatter == 'snv':
+            return snv(X)
+        if self.scatter == 'msc':
+            if self.reference is None:
+                self.reference = X.mean(axis=0)
+            return msc(X, self.reference)
+        return X
+
+    def fit_columns(self, corrected, rows=None):
+        """由已做散射校正的数据 (的部分行) 确定各列均值和标度，返回隐式算子"""
+        self.mean, std = _column_moments(corrected, rows)
+        # 常数列 (如全部归一化到同一点) 不缩放
+        self.scale = np.where(std > 0, std, 1.0) if self.scaling == 'autoscale' else np.ones_like(std)
+        return _Operator(corrected, rows, self.mean, self.scale)
+
+    def transform(self, X):
+        return (self.correct(np.asarray(X, dtype=float)) - self.mean) / self.scale
+
+
+def truncated_svd(op, rank, seed=0):
+    """
+    前 rank 个奇异值/向量。小矩阵直接完整分解；大矩阵用随机化 SVD (Halko 等, 2011)：
+    随机投影得到值域的近似基，幂迭代 (每步重新正交化) 提高精度，再在小矩阵上做精确 SVD。
+    op 为 _Operator (或有 shape/matmat/rmatmat/dense 的对象)。各成分的符号取载荷中绝对值最大的元素为正。
+    """
+    n, p = op.shape
+    rank = max(1, min(rank, n, p))
+    if n * p <= FULL_SVD_MAX_ELEMENTS:
+        U, s, Vt = np.linalg.svd(op.dense(), full_matrices=False)
+    else:
+        size = min(rank + SVD_OVERSAMPLE, n, p)
+        rng = np.random.default_rng(seed)
+        Q = np.linalg.qr(op.matmat(rng.standard_normal((p, size))))[0]
+        for _ in range(SVD_POWER_ITERATIONS):
+            Q = np.linalg.qr(op.rmatmat(Q))[0]
+            Q = np.linalg.qr(op.matmat(Q))[0]
+        Ub, s, Vt = np.linalg.svd(op.rmatmat(Q).T, full_matrices=False)
+        U = Q @ Ub
+    U, s, Vt = U[:, :rank], s[:rank], Vt[:rank]
+    signs = np.sign(Vt[np.arange(rank), np.abs(Vt).argmax(axis=1)])
+    return U * signs, s, Vt * signs[:, None]
+
+
+def pca(X, n_components=10, scatter='none', scaling='center', seed=0):
+    """
+    主成分分析。
+    :param X: (谱图数, 点数)
+    :return: PCAResult；scores (谱图数, 成分数)，loadings (成分数, 点数)，explained_ratio 为各成分解释的方差比例
+    """
+    X = _as_matrix(X)
+    preprocessor = Preprocessor(scatter, scaling)
+    op = preprocessor.fit_columns(preprocessor.correct(X))
+    U, s, Vt = truncated_svd(op, n_components, seed)
+    n = len(X)
+    _, std = _column_moments(op.data)
+    total = np.sum((std / preprocessor.scale) ** 2)
+    variance = s ** 2 / (n - 1)
+    return PCAResult(U * s, Vt, s, variance, variance / total if total > 0 else np.zeros_like(variance), preprocessor)
+
+
+def pca_transform(result, X):
+    """新谱图在已有主成分上的得分"""
+    return result.preprocessor.transform(np.atleast_2d(X)) @ result.loadings.T
+
+
+def _simpls(op, Y, n_components):
+    """
+    SIMPLS (de Jong, 1993)：每个成分只需 X̃r、X̃ᵀt 两次矩阵-向量乘法，不对 X 做收缩。
+    Y 已中心化 (行数, 响应数)。X 的秩不足时提前结束。:return: (R, T, P, Q)
+    """
+    n, p = op.shape
+    S = op.rmatmat(Y)
+    R, T, P, Q, V = [], [], [], [], np.zeros((p, 0))
+    for _ in range(min(n_components, n - 1, p)):
+        r = S[:, 0].copy() if S.shape[1] == 1 else np.linalg.svd(S, full_matrices=False)[0][:, 0]
+        t = op.matmat(r[:, None])[:, 0]
+        norm = np.linalg.norm(t)
+        if norm <= 1e-10 * max(np.linalg.norm(r), 1e-300):
+            break
+        t, r = t / norm, r / norm
+        loading = op.rmatmat(t[:, None])[:, 0]
+        v = loading - V @ (V.T @ loading)
+        v /= max(np.linalg.norm(v), 1e-300)
+        S -= np.outer(v, v @ S)
+        V = np.column_stack([V, v])
+        R.append(r), T.append(t), P.append(loading), Q.append(Y.T @ t)
+    if not R:
+        raise ValueError("X 的方差为零，无法建立 PLS 模型。")
+    return np.column_stack(R), np.column_stack(T), np.column_stack(P), np.column_stack(Q)
+
+
+def _as_responses(y, n):
+    y = np.asarray(y, dtype=float)
+    Y = y[:, None] if y.ndim == 1 else y
+    if Y.ndim != 2 or len(Y) != n:
+        raise ValueError(f"参考值个数 ({len(y)}) 与谱图条数 ({n}) 不一致。")
+    if not np.isfinite(Y).all():
+        raise ValueError("参考值中含有 NaN 或无穷大。")
+    return Y
+
+
+def pls(X, y, n_components=10, scatter='none', scaling='center'):
+    """
+    PLS 回归 (y 为一维时 PLS1，二维时 PLS2)。
+    :return: PLSModel；用 pls_predict 预测，可指定使用前几个成分
+    """
+    X = _as_matrix(X)
+    Y = _as_responses(y, len(X))
+    preprocessor = Preprocessor(scatter, scaling)
+    op = preprocessor.fit_columns(preprocessor.correct(X))
+    y_mean = Y.mean(axis=0)
+    R, T, P, Q = _simpls(op, Y - y_mean, n_components)
+    return PLSModel(R, T, P, Q, y_mean if np.ndim(y) == 2 else y_mean[0], preprocessor, R.shape[1])
+
+
+def pls_coefficients(model, n_components=None):
+    """预处理后数据上的回归系数 B = R·Qᵀ (点数,) 或 (点数, 响应数)"""
+    a = model.n_components if n_components is None else n_components
+    if not 1 <= a <= model.n_components:
+        raise ValueError(f"成分数应在 1 到 {model.n_components} 之间。")
+    B = model.x_weights[:, :a] @ model.y_loadings[:, :a].T
+    return B if np.ndim(model.y_mean) else B[:, 0]
+
+
+def pls_predict(model, X, n_components=None):
+    return model.preprocessor.transform(np.atleast_2d(X)) @ pls_coefficients(model, n_components) + model.y_mean
+
+
+def cv_folds(n, folds=5, split='venetian', seed=0):
+    """每个样本所在的折 (0 … folds-1)"""
+    if split not in CV_SPLITS:
+        raise ValueError(f"未知的划分方式 '{split}'，可选: {', '.join(CV_SPLITS)}")
+    if not 2 <= folds <= n:
+        raise ValueError(f"折数应在 2 到样本数 ({n}) 之间。")
+    if split == 'contiguous':
+        return np.repeat(np.arange(folds), [len(part) for part in np.array_split(np.arange(n), folds)])
+    order = np.random.default_rng(seed).permutation(n) if split == 'random' else np.arange(n)
+    assignment = np.empty(n, dtype=int)
+    assignment[order] = np.arange(n) % folds
+    return assignment
+
+
+def _cv_fold(corrected, Y, assignment, fold, n_components, scaling):
+    """训练一折并预测留出的样本，返回 (留出样本下标, (留出数, 成分数, 响应数) 的预测)"""
+    train, test = np.flatnonzero(assignment != fold), np.flatnonzero(assignment == fold)
+    preprocessor = Preprocessor('none', scaling)
+    op = preprocessor.fit_columns(corrected, train)
+    y_mean = Y[train].mean(axis=0)
+    R, _, _, Q = _simpls(op, Y[train] - y_mean, n_components)
+    scores = ((corrected[test] - preprocessor.mean) / preprocessor.scale) @ R
+    # 用前 a 个成分的预测 = 前 a 项得分·载荷之和
+    predictions = np.cumsum(scores[:, :, None] * Q.T[None, :, :], axis=1) + y_mean
+    if predictions.shape[1] < n_components:
+        predictions = np.concatenate([predictions, np.repeat(predictions[:, -1:], n_components - predictions.shape[1], axis=1)], axis=1)
+    return test, predictions
+
+
+def pls_cross_validate(X, y, n_components=10, folds=5, split='venetian', scatter='none', scaling='center', workers=None,
+                       seed=0):
+    """
+    k 折交叉验证，得到 1 … n_components 个成分的 RMSECV。散射校正只做一次 (MSC 的参比为全部谱图的平均谱)，
+    中心化/标度化在每折的训练集上重新计算。各折在线程池中并行，workers 为 1 时依次计算。
+    :return: CrossValidation；best_components 为 RMSECV (各响应平均) 最小的成分数
+    """
+    X = _as_matrix(X)
+    Y = _as_responses(y, len(X))
+    assignment = cv_folds(len(X), folds, split, seed)
+    # 最小训练集的中心化数据秩至多为 (样本数 - 1)
+    smallest = len(X) - np.bincount(assignment).max()
+    n_components = max(1, min(n_components, smallest - 1, X.shape[1]))
+    corrected = Preprocessor(scatter, scaling).correct(X)
+    predictions = np.empty((len(X), n_components, Y.shape[1]))
+    workers = min(workers or os.cpu_count() or 1, folds)
+    args = [(corrected, Y, assignment, fold, n_components, scaling) for fold in range(folds)]
+    if workers == 1:
+        results = [_cv_fold(*a) for a in args]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda a: _cv_fold(*a), args))
+    for test, fold_predictions in results:
+        predictions[test] = fold_predictions
+    residuals = predictions - Y[:, None, :]
+    rmsecv = np.sqrt(np.mean(residuals ** 2, axis=0))
+    total = np.sum((Y - Y.mean(axis=0)) ** 2, axis=0)
+    r2cv = 1.0 - np.sum(residuals ** 2, axis=0) / np.where(total > 0, total, 1.0)
+    best = int(np.argmin(rmsecv.mean(axis=1))) + 1
+    if np.ndim(y) == 1:
+        return CrossValidation(rmsecv[:, 0], r2cv[:, 0], predictions[:, :, 0], assignment, best)
+    return CrossValidation(rmsecv, r2cv, predictions, assignment, best)
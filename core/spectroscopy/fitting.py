@@ -0,0 +1,391 @@
+# chem_assistant/core/spectroscopy/fitting.py
+# 重叠峰拟合：若干高斯/洛伦兹/Voigt 峰 + 多项式基线，解析雅可比，带边界的 Levenberg-Marquardt
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.special import wofz
+
+PEAK_SHAPES = ('gaussian', 'lorentzian', 'voigt')
+# 每种峰形的参数 (面积归一化，第二个参数就是峰面积)
+PARAM_NAMES = {
+    'gaussian': ('center', 'area', 'fwhm'),
+    'lorentzian': ('center', 'area', 'fwhm'),
+    'voigt': ('center', 'area', 'sigma', 'gamma'),
+}
+# |z| 超过该值时 Faddeeva 函数用渐近展开 (相对误差 < 5e-7)，只在峰附近调用 wofz
+FADDEEVA_ASYMPTOTIC = 6.0
+# 计算 JᵀJ 时每块的数据点数
+CHUNK_POINTS = 2048
+# 雅可比只在峰中心 ± 该倍数半高宽内计算。窗口外高斯已小于 1e-30 (直接略去)；
+# 洛伦兹/Voigt 的翼部仍计入模型 (洛伦兹用原式，Voigt 用实数渐近式，8 倍处相对误差 < 3e-6)，
+# 只是迭代时不计入雅可比：解处残差为噪声，略去的梯度项均值为零，不引入偏差。
+# 翼部对面积、宽度的偏导并不小 (洛伦兹翼部 ∝ 面积·宽度/u²)，收敛后用完整雅可比再算一次 JᵀJ 求协方差
+WINDOW_FWHM = {'gaussian': 5.0, 'lorentzian': 8.0, 'voigt': 8.0}
+# 翼部之和在间距不超过 (最窄窗口半宽 / 该值) 的节点上精确计算、其间线性插值；
+# 翼部 ∝ 1/u²，窗口边缘处插值的相对误差 < 0.75/32² ≈ 0.07%，离峰越远越小
+TAIL_KNOTS_PER_WINDOW = 32
+
+FitResult = namedtuple('FitResult', ['shape', 'params', 'errors', 'baseline', 'baseline_errors', 'areas', 'area_errors',
+                                     'centers', 'center_errors', 'fwhm', 'heights', 'fitted', 'chi2', 'r_squared',
+                                     'iterations', 'converged', 'x_range'])
+
+_GAUSS_NORM = 2.0 * np.sqrt(np.log(2.0) / np.pi)
+_FOUR_LN2 = 4.0 * np.log(2.0)
+_SQRT2 = np.sqrt(2.0)
+_SQRT_PI = np.sqrt(np.pi)
+
+
+def _faddeeva(z):
+    """w(z) = exp(-z²)·erfc(-iz)；远离峰中心处用渐近展开 i/(√π·z)·Σ (2k-1)!!/(2z²)^k"""
+    # z = 0 (γ = 0 的峰中心) 处的除零结果随后被 wofz 覆盖
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / z
+        inv2 = inv * inv
+        w = (1j / _SQRT_PI) * inv * (1.0 + inv2 * (0.5 + inv2 * (0.75 + inv2 * (1.875 + 6.5625 * inv2))))
+    near = z.real ** 2 + z.imag ** 2 <= FADDEEVA_ASYMPTOTIC ** 2
+    w[near] = wofz(z[near])
+    return w
+
+
+def peak_profiles(shape, x, params, jacobian=False):
+    """
+    各峰 (面积为 1 时) 的峰形乘以面积。
+    :param params: (n_peaks, n_params) 数组，各列含义见 PARAM_NAMES[shape]
+    :return: (m, n_peaks) 数组；jacobian=True 时另返回对各参数的偏导 (n_params 个 (m, n_peaks) 数组)
+    """
+    x = np.asarray(x, dtype=float)[:, None]
+    center, area = params[:, 0], params[:, 1]
+    u = x - center
+    if shape == 'gaussian':
+        width = params[:, 2]
+        profile = _GAUSS_NORM / width * np.exp(-_FOUR_LN2 * u * u / (width * width))
+        values = area * profile
+        if not jacobian:
+            return values
+        return values, [values * (2.0 * _FOUR_LN2 * u / width ** 2), profile,
+                        values * (2.0 * _FOUR_LN2 * u * u / width ** 3 - 1.0 / width)]
+    if shape == 'lorentzian':
+        width = params[:, 2]
+        denominator = width * width + 4.0 * u * u
+        profile = (2.0 / np.pi) * width / denominator
+        values = area * profile
+        if not jacobian:
+            return values
+        return values, [values * (8.0 * u / denominator), profile,
+                        values * ((4.0 * u * u - width * width) / (width * denominator))]
+    if shape == 'voigt':
+        sigma, gamma = params[:, 2], params[:, 3]
+        scale = 1.0 / (sigma * _SQRT2)
+        z = (u + 1j * gamma) * scale
+        w = _faddeeva(z)
+        norm = 1.0 / (sigma * np.sqrt(2.0 * np.pi))
+        profile = w.real * norm
+        values = area * profile
+        if not jacobian:
+            return values
+        # w'(z) = -2z·w + 2i/√π；∂z/∂c = -1/(σ√2)，∂z/∂γ = i/(σ√2)，∂z/∂σ = -z/σ
+        dw = (-2.0 * z * w + 2j / _SQRT_PI) * (area * norm)
+        return values, [-dw.real * scale, profile, -(dw * z).real / sigma - values / sigma, -dw.imag * scale]
+    raise ValueError(f"未知的峰形 '{shape}'，可选: {', '.join(PEAK_SHAPES)}")
+
+
+def peak_tails(shape, x, params):
+    """
+    远离峰中心处 (计算窗口之外) 的峰形，(m, n_peaks)；高斯返回 None (可忽略)。
+    Voigt 用 Re w(z) 的前三项渐近展开，记 z = a + ib，q = 1/|z|²，t = a²q，s = b²q：
+    Re w ≈ bq/√π·[1 + (3t - s)q/2 + 3(5t² - 10ts + s²)q²/4]，只含实数运算
+    """
+    if shape == 'gaussian':
+        return None
+    if shape == 'lorentzian':
+        return peak_profiles(shape, x, params)
+    x = np.asarray(x, dtype=float)[:, None]
+    sigma, gamma = params[:, 2], params[:, 3]
+    a = (x - params[:, 0]) / (sigma * _SQRT2)
+    b = gamma / (sigma * _SQRT2)
+    q = 1.0 / (a * a + b * b)
+    t, s = a * a * q, b * b * q
+    series = 1.0 + q * (0.5 * (3.0 * t - s) + 0.75 * q * (5.0 * t * t - 10.0 * t * s + s * s))
+    return (params[:, 1] / (sigma * np.sqrt(2.0 * np.pi) * _SQRT_PI)) * b * q * series
+
+
+def peak_fwhm(shape, params):
+    """各峰的半高宽；Voigt 用 Olivero-Longbothum 近似 (误差约 0.02%)"""
+    if shape in ('gaussian', 'lorentzian'):
+        return params[:, 2].copy()
+    f_gauss = 2.0 * np.sqrt(2.0 * np.log(2.0)) * params[:, 2]
+    f_lorentz = 2.0 * params[:, 3]
+    return 0.5346 * f_lorentz + np.sqrt(0.2166 * f_lorentz ** 2 + f_gauss ** 2)
+
+
+def peak_heights(shape, params):
+    """各峰的峰高 (峰中心处的函数值)"""
+    index = np.arange(len(params))
+    return peak_profiles(shape, params[:, 0], params)[index, index]
+
+
+def initial_params(shape, centers, heights, fwhms):
+    """由寻峰得到的位置、峰高、半高宽给出初值；Voigt 初值取高斯、洛伦兹宽度相等且总半高宽不变"""
+    centers, heights, fwhms = (np.asarray(v, dtype=float) for v in (centers, heights, fwhms))
+    if shape == 'voigt':
+        # f_G = f_L = a 时 Voigt 半高宽约为 1.6376a
+        part = fwhms / 1.6376
+        params = np.column_stack([centers, np.ones(len(centers)), part / (2.0 * np.sqrt(2.0 * np.log(2.0))), part / 2.0])
+    elif shape in ('gaussian', 'lorentzian'):
+        params = np.column_stack([centers, np.ones(len(centers)), fwhms])
+    else:
+        raise ValueError(f"未知的峰形 '{shape}'，可选: {', '.join(PEAK_SHAPES)}")
+    params[:, 1] = heights / peak_heights(shape, params)
+    return params
+
+
+def _polynomial_basis(x, degree, x_range):
+    """多项式基线的基函数 (自变量缩放到 [-1, 1]，避免高次项数值溢出)"""
+    lo, hi = x_range
+    t = (np.asarray(x, dtype=float) - (lo + hi) / 2.0) / max((hi - lo) / 2.0, 1e-300)
+    return t[:, None] ** np.arange(degree + 1)
+
+
+class _Model:
+    """
+    把 (峰参数, 基线系数) 展平为一个参数向量，分块计算残差、JᵀJ 和 Jᵀr。
+    每个峰的精确峰形和雅可比只在中心 ± WINDOW_FWHM·半高宽 的窗口内计算 (窗口随参数更新)，
+    窗口外用 peak_tails (见 tail_sum)；每块数据只对窗口与之重叠的峰求导，按列散布到 JᵀJ 中，不保存整个雅可比矩阵。
+    """
+
+    def __init__(self, shape, x, y, n_peaks, degree):
+        self.shape, self.x, self.y = shape, x, y
+        self.n_peaks, self.k = n_peaks, len(PARAM_NAMES[shape])
+        self.degree = degree
+        self.x_range = (float(x[0]), float(x[-1]))
+        self.basis = _polynomial_basis(x, degree, self.x_range)
+        self.windows = None
+
+    def split(self, theta):
+        return theta[:self.n_peaks * self.k].reshape(self.n_peaks, self.k), theta[self.n_peaks * self.k:]
+
+    def update_windows(self, theta):
+        params = self.split(theta)[0]
+        half = WINDOW_FWHM[self.shape] * peak_fwhm(self.shape, params)
+        self.windows = (np.searchsorted(self.x, params[:, 0] - half), np.searchsorted(self.x, params[:, 0] + half))
+
+    def tail_sum(self, params):
+        """
+        各峰在自身窗口之外的翼部之和 (m,)；高斯返回 None。
+        翼部平滑，只在节点上对所有峰精确计算，节点之间线性插值；
+        窗口边界所在的节点区间内，该峰的翼部逐点精确计算。总计算量约为 O(节点数·峰数 + m)，而不是 O(m·峰数)。
+        """
+        if self.shape == 'gaussian':
+            return None
+        lo, hi = self.windows
+        m = len(self.x)
+        half = WINDOW_FWHM[self.shape] * peak_fwhm(self.shape, params)
+        spacing = max(float(half.min()) / TAIL_KNOTS_PER_WINDOW, 1e-300)
+        # 节点取每个间距格的第一个点及其前一个点：相邻节点要么是相邻数据点，要么相距不超过一个间距
+        steps = np.flatnonzero(np.diff(np.floor((self.x - self.x[0]) / spacing)) > 0) + 1
+        is_knot = np.zeros(m, dtype=bool)
+        is_knot[[0, m - 1]] = True
+        is_knot[steps - 1] = is_knot[steps] = True
+        knots = np.flatnonzero(is_knot)
+        if len(knots) >= m // 4:
+            tails = peak_tails(self.shape, self.x, params)
+            rows = np.arange(m)[:, None]
+            tails *= (rows < lo) | (rows >= hi)
+            return tails.sum(axis=1)
+        # 节点区间 t 包含数据点 [start_t, stop_t)，插值端点为节点 start_t 与 start_{t+1} (最后一个区间为末点)
+        start = knots[:-1]
+        stop = np.append(knots[1:-1], m)
+        outside = (stop[:, None] <= lo) | (start[:, None] >= hi)
+        at_knots = peak_tails(self.shape, self.x[knots], params)
+        left = (at_knots[:-1] * outside).sum(axis=1)
+        right = (at_knots[1:] * outside).sum(axis=1)
+        segment = np.repeat(np.arange(len(start)), stop - start)
+        x0, x1 = self.x[start][segment], self.x[knots[1:]][segment]
+        fraction = np.divide(self.x - x0, x1 - x0, out=np.zeros(m), where=x1 > x0)
+        total = left[segment] + (right - left)[segment] * fraction
+        # 窗口边界落在其中的区间：该峰的翼部逐点计算
+        inside = (start[:, None] >= lo) & (stop[:, None] <= hi)
+        for t, j in zip(*np.nonzero(~outside & ~inside)):
+            rows = np.arange(start[t], stop[t])
+            keep = (rows < lo[j]) | (rows >= hi[j])
+            total[rows[keep]] += peak_tails(self.shape, self.x[rows[keep]], params[j:j + 1])[:, 0]
+        return total
+
+    def full_normal_matrix(self, theta):
+        """完整雅可比 (各峰在所有数据点上的偏导，含窗口外的翼部) 的 JᵀJ；O(m·峰数)，只在收敛后用于协方差"""
+        params = self.split(theta)[0]
+        jtj = np.zeros((len(theta), len(theta)))
+        for start in range(0, len(self.x), CHUNK_POINTS):
+            stop = min(start + CHUNK_POINTS, len(self.x))
+            derivatives = peak_profiles(self.shape, self.x[start:stop], params, jacobian=True)[1]
+            jac = np.hstack([np.stack(derivatives, axis=2).reshape(stop - start, -1), self.basis[start:stop]])
+            jtj += jac.T @ jac
+        return jtj
+
+    def _chunks(self, params, jacobian):
+        """逐块给出 (切片, 窗口与该块重叠的峰下标, 峰值之和, 窗口内的各参数偏导)"""
+        lo, hi = self.windows
+        tails = self.tail_sum(params)
+        for start in range(0, len(self.x), CHUNK_POINTS):
+            stop = min(start + CHUNK_POINTS, len(self.x))
+            x = self.x[start:stop]
+            active = np.flatnonzero((lo < stop) & (hi > start))
+            rows = np.arange(start, stop)[:, None]
+            inside = (rows >= lo[active]) & (rows < hi[active])
+            total = np.zeros(len(x)) if tails is None else tails[start:stop]
+            if jacobian:
+                values, derivatives = peak_profiles(self.shape, x, params[active], jacobian=True)
+                yield slice(start, stop), active, total + (values * inside).sum(axis=1), [d * inside for d in derivatives]
+            else:
+                values = peak_profiles(self.shape, x, params[active])
+                yield slice(start, stop), active, total + (values * inside).sum(axis=1), None
+
+    def residual(self, theta):
+        params, coeffs = self.split(theta)
+        r = self.basis @ coeffs - self.y
+        for rows, _, values, _ in self._chunks(params, False):
+            r[rows] += values
+        return r
+
+    def normal_equations(self, theta):
+        """(JᵀJ, Jᵀr, 残差)；调用时按 theta 更新各峰的计算窗口"""
+        self.update_windows(theta)
+        params, coeffs = self.split(theta)
+        n_peak_params = params.size
+        n = len(theta)
+        jtj, jtr = np.zeros((n, n)), np.zeros(n)
+        residual = self.basis @ coeffs - self.y
+        chunks = list(self._chunks(params, True))
+        for rows, _, values, _ in chunks:
+            residual[rows] += values
+        base = np.arange(n_peak_params, n)
+        jtj[np.ix_(base, base)] = self.basis.T @ self.basis
+        jtr[base] = self.basis.T @ residual
+        for rows, active, _, derivatives in chunks:
+            if not len(active):
+                continue
+            # 列顺序与 theta 相同：峰 0 的各参数、峰 1 的各参数……
+            jac = np.stack(derivatives, axis=2).reshape(rows.stop - rows.start, -1)
+            cols = (active[:, None] * self.k + np.arange(self.k)).ravel()
+            basis, r = self.basis[rows], residual[rows]
+            jtj[np.ix_(cols, cols)] += jac.T @ jac
+            cross = jac.T @ basis
+            jtj[np.ix_(cols, base)] += cross
+            jtj[np.ix_(base, cols)] += cross.T
+            jtr[cols] += jac.T @ r
+        return jtj, jtr, residual
+
+
+def _levenberg_marquardt(model, theta, lower, upper, max_iter, tol):
+    """
+    投影 Levenberg-Marquardt：解 (JᵀJ + λ·diag(JᵀJ))δ = -Jᵀr，结果截断到边界内；
+    已贴在边界上、且梯度继续指向边界外的参数本轮固定不动。λ 按实际/预测下降比调整 (Nielsen)。
+    试探点直接连同雅可比一起计算 (多数试探会被接受，省去单独求残差的一遍)。
+    :return: (theta, JᵀJ, 残差, 迭代次数, 是否收敛)
+    """
+    lam, nu = 1e-3, 2.0
+    jtj, jtr, residual = model.normal_equations(theta)
+    cost = residual @ residual
+    for iteration in range(1, max_iter + 1):
+        free = ~(((theta <= lower) & (jtr > 0)) | ((theta >= upper) & (jtr < 0)))
+        a, g = jtj[np.ix_(free, free)], jtr[free]
+        diag = np.maximum(np.diag(a), 1e-12 * max(np.diag(a).max(), 1e-300))
+        while True:
+            step = np.zeros_like(theta)
+            try:
+                step[free] = np.linalg.solve(a + lam * np.diag(diag), -g)
+            except np.linalg.LinAlgError:
+                lam, nu = lam * nu, nu * 2.0
+                continue
+            candidate = np.clip(theta + step, lower, upper)
+            delta = (candidate - theta)[free]
+            predicted = -(2.0 * delta @ g + delta @ a @ delta)
+            trial = model.normal_equations(candidate)
+            new_cost = trial[2] @ trial[2]
+            if new_cost < cost and predicted > 0:
+                lam *= max(1.0 / 3.0, 1.0 - (2.0 * (cost - new_cost) / predicted - 1.0) ** 3)
+                nu = 2.0
+                break
+            lam, nu = lam * nu, nu * 2.0
+            if lam > 1e16:
+                return theta, jtj, residual, iteration, True
+        improvement = (cost - new_cost) / max(cost, 1e-300)
+        small_step = np.all(np.abs(candidate - theta) <= tol * (np.abs(theta) + tol))
+        theta, (jtj, jtr, residual), cost = candidate, trial, new_cost
+        if improvement < tol or small_step:
+            return theta, jtj, residual, iteration, True
+    return theta, jtj, residual, max_iter, False
+
+
+def fit_peaks(x, y, centers, heights, fwhms, shape='voigt', baseline_degree=1, center_tolerance=1.0,
+              max_iter=200, tol=1e-7):
+    """
+    在一段谱图上拟合 "多个峰 + 多项式基线"。
+    :param centers, heights, fwhms: 各峰初值 (通常来自寻峰结果)
+    :param shape: 'gaussian'、'lorentzian' 或 'voigt' (所有峰同一峰形)
+    :param baseline_degree: 基线多项式次数
+    :param center_tolerance: 峰中心只能在初值 ± center_tolerance·初始半高宽 范围内移动
+    :return: FitResult；errors/area_errors 等为由 σ²·(JᵀJ)⁻¹ 得到的 1σ 不确定度 (J 为含翼部的完整雅可比)
+    """
+    if shape not in PEAK_SHAPES:
+        raise ValueError(f"未知的峰形 '{shape}'，可选: {', '.join(PEAK_SHAPES)}")
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    order = np.argsort(x[keep], kind='stable')
+    x, y = x[keep][order], y[keep][order]
+    fwhms = np.asarray(fwhms, dtype=float)
+    if len(fwhms) == 0:
+        raise ValueError("没有可拟合的峰。")
+    if np.any(fwhms <= 0):
+        raise ValueError("峰的初始半高宽必须为正。")
+    params = initial_params(shape, centers, heights, fwhms)
+    n_params = params.size + baseline_degree + 1
+    if len(x) <= n_params:
+        raise ValueError(f"数据点数 ({len(x)}) 少于拟合参数个数 ({n_params})。")
+
+    model = _Model(shape, x, y, len(params), baseline_degree)
+    # 基线初值：扣掉初始峰后的线性最小二乘
+    theta = np.concatenate([params.ravel(), np.zeros(baseline_degree + 1)])
+    model.update_windows(theta)
+    coeffs = np.linalg.lstsq(model.basis, -model.residual(theta), rcond=None)[0]
+    theta[params.size:] = coeffs
+
+    # 边界：中心限制在初值附近，面积非负，宽度在 (初值/1000, 数据范围) 之内，Voigt 的 γ 可以为 0 (纯高斯)
+    lower_peak, upper_peak = np.empty_like(params), np.empty_like(params)
+    lower_peak[:, 0], upper_peak[:, 0] = params[:, 0] - center_tolerance * fwhms, params[:, 0] + center_tolerance * fwhms
+    lower_peak[:, 1], upper_peak[:, 1] = 0.0, np.inf
+    lower_peak[:, 2:], upper_peak[:, 2:] = 1e-3 * params[:, 2:], max(float(x[-1] - x[0]), 1e-300)
+    if shape == 'voigt':
+        lower_peak[:, 3] = 0.0
+    lower = np.concatenate([lower_peak.ravel(), np.full(len(coeffs), -np.inf)])
+    upper = np.concatenate([upper_peak.ravel(), np.full(len(coeffs), np.inf)])
+    theta = np.clip(theta, lower, upper)
+
+    theta, jtj, residual, iterations, converged = _levenberg_marquardt(model, theta, lower, upper, max_iter, tol)
+    if shape != 'gaussian':
+        # 迭代用的 JᵀJ 略去了翼部，直接用它求协方差会低估不确定度
+        jtj = model.full_normal_matrix(theta)
+
+    cost = residual @ residual
+    dof = max(len(x) - len(theta), 1)
+    covariance = np.linalg.pinv(jtj) * (cost / dof)
+    errors = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+    params, coeffs = model.split(theta)
+    peak_errors, coeff_errors = model.split(errors)
+    fitted = y + residual
+    total = np.sum((y - y.mean()) ** 2)
+    return FitResult(shape, params, peak_errors, coeffs, coeff_errors, params[:, 1].copy(), peak_errors[:, 1].copy(),
+                     params[:, 0].copy(), peak_errors[:, 0].copy(), peak_fwhm(shape, params), peak_heights(shape, params),
+                     fitted, cost / dof, 1.0 - cost / total if total > 0 else 1.0, iterations, converged, model.x_range)
+
+
+def fit_baseline(result, x):
+    """拟合得到的多项式基线在 x 上的值"""
+    return _polynomial_basis(x, len(result.baseline) - 1, result.x_range) @ result.baseline
+
+
+def fit_components(result, x):
+    """拟合结果在 x 上的各峰 (m, n_peaks) 与基线 (m,)，用于作图"""
+    x = np.asarray(x, dtype=float)
+    return peak_profiles(result.shape, x, result.params), fit_baseline(result, x)
@@ -0,0 +1,319 @@
+# chem_assistant/core/spectroscopy/library.py
+# 本地谱库：各谱图分桶、归一化后存成一个 float32 矩阵文件 (内存映射)，另存每条谱图最高几个峰所在 bin 的倒排表；
+# 检索时先用倒排表挑出与未知谱共享峰的候选，只对候选分块计算余弦/点积相似度，argpartition 取前 k 个
+
+import json
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.spectroscopy.workspace import LoadError, resample, spectrum_files, _read_xy, _sorted_finite
+
+LIBRARY_VERSION = 1
+LIBRARY_NORMALIZATIONS = ('l2', 'max')
+METRICS = ('cosine', 'dot')
+DEFAULT_BINS = 2048
+# 倒排表中每条谱图记录的峰数；检索时未知谱取同样多的峰，允许 ±INDEX_TOLERANCE 个 bin 的偏移
+PEAKS_PER_SPECTRUM = 8
+INDEX_TOLERANCE = 1
+# 候选至少共享这么多个峰；候选过多时只保留共享峰最多的 MAX_CANDIDATES 条
+MIN_SHARED_PEAKS = 2
+MAX_CANDIDATES = 20_000
+# 分块计算相似度时每块的行数 (float32，2048 个 bin 时每块 64 MB)
+BLOCK_ROWS = 8192
+# 未指定横轴范围时，由前这么多个文件的范围 (并集) 确定
+_RANGE_SAMPLE = 64
+_CHUNK_SIZE = 64
+
+_META_FILE = 'library.json'
+_MATRIX_FILE = 'spectra.f32'
+_NORMS_FILE = 'norms.npy'
+_OFFSETS_FILE = 'index_offsets.npy'
+_IDS_FILE = 'index_ids.npy'
+
+LibraryMatch = namedtuple('LibraryMatch', ['index', 'name', 'score', 'shared_peaks'])
+
+
+def bin_spectrum(x, y, grid, normalization='l2'):
+    """把一条谱图 (x 升序) 分桶到谱库横轴上 (范围外为 0)，按 L2 范数或最大绝对值归一化，返回 float32"""
+    if normalization not in LIBRARY_NORMALIZATIONS:
+        raise ValueError(f"未知的归一化方法 '{normalization}'，可选: {', '.join(LIBRARY_NORMALIZATIONS)}")
+    row = np.nan_to_num(resample(x, y, grid), nan=0.0)
+    scale = np.linalg.norm(row) if normalization == 'l2' else np.max(np.abs(row))
+    if not scale > 0:
+        raise ValueError("谱图不在谱库横轴范围内或强度全为零。")
+    return (row / scale).astype(np.float32)
+
+
+def top_peaks(rows, count=PEAKS_PER_SPECTRUM):
+    """各行最高的 count 个正的局部极大值所在的 bin (顺序不定)，不足时补 -1；(行数, count)"""
+    rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+    inner = rows[:, 1:-1]
+    heights = np.full(rows.shape, -np.inf, dtype=np.float32)
+    heights[:, 1:-1] = np.where((inner > rows[:, :-2]) & (inner >= rows[:, 2:]) & (inner > 0), inner, -np.inf)
+    count = min(count, rows.shape[1])
+    top = np.argpartition(-heights, count - 1, axis=1)[:, :count]
+    return np.where(np.isfinite(np.take_along_axis(heights, top, axis=1)), top, -1).astype(np.int32)
+
+
+class LibraryWriter:
+    """
+    逐批写入谱库。矩阵文件按需倍增扩展 (不把整个谱库放进内存)，close 时截到实际行数、建立倒排表，
+    最后写 library.json (有它才算完整的谱库)。可用作上下文管理器。
+    """
+
+    def __init__(self, directory, grid, normalization='l2', peaks_per_spectrum=PEAKS_PER_SPECTRUM, capacity=4096):
+        if normalization not in LIBRARY_NORMALIZATIONS:
+            raise ValueError(f"未知的归一化方法 '{normalization}'，可选: {', '.join(LIBRARY_NORMALIZATIONS)}")
+        self.grid = np.asarray(grid, dtype=float)
+        if self.grid.ndim != 1 or len(self.grid) < 3 or not np.all(np.diff(self.grid) > 0):
+            raise ValueError("谱库横轴必须是至少 3 个点的升序等距网格。")
+        self.directory, self.normalization, self.peaks_per_spectrum = directory, normalization, peaks_per_spectrum
+        os.makedirs(directory, exist_ok=True)
+        meta = os.path.join(directory, _META_FILE)
+        if os.path.exists(meta):
+            os.remove(meta)
+        self.names, self._norms, self._peaks, self.count = [], [], [], 0
+        self._capacity, self._matrix, self._closed = 0, None, False
+        self._resize(max(1, capacity))
+
+    def _resize(self, capacity):
+        path = os.path.join(self.directory, _MATRIX_FILE)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(path, 'r+b' if self._capacity else 'wb') as f:
+            f.truncate(capacity * len(self.grid) * 4)
+        self._capacity = capacity
+        if capacity:
+            self._matrix = np.memmap(path, dtype=np.float32, mode='r+', shape=(capacity, len(self.grid)))
+
+    def add(self, names, rows):
+        """加入已分桶、归一化的若干行 (len(names), bin 数)"""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+        if rows.shape != (len(names), len(self.grid)):
+            raise ValueError(f"谱图数据应为 ({len(names)}, {len(self.grid)}) 的数组。")
+        if self.count + len(rows) > self._capacity:
+            self._resize(max(2 * self._capacity, self.count + len(rows)))
+        self._matrix[self.count:self.count + len(rows)] = rows
+        self._norms.append(np.linalg.norm(rows, axis=1))
+        self._peaks.append(top_peaks(rows, self.peaks_per_spectrum))
+        self.names.extend(names)
+        self.count += len(rows)
+
+    def add_spectrum(self, name, x, y):
+        x, y = _sorted_finite(x, y)
+        self.add([name], bin_spectrum(x, y, self.grid, self.normalization)[None, :])
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._resize(self.count)
+        self._matrix = None
+        if not self.count:
+            raise ValueError("谱库中没有谱图。")
+        np.save(os.path.join(self.directory, _NORMS_FILE), np.concatenate(self._norms).astype(np.float32))
+        # 倒排表 (CSR)：bin b 的谱图编号为 ids[offsets[b]:offsets[b + 1]]，按编号升序
+        peaks = np.concatenate(self._peaks)
+        owners = np.repeat(np.arange(self.count, dtype=np.int32), peaks.shape[1])
+        bins = peaks.ravel()
+        keep = bins >= 0
+        order = np.argsort(bins[keep], kind='stable')
+        np.save(os.path.join(self.directory, _IDS_FILE), owners[keep][order])
+        np.save(os.path.join(self.directory, _OFFSETS_FILE),
+                np.concatenate([[0], np.cumsum(np.bincount(bins[keep], minlength=len(self.grid)))]).astype(np.int64))
+        meta = {'version': LIBRARY_VERSION, 'grid': [float(self.grid[0]), float(self.grid[-1]), len(self.grid)],
+                'normalization': self.normalization, 'peaks_per_spectrum': self.peaks_per_spectrum, 'count': self.count,
+                'names': self.names}
+        with open(os.path.join(self.directory, _META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._closed, self._matrix = True, None
+
+
+def _bin_chunk(tasks, grid_params, normalization):
+    """[(下标, 路径, x 列, y 列)] -> [(下标, 分桶后的一行或 None, 错误信息或 None)]，在子进程中调用"""
+    grid = np.linspace(*grid_params)
+    results = []
+    for k, filepath, x_column, y_column in tasks:
+        try:
+            x, y = _read_xy(filepath, x_column, y_column, None)
+            results.append((k, bin_spectrum(x, y, grid, normalization), None))
+        except Exception as e:
+            results.append((k, None, str(e)))
+    return results
+
+
+def build_library(paths, directory, x_range=None, n_bins=DEFAULT_BINS, normalization='l2', x_column=0, y_column=1,
+                  workers=None, callback=None):
+    """
+    由一组谱图文件 (或一个文件夹) 建立谱库。文件分块交给进程池 (spawn) 读取、分桶，主进程按文件顺序写入。
+    :param x_range: 谱库横轴范围 (lo, hi)；缺省为前 64 个文件的范围的并集
+    :param callback: 每处理完一块调用 callback(已完成数, 总数)
+    :return: (SpectralLibrary, 读取失败的文件 [LoadError])
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = spectrum_files(paths)
+    paths = [os.fspath(path) for path in paths]
+    if not paths:
+        raise ValueError("没有找到谱图文件。")
+    if x_range is None:
+        spans = []
+        for path in paths[:_RANGE_SAMPLE]:
+            try:
+                x, _ = _read_xy(path, x_column, y_column, None)
+                spans.append((x[0], x[-1]))
+            except Exception:
+                continue
+        if not spans:
+            raise ValueError("无法从前几个文件确定横轴范围，请指定 x_range。")
+        x_range = (min(lo for lo, _ in spans), max(hi for _, hi in spans))
+    lo, hi = map(float, x_range)
+    if not hi > lo or n_bins < 3:
+        raise ValueError("谱库横轴范围或 bin 数无效。")
+    grid_params = (lo, hi, int(n_bins))
+    tasks = [(k, path, x_column, y_column) for k, path in enumerate(paths)]
+    chunks = [tasks[i:i + _CHUNK_SIZE] for i in range(0, len(tasks), _CHUNK_SIZE)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    errors, done = [], 0
+    with LibraryWriter(directory, np.linspace(*grid_params), normalization) as writer:
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            results = pool.map(_bin_chunk, chunks, [grid_params] * len(chunks), [normalization] * len(chunks))
+        else:
+            pool = None
+            results = (_bin_chunk(chunk, grid_params, normalization) for chunk in chunks)
+        try:
+            for chunk_results in results:
+                good = [(k, row) for k, row, _ in chunk_results if row is not None]
+                errors += [LoadError(paths[k], error) for k, row, error in chunk_results if row is None]
+                if good:
+                    writer.add([os.path.basename(paths[k]) for k, _ in good], np.stack([row for _, row in good]))
+                done += len(chunk_results)
+                if callback is not None:
+                    callback(done, len(paths))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if not writer.count:
+            raise ValueError(f"没有成功读取的谱图 ({os.path.basename(errors[0].path)}: {errors[0].error})。")
+    return SpectralLibrary(directory), errors
+
+
+class SpectralLibrary:
+    """
+    打开一个已建立的谱库。矩阵以只读方式内存映射，倒排表和范数载入内存。
+    search 的耗时主要在读取候选行：候选数 × bin 数 × 4 字节。
+    """
+
+    def __init__(self, directory):
+        meta_path = os.path.join(directory, _META_FILE)
+        if not os.path.exists(meta_path):
+            raise ValueError(f"'{directory}' 不是完整的谱库 (缺少 {_META_FILE})。")
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != LIBRARY_VERSION:
+            raise ValueError(f"不支持的谱库版本: {meta.get('version')}")
+        self.directory = directory
+        self.grid = np.linspace(meta['grid'][0], meta['grid'][1], int(meta['grid'][2]))
+        self.normalization = meta['normalization']
+        self.peaks_per_spectrum = meta['peaks_per_spectrum']
+        self.names = meta['names']
+        self.matrix = np.memmap(os.path.join(directory, _MATRIX_FILE), dtype=np.float32, mode='r',
+                                shape=(meta['count'], len(self.grid)))
+        self.norms = np.load(os.path.join(directory, _NORMS_FILE))
+        self._offsets = np.load(os.path.join(directory, _OFFSETS_FILE))
+        self._ids = np.load(os.path.join(directory, _IDS_FILE))
+
+    def __len__(self):
+        return len(self.names)
+
+    def spectrum(self, index):
+        """第 index 条谱图 (谱库横轴, 归一化后的强度)"""
+        return self.grid, np.array(self.matrix[index], dtype=float)
+
+    def vectorize(self, x, y):
+        """把一条未知谱分桶、归一化到谱库的横轴上"""
+        x, y = _sorted_finite(x, y)
+        if len(x) < 2:
+            raise ValueError("有效数据点少于 2 个。")
+        return bin_spectrum(x, y, self.grid, self.normalization)
+
+    def candidates(self, vector, min_shared_peaks=MIN_SHARED_PEAKS, max_candidates=MAX_CANDIDATES):
+        """
+        与 vector 的最高几个峰 (±INDEX_TOLERANCE 个 bin) 至少共享 min_shared_peaks 个峰的谱图编号 (升序)
+        及各自的共享峰数；候选超过 max_candidates 时只保留共享峰最多的。
+        """
+        peaks = top_peaks(vector, self.peaks_per_spectrum)[0]
+        lists = []
+        for b in peaks[peaks >= 0]:
+            lo, hi = max(b - INDEX_TOLERANCE, 0), min(b + INDEX_TOLERANCE + 1, len(self.grid))
+            # 同一个未知峰在相邻 bin 中匹配到同一谱图的两个峰时只计一次
+            lists.append(np.unique(self._ids[self._offsets[lo]:self._offsets[hi]]))
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(lists), minlength=len(self))
+        ids = np.flatnonzero(shared >= min_shared_peaks)
+        if len(ids) > max_candidates:
+            ids = np.sort(ids[np.argpartition(-shared[ids], max_candidates - 1)[:max_candidates]])
+        return ids, shared[ids]
+
+    def _scores(self, vector, ids, metric):
+        """ids 为 None 时分块扫描整个谱库"""
+        count = len(self) if ids is None else len(ids)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, count)
+            block = self.matrix[start:stop] if ids is None else self.matrix[ids[start:stop]]
+            scores[start:stop] = block @ vector
+        if metric == 'cosine':
+            norms = self.norms if ids is None else self.norms[ids]
+            scores /= np.where(norms > 0, norms, 1.0) * max(np.linalg.norm(vector), 1e-30)
+        return scores
+
+    def search(self, x, y, top_k=10, metric='cosine', prefilter=True, min_shared_peaks=MIN_SHARED_PEAKS,
+               max_candidates=MAX_CANDIDATES):
+        """
+        检索与未知谱最相似的 top_k 条谱图，按相似度降序。prefilter 为 False 或候选少于 top_k 时扫描整个谱库。
+        :param metric: cosine (余弦) 或 dot (归一化后强度的点积)
+        :return: [LibraryMatch]
+        """
+        if metric not in METRICS:
+            raise ValueError(f"未知的相似度 '{metric}'，可选: {', '.join(METRICS)}")
+        if top_k < 1:
+            raise ValueError("top_k 至少为 1。")
+        vector = self.vectorize(x, y)
+        ids = None
+        if prefilter:
+            ids, shared = self.candidates(vector, min_shared_peaks, max_candidates)
+            if len(ids) < top_k:
+                ids = None
+        scores = self._scores(vector, ids, metric)
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        if ids is None:
+            indices = best
+            shared_peaks = self._shared_peaks(vector, indices)
+        else:
+            indices, shared_peaks = ids[best], shared[best]
+        return [LibraryMatch(int(i), self.names[i], float(s), int(n))
+                for i, s, n in zip(indices, scores[best], shared_peaks)]
+
+    def _shared_peaks(self, vector, indices):
+        """全库扫描时另算匹配结果与未知谱共享的峰数"""
+        query = top_peaks(vector, self.peaks_per_spectrum)[0]
+        query = query[query >= 0]
+        rows = top_peaks(self.matrix[indices], self.peaks_per_spectrum)
+        return [int(sum(np.any(np.abs(row[row >= 0] - b) <= INDEX_TOLERANCE) for b in query)) for row in rows]
@@ -0,0 +1,246 @@
+# chem_assistant/core/spectroscopy/processing.py
+# 谱图处理流水线：AsLS / arPLS 基线校正 (带状矩阵求解)、Savitzky-Golay 平滑、按显著度/峰宽/信噪比寻峰。
+# 每一步的结果按参数缓存，只改后面步骤的参数时前面的步骤不重算。
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.linalg import solveh_banded
+from scipy.signal import savgol_filter, find_peaks, peak_widths
+from scipy.special import expit
+
+BASELINE_METHODS = ('arpls', 'asls', 'none')
+STAGES = ('baseline', 'smooth', 'peaks')
+DEFAULT_PARAMS = {
+    # lam: 平滑惩罚 (按原始点数计)；p: AsLS 的不对称权重；tol: 权重相对变化的收敛阈值
+    'baseline': {'method': 'arpls', 'lam': 1e6, 'p': 0.01, 'max_iter': 50, 'tol': 1e-3},
+    # window 为 0 时不平滑
+    'smooth': {'window': 11, 'polyorder': 3},
+    # prominence 为 None 时取 min_snr 倍噪声；min_width 为半高宽下限 (x 轴单位)
+    'peaks': {'prominence': None, 'min_width': 0.0, 'min_snr': 3.0},
+}
+# 基线只在不超过这么多点的网格上迭代 (桶平均)，再插值回原网格
+BASELINE_MAX_POINTS = 20_000
+
+Peaks = namedtuple('Peaks', ['index', 'position', 'height', 'prominence', 'fwhm', 'snr'])
+ProcessedSpectrum = namedtuple('ProcessedSpectrum', ['x', 'y', 'baseline', 'corrected', 'smoothed', 'peaks', 'noise'])
+
+
+def _second_difference_bands(n, lam):
+    """λ·DᵀD (D 为二阶差分矩阵) 的上三角带状存储 (3, n)，供 solveh_banded 使用"""
+    ab = np.zeros((3, n))
+    ab[0, 2:] = lam
+    ab[1, 1:] = -4.0 * lam
+    ab[1, [1, -1]] = -2.0 * lam
+    ab[2] = 6.0 * lam
+    ab[2, [0, -1]] = lam
+    ab[2, [1, -2]] = 5.0 * lam
+    return ab
+
+
+def _whittaker_baseline(y, lam, method, p, max_iter, tol):
+    """
+    迭代重加权的 Whittaker 平滑：每轮解 (W + λDᵀD)z = Wy (五对角正定，带状 Cholesky，O(n))。
+    asls: 信号在基线之上的点权重 p，之下的点 1-p；
+    arpls: 按负残差的均值/标准差给出逻辑斯蒂权重 (Baek 等, 2015)。权重相对变化小于 tol 时停止。
+    """
+    n = len(y)
+    bands = _second_difference_bands(n, lam)
+    w = np.ones(n)
+    z = y
+    for _ in range(max_iter):
+        ab = bands.copy()
+        ab[2] += w
+        z = solveh_banded(ab, w * y, overwrite_ab=True, check_finite=False)
+        residual = y - z
+        if method == 'asls':
+            new_w = np.where(residual > 0, p, 1.0 - p)
+        else:
+            negative = residual[residual < 0]
+            if len(negative) < 2:
+                break
+            m, s = negative.mean(), negative.std()
+            new_w = expit(-2.0 * (residual - (2.0 * s - m)) / max(s, 1e-300))
+        converged = np.linalg.norm(w - new_w) <= tol * np.linalg.norm(w)
+        w = new_w
+        if converged:
+            break
+    return z
+
+
+def baseline(y, method='arpls', lam=1e6, p=0.01, max_iter=50, tol=1e-3):
+    """
+    估计基线。点数超过 BASELINE_MAX_POINTS 时先按 k 个点一桶取平均，
+    在粗网格上用 λ/k⁴ (与原网格等价的二阶差分惩罚) 迭代，再线性插值回原网格。
+    """
+    if method not in BASELINE_METHODS:
+        raise ValueError(f"未知的基线方法 '{method}'，可选: {', '.join(BASELINE_METHODS)}")
+    y = np.asarray(y, dtype=float)
+    if method == 'none' or len(y) < 3:
+        return np.zeros_like(y)
+    if lam <= 0 or not 0 < p < 1:
+        raise ValueError("基线参数必须满足 λ > 0，0 < p < 1。")
+    n = len(y)
+    k = -(-n // BASELINE_MAX_POINTS)
+    if k == 1:
+        return _whittaker_baseline(y, lam, method, p, max_iter, tol)
+    starts = np.arange(0, n, k)
+    counts = np.diff(np.append(starts, n))
+    z = _whittaker_baseline(np.add.reduceat(y, starts) / counts, lam / k ** 4, method, p, max_iter, tol)
+    return np.interp(np.arange(n), starts + (counts - 1) / 2.0, z)
+
+
+def smooth(y, window=11, polyorder=3):
+    """Savitzky-Golay 平滑 (按点数计的窗口，假定 x 近似等间距)；window 为 0 时原样返回"""
+    if not window:
+        return np.asarray(y, dtype=float)
+    if window % 2 == 0 or window <= polyorder or polyorder < 0:
+        raise ValueError("Savitzky-Golay 窗口必须为奇数且大于多项式阶数。")
+    if window > len(y):
+        raise ValueError(f"平滑窗口 ({window}) 超过数据点数 ({len(y)})。")
+    return savgol_filter(y, window, polyorder, mode='interp')
+
+
+def estimate_noise(y):
+    """由一阶差分的中位绝对偏差稳健估计白噪声标准差 (对宽峰和缓慢漂移不敏感)"""
+    if len(y) < 3:
+        return 0.0
+    diff = np.diff(y)
+    return float(1.4826 * np.median(np.abs(diff - np.median(diff))) / np.sqrt(2.0))
+
+
+def _nearest_higher(values, reverse=False):
+    """单调栈：每个元素之前 (reverse 时为之后) 最近的严格更大元素的下标，没有时为 -1"""
+    result = np.full(len(values), -1)
+    stack = []
+    for i in (range(len(values) - 1, -1, -1) if reverse else range(len(values))):
+        v = values[i]
+        while stack and values[stack[-1]] <= v:
+            stack.pop()
+        if stack:
+            result[i] = stack[-1]
+        stack.append(i)
+    return result
+
+
+def _range_argmin(values, lo, hi):
+    """values[lo:hi + 1] 中最小值的下标 (lo、hi 为数组，逐个区间)；稀疏表预处理 O(m log m)，查询向量化"""
+    m = len(values)
+    table = [np.arange(m)]
+    while 2 ** len(table) <= m:
+        prev, span = table[-1], 2 ** (len(table) - 1)
+        row = prev.copy()
+        a, b = prev[:m - span], prev[span:]
+        row[:m - span] = np.where(values[b] < values[a], b, a)
+        table.append(row)
+    table = np.array(table)
+    level = np.floor(np.log2(hi - lo + 1)).astype(int)
+    a, b = table[level, lo], table[level, hi - 2 ** level + 1]
+    return np.where(values[b] < values[a], b, a)
+
+
+def peak_prominences(y, peaks):
+    """
+    与 scipy.signal.peak_prominences (wlen=None) 相同的显著度，但不从每个峰逐点向两侧扫描
+    (缓坡上的噪声极大值每个都要扫到数组端点，总耗时 O(峰数·n))。
+    向一侧找到的 "最近的更高点" 总在某个更高的极大值处截断，因此先用单调栈在极大值之间找到它，
+    再在相邻极大值之间各段的最小值上做区间最小值查询。peaks 须为升序的全部局部极大值
+    (或高于某阈值的全部极大值)。
+    :return: (显著度, 左侧基点, 右侧基点)
+    """
+    y = np.asarray(y, dtype=float)
+    peaks = np.asarray(peaks, dtype=np.intp)
+    m = len(peaks)
+    if m == 0:
+        return np.zeros(0), np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    # 第 s 段为 [peaks[s-1], peaks[s])，第 0 段从数组开头起，最后一段到数组末尾
+    starts = np.concatenate([[0], peaks])
+    lengths = np.diff(np.append(starts, len(y)))
+    seg_min = np.minimum.reduceat(y, starts)
+    seg_id = np.repeat(np.arange(m + 1), lengths)
+    hits = np.flatnonzero(y == seg_min[seg_id])
+    seg_arg = hits[np.searchsorted(seg_id[hits], np.arange(m + 1))]
+
+    heights = y[peaks].tolist()
+    k = np.arange(m)
+    left = _nearest_higher(heights) + 1
+    right = _nearest_higher(heights, reverse=True)
+    right = np.where(right < 0, m, right)
+    left_seg = _range_argmin(seg_min, left, k)
+    right_seg = _range_argmin(seg_min, k + 1, right)
+    bases = np.maximum(seg_min[left_seg], seg_min[right_seg])
+    return y[peaks] - bases, seg_arg[left_seg].astype(np.intp), seg_arg[right_seg].astype(np.intp)
+
+
+def pick_peaks(x, y, noise, prominence=None, min_width=0.0, min_snr=3.0):
+    """
+    在 (已扣基线、平滑的) 信号上寻峰。先按 min_snr·noise 的高度筛掉噪声极大值，
+    再按显著度和半高宽 (x 轴单位，由插值的半高位置换算) 过滤。
+    :return: Peaks，各字段为按位置排序的数组
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    threshold = min_snr * noise
+    if prominence is None:
+        prominence = threshold
+    index, _ = find_peaks(y, height=threshold if threshold > 0 else None)
+    prominences, left_bases, right_bases = peak_prominences(y, index)
+    keep = prominences >= prominence
+    index, prominences = index[keep], prominences[keep]
+    _, _, left_ips, right_ips = peak_widths(y, index, rel_height=0.5,
+                                            prominence_data=(prominences, left_bases[keep], right_bases[keep]))
+    grid = np.arange(len(x))
+    fwhm = np.abs(np.interp(right_ips, grid, x) - np.interp(left_ips, grid, x))
+    keep = fwhm >= min_width
+    index = index[keep]
+    snr = y[index] / noise if noise > 0 else np.full(len(index), np.inf)
+    return Peaks(index, x[index], y[index], prominences[keep], fwhm[keep], snr)
+
+
+class SpectrumPipeline:
+    """
+    基线 → 平滑 → 寻峰 三步流水线。每一步缓存 (参数, 结果)，run() 时从第一个参数变化的步骤开始重算。
+    非有限值的点被去掉，x 按升序排列。
+    """
+
+    def __init__(self, x, y, **params):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = np.isfinite(x) & np.isfinite(y)
+        x, y = x[keep], y[keep]
+        order = np.argsort(x, kind='stable')
+        self.x, self.y = x[order], y[order]
+        self.params = {stage: dict(values) for stage, values in DEFAULT_PARAMS.items()}
+        self._cache = {}
+        # 每一步实际计算的次数
+        self.runs = dict.fromkeys(STAGES, 0)
+        for stage, values in params.items():
+            self.set_params(stage, **values)
+
+    def set_params(self, stage, **values):
+        if stage not in STAGES:
+            raise ValueError(f"未知的处理步骤 '{stage}'，可选: {', '.join(STAGES)}")
+        unknown = set(values) - set(DEFAULT_PARAMS[stage])
+        if unknown:
+            raise ValueError(f"步骤 '{stage}' 没有参数: {', '.join(sorted(unknown))}")
+        self.params[stage].update(values)
+
+    def _compute(self, stage):
+        if stage == 'baseline':
+            return baseline(self.y, **self.params['baseline'])
+        if stage == 'smooth':
+            return smooth(self.y - self._cache['baseline'][1], **self.params['smooth'])
+        noise = estimate_noise(self.y - self._cache['baseline'][1])
+        return pick_peaks(self.x, self._cache['smooth'][1], noise, **self.params['peaks']), noise
+
+    def run(self):
+        stale = False
+        for stage in STAGES:
+            key = tuple(sorted(self.params[stage].items()))
+            cached = self._cache.get(stage)
+            if stale or cached is None or cached[0] != key:
+                self._cache[stage] = (key, self._compute(stage))
+                self.runs[stage] += 1
+                stale = True
+        base = self._cache['baseline'][1]
+        peaks, noise = self._cache['peaks'][1]
+        return ProcessedSpectrum(self.x, self.y, base, self.y - base, self._cache['smooth'][1], peaks, noise)
@@ -0,0 +1,271 @@
+# chem_assistant/core/spectroscopy/workspace.py
+# 批量谱图工作区：并发读取一个文件夹的谱图，重采样到共同横轴上组成一个 (谱图数, 点数) 数组，
+# 叠加、偏移堆叠、平均、差谱、归一化都是整个数组上的向量运算
+
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from utils.file_io.spectrum_reader import read_spectrum, is_spectrum_cached, SPECTRUM_EXTENSIONS
+
+NORMALIZATIONS = ('none', 'max', 'area', 'minmax', 'snv')
+# common: 各谱图横轴范围的交集；all: 并集 (没有覆盖到的部分为 NaN)
+GRID_SPANS = ('common', 'all')
+# 进程池每次最多处理这么多个文件，减少进程间往返
+_CHUNK_SIZE = 8
+# 共同网格上的数组 (float64) 的内存上限；超出时降低网格分辨率，各谱图按网格间距分桶平均
+WORKSPACE_MAX_BYTES = 512 * 1024 ** 2
+
+LoadError = namedtuple('LoadError', ['path', 'error'])
+
+
+def _sorted_finite(x, y):
+    """去掉非有限值的点，按 x 升序排列"""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    if len(x) > 1 and x[0] > x[-1]:
+        x, y = x[::-1], y[::-1]
+    if len(x) > 2 and np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    return x, y
+
+
+def _read_xy(filepath, x_column, y_column, cache_dir, copy=False):
+    """读取一个谱图文件 -> (x, y)。在进程池中调用时复制出内存映射数组再传回"""
+    spectrum = read_spectrum(filepath, x_column, y_column, cache_dir=cache_dir)
+    x, y = _sorted_finite(spectrum.x, spectrum.y)
+    if len(x) < 2:
+        raise ValueError("有效数据点少于 2 个。")
+    return (np.array(x), np.array(y)) if copy else (x, y)
+
+
+def _read_chunk(tasks, copy=False):
+    """[(下标, 路径, x 列, y 列, 缓存目录)] -> [(下标, (x, y) 或 None, 错误信息或 None)]"""
+    results = []
+    for k, filepath, x_column, y_column, cache_dir in tasks:
+        try:
+            results.append((k, _read_xy(filepath, x_column, y_column, cache_dir, copy), None))
+        except Exception as e:
+            results.append((k, None, str(e)))
+    return results
+
+
+def _read_chunk_copy(tasks):
+    return _read_chunk(tasks, copy=True)
+
+
+def common_grid(spectra, span='common', n_points=None, max_bytes=WORKSPACE_MAX_BYTES):
+    """
+    各谱图 [(x, y)] (x 升序) 的共同等距横轴。缺省点距取各谱图平均点距中最小的一个，
+    点数受 max_bytes 限制 (整个数组为 len(spectra) × 点数 个 float64)。
+    """
+    if span not in GRID_SPANS:
+        raise ValueError(f"未知的网格范围 '{span}'，可选: {', '.join(GRID_SPANS)}")
+    lows = [x[0] for x, _ in spectra]
+    highs = [x[-1] for x, _ in spectra]
+    lo, hi = (max(lows), min(highs)) if span == 'common' else (min(lows), max(highs))
+    if lo >= hi:
+        raise ValueError("各谱图的横轴范围没有重叠，请改用全部范围 (span='all')。")
+    if n_points is None:
+        step = min((x[-1] - x[0]) / (len(x) - 1) for x, _ in spectra)
+        n_points = int(round((hi - lo) / step)) + 1
+    n_points = max(2, min(int(n_points), max_bytes // (8 * len(spectra))))
+    return np.linspace(lo, hi, n_points)
+
+
+def resample(x, y, grid):
+    """
+    把一条谱图 (x 升序) 重采样到等距网格上，网格范围外为 NaN。网格比原始点距粗一倍以上时
+    先按网格间距分桶平均 (直接插值会随机漏掉窄峰并保留全部噪声)，否则线性插值。
+    """
+    if len(x) > 1 and len(grid) > 1:
+        step = (grid[-1] - grid[0]) / (len(grid) - 1)
+        if 2.0 * (x[-1] - x[0]) / (len(x) - 1) < step:
+            edges = np.searchsorted(x, np.append(grid - step / 2.0, grid[-1] + step / 2.0))
+            counts = np.diff(edges)
+            # 末尾补一个 0，使 reduceat 的最后一段止于 edges[-1] 而不是数组末尾
+            sums = np.add.reduceat(np.append(y, 0.0), edges)[:-1]
+            values = np.full(len(grid), np.nan)
+            filled = counts > 0
+            values[filled] = sums[filled] / counts[filled]
+            gaps = ~filled & (grid >= x[0]) & (grid <= x[-1])
+            values[gaps] = np.interp(grid[gaps], x, y)
+            return values
+    return np.interp(grid, x, y, left=np.nan, right=np.nan)
+
+
+class SpectraWorkspace:
+    """
+    一组谱图在共同横轴 grid (m,) 上的数据 data (k, m)，names 为各谱图名称，errors 为读取失败的文件。
+    各运算返回新数组 (normalized('none') 直接返回 data)，忽略 NaN。
+    """
+
+    def __init__(self, grid, data, names, errors=()):
+        self.grid = np.asarray(grid, dtype=float)
+        self.data = np.asarray(data, dtype=float)
+        if self.data.ndim != 2 or self.data.shape[1] != len(self.grid):
+            raise ValueError("数据必须为 (谱图数, 网格点数) 的二维数组。")
+        if len(names) != len(self.data):
+            raise ValueError("名称个数与谱图条数不一致。")
+        self.names = list(names)
+        self.errors = list(errors)
+
+    def __len__(self):
+        return len(self.data)
+
+    def normalized(self, method='max'):
+        """
+        max: 除以最大绝对值；area: 除以 ∫|y|dx；minmax: 缩放到 [0, 1]；snv: 减均值再除以标准差。
+        全为常数的谱图不缩放。
+        """
+        if method not in NORMALIZATIONS:
+            raise ValueError(f"未知的归一化方法 '{method}'，可选: {', '.join(NORMALIZATIONS)}")
+        data = self.data
+        if method == 'none':
+            return data
+        if method == 'minmax':
+            low = np.nanmin(data, axis=1, keepdims=True)
+            data, scale = data - low, np.nanmax(data, axis=1, keepdims=True) - low
+        elif method == 'snv':
+            data, scale = data - np.nanmean(data, axis=1, keepdims=True), np.nanstd(data, axis=1, keepdims=True)
+        elif method == 'max':
+            scale = np.nanmax(np.abs(data), axis=1, keepdims=True)
+        else:
+            scale = np.nansum(np.abs(data), axis=1, keepdims=True) * (self.grid[-1] - self.grid[0]) / (len(self.grid) - 1)
+        return data / np.where(scale > 0, scale, 1.0)
+
+    def average(self, data=None):
+        """逐点平均 (只计有值的谱图)，(m,)"""
+        data = self.data if data is None else data
+        counts = np.isfinite(data).sum(axis=0)
+        return np.where(counts > 0, np.nansum(data, axis=0) / np.maximum(counts, 1), np.nan)
+
+    def difference(self, reference=0, data=None):
+        """各谱图减去参比谱图 (下标，或 'mean' 表示平均谱)，(k, m)"""
+        data = self.data if data is None else data
+        if isinstance(reference, str):
+            if reference != 'mean':
+                raise ValueError(f"未知的参比 '{reference}'，可为谱图下标或 'mean'。")
+            return data - self.average(data)
+        if not -len(data) <= reference < len(data):
+            raise ValueError(f"参比谱图序号 {reference} 超出范围 (共 {len(data)} 条)。")
+        return data - data[reference]
+
+    def stacked(self, data=None, offset=None):
+        """第 i 条谱图向上平移 i·offset；offset 缺省为各谱图峰谷差中位数的 1.1 倍"""
+        data = self.data if data is None else data
+        if offset is None:
+            spread = np.nanmedian(np.nanmax(data, axis=1) - np.nanmin(data, axis=1))
+            offset = 1.1 * spread if spread > 0 else 1.0
+        return data + offset * np.arange(len(data))[:, None]
+
+
+def spectrum_files(directory):
+    """文件夹中扩展名属于 SPECTRUM_EXTENSIONS 的文件，按文件名排序"""
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(SPECTRUM_EXTENSIONS))
+    return [os.path.join(directory, name) for name in names if os.path.isfile(os.path.join(directory, name))]
+
+
+def read_reference_values(filepath, names):
+    """
+    读取参考值表 (每行: 文件名, 数值[, 数值 …]，以逗号、分号、制表符或空白分隔，可有表头) 并与谱图名称对应；
+    文件名可以省略扩展名。
+    :return: (names 中匹配到的下标 (升序), (匹配数, 响应数) 数组)
+    """
+    values = {}
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    for encoding in ('utf-8-sig', 'gb18030', 'latin-1'):
+        try:
+            text = raw.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    for line in text.splitlines():
+        fields = [field.strip().strip('"') for field in re.split(r'[,;\t]' if re.search(r'[,;\t]', line) else r'\s+', line.strip())]
+        if len(fields) < 2 or not fields[0]:
+            continue
+        try:
+            values[fields[0].lower()] = [float(field) for field in fields[1:] if field]
+        except ValueError:
+            continue  # 表头或注释
+    rows, matched = [], []
+    for k, name in enumerate(names):
+        key = name.lower()
+        row = values.get(key, values.get(os.path.splitext(key)[0]))
+        if row:
+            rows.append(k)
+            matched.append(row)
+    if not rows:
+        raise ValueError("参考值表中没有与已加载谱图同名的条目。")
+    if len({len(row) for row in matched}) != 1:
+        raise ValueError("参考值表各行的数值个数不一致。")
+    return np.array(rows), np.array(matched, dtype=float)
+
+
+def load_workspace(paths, x_column=0, y_column=1, span='common', n_points=None, workers=None, cache_dir=None,
+                   callback=None):
+    """
+    并发读取一组谱图并重采样到共同横轴。需要解析的文件 (嗅探和解析都占 CPU、持有 GIL) 分块交给进程池，
+    缓存命中的文件只需内存映射 (以 I/O 为主)，在线程池中打开；workers 为 1 或需要解析的文件少于两个时不建进程池。
+    :param paths: 文件路径列表，或一个文件夹
+    :param span / n_points: 共同横轴的范围和点数，见 common_grid
+    :param workers: 进程数，缺省为 CPU 核数
+    :param callback: 每读完一个文件调用 callback(已完成数, 总数) (在调用者线程中)
+    :return: SpectraWorkspace；读取失败的文件记在 errors 中 (LoadError)，不影响其余文件
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = spectrum_files(paths)
+    paths = [os.fspath(path) for path in paths]
+    if not paths:
+        raise ValueError("没有找到谱图文件。")
+    workers = workers or os.cpu_count() or 1
+    tasks = [(k, path, x_column, y_column, cache_dir) for k, path in enumerate(paths)]
+    parse = []
+    if workers > 1:
+        parse = [task for task in tasks if not is_spectrum_cached(task[1], cache_dir)]
+        if len(parse) < 2:
+            parse = []
+    in_process = {task[0] for task in parse}
+
+    spectra, errors, done = [None] * len(paths), [], 0
+    threads = ThreadPoolExecutor(max_workers=min(32, workers + 4))
+    processes = None
+    try:
+        futures = [threads.submit(_read_chunk, [task]) for task in tasks if task[0] not in in_process]
+        if parse:
+            # 每个进程至少分到几块，快慢不均时也能互相补上
+            size = max(1, min(_CHUNK_SIZE, len(parse) // (4 * workers)))
+            processes = ProcessPoolExecutor(max_workers=min(workers, len(parse)), mp_context=multiprocessing.get_context('spawn'))
+            futures += [processes.submit(_read_chunk_copy, parse[i:i + size]) for i in range(0, len(parse), size)]
+        for future in as_completed(futures):
+            results = future.result()
+            for k, spectrum, error in results:
+                spectra[k] = spectrum
+                if error is not None:
+                    errors.append((k, LoadError(paths[k], error)))
+            done += len(results)
+            if callback is not None:
+                callback(done, len(paths))
+    finally:
+        threads.shutdown()
+        if processes is not None:
+            processes.shutdown()
+
+    loaded = [k for k, spectrum in enumerate(spectra) if spectrum is not None]
+    errors = [error for _, error in sorted(errors)]
+    if not loaded:
+        raise ValueError(f"没有成功读取的谱图 ({os.path.basename(errors[0].path)}: {errors[0].error})。")
+    grid = common_grid([spectra[k] for k in loaded], span, n_points)
+    data = np.empty((len(loaded), len(grid)))
+    for row, k in enumerate(loaded):
+        data[row] = resample(*spectra[k], grid)
+        spectra[k] = None
+    return SpectraWorkspace(grid, data, [os.path.basename(paths[k]) for k in loaded], errors)
@@ -0,0 +1,90 @@
+# chem_assistant/core/structure/bonds.py
+# 基于共价半径的成键判断 (网格邻居表，O(n))
+
+import itertools
+import numpy as np
+
+from utils.chem_utils.element_data import COVALENT_RADII, DEFAULT_COVALENT_RADIUS
+
+# 判定成键的距离容差 (Å)：d <= r_i + r_j + BOND_TOLERANCE
+BOND_TOLERANCE = 0.45
+# 小于该距离的原子对视为重叠/无效，不连键
+MIN_BOND_DISTANCE = 0.4
+
+# 半壳层的 13 个邻居格子偏移 (加上自身格子)，保证每对格子只访问一次
+_HALF_SHELL = [offset for offset in itertools.product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+
+
+def covalent_radii_array(elements):
+    """把元素符号数组映射为共价半径数组 (对不同元素只查一次表)"""
+    symbols, inverse = np.unique(np.asarray(elements).astype(str), return_inverse=True)
+    radii = np.array([COVALENT_RADII.get(s, DEFAULT_COVALENT_RADIUS) for s in symbols])
+    return radii[inverse.ravel()]
+
+
+def pairs_between_cells(starts_a, counts_a, starts_b, counts_b):
+    """对每一对格子 (A, B) 生成 A 中原子 × B 中原子的全部组合 (排序后的原子下标)"""
+    n_pairs = counts_a * counts_b
+    total = int(n_pairs.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    cell = np.repeat(np.arange(len(n_pairs)), n_pairs)
+    local = np.arange(total) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+    return starts_a[cell] + local // counts_b[cell], starts_b[cell] + local % counts_b[cell]
+
+
+def find_neighbor_pairs(coords, cutoff):
+    """
+    用网格邻居表 (cell list) 找出所有距离小于 cutoff 的原子对，复杂度与原子数成线性关系。
+    :return: (i, j, 距离) 三个数组，保证 i < j
+    """
+    coords = np.asarray(coords, dtype=float)
+    n = len(coords)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    cells = np.floor((coords - coords.min(axis=0)) / cutoff).astype(np.int64)
+    dims = cells.max(axis=0) + 3
+    keys = ((cells[:, 0] + 1) * dims[1] + (cells[:, 1] + 1)) * dims[2] + (cells[:, 2] + 1)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    cell_keys, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    sorted_coords = coords[order]
+
+    pair_i, pair_j = [], []
+    # 同一格子内的原子对
+    i, j = pairs_between_cells(starts, counts, starts, counts)
+    upper = i < j
+    pair_i.append(i[upper]); pair_j.append(j[upper])
+    # 与半壳层邻居格子之间的原子对
+    for dx, dy, dz in _HALF_SHELL:
+        neighbor_keys = cell_keys + (dx * dims[1] + dy) * dims[2] + dz
+        pos = np.searchsorted(cell_keys, neighbor_keys)
+        pos = np.minimum(pos, len(cell_keys) - 1)
+        found = cell_keys[pos] == neighbor_keys
+        i, j = pairs_between_cells(starts[found], counts[found], starts[pos[found]], counts[pos[found]])
+        pair_i.append(i); pair_j.append(j)
+
+    i = np.concatenate(pair_i); j = np.concatenate(pair_j)
+    distances = np.linalg.norm(sorted_coords[i] - sorted_coords[j], axis=1)
+    close = distances < cutoff
+    i, j, distances = order[i[close]], order[j[close]], distances[close]
+    swap = i > j
+    i[swap], j[swap] = j[swap], i[swap]
+    return i, j, distances
+
+
+def perceive_bonds(elements, coords, tolerance=BOND_TOLERANCE):
+    """
+    根据共价半径判断成键：MIN_BOND_DISTANCE < d <= r_i + r_j + tolerance。
+    :return: (m, 2) 的键数组，按 (i, j) 排序
+    """
+    radii = covalent_radii_array(elements)
+    if len(radii) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    cutoff = 2.0 * radii.max() + tolerance
+    i, j, distances = find_neighbor_pairs(coords, cutoff)
+    bonded = (distances > MIN_BOND_DISTANCE) & (distances <= radii[i] + radii[j] + tolerance)
+    bonds = np.column_stack([i[bonded], j[bonded]])
+    return bonds[np.lexsort((bonds[:, 1], bonds[:, 0]))]
@@ -0,0 +1,335 @@
+# chem_assistant/core/structure/embedding.py
+# 距离几何法生成三维坐标：上下界矩阵 -> 三角不等式平滑 -> 度量矩阵本征分解 -> 误差函数优化
+
+import math
+from collections import deque
+
+import numpy as np
+from scipy.optimize import minimize
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import shortest_path
+
+from core.structure.bonds import covalent_radii_array
+from core.structure.molecule import Molecule
+from core.structure.smiles import AROMATIC_BOND, parse_smiles
+from utils.chem_utils.element_data import VDW_RADII, DEFAULT_VDW_RADIUS
+
+# 键长 = 两原子共价半径之和 × 该系数
+BOND_ORDER_SCALE = {1: 1.0, 2: 0.87, 3: 0.78, AROMATIC_BOND: 0.93}
+# 各类距离约束的容差 (Å)
+BOND_TOLERANCE = 0.01
+ANGLE_TOLERANCE = 0.04
+TORSION_TOLERANCE = 0.06
+# 相隔 3 个键以上的原子对，下界取范德华半径之和 × 该系数
+VDW_SCALE = 0.75
+# 不连通片段 (如盐) 之间的上界 = 范德华半径之和 + 该值
+FRAGMENT_GAP = 4.0
+# 平面性约束 (sp2 中心、双键/芳香键两侧四原子的有向体积) 在误差函数中的权重
+PLANARITY_WEIGHT = 0.1
+# L-BFGS 的终止条件：误差的单步下降小于该值即停止 (误差接近 0 时等价于绝对容差)
+OPTIMIZER_FTOL = 1e-6
+# 优化后误差函数低于该值视为嵌入成功
+ACCEPTABLE_ERROR = 0.05
+
+_HYBRID_ANGLES = {1: math.pi, 2: math.radians(120.0), 3: math.radians(109.4712)}
+
+
+def hybridization(n_atoms, bonds, orders):
+    """
+    按成键情况粗略判断杂化：不超过 2 个邻居且有叁键或两个双键为 sp，不超过 3 个邻居且有双键或芳香键为 sp2，
+    否则 sp3 (砜、磷酸酯等 4 配位的高价中心也按 sp3 处理)
+    """
+    doubles = np.zeros(n_atoms, dtype=int)
+    triples = np.zeros(n_atoms, dtype=int)
+    aromatic = np.zeros(n_atoms, dtype=bool)
+    for (i, j), order in zip(bonds, orders):
+        for k in (i, j):
+            if order == 2: doubles[k] += 1
+            elif order == 3: triples[k] += 1
+            elif order == AROMATIC_BOND: aromatic[k] = True
+    degree = np.bincount(np.asarray(bonds, dtype=np.int64).ravel(), minlength=n_atoms)
+    linear = ((triples > 0) | (doubles > 1)) & (degree <= 2)
+    planar = ((triples > 0) | (doubles > 0) | aromatic) & (degree <= 3)
+    return np.where(linear, 1, np.where(planar, 2, 3))
+
+
+def _path_length(adjacency, start, goal, banned, max_depth):
+    """不经过 banned 中原子时 start 到 goal 的最短路径长度 (超过 max_depth 返回 None)"""
+    seen = {start} | set(banned)
+    queue = deque([(start, 0)])
+    while queue:
+        atom, depth = queue.popleft()
+        if depth == max_depth:
+            continue
+        for neighbor in adjacency[atom]:
+            if neighbor == goal:
+                return depth + 1
+            if neighbor not in seen:
+                seen.add(neighbor); queue.append((neighbor, depth + 1))
+    return None
+
+
+def _torsion_distances(a, b, c, theta1, theta2):
+    """i-j-k-l 中 i、l 在二面角 0° (顺式) 和 180° (反式) 时的距离"""
+    x_i, y_i = a * math.cos(theta1), a * math.sin(theta1)
+    x_l, y_l = b - c * math.cos(theta2), c * math.sin(theta2)
+    cis = math.hypot(x_l - x_i, y_l - y_i)
+    trans = math.hypot(x_l - x_i, y_l + y_i)
+    return cis, trans
+
+
+def ideal_bond_lengths(molecule):
+    """与 molecule.bonds 对应的参考键长：两原子共价半径之和 × 键级系数"""
+    if len(molecule.bonds) == 0:
+        return np.zeros(0)
+    radii = covalent_radii_array(molecule.elements)
+    scale = np.array([BOND_ORDER_SCALE.get(int(order), 1.0) for order in molecule.bond_orders])
+    return (radii[molecule.bonds[:, 0]] + radii[molecule.bonds[:, 1]]) * scale
+
+
+def ideal_angles(molecule):
+    """
+    全部键角 i-k-j 及其参考值：按中心原子杂化取 180°/120°/109.47°，3~5 元环内取正多边形内角。
+    :return: ((m, 3) 的 (i, k, j) 下标数组, (m,) 的弧度数组)
+    """
+    hybrid = hybridization(len(molecule), molecule.bonds, molecule.bond_orders)
+    adjacency = molecule.neighbors()
+    triples, thetas = [], []
+    for k in range(len(molecule)):
+        neighbors = adjacency[k]
+        for a in range(len(neighbors)):
+            for b in range(a + 1, len(neighbors)):
+                i, j = neighbors[a], neighbors[b]
+                ring = _path_length(adjacency, i, j, (k,), 3)
+                triples.append((i, k, j))
+                thetas.append(math.pi * ring / (ring + 2) if ring is not None else _HYBRID_ANGLES[hybrid[k]])
+    return np.array(triples, dtype=np.int64).reshape(-1, 3), np.array(thetas, dtype=float)
+
+
+def bounds_matrix(molecule):
+    """
+    由连接图建立距离上下界矩阵：1-2 取键长，1-3 由键角推出，1-4 在顺/反式之间 (平面双键/芳香键取定值)，
+    其余原子对下界为缩放后的范德华半径之和；最后做三角不等式平滑。
+    :return: (lower, upper) 两个 (n, n) 矩阵
+    """
+    n = len(molecule)
+    elements = molecule.elements.astype(str)
+    bonds, orders = molecule.bonds, molecule.bond_orders
+    adjacency = molecule.neighbors()
+    vdw = np.array([VDW_RADII.get(s, DEFAULT_VDW_RADIUS) for s in elements])
+
+    graph = coo_matrix((np.ones(len(bonds)), (bonds[:, 0], bonds[:, 1])), shape=(n, n))
+    topo = shortest_path(graph, directed=False, unweighted=True)
+
+    lower = VDW_SCALE * (vdw[:, None] + vdw[None, :])
+    upper = np.where(np.isinf(topo), vdw[:, None] + vdw[None, :] + FRAGMENT_GAP, 1000.0)
+
+    bond_length = {}
+    for (i, j), length in zip(bonds, ideal_bond_lengths(molecule)):
+        bond_length[i, j] = bond_length[j, i] = length
+    bond_order = {}
+    for (i, j), order in zip(bonds, orders):
+        bond_order[i, j] = bond_order[j, i] = int(order)
+
+    hybrid = hybridization(n, bonds, orders)
+    angle = {}  # (i, k, j) -> i-k-j 键角
+    pairs_13 = {}
+    for (i, k, j), theta in zip(*ideal_angles(molecule)):
+        angle[i, k, j] = angle[j, k, i] = theta
+        if topo[i, j] == 2:
+            a_len, b_len = bond_length[i, k], bond_length[k, j]
+            d = math.sqrt(a_len ** 2 + b_len ** 2 - 2 * a_len * b_len * math.cos(theta))
+            lo, hi = pairs_13.get((i, j), (d, d))
+            pairs_13[i, j] = (min(lo, d), max(hi, d))
+    for (i, j), (lo, hi) in pairs_13.items():
+        lower[i, j] = lower[j, i] = lo - ANGLE_TOLERANCE
+        upper[i, j] = upper[j, i] = hi + ANGLE_TOLERANCE
+
+    pairs_14 = {}
+    for j, k in bonds:
+        side_j = sorted((a for a in adjacency[j] if a != k), key=lambda a: elements[a] == 'H')
+        side_k = sorted((b for b in adjacency[k] if b != j), key=lambda b: elements[b] == 'H')
+        planar = (bond_order[j, k] in (2, AROMATIC_BOND) and hybrid[j] == 2 and hybrid[k] == 2
+                  and len(side_j) <= 2 and len(side_k) <= 2)
+        cis_pairs = set()
+        if planar and side_j and side_k:
+            # 同在一个环里的取代基互为顺式；否则默认重原子取代基互为反式 (E 构型)
+            ring_pair = next(((a, b) for a in side_j for b in side_k
+                              if a != b and _path_length(adjacency, a, b, (j, k), 4) is not None), None)
+            if ring_pair is None:
+                ring_pair = (side_j[0], side_k[-1]) if len(side_k) == 2 else (side_j[-1], side_k[0]) if len(side_j) == 2 else None
+            if ring_pair is not None:
+                a, b = ring_pair
+                cis_pairs.add((a, b))
+                others_j = [x for x in side_j if x != a]
+                others_k = [x for x in side_k if x != b]
+                if others_j and others_k:
+                    cis_pairs.add((others_j[0], others_k[0]))
+        for i in side_j:
+            for l in side_k:
+                if i == l or topo[i, l] != 3:
+                    continue
+                cis, trans = _torsion_distances(bond_length[i, j], bond_length[j, k], bond_length[k, l],
+                                                angle[i, j, k], angle[j, k, l])
+                if planar:
+                    d = cis if (i, l) in cis_pairs else trans
+                    lo, hi = d, d
+                else:
+                    lo, hi = cis, trans
+                old = pairs_14.get((i, l), (lo, hi))
+                pairs_14[i, l] = (min(old[0], lo), max(old[1], hi))
+    for (i, l), (lo, hi) in pairs_14.items():
+        lower[i, l] = lower[l, i] = lo - TORSION_TOLERANCE
+        upper[i, l] = upper[l, i] = hi + TORSION_TOLERANCE
+
+    for (i, j), length in bond_length.items():
+        lower[i, j] = length - BOND_TOLERANCE
+        upper[i, j] = length + BOND_TOLERANCE
+    np.fill_diagonal(lower, 0.0)
+    np.fill_diagonal(upper, 0.0)
+    return triangle_smooth(lower, upper)
+
+
+def _planar_bonds(molecule, hybrid):
+    for (j, k), order in zip(molecule.bonds, molecule.bond_orders):
+        if order in (2, AROMATIC_BOND) and hybrid[j] == 2 and hybrid[k] == 2:
+            yield j, k
+
+
+def planarity_constraints(molecule):
+    """
+    需要共平面的四原子组 (m, 4)：三配位 sp2 原子与其三个邻居，以及双键/芳香键 j-k 两侧的 i-j-k-l。
+    仅靠距离上下界的容差不足以把芳香环压平，这些组的有向体积在优化时被约束为 0。
+    """
+    hybrid = hybridization(len(molecule), molecule.bonds, molecule.bond_orders)
+    adjacency = molecule.neighbors()
+    quads = [(c, *adjacency[c]) for c in range(len(molecule)) if hybrid[c] == 2 and len(adjacency[c]) == 3]
+    for j, k in _planar_bonds(molecule, hybrid):
+        quads += [(i, j, k, l) for i in adjacency[j] if i != k for l in adjacency[k] if l != j and l != i]
+    return np.array(quads, dtype=np.int64).reshape(-1, 4)
+
+
+def triangle_smooth(lower, upper):
+    """
+    三角不等式平滑：上界即以上界为边权的全源最短路 (scipy 的 Floyd-Warshall，C 实现)；
+    下界再按 l_ij >= l_ik - u_kj 逐个中间点整行整列原地更新。
+    """
+    upper = shortest_path(upper, method='FW', directed=False)
+    lower = lower.copy()
+    for k in range(len(upper)):
+        bound = lower[:, k, None] - upper[None, k, :]
+        np.maximum(lower, bound, out=lower)
+        np.maximum(lower, bound.T, out=lower)
+    # 约束互相矛盾时 (下界超过上界) 取上界，避免后续采样失败
+    return np.minimum(lower, upper), upper
+
+
+def _metric_embedding(distances, rng):
+    """由距离矩阵构造以质心为原点的度量矩阵，取最大的三个本征值对应的本征向量得到坐标"""
+    n = len(distances)
+    d2 = distances ** 2
+    centered = d2 - d2.mean(axis=0)[None, :] - d2.mean(axis=1)[:, None] + d2.mean()
+    metric = -0.5 * centered
+    values, vectors = np.linalg.eigh(metric)
+    values, vectors = values[-3:], vectors[:, -3:]
+    coords = np.zeros((n, 3))
+    coords[:, :values.size] = vectors * np.sqrt(np.maximum(values, 1e-3))
+    # 原子太少时度量矩阵的秩不足 3，加一点噪声让优化有方向可走
+    coords += rng.normal(scale=0.01, size=coords.shape)
+    return coords
+
+
+def _planarity_error(coords, quads, weight):
+    """四原子有向体积 V = a·(b×c) 的平方和及梯度"""
+    p0, p1, p2, p3 = (coords[quads[:, k]] for k in range(4))
+    a, b, c = p1 - p0, p2 - p0, p3 - p0
+    bc, ca, ab = np.cross(b, c), np.cross(c, a), np.cross(a, b)
+    volume = np.einsum('ij,ij->i', a, bc)
+    energy = weight * np.sum(volume ** 2)
+    factor = (2.0 * weight * volume)[:, None]
+    grad = np.zeros_like(coords)
+    for k, dv in enumerate((-(bc + ca + ab), bc, ca, ab)):
+        for axis in range(3):
+            grad[:, axis] += np.bincount(quads[:, k], weights=factor[:, 0] * dv[:, axis], minlength=len(coords))
+    return energy, grad
+
+
+def _error_function(x, lower2, inv_upper2, quads, planarity_weight):
+    """
+    距离约束 + 平面性约束的误差及解析梯度 (对全部原子对整体向量化计算)。
+    d² 用 |a|² + |b|² - 2a·b 由矩阵乘法得到；inv_upper2 的对角线为 0，使对角元不产生误差项。
+    """
+    coords = x.reshape(-1, 3)
+    n = len(coords)
+    squared = np.einsum('ij,ij->i', coords, coords)
+    d2 = squared[:, None] + squared[None, :] - 2.0 * (coords @ coords.T)
+    d2.flat[::n + 1] = 0.0
+
+    # 超出上界: d²/u² - 1；小于下界: 2l²/(l² + d²) - 1；两者在约束满足时都 ≤ 0，截断为 0
+    term_over = np.maximum(d2 * inv_upper2 - 1.0, 0.0)
+    s = lower2 + d2
+    s.flat[::n + 1] = 1.0
+    term_under = np.maximum(2.0 * lower2 / s - 1.0, 0.0)
+    energy = 0.5 * (np.sum(term_over ** 2) + np.sum(term_under ** 2))
+
+    # dE/d(d²)；每对原子在对称矩阵中出现两次，与 energy 的 0.5 抵消
+    g = 2.0 * term_over * inv_upper2 - 4.0 * term_under * lower2 / s ** 2
+    grad = 2.0 * (g.sum(axis=1)[:, None] * coords - g @ coords)
+    if len(quads) and planarity_weight:
+        planar_energy, planar_grad = _planarity_error(coords, quads, planarity_weight)
+        energy += planar_energy; grad += planar_grad
+    return energy, grad.ravel()
+
+
+def _minimize(coords, lower2, inv_upper2, quads, planarity_weight, maxiter):
+    result = minimize(_error_function, coords.ravel(), args=(lower2, inv_upper2, quads, planarity_weight), jac=True,
+                      method='L-BFGS-B', options={'maxiter': maxiter, 'ftol': OPTIMIZER_FTOL})
+    return result.x.reshape(-1, 3), float(result.fun)
+
+
+def embed_coordinates(lower, upper, planar_quads=None, seed=None, max_attempts=5, maxiter=2000):
+    """
+    在上下界之间随机取距离 -> 度量矩阵嵌入 -> L-BFGS 最小化误差函数。
+    先只用距离约束优化 (收敛快)，再加入平面性约束做第二轮。
+    :return: (坐标, 误差)；多次尝试中取误差最小的一次
+    """
+    rng = np.random.default_rng(seed)
+    n = len(lower)
+    if n == 1:
+        return np.zeros((1, 3)), 0.0
+    lower2 = lower ** 2
+    with np.errstate(divide='ignore'):
+        inv_upper2 = np.where(upper > 0, 1.0 / upper ** 2, 0.0)
+    quads = np.zeros((0, 4), dtype=np.int64) if planar_quads is None else planar_quads
+    best = None
+    for _ in range(max_attempts):
+        distances = np.triu(rng.uniform(lower, upper), 1)
+        coords = _metric_embedding(distances + distances.T, rng)
+        coords, error = _minimize(coords, lower2, inv_upper2, quads, 0.0, maxiter)
+        if len(quads):
+            coords, error = _minimize(coords, lower2, inv_upper2, quads, PLANARITY_WEIGHT, maxiter)
+        if best is None or error < best[1]:
+            best = (coords, error)
+        if best[1] < ACCEPTABLE_ERROR:
+            break
+    coords, error = best
+    return coords - coords.mean(axis=0), error
+
+
+def has_flat_coordinates(molecule, tolerance=1e-3):
+    """有连接表但所有原子共面于 z = 常数 (二维结构式导出的 MOL/SDF)，需要重新生成三维坐标"""
+    return len(molecule) > 2 and len(molecule.bonds) > 0 and np.ptp(molecule.coords[:, 2]) < tolerance
+
+
+def embed_molecule(molecule, seed=None):
+    """为分子 (SMILES 或 MOL 得到的连接图) 生成三维坐标，返回新的 Molecule"""
+    if len(molecule) == 0:
+        raise ValueError("分子中没有原子。")
+    lower, upper = bounds_matrix(molecule)
+    coords, _ = embed_coordinates(lower, upper, planarity_constraints(molecule), seed=seed)
+    return Molecule(molecule.elements, coords, molecule.bonds, molecule.bond_orders, title=molecule.title)
+
+
+def smiles_to_3d(smiles, seed=None):
+    """SMILES -> 带三维坐标的 Molecule (含氢)"""
+    return embed_molecule(parse_smiles(smiles), seed=seed)
@@ -0,0 +1,231 @@
+# chem_assistant/core/structure/forcefield.py
+# 简化的 UFF 风格力场：键伸缩、键角弯曲、二面角扭转、范德华 (网格邻居表)；能量和解析梯度全部按数组向量化计算
+# 单位: 能量 kcal/mol，长度 Å
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.optimize import minimize
+
+from core.structure.bonds import find_neighbor_pairs
+from core.structure.embedding import AROMATIC_BOND, hybridization, ideal_angles, ideal_bond_lengths
+from core.structure.molecule import Molecule
+from utils.chem_utils.element_data import VALENCE_ELECTRONS, vdw_radius
+
+# 键伸缩 E = k (r - r0)²
+BOND_FORCE_CONSTANT = 350.0
+# 键角弯曲 E = k (cosθ - cosθ0)²；θ0 接近 180° 时改用 E = k_lin (1 + cosθ)
+ANGLE_FORCE_CONSTANT = 100.0
+LINEAR_ANGLE_FORCE_CONSTANT = 50.0
+LINEAR_ANGLE_THRESHOLD = np.radians(175.0)
+# 二面角扭转 E = V/2 (1 - cos(nφ0) cos(nφ))：按 (两端杂化, 是否双键/芳香键) 取 (V, n, cos(nφ0))，V 再除以该键上的二面角个数
+TORSION_PARAMETERS = {
+    (3, 3, False): (2.0, 3, -1.0),
+    (2, 3, False): (1.0, 6, 1.0),
+    (2, 2, False): (5.0, 2, 1.0),
+    (2, 2, True): (45.0, 2, 1.0),
+}
+# 范德华 E = D [(x/r)¹² - 2 (x/r)⁶]，x = 两原子范德华半径之和，D = 两原子势阱深度的几何平均
+UFF_WELL_DEPTH = {
+    'H': 0.044, 'C': 0.105, 'N': 0.069, 'O': 0.060, 'F': 0.050, 'Si': 0.402, 'P': 0.305, 'S': 0.274,
+    'Cl': 0.227, 'Br': 0.251, 'I': 0.339, 'Na': 0.030, 'K': 0.035, 'Xe': 0.332,
+}
+DEFAULT_WELL_DEPTH = 0.1
+VDW_CUTOFF = 6.0
+# 邻居表的缓冲层：任一原子自上次建表以来位移超过 skin/2 才重建
+NEIGHBOR_SKIN = 1.0
+# L-BFGS 收敛判据：梯度最大分量 (kcal/mol/Å)
+GRADIENT_TOLERANCE = 0.05
+
+OptimizationResult = namedtuple('OptimizationResult', ['molecule', 'energy', 'initial_energy', 'steps', 'converged'])
+
+
+def _dot(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+
+def _unusual_valence(molecule):
+    """
+    已用价与常见价不符的非芳香中心：高价/配位中心 (SF6、XeF4、NH4+、金属)，或连接表缺少重键信息 (VSEPR 构型中的 CO2)。
+    这些中心按杂化规则给不出正确的键角。
+    """
+    used = np.zeros(len(molecule), dtype=int)
+    aromatic = np.zeros(len(molecule), dtype=bool)
+    for (i, j), order in zip(molecule.bonds, molecule.bond_orders):
+        used[i] += order; used[j] += order
+        if order == AROMATIC_BOND:
+            aromatic[i] = aromatic[j] = True
+    valence = np.array([VALENCE_ELECTRONS.get(s, 0) for s in molecule.elements.astype(str)])
+    normal = np.maximum(1, np.minimum(valence, 8 - valence))
+    degree = np.bincount(molecule.bonds.ravel(), minlength=len(molecule))
+    return ~aromatic & (degree >= 2) & ((used != normal) | (degree > 4))
+
+
+class ForceField:
+    """
+    对一个分子预先生成各类能量项的下标与参数数组，energy_and_gradient 对整组数组一次求值。
+    价态不寻常的中心 (多来自 VSEPR 构型) 的键角参考值取输入坐标中的键角。
+    """
+
+    def __init__(self, molecule, cutoff=VDW_CUTOFF, skin=NEIGHBOR_SKIN):
+        self.n_atoms = len(molecule)
+        self.cutoff, self.skin = cutoff, skin
+        elements = molecule.elements.astype(str)
+        coords = np.asarray(molecule.coords, dtype=float)
+
+        self.bonds = molecule.bonds
+        self.bond_r0 = ideal_bond_lengths(molecule)
+
+        self.angles, theta0 = ideal_angles(molecule)
+        if len(self.angles):
+            special = _unusual_valence(molecule)[self.angles[:, 1]]
+            theta0[special] = np.arccos(np.clip(self._cos_angles(coords)[special], -1.0, 1.0))
+        self.angle_linear = theta0 > LINEAR_ANGLE_THRESHOLD
+        self.angle_cos0 = np.cos(theta0)
+
+        self._build_torsions(molecule)
+
+        # 1-2、1-3 原子对不计范德华作用
+        excluded = [self.bonds, self.angles[:, [0, 2]]]
+        excluded = np.sort(np.vstack(excluded), axis=1) if len(self.bonds) else np.zeros((0, 2), dtype=np.int64)
+        self._excluded_keys = np.unique(excluded[:, 0] * self.n_atoms + excluded[:, 1])
+        self.vdw_radius = np.array([vdw_radius(s) for s in elements])
+        self.well_depth = np.sqrt(np.array([UFF_WELL_DEPTH.get(s, DEFAULT_WELL_DEPTH) for s in elements]))
+        self._pairs = None
+        self._pairs_origin = None
+
+    def _build_torsions(self, molecule):
+        hybrid = hybridization(self.n_atoms, molecule.bonds, molecule.bond_orders)
+        adjacency = molecule.neighbors()
+        quads, barrier, period, sign = [], [], [], []
+        for (j, k), order in zip(molecule.bonds, molecule.bond_orders):
+            key = (max(hybrid[j], hybrid[k]), min(hybrid[j], hybrid[k]), int(order) in (2, AROMATIC_BOND))
+            if key not in TORSION_PARAMETERS:
+                continue  # sp 杂化端 (直线) 没有二面角
+            terms = [(i, j, k, l) for i in adjacency[j] if i != k for l in adjacency[k] if l != j and l != i]
+            if not terms:
+                continue
+            v, n, s = TORSION_PARAMETERS[key]
+            quads += terms
+            barrier += [v / len(terms)] * len(terms); period += [n] * len(terms); sign += [s] * len(terms)
+        self.torsions = np.array(quads, dtype=np.int64).reshape(-1, 4)
+        self.torsion_barrier = np.array(barrier)
+        self.torsion_period = np.array(period, dtype=float)
+        self.torsion_sign = np.array(sign)
+
+    def _cos_angles(self, coords):
+        a = coords[self.angles[:, 0]] - coords[self.angles[:, 1]]
+        b = coords[self.angles[:, 2]] - coords[self.angles[:, 1]]
+        return _dot(a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+    def _neighbor_pairs(self, coords):
+        """Verlet 邻居表：在 cutoff + skin 内找原子对并剔除 1-2、1-3 对；位移不大时复用上次的表"""
+        if self._pairs is not None:
+            moved = np.max(np.sum((coords - self._pairs_origin) ** 2, axis=1))
+            if moved < (0.5 * self.skin) ** 2:
+                return self._pairs
+        i, j, _ = find_neighbor_pairs(coords, self.cutoff + self.skin)
+        keep = ~np.isin(i * self.n_atoms + j, self._excluded_keys)
+        self._pairs = (i[keep], j[keep])
+        self._pairs_origin = coords.copy()
+        return self._pairs
+
+    def energy_and_gradient(self, coords):
+        """
+        :return: (总能量, (n, 3) 梯度, 各项能量字典)
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        # 各项对原子的梯度贡献先收集起来，最后按原子下标一次性累加 (比逐项 np.add.at 快得多)
+        indices, parts = [], []
+        terms = {}
+
+        # 键伸缩
+        i, j = self.bonds[:, 0], self.bonds[:, 1]
+        delta = coords[i] - coords[j]
+        r = np.linalg.norm(delta, axis=1)
+        stretch = r - self.bond_r0
+        terms['bond'] = BOND_FORCE_CONSTANT * np.sum(stretch ** 2)
+        force = (2.0 * BOND_FORCE_CONSTANT * stretch / np.maximum(r, 1e-8))[:, None] * delta
+        indices += [i, j]; parts += [force, -force]
+
+        # 键角弯曲
+        i, k, j = self.angles[:, 0], self.angles[:, 1], self.angles[:, 2]
+        a, b = coords[i] - coords[k], coords[j] - coords[k]
+        la, lb = np.linalg.norm(a, axis=1), np.linalg.norm(b, axis=1)
+        cos = _dot(a, b) / (la * lb)
+        linear = self.angle_linear
+        terms['angle'] = (ANGLE_FORCE_CONSTANT * np.sum((cos[~linear] - self.angle_cos0[~linear]) ** 2)
+                          + LINEAR_ANGLE_FORCE_CONSTANT * np.sum(1.0 + cos[linear]))
+        d_cos = np.where(linear, LINEAR_ANGLE_FORCE_CONSTANT, 2.0 * ANGLE_FORCE_CONSTANT * (cos - self.angle_cos0))
+        grad_a = d_cos[:, None] * (b / (la * lb)[:, None] - (cos / la ** 2)[:, None] * a)
+        grad_b = d_cos[:, None] * (a / (la * lb)[:, None] - (cos / lb ** 2)[:, None] * b)
+        indices += [i, j, k]; parts += [grad_a, grad_b, -(grad_a + grad_b)]
+
+        # 二面角扭转 (Blondel-Karplus 梯度，避免对 cosφ 求导时 φ = 0/180° 处的奇点)
+        i, j, k, l = self.torsions.T
+        f, g, h = coords[i] - coords[j], coords[j] - coords[k], coords[l] - coords[k]
+        m, n = np.cross(f, g), np.cross(h, g)
+        m2, n2 = np.maximum(_dot(m, m), 1e-12), np.maximum(_dot(n, n), 1e-12)
+        lg = np.linalg.norm(g, axis=1)
+        phi = np.arctan2(_dot(np.cross(n, m), g) / lg, _dot(m, n))
+        period, barrier, sign = self.torsion_period, self.torsion_barrier, self.torsion_sign
+        terms['torsion'] = np.sum(0.5 * barrier * (1.0 - sign * np.cos(period * phi)))
+        d_phi = (0.5 * barrier * sign * period * np.sin(period * phi))[:, None]
+        grad_i = -(lg / m2)[:, None] * m
+        grad_l = (lg / n2)[:, None] * n
+        fg, hg = (_dot(f, g) / lg ** 2)[:, None], (_dot(h, g) / lg ** 2)[:, None]
+        grad_j = -grad_i - fg * grad_i - hg * grad_l
+        grad_k = -grad_l + fg * grad_i + hg * grad_l
+        indices += [i, j, k, l]; parts += [d_phi * grad_i, d_phi * grad_j, d_phi * grad_k, d_phi * grad_l]
+
+        # 范德华 (截断处平移到 0)
+        i, j = self._neighbor_pairs(coords)
+        delta = coords[i] - coords[j]
+        r2 = _dot(delta, delta)
+        x2 = (self.vdw_radius[i] + self.vdw_radius[j]) ** 2
+        depth = self.well_depth[i] * self.well_depth[j]
+        inside = r2 < self.cutoff ** 2
+        s6 = (x2 / r2) ** 3
+        s6_cut = (x2 / self.cutoff ** 2) ** 3
+        terms['vdw'] = np.sum(np.where(inside, depth * (s6 ** 2 - 2.0 * s6 - s6_cut ** 2 + 2.0 * s6_cut), 0.0))
+        force = np.where(inside, depth * 12.0 * (s6 - s6 ** 2) / r2, 0.0)[:, None] * delta
+        indices += [i, j]; parts += [force, -force]
+
+        index, part = np.concatenate(indices), np.concatenate(parts)
+        grad = np.column_stack([np.bincount(index, weights=part[:, axis], minlength=self.n_atoms) for axis in range(3)])
+        return sum(terms.values()), grad, terms
+
+    def energy(self, coords):
+        return self.energy_and_gradient(coords)[0]
+
+
+def optimize_geometry(molecule, max_steps=2000, gradient_tolerance=GRADIENT_TOLERANCE, callback=None,
+                      callback_interval=5):
+    """
+    L-BFGS 优化分子几何。
+    :param callback: callback(步数, 坐标, 能量)，每 callback_interval 步调用一次，可用于实时显示优化过程；返回 True 时提前停止
+    :return: OptimizationResult
+    """
+    if len(molecule) == 0:
+        raise ValueError("分子中没有原子。")
+    field = ForceField(molecule)
+    initial_energy = field.energy(molecule.coords)
+    state = {'steps': 0, 'energy': initial_energy}
+
+    def fun(x):
+        energy, grad, _ = field.energy_and_gradient(x)
+        state['energy'] = energy
+        return energy, grad.ravel()
+
+    def step(x):
+        state['steps'] += 1
+        if callback is not None and state['steps'] % callback_interval == 0:
+            if callback(state['steps'], x.reshape(-1, 3).copy(), state['energy']) is True:
+                # SciPy >= 1.11 把回调中的 StopIteration 当作正常终止 (见 requirements.txt)
+                raise StopIteration
+
+    result = minimize(fun, np.asarray(molecule.coords, dtype=float).ravel(), jac=True, method='L-BFGS-B',
+                      callback=step, options={'maxiter': max_steps, 'gtol': gradient_tolerance, 'ftol': 1e-12})
+    coords = result.x.reshape(-1, 3)
+    optimized = Molecule(molecule.elements, coords, molecule.bonds, molecule.bond_orders, title=molecule.title)
+    return OptimizationResult(optimized, float(result.fun), float(initial_energy), int(result.nit), bool(result.success))
@@ -0,0 +1,167 @@
+# chem_assistant/core/structure/huckel.py
+# 简单 Hückel 分子轨道 (π 体系)：由连接图建立哈密顿矩阵，同样大小的体系堆叠成三维数组一次 eigh 求解
+
+from collections import namedtuple
+
+import numpy as np
+
+# 杂原子参数 (h, k)：α_X = α + hβ，β_CX = kβ (Streitwieser 表；S 取 Van-Catledge 值)。
+# 键为 (元素, 贡献给 π 体系的电子数)
+HUCKEL_PARAMETERS = {
+    ('C', 1): (0.0, 1.0),
+    ('N', 1): (0.5, 1.0),    # 吡啶型、亚胺、腈
+    ('N', 2): (1.5, 0.8),    # 吡咯型、苯胺型
+    ('O', 1): (1.0, 1.0),    # 羰基
+    ('O', 2): (2.0, 0.8),    # 呋喃型、酚羟基
+    ('S', 2): (1.11, 0.69),  # 噻吩型
+    ('F', 2): (3.0, 0.7),
+    ('Cl', 2): (2.0, 0.4),
+    ('Br', 2): (1.5, 0.3),
+    ('B', 0): (-1.0, 0.7),   # 空 p 轨道
+}
+# 轨道能量 (以 β 为单位) 相差小于该值视为简并
+DEGENERACY_TOLERANCE = 1e-6
+
+# energies: x_i，轨道能量 E_i = α + x_i·β (β < 0)，按能量从低到高 (x 从大到小) 排列
+# coefficients: (n, n)，第 i 列为第 i 个分子轨道在各 π 原子上的系数；atoms 为这些 π 原子在分子中的下标
+# bond_orders: Coulson 键级矩阵 P = C·diag(占据数)·Cᵀ，对角元为各原子的 π 电子密度；charges 为 π 净电荷
+# homo/lumo: 轨道序号，不存在时为 -1；pi_energy: Σ n_i·x_i，即 E_π = Nα + pi_energy·β
+HuckelResult = namedtuple('HuckelResult', ['atoms', 'energies', 'coefficients', 'occupations', 'n_electrons',
+                                           'homo', 'lumo', 'pi_energy', 'charges', 'bond_orders'])
+
+
+def pi_electron_contributions(molecule):
+    """
+    按元素和配位数 (包括氢) 判断哪些原子参与共轭 π 体系，以及各贡献几个电子：
+    配位数不超过 3 的 C、不超过 2 的 N 为不饱和原子 (各 1 个电子)；与不饱和原子相连的端基 O 为羰基型 (1 个)，
+    带孤对电子的 N(3 配位)、O/S(2 配位)、卤素为给体 (2 个)，B 提供空轨道 (0 个)。
+    :return: 每个原子的 π 电子数，不参与 π 体系的原子为 -1
+    """
+    n = len(molecule)
+    elements = np.asarray(molecule.elements).astype(str)
+    bonds = molecule.bonds
+    degree = np.bincount(bonds.ravel(), minlength=n)
+    is_c, is_n, is_o = elements == 'C', elements == 'N', elements == 'O'
+    unsaturated = (is_c & (degree <= 3)) | (is_n & (degree <= 2))
+    adjacent = np.zeros(n, dtype=bool)
+    adjacent[bonds[unsaturated[bonds[:, 1]], 0]] = True
+    adjacent[bonds[unsaturated[bonds[:, 0]], 1]] = True
+
+    contributions = np.full(n, -1, dtype=np.int64)
+    contributions[unsaturated] = 1
+    contributions[is_o & (degree == 1) & adjacent] = 1
+    donor = (is_n & (degree == 3)) | ((is_o | (elements == 'S')) & (degree == 2)) | \
+            (np.isin(elements, ('F', 'Cl', 'Br')) & (degree == 1))
+    contributions[donor & adjacent] = 2
+    contributions[(elements == 'B') & (degree <= 3) & adjacent] = 0
+    return contributions
+
+
+def _huckel_system(molecule, charge):
+    """huckel_matrix 的实现；没有 π 原子时返回 None"""
+    contributions = pi_electron_contributions(molecule)
+    elements = np.asarray(molecule.elements).astype(str)
+    keys = list(zip(elements.tolist(), contributions.tolist()))
+    atoms = np.array([a for a, key in enumerate(keys) if key in HUCKEL_PARAMETERS], dtype=np.int64)
+    if len(atoms) == 0:
+        return None
+    h, k = np.array([HUCKEL_PARAMETERS[keys[a]] for a in atoms]).T
+    local = np.full(len(molecule), -1, dtype=np.int64)
+    local[atoms] = np.arange(len(atoms))
+    pairs = local[molecule.bonds]
+    pairs = pairs[(pairs >= 0).all(axis=1)]
+    matrix = np.diag(h)
+    matrix[pairs[:, 0], pairs[:, 1]] = matrix[pairs[:, 1], pairs[:, 0]] = k[pairs[:, 0]] * k[pairs[:, 1]]
+    n_electrons = int(contributions[atoms].sum()) - int(charge)
+    if not 0 <= n_electrons <= 2 * len(atoms):
+        raise ValueError(f"电荷 {charge} 对应的 π 电子数 ({n_electrons}) 超出 0 ~ {2 * len(atoms)} 的范围。")
+    return atoms, matrix, n_electrons, contributions[atoms]
+
+
+def huckel_matrix(molecule, charge=0):
+    """
+    建立 π 体系的 Hückel 矩阵 (以 β 为单位，α 取 0)：对角元 h_X，相连 π 原子之间为 k_X·k_Y。
+    :return: (π 原子下标, 矩阵, π 电子数, 各 π 原子贡献的电子数)
+    """
+    system = _huckel_system(molecule, charge)
+    if system is None:
+        raise ValueError("分子中没有共轭 π 体系 (没有找到不饱和的 C/N 原子)。")
+    return system
+
+
+def _occupations(energies, electrons):
+    """按能量从低到高每个轨道填 2 个电子；简并轨道平均分配 (如环丁二烯的两个非键轨道各 1 个电子)"""
+    m, n = energies.shape
+    occupations = np.clip(electrons[:, None] - 2 * np.arange(n), 0, 2).astype(float)
+    steps = np.abs(np.diff(energies, axis=1)) > DEGENERACY_TOLERANCE
+    groups = np.concatenate([np.zeros((m, 1), dtype=np.int64), np.cumsum(steps, axis=1)], axis=1)
+    groups += n * np.arange(m)[:, None]
+    sums = np.bincount(groups.ravel(), occupations.ravel(), minlength=m * n)
+    counts = np.bincount(groups.ravel(), minlength=m * n)
+    return (sums / np.maximum(counts, 1))[groups]
+
+
+def _solve_stack(matrices, electrons, contributions):
+    """同样大小的一组矩阵 (m, n, n) 一次对角化，并批量计算占据数、键级和电荷"""
+    values, vectors = np.linalg.eigh(matrices)
+    # eigh 按本征值升序返回；β < 0，x 越大能量越低
+    energies = values[:, ::-1]
+    coefficients = vectors[:, :, ::-1]
+    # 每个轨道的符号约定为绝对值最大的系数取正，结果与求解器的随机符号无关
+    m, n = energies.shape
+    largest = np.abs(coefficients).argmax(axis=1)
+    signs = np.sign(np.take_along_axis(coefficients, largest[:, None, :], axis=1))
+    coefficients = coefficients * np.where(signs == 0, 1.0, signs)
+    occupations = _occupations(energies, electrons)
+    bond_orders = np.einsum('mri,mi,msi->mrs', coefficients, occupations, coefficients)
+    occupied = occupations > 1e-9
+    homo = np.where(occupied.any(axis=1), n - 1 - np.argmax(occupied[:, ::-1], axis=1), -1)
+    not_full = occupations < 2.0 - 1e-9
+    lumo = np.where(not_full.any(axis=1), np.argmax(not_full, axis=1), -1)
+    pi_energy = np.sum(occupations * energies, axis=1)
+    charges = contributions - np.diagonal(bond_orders, axis1=1, axis2=2)
+    return energies, coefficients, occupations, homo, lumo, pi_energy, charges, bond_orders
+
+
+def solve_huckel_batch(molecules, charges=None):
+    """
+    批量求解：π 原子数相同的分子堆叠成 (m, n, n) 数组，一次 numpy.linalg.eigh 调用完成对角化。
+    :param charges: 每个分子的电荷，缺省全为 0
+    :return: HuckelResult 列表，没有 π 体系的分子对应 None
+    """
+    molecules = list(molecules)
+    charges = [0] * len(molecules) if charges is None else list(charges)
+    if len(charges) != len(molecules):
+        raise ValueError("电荷个数与分子个数不一致。")
+    systems = {}
+    for index, (molecule, charge) in enumerate(zip(molecules, charges)):
+        system = _huckel_system(molecule, charge)
+        if system is not None:
+            systems.setdefault(len(system[0]), []).append((index,) + system)
+
+    results = [None] * len(molecules)
+    for group in systems.values():
+        indices, atoms, matrices, electrons, contributions = zip(*group)
+        solved = _solve_stack(np.stack(matrices), np.array(electrons), np.array(contributions, dtype=float))
+        for k, index in enumerate(indices):
+            energies, coefficients, occupations, homo, lumo, pi_energy, net, orders = (item[k] for item in solved)
+            results[index] = HuckelResult(atoms[k], energies, coefficients, occupations, electrons[k], int(homo),
+                                          int(lumo), float(pi_energy), net, orders)
+    return results
+
+
+def solve_huckel(molecule, charge=0):
+    """单个分子的 Hückel 计算 (没有 π 体系时报错)"""
+    result = solve_huckel_batch([molecule], [charge])[0]
+    if result is None:
+        raise ValueError("分子中没有共轭 π 体系 (没有找到不饱和的 C/N 原子)。")
+    return result
+
+
+def orbital_label(result, index):
+    """轨道名称：HOMO、LUMO、HOMO-1、LUMO+2 ...，离前线轨道较远的记为 ψ序号"""
+    if result.homo >= 0 and index <= result.homo and result.homo - index <= 3:
+        return "HOMO" if index == result.homo else f"HOMO-{result.homo - index}"
+    if result.lumo >= 0 and index >= result.lumo and index - result.lumo <= 3 and index > result.homo:
+        return "LUMO" if index == result.lumo else f"LUMO+{index - result.lumo}"
+    return f"ψ{index + 1}"
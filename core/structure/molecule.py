@@ -0,0 +1,45 @@
+# chem_assistant/core/structure/molecule.py
+# 分子/原子集合的基础数据模型
+
+import numpy as np
+
+
+class Molecule:
+    """以 NumPy 数组保存的原子集合：元素、笛卡尔坐标 (Å) 和键连关系"""
+
+    def __init__(self, elements, coords, bonds=None, bond_orders=None, title=""):
+        self.elements = np.asarray(elements, dtype=object)
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        if len(self.elements) != len(self.coords):
+            raise ValueError("元素数量与坐标数量不一致。")
+        self.bonds = np.zeros((0, 2), dtype=np.int64) if bonds is None else np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+        if bond_orders is None:
+            bond_orders = np.ones(len(self.bonds), dtype=np.int8)
+        self.bond_orders = np.asarray(bond_orders, dtype=np.int8)
+        self.title = title
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def formula(self):
+        """Hill 顺序的分子式 (C、H 在前，其余按字母排序)"""
+        symbols, counts = np.unique(self.elements.astype(str), return_counts=True)
+        count_map = dict(zip(symbols, counts))
+        order = [s for s in ('C', 'H') if s in count_map] if 'C' in count_map else []
+        order += sorted(s for s in count_map if s not in order)
+        return "".join(s if count_map[s] == 1 else f"{s}{count_map[s]}" for s in order)
+
+    @property
+    def centroid(self):
+        return self.coords.mean(axis=0) if len(self.coords) else np.zeros(3)
+
+    def neighbors(self):
+        """返回每个原子的邻接原子列表"""
+        adjacency = [[] for _ in range(len(self))]
+        for i, j in self.bonds:
+            adjacency[i].append(int(j)); adjacency[j].append(int(i))
+        return adjacency
+
+    def __repr__(self):
+        return f"Molecule('{self.title or self.formula}', {len(self)} atoms, {len(self.bonds)} bonds)"
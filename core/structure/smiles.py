@@ -0,0 +1,130 @@
+# chem_assistant/core/structure/smiles.py
+# SMILES 解析：得到连接图 (元素、键、键级)，并补全隐式氢。不含坐标，坐标由 embedding.py 生成
+
+import re
+
+import numpy as np
+
+from core.structure.molecule import Molecule
+from utils.chem_utils.element_data import ATOMIC_NUMBERS
+
+# 键级 4 表示芳香键 (与 MDL MOL 文件的约定一致)
+AROMATIC_BOND = 4
+
+# 有机子集元素的常见价态，隐式氢数取不小于已用价的最小价态
+DEFAULT_VALENCES = {
+    'B': (3,), 'C': (4,), 'N': (3, 5), 'O': (2,), 'P': (3, 5), 'S': (2, 4, 6),
+    'F': (1,), 'Cl': (1,), 'Br': (1,), 'I': (1,),
+}
+
+_TOKEN = re.compile(
+    r'(?P<bracket>\[[^\]]+\])|(?P<organic>Cl|Br|[BCNOPSFI]|[bcnops])|(?P<bond>[-=#:/\\])'
+    r'|(?P<ring>%\d{2}|\d)|(?P<open>\()|(?P<close>\))|(?P<dot>\.)'
+)
+_BRACKET = re.compile(
+    r'\[(?P<isotope>\d+)?(?P<symbol>[A-Z][a-z]?|[bcnops]|se|as)(?P<chiral>@{0,2})'
+    r'(?P<hcount>H\d*)?(?P<charge>[+-]+\d*)?(?::\d+)?\]'
+)
+_BOND_ORDERS = {'-': 1, '/': 1, '\\': 1, '=': 2, '#': 3, ':': AROMATIC_BOND}
+
+
+def parse_smiles(smiles, add_hydrogens=True):
+    """
+    解析 SMILES (支持分支、环闭合、芳香小写原子和方括号原子；电荷与立体标记只做语法检查，不参与建模)。
+    :return: Molecule，坐标全为 0；芳香键的键级为 AROMATIC_BOND
+    """
+    smiles = smiles.strip()
+    if not smiles:
+        raise ValueError("SMILES 为空。")
+    elements, aromatic, explicit_h = [], [], []
+    bonds, orders = [], []
+    ring_open = {}
+    branch_stack = []
+    previous = None
+    pending_bond = None
+
+    position = 0
+    while position < len(smiles):
+        match = _TOKEN.match(smiles, position)
+        if not match:
+            raise ValueError(f"SMILES 在第 {position + 1} 个字符 '{smiles[position]}' 处无法解析。")
+        position = match.end()
+        kind, text = match.lastgroup, match.group()
+
+        if kind in ('organic', 'bracket'):
+            if kind == 'organic':
+                symbol, hcount = text, None
+            else:
+                atom = _BRACKET.fullmatch(text)
+                if not atom:
+                    raise ValueError(f"无法识别的方括号原子 '{text}'。")
+                symbol = atom.group('symbol')
+                hcount = atom.group('hcount')
+                # 方括号原子的氢数是显式的，不再补隐式氢
+                hcount = 0 if hcount is None else int(hcount[1:] or 1)
+            is_aromatic = symbol[0].islower()
+            symbol = symbol.capitalize()
+            if symbol not in ATOMIC_NUMBERS:
+                raise ValueError(f"SMILES 中有未知元素 '{symbol}'。")
+            index = len(elements)
+            elements.append(symbol); aromatic.append(is_aromatic); explicit_h.append(hcount)
+            if previous is not None:
+                order = pending_bond or (AROMATIC_BOND if is_aromatic and aromatic[previous] else 1)
+                bonds.append((previous, index)); orders.append(order)
+            previous, pending_bond = index, None
+        elif kind == 'bond':
+            pending_bond = _BOND_ORDERS[text]
+        elif kind == 'ring':
+            if previous is None:
+                raise ValueError("环闭合数字前没有原子。")
+            label = int(text.lstrip('%'))
+            if label in ring_open:
+                partner, partner_bond = ring_open.pop(label)
+                order = pending_bond or partner_bond or (AROMATIC_BOND if aromatic[partner] and aromatic[previous] else 1)
+                bonds.append((partner, previous)); orders.append(order)
+            else:
+                ring_open[label] = (previous, pending_bond)
+            pending_bond = None
+        elif kind == 'open':
+            branch_stack.append(previous)
+        elif kind == 'close':
+            if not branch_stack:
+                raise ValueError("SMILES 中的括号不匹配。")
+            previous = branch_stack.pop()
+        elif kind == 'dot':
+            previous, pending_bond = None, None
+
+    if ring_open:
+        raise ValueError(f"SMILES 中有未闭合的环标记: {sorted(ring_open)}")
+    if branch_stack:
+        raise ValueError("SMILES 中的括号不匹配。")
+
+    n_heavy = len(elements)
+    bonds = np.array(bonds, dtype=np.int64).reshape(-1, 2)
+    orders = np.array(orders, dtype=np.int8)
+    # 已用价：芳香键按 1 计；芳香原子的 π 电子另占 1 价 (见下)
+    used = np.zeros(n_heavy, dtype=int)
+    for (i, j), order in zip(bonds, orders):
+        value = 1 if order == AROMATIC_BOND else int(order)
+        used[i] += value; used[j] += value
+
+    h_counts = []
+    for k in range(n_heavy):
+        if explicit_h[k] is not None:
+            h_counts.append(explicit_h[k])
+            continue
+        valences = DEFAULT_VALENCES.get(elements[k], (0,))
+        # OpenSMILES：只有最低价态尚未被显式键占满时芳香原子才另加 1
+        # (c、吡啶的 n 加 1；噻吩的 s、呋喃的 o、N-取代吡咯的 n 已满，不再补氢)
+        load = used[k] + (1 if aromatic[k] and used[k] < valences[0] else 0)
+        target = next((v for v in valences if v >= load), valences[-1])
+        h_counts.append(max(0, target - load))
+
+    if add_hydrogens and sum(h_counts):
+        parents = np.repeat(np.arange(n_heavy), h_counts)
+        h_index = np.arange(n_heavy, n_heavy + len(parents))
+        elements = elements + ['H'] * len(parents)
+        bonds = np.vstack([bonds, np.column_stack([parents, h_index])])
+        orders = np.concatenate([orders, np.ones(len(parents), dtype=np.int8)])
+
+    return Molecule(elements, np.zeros((len(elements), 3)), bonds, orders, title=smiles)
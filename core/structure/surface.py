@@ -0,0 +1,115 @@
+# chem_assistant/core/structure/surface.py
+# 溶剂可及表面积 (Shrake-Rupley 球面点法 + 网格邻居表) 和范德华体积 (布尔体素网格)
+
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from core.structure.bonds import find_neighbor_pairs
+from utils.chem_utils.element_data import VDW_RADII, DEFAULT_VDW_RADIUS
+
+PROBE_RADIUS = 1.4      # Å，水分子探针
+SPHERE_POINTS = 96      # 每个原子球面上的测试点数
+VOXEL_SPACING = 0.3     # Å，体积计算的体素边长
+# 每批处理的 (原子对 × 球面点) 数，限制中间数组的内存
+_BATCH_TESTS = 4_000_000
+
+# atom_areas: 每个原子的可及面积 (Å²)；exposure: 可及面积占该原子扩展球面积的比例 (0 完全埋藏，1 完全暴露)
+SurfaceResult = namedtuple('SurfaceResult', ['total_area', 'atom_areas', 'exposure', 'volume', 'probe_radius'])
+
+
+@lru_cache(maxsize=8)
+def sphere_points(n=SPHERE_POINTS):
+    """黄金螺旋在单位球面上取 n 个近似均匀的点"""
+    k = np.arange(n) + 0.5
+    z = 1.0 - 2.0 * k / n
+    phi = np.pi * (3.0 - np.sqrt(5.0)) * k
+    rho = np.sqrt(1.0 - z * z)
+    points = np.column_stack([rho * np.cos(phi), rho * np.sin(phi), z]).astype(np.float32)
+    points.setflags(write=False)
+    return points
+
+
+def vdw_radii_array(elements):
+    symbols, inverse = np.unique(np.asarray(elements).astype(str), return_inverse=True)
+    radii = np.array([VDW_RADII.get(s, DEFAULT_VDW_RADIUS) for s in symbols])
+    return radii[inverse.ravel()]
+
+
+def atom_accessible_areas(coords, radii, probe_radius=PROBE_RADIUS, n_points=SPHERE_POINTS):
+    """
+    Shrake-Rupley：原子半径加探针半径得到扩展球，球面点落在任何相邻扩展球内即视为被埋藏。
+    点 c_i + R_i·u 落在球 j 内  <=>  u·(c_j - c_i) > (R_i² + d² - R_j²) / (2R_i)，
+    所以每个原子对只需一次 (点数 × 3) 的矩阵乘法；同一原子的全部原子对用 logical_or.reduceat 合并。
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    expanded = np.asarray(radii, dtype=float) + probe_radius
+    n = len(coords)
+    units = sphere_points(n_points)
+    buried = np.zeros((n, len(units)), dtype=bool)
+    if n > 1:
+        i, j, distances = find_neighbor_pairs(coords, 2.0 * float(expanded.max()))
+        overlap = distances < expanded[i] + expanded[j]
+        i, j, distances = i[overlap], j[overlap], distances[overlap]
+        # 每对原子两个方向都要检验，按被检验的原子排序后分批处理
+        atom = np.concatenate([i, j]); other = np.concatenate([j, i]); distances = np.concatenate([distances, distances])
+        order = np.argsort(atom, kind='stable')
+        atom, other, distances = atom[order], other[order], distances[order]
+        batch = max(_BATCH_TESTS // len(units), 1)
+        start = 0
+        while start < len(atom):
+            stop = min(start + batch, len(atom))
+            # 批次边界对齐到原子边界，reduceat 的每一段都属于同一个原子
+            if stop < len(atom):
+                stop = max(np.searchsorted(atom, atom[stop], side='left'), start + 1)
+            a, b, d = atom[start:stop], other[start:stop], distances[start:stop]
+            ra = expanded[a]
+            threshold = ((ra * ra + d * d - expanded[b] ** 2) / (2.0 * ra)).astype(np.float32)
+            inside = (coords[b] - coords[a]).astype(np.float32) @ units.T > threshold[:, None]
+            segment = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+            buried[a[segment]] |= np.logical_or.reduceat(inside, segment, axis=0)
+            start = stop
+    fraction = 1.0 - buried.mean(axis=1)
+    return fraction * 4.0 * np.pi * expanded ** 2, fraction
+
+
+def voxel_volume(coords, radii, spacing=VOXEL_SPACING):
+    """把原子球印到布尔体素网格上，被占据的体素数 × 体素体积即为分子 (球并集) 体积"""
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=float)
+    if len(coords) == 0:
+        return 0.0
+    margin = float(radii.max()) + 2 * spacing
+    origin = coords.min(axis=0) - margin
+    shape = np.ceil((coords.max(axis=0) + margin - origin) / spacing).astype(np.int64) + 1
+    grid = np.zeros(int(np.prod(shape)), dtype=bool)
+    strides = np.array([shape[1] * shape[2], shape[2], 1])
+    flat_centers = np.rint((coords - origin) / spacing).astype(np.int64) @ strides
+    # 同一半径的原子共用一个球形模板：离中心最近的 round(4/3·πr³/h³) 个体素，单个原子的体积因此是精确的；
+    # 原子中心取最近的格点，误差在半个体素以内，只影响原子间重叠部分
+    for radius in np.unique(radii):
+        atoms = np.flatnonzero(radii == radius)
+        reach = int(np.ceil(radius / spacing)) + 1
+        offsets = np.stack(np.meshgrid(*[np.arange(-reach, reach + 1)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+        count = int(round(4.0 / 3.0 * np.pi * (radius / spacing) ** 3))
+        template = offsets[np.argsort(np.sum(offsets ** 2, axis=1), kind='stable')[:count]] @ strides
+        batch = max(_BATCH_TESTS // len(template), 1)
+        for start in range(0, len(atoms), batch):
+            grid[(flat_centers[atoms[start:start + batch], None] + template[None]).ravel()] = True
+    return float(np.count_nonzero(grid)) * spacing ** 3
+
+
+def molecular_surface(molecule, probe_radius=PROBE_RADIUS, n_points=SPHERE_POINTS, spacing=VOXEL_SPACING):
+    """
+    分子的溶剂可及表面积 (SASA) 与范德华体积。
+    :param probe_radius: 探针半径 (Å)；取 0 时得到范德华表面积
+    :return: SurfaceResult(总面积 Å², 每原子面积, 每原子暴露比例, 体积 Å³, 探针半径)
+    """
+    if len(molecule) == 0:
+        raise ValueError("分子中没有原子。")
+    if probe_radius < 0 or n_points < 1 or spacing <= 0:
+        raise ValueError("探针半径不能为负，球面点数和体素边长必须为正数。")
+    radii = vdw_radii_array(molecule.elements)
+    areas, exposure = atom_accessible_areas(molecule.coords, radii, probe_radius, n_points)
+    return SurfaceResult(float(areas.sum()), areas, exposure, voxel_volume(molecule.coords, radii, spacing), probe_radius)
@@ -0,0 +1,391 @@
+# chem_assistant/core/structure/symmetry.py
+# 分子点群判断：由惯量主轴和等价原子壳层生成候选轴/镜面，候选对称操作批量作用于坐标，
+# 再用按容差量化的坐标哈希判断变换后的分子是否与原分子重合
+
+import math
+from collections import namedtuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from utils.chem_utils.element_data import atomic_mass
+
+SYMMETRY_TOLERANCE = 0.3   # Å，对称操作后原子位置允许的偏差
+INERTIA_TOLERANCE = 0.01   # 最小主转动惯量与最大值之比小于该值时视为线形分子
+DIRECTION_TOLERANCE = 1e-3  # 两个单位向量 |cos| > 1 - 该值时视为同一方向
+# 候选轴/镜面只取等价原子中彼此距离不超过最近邻距离该倍数的原子对和三原子组 (棱中点、面心)
+_NEAR_FACTOR = 1.75
+# 先用少数原子逐级筛掉不成立的候选操作，剩下的再对全部原子检验
+_PROBE_STAGES = (2, 12)
+# 容差内成立的对称元素方向有一定的角度范围 (约 容差/分子半径)，其中的近重复元素合并为一个，合并角不超过该值
+MAX_MERGE_ANGLE = math.radians(15.0)
+_NEIGHBOR_OFFSETS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+
+# symbol: 'C3'、'S4'、'σh'、'σv'、'σd'、'σ'、'i'、'C∞'；order: 轴的阶次 (镜面、对称中心为 2，C∞ 为 0)；
+# vector: 轴方向或镜面法向 (单位向量，对称中心为零向量)
+SymmetryElement = namedtuple('SymmetryElement', ['symbol', 'order', 'vector'])
+PointGroupResult = namedtuple('PointGroupResult', ['point_group', 'symmetry_elements', 'center', 'principal_axes'])
+
+
+class _PositionHash:
+    """
+    把坐标按容差量化成整数格子，格子编号与元素编号合成一个 int64 键并排序。
+    查询一个点时在它所在格子及相邻 26 个格子里二分查找，只有同种元素且距离小于容差才算匹配。
+    """
+
+    def __init__(self, coords, codes, tolerance):
+        self.coords, self.codes, self.tolerance = coords, codes, tolerance
+        # 对称操作保持到中心的距离，变换后的点一定落在同一个立方体内
+        reach = float(np.abs(coords).max()) + 2 * tolerance
+        self._origin = math.floor(-reach / tolerance) - 2
+        self._size = math.floor(reach / tolerance) - self._origin + 3
+        self._n_codes = int(codes.max()) + 1
+        keys = self._keys(np.floor(coords / tolerance).astype(np.int64) - self._origin, codes)
+        self._order = np.argsort(keys)
+        self._sorted = keys[self._order]
+
+    def _keys(self, cells, codes):
+        return ((cells[:, 0] * self._size + cells[:, 1]) * self._size + cells[:, 2]) * self._n_codes + codes
+
+    def contains(self, points, codes):
+        """每个点附近 (容差内) 是否有同种元素的原子"""
+        cells = np.floor(points / self.tolerance).astype(np.int64) - self._origin
+        np.clip(cells, 1, self._size - 2, out=cells)
+        keys = self._keys(cells, codes)
+        # 相邻格子的键 = 本格子的键 + 固定偏移，27 个格子一次二分查找
+        shifts = ((_NEIGHBOR_OFFSETS[:, 0] * self._size + _NEIGHBOR_OFFSETS[:, 1]) * self._size
+                  + _NEIGHBOR_OFFSETS[:, 2]) * self._n_codes
+        keys = (keys[None, :] + shifts[:, None]).ravel()
+        index = np.minimum(np.searchsorted(self._sorted, keys), len(self._sorted) - 1)
+        hit = self._sorted[index] == keys
+        partner = self.coords[self._order[index]].reshape(len(shifts), -1, 3)
+        close = np.sum((partner - points) ** 2, axis=2) < self.tolerance ** 2
+        return (hit.reshape(len(shifts), -1) & close).any(axis=0)
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=float).reshape(-1, 3)
+    norms = np.linalg.norm(vectors, axis=1)
+    keep = norms > 1e-8
+    return vectors[keep] / norms[keep, None]
+
+
+def unique_directions(vectors, tolerance=DIRECTION_TOLERANCE):
+    """单位化并合并 (不计正负号) 相同的方向，保留第一次出现的顺序"""
+    vectors = _unit_rows(vectors)
+    if len(vectors) == 0:
+        return vectors
+    # 先按粗网格去掉大量完全重复的方向，再两两比较
+    signs = np.sign(vectors[np.arange(len(vectors)), np.argmax(np.abs(vectors) > 1e-6, axis=1)])
+    vectors = vectors * signs[:, None]
+    _, first = np.unique(np.round(vectors / 1e-4).astype(np.int64), axis=0, return_index=True)
+    vectors = vectors[np.sort(first)]
+    close = np.abs(vectors @ vectors.T) > 1.0 - tolerance
+    duplicate = np.triu(close, 1).any(axis=0)
+    return vectors[~duplicate]
+
+
+def rotation_matrices(axes, order, improper=False):
+    """绕一组单位轴转 2π/order 的矩阵 (m, 3, 3)；improper=True 时再乘以垂直于轴的镜面 (Sn)"""
+    axes = np.asarray(axes, dtype=float).reshape(-1, 3)
+    angle = 2 * math.pi / order
+    cross = np.zeros((len(axes), 3, 3))
+    cross[:, 0, 1], cross[:, 0, 2], cross[:, 1, 2] = -axes[:, 2], axes[:, 1], -axes[:, 0]
+    cross -= cross.transpose(0, 2, 1)
+    outer = axes[:, :, None] * axes[:, None, :]
+    matrices = math.cos(angle) * np.eye(3) + math.sin(angle) * cross + (1 - math.cos(angle)) * outer
+    if improper:
+        matrices = (np.eye(3) - 2 * outer) @ matrices
+    return matrices
+
+
+def reflection_matrices(normals):
+    normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+    return np.eye(3) - 2 * normals[:, :, None] * normals[:, None, :]
+
+
+def _shells(codes, radii, tolerance):
+    """按 (元素, 到中心距离) 把原子分成等价壳层：对称操作只会在壳层内部置换原子"""
+    order = np.lexsort((radii, codes))
+    breaks = (np.diff(codes[order]) != 0) | (np.diff(radii[order]) > tolerance)
+    labels = np.empty(len(order), dtype=np.int64)
+    labels[order] = np.concatenate([[0], np.cumsum(breaks)])
+    return labels
+
+
+class _SymmetryAnalyzer:
+
+    def __init__(self, elements, coords, masses, tolerance):
+        self.coords = coords
+        self.tolerance = tolerance
+        _, self.codes = np.unique(elements, return_inverse=True)
+        self.codes = self.codes.ravel().astype(np.int64)
+        self.hash = _PositionHash(coords, self.codes, tolerance)
+        self.radii = np.linalg.norm(coords, axis=1)
+        self.shell_labels = _shells(self.codes, self.radii, tolerance)
+        inertia = np.einsum('n,n,ij->ij', masses, self.radii ** 2, np.eye(3)) \
+            - np.einsum('n,ni,nj->ij', masses, coords, coords)
+        self.moments, axes = np.linalg.eigh(inertia)
+        self.principal_axes = axes.T
+        # 远离中心的原子对方向最敏感，用来预筛候选操作
+        self._by_radius = np.argsort(-self.radii, kind='stable')
+        # 外层原子偏离 tolerance 对应的方向偏差：这个角度内成立的轴/镜面是同一个对称元素
+        self.merge_angle = min(math.asin(min(1.0, tolerance / max(float(self.radii.max()), tolerance))), MAX_MERGE_ANGLE)
+        self._tree = None
+
+    def _valid(self, matrices):
+        """批量检验一组 3×3 变换矩阵是否为对称操作"""
+        matrices = np.asarray(matrices).reshape(-1, 3, 3)
+        if len(matrices) == 0:
+            return np.zeros(0, dtype=bool)
+        valid = np.ones(len(matrices), dtype=bool)
+        for size in _PROBE_STAGES + (len(self.coords),):
+            candidates = np.flatnonzero(valid)
+            if len(candidates) == 0:
+                break
+            atoms = self._by_radius[:size]
+            subset, codes = self.coords[atoms], self.codes[atoms]
+            moved = np.einsum('mij,nj->mni', matrices[candidates], subset).reshape(-1, 3)
+            matched = self.hash.contains(moved, np.tile(codes, len(candidates)))
+            valid[candidates] = matched.reshape(len(candidates), -1).all(axis=1)
+        return valid
+
+    def _deviations(self, matrices):
+        """各变换后原子到最近同种原子的最大距离，用于在近重复的对称元素中挑出最准确的一个"""
+        if self._tree is None:
+            # 元素编号放大后作为第四个坐标，最近邻只可能是同种原子
+            self._labels = self.codes[:, None] * (4.0 * float(self.radii.max()) + 1.0)
+            self._tree = cKDTree(np.hstack([self.coords, self._labels]))
+        matrices = np.asarray(matrices).reshape(-1, 3, 3)
+        moved = np.einsum('mij,nj->mni', matrices, self.coords).reshape(-1, 3)
+        distances, _ = self._tree.query(np.hstack([moved, np.tile(self._labels, (len(matrices), 1))]))
+        return distances.reshape(len(matrices), -1).max(axis=1)
+
+    def _merge(self, vectors, matrices, orders=None):
+        """
+        合并方向相差不到 merge_angle 的 (已成立的) 轴或镜面法向：阶次高的优先，同阶次保留偏差最小的。
+        返回保留元素的下标 (按阶次降序，同阶次保持原来的顺序)。
+        """
+        if len(vectors) == 0:
+            return np.zeros(0, dtype=np.int64)
+        orders = np.zeros(len(vectors)) if orders is None else np.asarray(orders)
+        ranking = np.lexsort((self._deviations(matrices), -orders))
+        same = np.abs(vectors @ vectors.T) > math.cos(self.merge_angle)
+        kept = []
+        for k in ranking:
+            if not any(same[k, j] for j in kept):
+                kept.append(k)
+        return np.array(sorted(kept, key=lambda k: (-orders[k], k)), dtype=np.int64)
+
+    def _merge_axes(self, proper):
+        if not proper:
+            return proper
+        axes = np.array([axis for axis, _ in proper])
+        orders = np.array([n for _, n in proper])
+        matrices = np.concatenate([rotation_matrices(axis, n) for axis, n in proper])
+        return [proper[k] for k in self._merge(axes, matrices, orders)]
+
+    def _possible_orders(self, axes):
+        """每个壳层中不在轴上的原子数都必须是轴阶次的倍数：返回每条轴各壳层计数的最大公约数"""
+        off_axis = np.linalg.norm(np.cross(self.coords[None], axes[:, None]), axis=2) > self.tolerance
+        n_shells = int(self.shell_labels.max()) + 1
+        rows = np.repeat(np.arange(len(axes)), len(self.coords)).reshape(len(axes), -1)
+        counts = np.bincount((rows * n_shells + self.shell_labels)[off_axis], minlength=len(axes) * n_shells)
+        return np.gcd.reduce(counts.reshape(len(axes), n_shells), axis=1)
+
+    def _shell_atoms(self, off_axis=None):
+        """最小的非中心壳层中的原子 (可指定只取不在某轴上的原子)"""
+        mask = self.radii > self.tolerance
+        if off_axis is not None:
+            mask &= np.linalg.norm(np.cross(self.coords, off_axis), axis=1) > self.tolerance
+        if not mask.any():
+            return np.zeros((0, 3))
+        labels = self.shell_labels[mask]
+        counts = np.bincount(labels)
+        counts[counts == 0] = len(self.coords) + 1
+        return self.coords[mask][labels == np.argmin(counts)]
+
+    def proper_axes(self, candidates):
+        """
+        对每个候选轴找出成立的最高阶旋转，返回按阶次降序排列的 [(轴, 阶次)]。
+        每条轴可能的阶次由壳层原子数推出，同一阶次的候选操作一次性批量检验。
+        """
+        if len(candidates) == 0:
+            return []
+        divisor = self._possible_orders(candidates)
+        best = np.ones(len(candidates), dtype=np.int64)
+        for n in range(2, int(divisor.max()) + 1):
+            indices = np.flatnonzero((divisor > 0) & (divisor % n == 0))
+            if len(indices):
+                best[indices[self._valid(rotation_matrices(candidates[indices], n))]] = n
+        order = np.argsort(-best, kind='stable')
+        return [(candidates[k], int(best[k])) for k in order if best[k] > 1]
+
+    def analyze(self):
+        moments, axes = self.moments, self.principal_axes
+        scale = max(float(moments.max()), 1e-12)
+        inversion = bool(self._valid(-np.eye(3))[0])
+        if moments[0] < INERTIA_TOLERANCE * scale:
+            axis = axes[0]
+            if inversion:
+                return 'D∞h', [SymmetryElement('C∞', 0, axis), SymmetryElement('σh', 2, axis),
+                               SymmetryElement('i', 2, np.zeros(3))]
+            return 'C∞v', [SymmetryElement('C∞', 0, axis)]
+
+        # 第一轮：惯量主轴 + 最小等价壳层的原子方向、相邻原子对中点、相邻三原子面心方向。
+        # 主轴只作为候选之一，近简并 (含噪声的结构) 时不依赖它的方向
+        shell = self._shell_atoms()
+        pair_i, pair_j, faces = self._near_pairs_and_faces(shell)
+        candidates = unique_directions(np.concatenate([axes, shell, shell[pair_i] + shell[pair_j], faces]))
+        proper = self._merge_axes(self.proper_axes(candidates))
+        mirror_candidates = [axes, shell[pair_i] - shell[pair_j], np.cross(shell[pair_i], shell[pair_j])]
+
+        if proper:
+            # 第二轮：垂直于最高阶轴的 C2 (D 群) 和包含该轴的镜面，候选来自不在轴上的最小壳层的投影
+            main = proper[0][0]
+            off_axis = self._shell_atoms(off_axis=main)
+            projected = off_axis - np.outer(off_axis @ main, main)
+            pair_i, pair_j = np.triu_indices(len(projected), k=1)
+            in_plane = np.concatenate([projected, projected[pair_i] + projected[pair_j]])
+            known = np.array([axis for axis, _ in proper])
+            perpendicular = unique_directions(in_plane)
+            if len(perpendicular):
+                perpendicular = perpendicular[np.abs(perpendicular @ known.T).max(axis=1) < 1.0 - DIRECTION_TOLERANCE]
+                proper += [(axis, 2) for axis in perpendicular[self._valid(rotation_matrices(perpendicular, 2))]]
+                proper = self._merge_axes(proper)
+            mirror_candidates += [np.cross(main, in_plane), projected[pair_i] - projected[pair_j]]
+
+        mirror_candidates.append(np.array([axis for axis, _ in proper]).reshape(-1, 3))
+        normals = unique_directions(np.concatenate(mirror_candidates))
+        mirrors = normals[self._valid(reflection_matrices(normals))]
+        mirrors = mirrors[self._merge(mirrors, reflection_matrices(mirrors))]
+
+        # 每条旋转轴上只记录最高阶的 Sn：先试 S2n，不成立再试 Sn
+        improper = {}
+        for multiple in (2, 1):
+            options = [(k, multiple * order) for k, (axis, order) in enumerate(proper)
+                       if k not in improper and multiple * order >= 3]
+            if options:
+                matrices = np.concatenate([rotation_matrices(proper[k][0], n, improper=True) for k, n in options])
+                improper.update((k, n) for (k, n), ok in zip(options, self._valid(matrices)) if ok)
+        improper = [(proper[k][0], n) for k, n in sorted(improper.items())]
+        return self._classify(proper, mirrors, improper, inversion)
+
+    def _near_pairs_and_faces(self, shell):
+        """等价原子中相近的原子对，以及三个两两相近的原子所在平面的法向 (过多面体棱中点、面心的轴)"""
+        if len(shell) < 2:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+        distances = np.linalg.norm(shell[:, None] - shell[None], axis=-1)
+        separated = distances > self.tolerance
+        near = separated & (distances < _NEAR_FACTOR * distances[separated].min())
+        pair_i, pair_j = np.nonzero(np.triu(near, 1))
+        normals = []
+        for a in range(len(shell)):
+            neighbors = np.flatnonzero(near[a])
+            b, c = np.triu_indices(len(neighbors), k=1)
+            b, c = neighbors[b], neighbors[c]
+            keep = near[b, c]
+            normals.append(np.cross(shell[b[keep]] - shell[a], shell[c[keep]] - shell[a]))
+        return pair_i, pair_j, np.concatenate(normals)
+
+    def _classify(self, proper, mirrors, improper, inversion):
+        # 平行/垂直的判断与合并近重复元素用同一个角度
+        tol_cos = math.sin(self.merge_angle)
+        elements = [SymmetryElement(f"C{n}", n, axis) for axis, n in proper]
+        high = [n for _, n in proper if n >= 3]
+        mirror_labels = ['σ'] * len(mirrors)
+
+        if len(high) >= 2:
+            # 多条三次以上的轴：立方群或二十面体群
+            if 5 in high:
+                group = 'Ih' if inversion else 'I'
+            elif 4 in high:
+                group = 'Oh' if inversion else 'O'
+                four_fold = np.array([axis for axis, n in proper if n == 4])
+                mirror_labels = ['σh' if np.any(np.abs(four_fold @ m) > 1 - tol_cos) else 'σd' for m in mirrors]
+            elif inversion:
+                group, mirror_labels = 'Th', ['σh'] * len(mirrors)
+            else:
+                group = 'Td' if len(mirrors) else 'T'
+                mirror_labels = ['σd'] * len(mirrors)
+        elif not proper:
+            group = 'Cs' if len(mirrors) else ('Ci' if inversion else 'C1')
+        else:
+            main, n = proper[0]
+            c2_perpendicular = np.array([axis for axis, order in proper[1:] if order == 2 and abs(axis @ main) < tol_cos])
+            horizontal = [abs(m @ main) > 1 - tol_cos for m in mirrors]
+            vertical = [abs(m @ main) < tol_cos for m in mirrors]
+            dihedral = len(c2_perpendicular) >= n
+            for k, m in enumerate(mirrors):
+                if horizontal[k]:
+                    mirror_labels[k] = 'σh'
+                elif vertical[k]:
+                    contains_c2 = dihedral and np.any(np.abs(c2_perpendicular @ m) < tol_cos)
+                    mirror_labels[k] = 'σd' if dihedral and not contains_c2 else 'σv'
+            has_h, n_vertical = any(horizontal), sum(vertical)
+            if n % 2 == 0 and n >= 4 and n_vertical == n and (has_h or not dihedral):
+                self._split_vertical(main, n, mirrors, vertical, mirror_labels)
+            if dihedral:
+                group = f"D{n}h" if has_h else (f"D{n}d" if n_vertical >= n else f"D{n}")
+            elif has_h:
+                group = f"C{n}h"
+            elif n_vertical:
+                group = f"C{n}v"
+            elif any(m == 2 * n and abs(axis @ main) > 1 - tol_cos for axis, m in improper):
+                group = f"S{2 * n}"
+            else:
+                group = f"C{n}"
+
+        elements += [SymmetryElement(f"S{n}", n, axis) for axis, n in improper]
+        elements += [SymmetryElement(label, 2, m) for label, m in zip(mirror_labels, mirrors)]
+        if inversion:
+            elements.append(SymmetryElement('i', 2, np.zeros(3)))
+        return group, elements
+
+
+    def _split_vertical(self, main, n, mirrors, vertical, mirror_labels):
+        # Dnh/Cnv (n 为偶数) 的竖直镜面分成相隔 π/n 交替的两类：
+        # 经过原子 (含 C2') 的一类记作 σv，平分它们 (含 C2'') 的一类记作 σd
+        indices = [k for k, v in enumerate(vertical) if v]
+        reference = mirrors[indices[0]]
+        side = np.cross(main, reference)
+        classes = {}
+        for k in indices:
+            angle = math.atan2(side @ mirrors[k], reference @ mirrors[k]) % math.pi
+            classes[k] = round(angle / (math.pi / n)) % 2
+        on_plane = [0, 0]
+        for k, c in classes.items():
+            on_plane[c] += np.count_nonzero(np.abs(self.coords @ mirrors[k]) < self.tolerance)
+        sigma_v = 0 if on_plane[0] >= on_plane[1] else 1
+        for k, c in classes.items():
+            mirror_labels[k] = 'σv' if c == sigma_v else 'σd'
+
+
+def detect_point_group(molecule, tolerance=SYMMETRY_TOLERANCE):
+    """
+    判断分子的点群 (Schoenflies 符号) 并列出对称元素。
+    :param tolerance: 对称操作后原子位置允许的偏差 (Å)；力场优化或实验结构可适当放宽
+    :return: PointGroupResult(点群, 对称元素列表, 质心, 惯量主轴)
+    """
+    if tolerance <= 0:
+        raise ValueError("对称性容差必须为正数。")
+    elements = np.asarray(molecule.elements).astype(str)
+    coords = np.asarray(molecule.coords, dtype=float).reshape(-1, 3)
+    if len(coords) == 0:
+        raise ValueError("分子中没有原子。")
+    masses = np.array([atomic_mass(s) for s in elements])
+    center = masses @ coords / masses.sum()
+    coords = coords - center
+    if np.all(np.linalg.norm(coords, axis=1) < tolerance):
+        return PointGroupResult('Kh', [], center, np.eye(3))
+    analyzer = _SymmetryAnalyzer(elements, coords, masses, tolerance)
+    group, symmetry_elements = analyzer.analyze()
+    return PointGroupResult(group, symmetry_elements, center, analyzer.principal_axes)
+
+
+def format_symmetry_elements(symmetry_elements):
+    """按教材习惯合并同类对称元素，如 'E, C3, 3C2, σh, S3, 3σv'"""
+    counts = {}
+    for element in symmetry_elements:
+        counts[element.symbol] = counts.get(element.symbol, 0) + 1
+    return ", ".join(['E'] + [symbol if count == 1 else f"{count}{symbol}" for symbol, count in counts.items()])
@@ -0,0 +1,186 @@
+# chem_assistant/core/structure/vsepr.py
+# 表驱动的 VSEPR 构型判断：纯函数，不依赖界面或绘图库；结果按规范化学式缓存，可批量处理
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+from core.structure.molecule import Molecule
+from utils.chem_utils.element_data import (ELECTRONEGATIVITY, DEFAULT_ELECTRONEGATIVITY, VALENCE_ELECTRONS,
+                                           covalent_radius)
+from utils.chem_utils.formula import parse_formula
+
+
+def _unit(vectors):
+    vectors = np.array(vectors, dtype=float)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors.setflags(write=False)
+    return vectors
+
+
+_TRIGONAL = [(0, 1, 0), (math.sqrt(3) / 2, -0.5, 0), (-math.sqrt(3) / 2, -0.5, 0)]
+_PENTAGONAL = [(math.cos(2 * math.pi * k / 5), math.sin(2 * math.pi * k / 5), 0) for k in range(5)]
+
+# 每个空间数对应的电子对 (价层电子对) 方向，均为单位向量。
+# 三角双锥/五角双锥中前两个是轴向，孤对电子优先占据后面的赤道位置
+DOMAIN_VECTORS = {
+    1: _unit([(0, 0, 1)]),
+    2: _unit([(0, 0, 1), (0, 0, -1)]),
+    3: _unit(_TRIGONAL),
+    4: _unit([(0, 0, 1), (math.sqrt(8 / 9), 0, -1 / 3), (-math.sqrt(2 / 9), math.sqrt(2 / 3), -1 / 3),
+              (-math.sqrt(2 / 9), -math.sqrt(2 / 3), -1 / 3)]),
+    5: _unit([(0, 0, 1), (0, 0, -1)] + _TRIGONAL),
+    6: _unit([(0, 0, 1), (0, 0, -1), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0)]),
+    7: _unit([(0, 0, 1), (0, 0, -1)] + _PENTAGONAL),
+}
+
+# (空间数, 孤对数) -> (构型名称, 成键方向在 DOMAIN_VECTORS 中的下标)；其余方向由孤对电子占据
+SHAPES = {
+    (2, 0): ('Linear', (0, 1)),
+    (3, 0): ('Trigonal planar', (0, 1, 2)),
+    (3, 1): ('Bent (Trigonal)', (1, 2)),
+    (4, 0): ('Tetrahedral', (0, 1, 2, 3)),
+    (4, 1): ('Trigonal pyramidal', (1, 2, 3)),
+    (4, 2): ('Bent (Tetrahedral)', (2, 3)),
+    (5, 0): ('Trigonal bipyramidal', (0, 1, 2, 3, 4)),
+    (5, 1): ('Seesaw', (0, 1, 3, 4)),
+    (5, 2): ('T-shaped', (0, 1, 4)),
+    (5, 3): ('Linear', (0, 1)),
+    (6, 0): ('Octahedral', (0, 1, 2, 3, 4, 5)),
+    (6, 1): ('Square pyramidal', (0, 2, 3, 4, 5)),
+    (6, 2): ('Square planar', (2, 3, 4, 5)),
+    (6, 3): ('T-shaped', (0, 2, 3)),
+    (6, 4): ('Linear', (2, 3)),
+    (7, 0): ('Pentagonal bipyramidal', (0, 1, 2, 3, 4, 5, 6)),
+    (7, 1): ('Pentagonal pyramidal', (0, 2, 3, 4, 5, 6)),
+    (7, 2): ('Pentagonal planar', (2, 3, 4, 5, 6)),
+}
+MAX_STERIC_NUMBER = 7
+
+VSEPRResult = namedtuple('VSEPRResult', ['formula', 'center', 'ligands', 'lone_pairs', 'steric_number', 'shape', 'charge'])
+
+
+def _electronegativity(symbol):
+    return ELECTRONEGATIVITY.get(symbol, DEFAULT_ELECTRONEGATIVITY)
+
+
+def _bonding_electrons(symbol):
+    """配体与中心原子成键时中心原子付出的电子数 (H、卤素 1，O、S 2，N 3 ...)"""
+    valence = VALENCE_ELECTRONS.get(symbol, 1)
+    return max(1, min(valence, 8 - valence))
+
+
+def _hill_formula(composition, charge):
+    counts = dict(composition)
+    order = [s for s in ('C', 'H') if s in counts] if 'C' in counts else []
+    order += sorted(s for s in counts if s not in order)
+    text = "".join(s if counts[s] == 1 else f"{s}{counts[s]}" for s in order)
+    if charge:
+        text += ("" if abs(charge) == 1 else f"^{abs(charge)}") + ("+" if charge > 0 else "-")
+    return text
+
+
+def _split_center(composition):
+    """
+    选出中心原子并返回 (中心, 配体列表)。中心原子取可作中心的非氢元素中电负性最小的：
+    只出现一次的元素，以及三原子分子 X2Y 中的非卤素 X (X-X-Y 链，如 N2O 为 N-N-O、S2O 为 S-S-O；
+    卤素只作端基，Cl2O 仍以 O 为中心)
+    """
+    counts = dict(composition)
+    if len(counts) == 1:
+        symbol, count = composition[0]
+        if count > 3:
+            raise ValueError(f"'{symbol}{count}' 不是单中心分子，无法用 VSEPR 判断。")
+        return symbol, [symbol] * (count - 1)
+
+    triatomic = sum(counts.values()) == 3
+    candidates = [s for s in counts if s != 'H' and (counts[s] == 1 or
+                                                     (triatomic and VALENCE_ELECTRONS.get(s) != 7))]
+    # 只有 H 能作中心时 (如 HF2- 为 F-H-F)
+    candidates = candidates or [s for s in counts if counts[s] == 1]
+    if not candidates:
+        raise ValueError(f"'{_hill_formula(composition, 0)}' 没有唯一的中心原子，无法用 VSEPR 判断。")
+    center = min(candidates, key=_electronegativity)
+    ligands = {s: c - (s == center) for s, c in counts.items()}
+    # 含氧酸中的 H 连在 O 上而不是中心原子上 (H2SO4、HNO3、H3PO4 ...)；CH2O 这类 H 多于 O 的不算
+    if center != 'O' and 'H' in ligands and ligands.get('O', 0) >= ligands['H']:
+        ligands['H'] = 0
+    # 电负性大的配体在前，三角双锥中优先占据轴向位置
+    order = sorted((s for s in ligands if ligands[s]), key=_electronegativity, reverse=True)
+    return center, [s for s in order for _ in range(ligands[s])]
+
+
+@lru_cache(maxsize=8192)
+def _classify(composition, charge):
+    center, ligands = _split_center(composition)
+    formula = _hill_formula(composition, charge)
+    if not ligands:
+        return VSEPRResult(formula, center, (), 0, 0, 'Spherical', charge)
+    electrons = VALENCE_ELECTRONS.get(center, 0) - sum(_bonding_electrons(s) for s in ligands) - charge
+    # 单电子也占一个电子对方向 (如 NO2、ClO2)；负值说明有配位/共振双键，按 0 处理
+    lone_pairs = max(0, math.ceil(electrons / 2))
+    if len(ligands) == 1:
+        return VSEPRResult(formula, center, tuple(ligands), lone_pairs, 1 + lone_pairs, 'Linear', charge)
+    steric_number = len(ligands) + lone_pairs
+    if steric_number > MAX_STERIC_NUMBER:
+        raise ValueError(f"'{formula}' 的空间数为 {steric_number}，超出 VSEPR 表的范围。")
+    shape, _ = SHAPES[(steric_number, lone_pairs)]
+    return VSEPRResult(formula, center, tuple(ligands), lone_pairs, steric_number, shape, charge)
+
+
+def classify_formula(formula):
+    """
+    判断单个化学式的 VSEPR 构型，例如 classify_formula("XeF4").shape == 'Square planar'。
+    同一组成 (不论书写顺序) 只计算一次。
+    """
+    composition, charge = parse_formula(formula)
+    return _classify(tuple(sorted(composition)), charge)
+
+
+def classify_formulas(formulas, skip_errors=True):
+    """
+    批量判断 (如练习题、工作表)。
+    :param skip_errors: 为 True 时无法判断的化学式返回 None，否则抛出 ValueError
+    """
+    results = {}
+    for formula in formulas:
+        if formula in results:
+            continue
+        try:
+            results[formula] = classify_formula(formula)
+        except ValueError:
+            if not skip_errors:
+                raise
+            results[formula] = None
+    return [results[formula] for formula in formulas]
+
+
+def _bond_directions(result):
+    if result.steric_number == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    if len(result.ligands) == 1:
+        return DOMAIN_VECTORS[1], np.zeros((0, 3))
+    domains = DOMAIN_VECTORS[result.steric_number]
+    _, bonded = SHAPES[(result.steric_number, result.lone_pairs)]
+    lone = [i for i in range(len(domains)) if i not in bonded]
+    return domains[list(bonded)], domains[lone]
+
+
+def lone_pair_directions(result):
+    """孤对电子方向 (单位向量)"""
+    return _bond_directions(result)[1]
+
+
+def vsepr_molecule(result):
+    """
+    按构型生成理想几何：中心原子位于原点 (下标 0)，配体沿单位方向放置，键长为两原子共价半径之和。
+    :param result: VSEPRResult 或化学式字符串
+    """
+    if isinstance(result, str):
+        result = classify_formula(result)
+    directions, _ = _bond_directions(result)
+    lengths = np.array([covalent_radius(result.center) + covalent_radius(s) for s in result.ligands])
+    coords = np.vstack([np.zeros((1, 3)), directions * lengths[:, None]]) if len(lengths) else np.zeros((1, 3))
+    bonds = [(0, i) for i in range(1, len(result.ligands) + 1)]
+    return Molecule((result.center,) + result.ligands, coords, bonds or None, title=result.formula)
@@ -4,15 +4,12 @@
 测试优化后的VSEPR模型
 """
 
-from app import ChemApp
+from core.structure.vsepr import classify_formula
 
 def test_vsepr_models():
     """测试多种分子的VSEPR模型"""
     print("=== 测试优化后的VSEPR模型 ===")
     
-    # 创建ChemApp实例
-    app = ChemApp()
-    
     # 测试分子列表
     test_molecules = [
         'H2O',
@@ -40,12 +37,11 @@ def test_vsepr_models():
     for mol in test_molecules:
         print(f"\n测试 {mol} 的VSEPR模型...")
         try:
-            result = app.get_vsepr_shape(mol)
-            shape, lone_pairs, composition, center_atom = result
-            print(f"  中心原子: {center_atom}")
-            print(f"  几何构型: {shape}")
-            print(f"  孤对电子对数: {lone_pairs}")
-            print(f"  分子组成: {composition}")
+            result = classify_formula(mol)
+            print(f"  中心原子: {result.center}")
+            print(f"  几何构型: {result.shape}")
+            print(f"  孤对电子对数: {result.lone_pairs}")
+            print(f"  配体: {result.ligands}")
             print("  测试通过！")
         except Exception as e:
             print(f"  错误: {e}")
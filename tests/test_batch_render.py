@@ -0,0 +1,35 @@
+# chem_assistant/tests/test_batch_render.py
+
+import pytest
+
+pytest.importorskip("pyvista")
+
+from PIL import Image
+
+from utils.visualization.batch_render import render_batch, output_names, scene_for_item
+
+
+def test_output_names_are_unique_and_safe(tmp_path):
+    xyz = tmp_path / "water.xyz"
+    xyz.write_text("3\nwater\nO 0 0 0.117\nH 0 0.757 -0.469\nH 0 -0.757 -0.469\n")
+    assert output_names(["H2O", "h2o", "CH4", str(xyz), "a/b"]) == ["H2O.png", "h2o_2.png", "CH4.png", "water.png", "a_b.png"]
+    assert scene_for_item(str(xyz))['title'] == "water"
+    assert len(scene_for_item("NaCl")['coords']) == 27
+    assert scene_for_item("CH4")['info'].startswith("VSEPR Model: Tetrahedral")
+
+
+def test_render_in_process_reports_failures(tmp_path):
+    summary = render_batch(["H2O", "SF6", "Xx2", "NaCl"], tmp_path / "out", size=(320, 240), workers=1)
+    paths = {r.item: r.path for r in summary.results}
+    assert [r.item for r in summary.results] == ["H2O", "SF6", "Xx2", "NaCl"]
+    assert paths["Xx2"] is None and "Xx" in summary.results[2].error
+    with Image.open(paths["SF6"]) as image:
+        assert image.size == (320, 240)
+    assert summary.images_per_second > 0
+
+
+def test_render_with_process_pool(tmp_path):
+    items = ["H2O", "NH3", "CO2", "BF3"] * 3
+    summary = render_batch(items, tmp_path, size=(200, 160), workers=2)
+    assert all(r.error is None for r in summary.results)
+    assert len(list(tmp_path.glob("*.png"))) == len(items)
@@ -0,0 +1,148 @@
+# chem_assistant/tests/test_chemometrics.py
+
+import numpy as np
+import pytest
+
+from core.spectroscopy import chemometrics
+from core.spectroscopy.chemometrics import (pca, pca_transform, pls, pls_predict, pls_coefficients, pls_cross_validate,
+                                            cv_folds, snv, msc, Preprocessor, truncated_svd)
+from core.spectroscopy.workspace import read_reference_values
+
+
+def _mixtures(n=60, points=300, seed=0, scatter=True):
+    """三组分混合物谱图 (+ 乘性/加性散射) + 噪声；返回 (X, 浓度)"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.0, 100.0, points)
+    pure = np.stack([np.exp(-0.5 * ((x - c) / w) ** 2) for c, w in ((30.0, 5.0), (50.0, 8.0), (70.0, 4.0))])
+    concentrations = rng.uniform(0.1, 1.0, size=(n, 3))
+    X = concentrations @ pure
+    if scatter:
+        X = X * rng.uniform(0.8, 1.2, size=(n, 1)) + rng.uniform(-0.1, 0.1, size=(n, 1))
+    return X + rng.normal(scale=1e-3, size=X.shape), concentrations
+
+
+def test_randomized_svd_matches_full(monkeypatch):
+    X, _ = _mixtures(n=200, points=400)
+    full = pca(X, 5)
+    monkeypatch.setattr(chemometrics, 'FULL_SVD_MAX_ELEMENTS', 0)
+    fast = pca(X, 5)
+    # 前四个成分 (三个组分 + 散射) 与完整分解一致，符号约定相同；第五个是噪声，只近似
+    assert np.allclose(fast.singular_values[:4], full.singular_values[:4], rtol=1e-10)
+    assert fast.singular_values[4] == pytest.approx(full.singular_values[4], rel=0.05)
+    assert np.allclose(fast.loadings[:4], full.loadings[:4], atol=1e-6)
+    assert np.allclose(fast.scores[:, :4], full.scores[:, :4], atol=1e-6)
+
+
+def test_pca_matches_numpy_svd_of_centered_data():
+    X, _ = _mixtures()
+    result = pca(X, 4, scaling='autoscale')
+    Z = (X - X.mean(axis=0)) / X.std(axis=0, ddof=1)
+    s = np.linalg.svd(Z, compute_uv=False)
+    assert np.allclose(result.singular_values, s[:4])
+    assert np.allclose(result.explained_ratio, s[:4] ** 2 / np.sum(s ** 2))
+    assert np.allclose(result.loadings @ result.loadings.T, np.eye(4), atol=1e-10)
+    assert np.allclose(pca_transform(result, X), result.scores)
+    assert np.all(result.loadings[np.arange(4), np.abs(result.loadings).argmax(axis=1)] > 0)
+
+
+def test_scatter_corrections():
+    X, _ = _mixtures()
+    corrected = snv(X)
+    assert np.allclose(corrected.mean(axis=1), 0.0) and np.allclose(corrected.std(axis=1), 1.0)
+    reference = X.mean(axis=0)
+    # MSC 完全消除 a + b·ref 形式的散射
+    assert np.allclose(msc(3.0 + 0.5 * reference[None, :], reference), reference)
+    assert np.allclose(snv(np.ones((2, 5))), 0.0)
+    pre = Preprocessor('msc')
+    pre.fit_columns(pre.correct(X))
+    assert np.allclose(pre.reference, reference) and np.allclose(pre.transform(X).mean(axis=0), 0.0)
+
+
+def test_full_rank_pls_equals_least_squares():
+    rng = np.random.default_rng(4)
+    X = rng.normal(size=(30, 6))
+    y = X @ np.array([1.0, -2.0, 0.5, 0.0, 3.0, 1.0]) + 4.0 + rng.normal(scale=0.1, size=30)
+    model = pls(X, y, n_components=6)
+    Xc = X - X.mean(axis=0)
+    beta = np.linalg.lstsq(Xc, y - y.mean(), rcond=None)[0]
+    assert np.allclose(pls_coefficients(model), beta)
+    assert np.allclose(pls_predict(model, X[:3]), X[:3] @ beta + y.mean() - X.mean(axis=0) @ beta)
+    # 得分正交且单位长度
+    assert np.allclose(model.x_scores.T @ model.x_scores, np.eye(6), atol=1e-10)
+
+
+def test_pls1_matches_nipals():
+    X, concentrations = _mixtures(scatter=False)
+    y = concentrations[:, 1]
+    model = pls(X, y, n_components=3)
+    # NIPALS (收缩 X) 的回归系数
+    E, f = X - X.mean(axis=0), y - y.mean()
+    W, P, q = [], [], []
+    for _ in range(3):
+        w = E.T @ f
+        w /= np.linalg.norm(w)
+        t = E @ w
+        p = E.T @ t / (t @ t)
+        q.append(f @ t / (t @ t))
+        E = E - np.outer(t, p)
+        f = f - q[-1] * t
+        W.append(w), P.append(p)
+    W, P = np.column_stack(W), np.column_stack(P)
+    beta = W @ np.linalg.solve(P.T @ W, np.array(q))
+    assert np.allclose(pls_coefficients(model), beta, rtol=1e-8, atol=1e-10)
+
+
+def test_pls2_and_cross_validation():
+    X, concentrations = _mixtures(n=80, scatter=False)
+    cv = pls_cross_validate(X, concentrations, n_components=6, folds=5, workers=1)
+    assert cv.rmsecv.shape == (6, 3) and cv.predictions.shape == (80, 6, 3)
+    assert cv.best_components >= 3 and np.all(cv.r2cv[cv.best_components - 1] > 0.99)
+    assert np.allclose(pls_cross_validate(X, concentrations, n_components=6, folds=5, workers=3).predictions,
+                       cv.predictions)
+    serial, parallel = (pls_cross_validate(X, concentrations, 6, scatter='msc', scaling='autoscale', workers=w)
+                        for w in (1, 3))
+    assert np.allclose(serial.predictions, parallel.predictions) and serial.best_components == parallel.best_components
+    one = pls_cross_validate(X, concentrations[:, 0], n_components=6, split='random', folds=4, workers=2)
+    assert one.rmsecv.shape == (6,) and one.predictions.shape == (80, 6)
+    model = pls(X, concentrations, n_components=4, scatter='snv', scaling='autoscale')
+    assert pls_predict(model, X).shape == (80, 3)
+    assert np.allclose(pls_predict(model, X, 4), pls_predict(model, X))
+
+
+def test_cv_folds():
+    assert cv_folds(7, 3).tolist() == [0, 1, 2, 0, 1, 2, 0]
+    assert cv_folds(7, 3, 'contiguous').tolist() == [0, 0, 0, 1, 1, 2, 2]
+    random = cv_folds(9, 3, 'random', seed=1)
+    assert np.bincount(random).tolist() == [3, 3, 3] and random.tolist() == cv_folds(9, 3, 'random', seed=1).tolist()
+
+
+def test_truncated_svd_rank_limit():
+    X = np.outer(np.arange(1.0, 6.0), np.ones(4)) + np.eye(5, 4)
+    pre = Preprocessor()
+    U, s, Vt = truncated_svd(pre.fit_columns(X), 10)
+    assert U.shape == (5, 4) and Vt.shape == (4, 4)
+
+
+def test_read_reference_values(tmp_path):
+    table = tmp_path / "ref.csv"
+    table.write_text("样品,浓度\nA,1.5\nb.csv,2.5\nmissing,9\n", encoding='utf-8')
+    rows, values = read_reference_values(table, ["a.txt", "B.csv", "c.csv"])
+    assert rows.tolist() == [0, 1] and values[:, 0].tolist() == [1.5, 2.5]
+    with pytest.raises(ValueError):
+        read_reference_values(table, ["c.csv"])
+
+
+def test_invalid_input():
+    X, concentrations = _mixtures(n=10)
+    with pytest.raises(ValueError):
+        pca(X, scatter='osc')
+    with pytest.raises(ValueError):
+        pca(X, scaling='pareto')
+    with pytest.raises(ValueError):
+        pca(np.where(np.eye(10, 300) > 0, np.nan, X))
+    with pytest.raises(ValueError):
+        pls(X, concentrations[:5, 0])
+    with pytest.raises(ValueError):
+        pls_cross_validate(X, concentrations[:, 0], folds=11)
+    with pytest.raises(ValueError):
+        pls_coefficients(pls(X, concentrations[:, 0], 2), 3)
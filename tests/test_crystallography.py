@@ -0,0 +1,173 @@
+# chem_assistant/tests/test_crystallography.py
+
+import itertools
+import numpy as np
+import pytest
+
+from core.crystallography.crystal import UnitCell, CrystalStructure
+from core.crystallography.xrd import simulate_powder_pattern, structure_rotations
+from core.crystallography.lattice import generate_lattice
+from utils.file_io.cif_reader import read_cif, parse_symop, symops_to_arrays, expand_symmetry, element_from_label
+
+FCC = np.array([[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]])
+
+
+def nacl_structure():
+    cell = UnitCell(5.6402, 5.6402, 5.6402)
+    return CrystalStructure(cell, ['Na'] * 4 + ['Cl'] * 4, np.vstack([FCC, (FCC + 0.5) % 1.0]))
+
+
+def fm3m_symops():
+    """生成 Fm-3m 的 192 个对称操作字符串 (48个点操作 × 4个面心平移)"""
+    ops = []
+    for perm in itertools.permutations('xyz'):
+        for signs in itertools.product('+-', repeat=3):
+            point = [s + p for s, p in zip(signs, perm)]
+            for t in ('', '', ''), ('', '+1/2', '+1/2'), ('+1/2', '', '+1/2'), ('+1/2', '+1/2', ''):
+                ops.append(','.join(p + shift for p, shift in zip(point, t)))
+    return ops
+
+
+# P6_3/mmc (No. 194) 的 24 个对称操作
+HCP_SYMOPS = ['x,y,z', '-y,x-y,z', '-x+y,-x,z', '-x,-y,z+1/2', 'y,-x+y,z+1/2', 'x-y,x,z+1/2',
+              'y,x,-z', 'x-y,-y,-z', '-x,-x+y,-z', '-y,-x,-z+1/2', '-x+y,y,-z+1/2', 'x,x-y,-z+1/2',
+              '-x,-y,-z', 'y,-x+y,-z', 'x-y,x,-z', 'x,y,-z+1/2', '-y,x-y,-z+1/2', '-x+y,-x,-z+1/2',
+              '-y,-x,z', '-x+y,y,z', 'x,x-y,z', 'y,x,z+1/2', 'x-y,-y,z+1/2', '-x,-x+y,z+1/2']
+
+
+def write_nacl_cif(path):
+    lines = [
+        "data_NaCl",
+        "_chemical_formula_sum 'Cl Na'",
+        "_cell_length_a 5.6402(3)", "_cell_length_b 5.6402(3)", "_cell_length_c 5.6402(3)",
+        "_cell_angle_alpha 90", "_cell_angle_beta 90", "_cell_angle_gamma 90",
+        "loop_", "_symmetry_equiv_pos_as_xyz",
+    ]
+    lines += [f"'{op}'" for op in fm3m_symops()]
+    lines += [
+        "loop_", "_atom_site_label", "_atom_site_type_symbol",
+        "_atom_site_fract_x", "_atom_site_fract_y", "_atom_site_fract_z", "_atom_site_occupancy",
+        "Na1 Na1+ 0 0 0 1", "Cl1 Cl1- 0.5 0.5 0.5 1",
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_unit_cell_geometry():
+    cell = UnitCell(4.0, 5.0, 6.0, 90, 100, 90)
+    assert cell.volume == pytest.approx(4 * 5 * 6 * np.sin(np.radians(100)))
+    cubic = UnitCell(5.0, 5.0, 5.0)
+    assert cubic.d_spacing([1, 1, 1]) == pytest.approx(5.0 / np.sqrt(3))
+
+
+def test_nacl_powder_pattern():
+    pattern = simulate_powder_pattern(nacl_structure(), wavelength='CuKa')
+    peaks = {r['hkl']: r for r in pattern['reflections']}
+
+    # 面心立方消光：(100)、(110) 不应出现
+    assert (1, 0, 0) not in peaks and (1, 1, 0) not in peaks
+    assert peaks[(2, 0, 0)]['two_theta'] == pytest.approx(31.70, abs=0.02)
+    assert peaks[(2, 0, 0)]['multiplicity'] == 6
+    assert peaks[(2, 2, 0)]['multiplicity'] == 12
+    assert peaks[(2, 0, 0)]['intensity'] == pytest.approx(100.0)
+
+    strongest = pattern['two_theta'][np.argmax(pattern['intensity'])]
+    assert strongest == pytest.approx(31.70, abs=0.05)
+
+
+def test_coincident_reflections_keep_their_own_multiplicity():
+    # (333)/(511) 与 (600)/(442) 的 d、|F|² 都相同，但属于不同晶面族
+    pattern = simulate_powder_pattern(nacl_structure(), two_theta_range=(5.0, 120.0))
+    peaks = {r['hkl']: r['multiplicity'] for r in pattern['reflections']}
+    assert (peaks[(3, 3, 3)], peaks[(5, 1, 1)]) == (8, 24)
+    assert (peaks[(6, 0, 0)], peaks[(4, 4, 2)]) == (6, 24)
+    # 四方晶胞 c = 2a：(002) 与 (100) 的 d 相同
+    tetragonal = CrystalStructure(UnitCell(4.0, 4.0, 8.0), ['Ti', 'O', 'O'], [[0, 0, 0], [0, 0, 0.3], [0, 0, 0.7]])
+    assert len(structure_rotations(tetragonal)) == 16
+    peaks = {r['hkl']: r['multiplicity'] for r in simulate_powder_pattern(tetragonal)['reflections']}
+    assert (peaks[(0, 0, 2)], peaks[(1, 0, 0)], peaks[(1, 0, 1)]) == (2, 4, 8)
+    # 无对称性时每个衍射只与其 Friedel 对等价
+    rng = np.random.default_rng(0)
+    triclinic = CrystalStructure(UnitCell(5.0, 6.0, 7.0, 80, 95, 100), ['C'] * 6, rng.random((6, 3)))
+    assert {r['multiplicity'] for r in simulate_powder_pattern(triclinic)['reflections']} == {2}
+
+
+def test_element_from_label():
+    labels = ['Na1+', 'O2-', 'Cl1', 'CL1', 'OW1', 'HW2', 'Fe3+', 'C12', 'U1']
+    assert [element_from_label(label) for label in labels] == ['Na', 'O', 'Cl', 'Cl', 'O', 'H', 'Fe', 'C', 'U']
+    with pytest.raises(ValueError):
+        element_from_label('12')
+
+
+def test_read_cif_expands_symmetry(tmp_path):
+    cif = tmp_path / "nacl.cif"
+    write_nacl_cif(cif)
+    structure = read_cif(cif)
+
+    assert len(structure) == 8
+    assert sorted(structure.elements) == ['Cl'] * 4 + ['Na'] * 4
+    assert structure.cell.a == pytest.approx(5.6402)
+
+    from_cif = simulate_powder_pattern(structure)
+    reference = simulate_powder_pattern(nacl_structure())
+    assert np.allclose(from_cif['intensity'], reference['intensity'], atol=1e-6)
+
+
+def test_read_cif_without_element_columns(tmp_path):
+    cif = tmp_path / "bad.cif"
+    cif.write_text("data_x\n_cell_length_a 4\n_cell_length_b 4\n_cell_length_c 4\n_cell_angle_alpha 90\n"
+                   "_cell_angle_beta 90\n_cell_angle_gamma 90\nloop_\n_atom_site_fract_x\n_atom_site_fract_y\n"
+                   "_atom_site_fract_z\n0 0 0\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="_atom_site_type_symbol"):
+        read_cif(cif)
+
+
+def test_parse_symop():
+    rotation, translation = parse_symop('-x+1/2, y, z-1/4')
+    assert np.array_equal(rotation, np.diag([-1.0, 1.0, 1.0]))
+    assert np.allclose(translation, [0.5, 0.0, -0.25])
+
+
+def test_expand_symmetry_merges_special_positions():
+    rotations, translations = symops_to_arrays(tuple(fm3m_symops()))
+    # 顶点 (4a)、一般位置 (192l) 与紧贴晶胞边界的 24d 位置
+    frac = np.array([[0.0, 0.0, 0.0], [0.11, 0.23, 0.37], [0.9999999, 0.25, 0.25]])
+    expanded, site_index = expand_symmetry(frac, rotations, translations)
+    counts = np.bincount(site_index, minlength=3)
+    assert list(counts) == [4, 192, 24]
+    assert np.all((expanded >= 0.0) & (expanded < 1.0))
+
+
+def test_expand_symmetry_merges_rounded_hcp_sites(tmp_path):
+    # 坐标只保留 4 位小数：1/3、2/3 的各个像之间相差约 1e-4，仍应合并
+    lines = ["data_Mg", "_cell_length_a 3.2094", "_cell_length_b 3.2094", "_cell_length_c 5.2108",
+             "_cell_angle_alpha 90", "_cell_angle_beta 90", "_cell_angle_gamma 120", "loop_", "_space_group_symop_operation_xyz"]
+    lines += [f"'{op}'" for op in HCP_SYMOPS]
+    lines += ["loop_", "_atom_site_label", "_atom_site_fract_x", "_atom_site_fract_y", "_atom_site_fract_z",
+              "Mg1 0.3333 0.6667 0.25"]
+    cif = tmp_path / "mg.cif"
+    cif.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert len(read_cif(cif)) == 2
+
+    rotations, translations = symops_to_arrays(tuple(HCP_SYMOPS))
+    _, site_index = expand_symmetry(np.array([[0.3334, 0.6666, 0.0625], [0.1667, 0.3333, 0.25]]), rotations, translations)
+    assert list(np.bincount(site_index)) == [4, 6]
+
+
+def test_expand_symmetry_merges_near_duplicates_across_bin_edges():
+    # 相距 0.3·容差、方向随机的像对必须全部合并，不论是否跨越任何网格边界
+    rng = np.random.default_rng(0)
+    frac = rng.random((500, 3))
+    offsets = rng.normal(size=(500, 3))
+    offsets *= 0.3e-3 / np.linalg.norm(offsets, axis=1, keepdims=True)
+    for offset in offsets[:50]:
+        _, site_index = expand_symmetry(frac, np.array([np.eye(3), np.eye(3)]), np.array([np.zeros(3), offset]))
+        assert np.array_equal(site_index, np.arange(500))
+
+
+def test_generate_lattice_closes_cell():
+    elements, coords, _ = generate_lattice(nacl_structure())
+    # 闭合的 NaCl 晶胞: 14 个面心位置 + 13 个棱心/体心位置
+    assert len(coords) == 27
+    assert np.count_nonzero(elements == 'Na') == 14
+    elements, coords, _ = generate_lattice(nacl_structure(), (2, 2, 2), include_boundary=False)
+    assert len(coords) == 64
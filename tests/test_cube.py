@@ -0,0 +1,123 @@
+# chem_assistant/tests/test_cube.py
+
+import os
+
+import numpy as np
+import pytest
+
+from utils.file_io import cube_reader
+from utils.file_io.cube_reader import read_cube, BOHR_TO_ANGSTROM
+from utils.visualization.scene import volume_scene
+
+
+def _p_orbital(n, spacing):
+    """以原点为中心的 2p_z 型函数 z·exp(-r)"""
+    axis = (np.arange(n) - (n - 1) / 2) * spacing
+    x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+    return axis[0], z * np.exp(-np.sqrt(x * x + y * y + z * z))
+
+
+def _write_cube(path, grid, start, spacing, orbital_ids=(), angstrom=False):
+    """按 Gaussian 格式写 cube：z 变化最快，每行 6 个数；多个轨道时同一格点的各轨道值相邻"""
+    n = grid.shape[0]
+    count = -n if angstrom else n
+    lines = ["test cube", "generated", f"{-1 if orbital_ids else 2:5d} {start:12.6f} {start:12.6f} {start:12.6f}"]
+    lines += [f"{count:5d} {spacing * (k == 0):12.6f} {spacing * (k == 1):12.6f} {spacing * (k == 2):12.6f}" for k in range(3)]
+    lines.append("    8    8.000000    0.000000    0.000000    0.000000")
+    if not orbital_ids:
+        lines.append("    1    1.000000    0.000000    0.000000    1.800000")
+    else:
+        lines.append(" ".join(str(v) for v in (len(orbital_ids),) + tuple(orbital_ids)))
+    rows = grid.reshape(n, n, -1)
+    for i in range(n):
+        for j in range(n):
+            row = rows[i, j]
+            lines += ["".join(f" {v:12.5E}" for v in row[s:s + 6]) for s in range(0, len(row), 6)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_reads_grid_atoms_and_units(tmp_path):
+    start, grid = _p_orbital(12, 0.5)
+    _write_cube(tmp_path / "density.cube", grid ** 2, start, 0.5)
+    cube = read_cube(str(tmp_path / "density.cube"))
+    assert cube.shape == (12, 12, 12) and cube.n_sets == 1 and not cube.is_orbital
+    assert cube.values.dtype == np.float32
+    assert np.allclose(cube.values, grid ** 2, rtol=1e-4, atol=1e-9)
+    assert np.allclose(cube.origin, start * BOHR_TO_ANGSTROM) and np.allclose(np.diag(cube.axes), 0.5 * BOHR_TO_ANGSTROM)
+    assert list(cube.molecule.elements) == ['O', 'H'] and len(cube.molecule.bonds) == 1
+
+    _write_cube(tmp_path / "angstrom.cube", grid, start, 0.5, angstrom=True)
+    assert np.allclose(np.diag(read_cube(str(tmp_path / "angstrom.cube")).axes), 0.5)
+
+
+def test_multiple_orbitals(tmp_path):
+    start, grid = _p_orbital(10, 0.6)
+    _write_cube(tmp_path / "mo.cube", np.stack([grid, -2 * grid], axis=-1), start, 0.6, orbital_ids=(5, 6))
+    cube = read_cube(str(tmp_path / "mo.cube"))
+    assert cube.orbital_ids == (5, 6) and cube.values.shape == (10, 10, 10, 2)
+    assert np.allclose(cube.grid(1), -2 * grid, rtol=1e-4, atol=1e-9)
+    with pytest.raises(IndexError):
+        cube.grid(2)
+
+
+def test_large_grid_is_cached_and_memory_mapped(tmp_path, monkeypatch):
+    start, grid = _p_orbital(16, 0.4)
+    path = tmp_path / "big.cube"
+    _write_cube(path, grid, start, 0.4, orbital_ids=(3,))
+    monkeypatch.setattr(cube_reader, '_CHUNK_VALUES', 1000)
+    cache = tmp_path / "cache"
+    first = read_cube(str(path), cache_dir=str(cache), mmap_threshold=100)
+    assert isinstance(first.values, np.memmap)
+    assert np.allclose(first.values, grid, rtol=1e-4, atol=1e-9)
+    assert len(os.listdir(cache)) == 1
+    assert np.array_equal(read_cube(str(path), cache_dir=str(cache), mmap_threshold=100).values, first.values)
+
+    # 数据不完整时报错，且不留下半个缓存文件
+    text = path.read_text()
+    path.write_text(text[:len(text) // 2])
+    with pytest.raises(ValueError):
+        read_cube(str(path), cache_dir=str(cache), mmap_threshold=100)
+    assert len(os.listdir(cache)) == 1
+
+
+def test_failed_cache_rename_leaves_no_partial_file(tmp_path, monkeypatch):
+    start, grid = _p_orbital(12, 0.4)
+    path = tmp_path / "big.cube"
+    _write_cube(path, grid, start, 0.4, orbital_ids=(3,))
+    cache = tmp_path / "cache"
+
+    def fail(src, dst):
+        raise PermissionError("缓存目录只读")
+    monkeypatch.setattr(cube_reader.os, 'replace', fail)
+    with pytest.raises(PermissionError, match="只读"):
+        read_cube(str(path), cache_dir=str(cache), mmap_threshold=100)
+    assert os.listdir(cache) == []
+
+
+def test_volume_scene_and_isosurfaces(tmp_path, monkeypatch):
+    start, grid = _p_orbital(40, 0.3)
+    _write_cube(tmp_path / "p.cube", grid, start, 0.3, orbital_ids=(1,))
+    scene = volume_scene(read_cube(str(tmp_path / "p.cube")))
+    volume = scene['volume']
+    assert volume['signed'] and volume['isovalue'] == pytest.approx(0.02) and len(volume['colors']) == 2
+
+    pv = pytest.importorskip("pyvista")
+    from utils.visualization import renderer
+    from utils.visualization.renderer import SceneRenderer
+    plotter = pv.Plotter(off_screen=True)
+    try:
+        view = SceneRenderer(plotter)
+        view.show(scene)
+        positive, negative = view.isosurfaces()
+        # 正相在 +z 一侧，负相与之镜像对称
+        assert positive.center[2] > 0.5 and negative.center[2] == pytest.approx(-positive.center[2], abs=1e-3)
+        full_points = positive.n_points
+
+        monkeypatch.setattr(renderer, 'PREVIEW_POINTS', 10 ** 3)
+        view.show(scene)
+        view.set_isovalue(0.02, preview=True)
+        assert 0 < view.isosurfaces()[0].n_points < full_points
+        view.set_isovalue(0.02)
+        assert view.isosurfaces()[0].n_points == full_points
+    finally:
+        plotter.close()
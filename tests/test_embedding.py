@@ -0,0 +1,81 @@
+# chem_assistant/tests/test_embedding.py
+
+import numpy as np
+import pytest
+
+from core.structure.embedding import (bounds_matrix, triangle_smooth, embed_molecule, smiles_to_3d,
+                                      has_flat_coordinates)
+from core.structure.molecule import Molecule
+from core.structure.smiles import parse_smiles, AROMATIC_BOND
+
+
+def _bond_lengths(molecule):
+    bonds = molecule.bonds
+    return np.linalg.norm(molecule.coords[bonds[:, 0]] - molecule.coords[bonds[:, 1]], axis=1)
+
+
+@pytest.mark.parametrize("smiles, formula", [
+    ("CCO", "C2H6O"),
+    ("c1ccccc1", "C6H6"),
+    ("c1cc[nH]c1", "C4H5N"),
+    ("CC(=O)Nc1ccc(O)cc1", "C8H9NO2"),
+    ("C1CC2CCC1C2", "C7H12"),
+    ("[NH4+].[Cl-]", "ClH4N"),
+    # 芳香 s/o 的最低价态已被两个环键占满，不补氢
+    ("c1ccsc1", "C4H4S"),
+    ("c1ccc2sccc2c1", "C8H6S"),
+    ("c1ccoc1", "C4H4O"),
+    ("c1ccncc1", "C5H5N"),
+    ("Cn1cccc1", "C5H7N"),
+])
+def test_parse_smiles_adds_implicit_hydrogens(smiles, formula):
+    assert parse_smiles(smiles).formula == formula
+
+
+def test_parse_smiles_bond_orders_and_errors():
+    molecule = parse_smiles("C=CC#N", add_hydrogens=False)
+    assert list(molecule.bond_orders) == [2, 1, 3]
+    assert set(parse_smiles("c1ccccc1", add_hydrogens=False).bond_orders) == {AROMATIC_BOND}
+    for bad in ("", "C1CC", "C(C", "CX"):
+        with pytest.raises(ValueError):
+            parse_smiles(bad)
+
+
+def test_triangle_smoothing_tightens_bounds():
+    lower = np.zeros((3, 3))
+    upper = np.array([[0, 1.0, 100], [1.0, 0, 1.0], [100, 1.0, 0]])
+    lower[0, 2] = lower[2, 0] = 0.5
+    lower, upper = triangle_smooth(lower, upper)
+    assert upper[0, 2] == pytest.approx(2.0)
+    assert np.all(lower <= upper)
+
+
+@pytest.mark.parametrize("smiles", ["CCO", "C1CCCCC1", "CC(C)(C)C#N", "CC(=O)Nc1ccc(O)cc1"])
+def test_embedded_geometry_satisfies_bounds(smiles):
+    molecule = smiles_to_3d(smiles, seed=0)
+    lower, upper = bounds_matrix(molecule)
+    distances = np.linalg.norm(molecule.coords[:, None] - molecule.coords[None], axis=-1)
+    assert np.all(distances >= lower - 0.05) and np.all(distances <= upper + 0.05)
+    assert np.all((_bond_lengths(molecule) > 0.9) & (_bond_lengths(molecule) < 1.6))
+
+
+@pytest.mark.parametrize("smiles", ["c1ccccc1", "c1ccc2ccccc2c1", "C/C=C/C"])
+def test_sp2_systems_are_planar(smiles):
+    molecule = smiles_to_3d(smiles, seed=0)
+    heavy = molecule.coords[molecule.elements != 'H']
+    smallest = np.linalg.svd(heavy - heavy.mean(axis=0), compute_uv=False)[-1]
+    assert smallest < 0.05
+
+
+def test_disconnected_fragments_and_flat_mol_input():
+    salt = smiles_to_3d("[Na+].[Cl-]", seed=0)
+    assert 2.0 < np.linalg.norm(salt.coords[0] - salt.coords[1]) < 8.0
+
+    # 二维 MOL 的连接表：环己烷骨架全部在 z = 0 平面
+    angles = np.linspace(0, 2 * np.pi, 6, endpoint=False)
+    flat = Molecule(['C'] * 6, np.column_stack([np.cos(angles), np.sin(angles), np.zeros(6)]) * 1.5,
+                    [(i, (i + 1) % 6) for i in range(6)])
+    assert has_flat_coordinates(flat)
+    embedded = embed_molecule(flat, seed=0)
+    assert not has_flat_coordinates(embedded)
+    assert np.allclose(_bond_lengths(embedded), 1.52, atol=0.05)
@@ -0,0 +1,67 @@
+# chem_assistant/tests/test_forcefield.py
+
+import numpy as np
+import pytest
+
+from core.structure.embedding import smiles_to_3d, ideal_bond_lengths
+from core.structure.forcefield import ForceField, optimize_geometry
+from core.structure.vsepr import vsepr_molecule
+
+
+def _dihedral(coords, i, j, k, l):
+    b1, b2, b3 = coords[j] - coords[i], coords[k] - coords[j], coords[l] - coords[k]
+    n1, n2 = np.cross(b1, b2), np.cross(b2, b3)
+    x = n1 @ n2
+    y = np.cross(n1, n2) @ b2 / np.linalg.norm(b2)
+    return np.degrees(np.arctan2(y, x))
+
+
+def test_analytic_gradient_matches_finite_differences():
+    molecule = smiles_to_3d("CC(=O)Nc1ccc(O)cc1CC", seed=0)
+    field = ForceField(molecule, skin=50.0)  # 有限差分期间不重建邻居表
+    coords = molecule.coords + np.random.default_rng(1).normal(scale=0.2, size=molecule.coords.shape)
+    _, grad, terms = field.energy_and_gradient(coords)
+    assert set(terms) == {'bond', 'angle', 'torsion', 'vdw'}
+
+    numeric = np.zeros_like(coords)
+    h = 1e-5
+    for atom in range(len(coords)):
+        for axis in range(3):
+            step = np.zeros_like(coords)
+            step[atom, axis] = h
+            numeric[atom, axis] = (field.energy(coords + step) - field.energy(coords - step)) / (2 * h)
+    assert np.allclose(grad, numeric, atol=1e-4)
+
+
+def test_optimization_relaxes_strained_structure():
+    molecule = smiles_to_3d("CCCCCC", seed=0)
+    molecule.coords += np.random.default_rng(2).normal(scale=0.15, size=molecule.coords.shape)
+    result = optimize_geometry(molecule)
+    assert result.converged and result.energy < result.initial_energy
+    bonds = result.molecule.bonds
+    lengths = np.linalg.norm(result.molecule.coords[bonds[:, 0]] - result.molecule.coords[bonds[:, 1]], axis=1)
+    assert np.allclose(lengths, ideal_bond_lengths(result.molecule), atol=0.03)
+
+
+def test_ethane_relaxes_to_staggered():
+    molecule = smiles_to_3d("CC", seed=0)
+    coords = optimize_geometry(molecule).molecule.coords
+    # 原子顺序: C0, C1, H2-4 (连在 C0), H5-7 (连在 C1)
+    angle = abs(_dihedral(coords, 2, 0, 1, 5)) % 120
+    assert angle == pytest.approx(60, abs=5)
+
+
+@pytest.mark.parametrize("formula", ["SF6", "XeF4", "CO2", "NH4+"])
+def test_vsepr_geometries_are_minima(formula):
+    molecule = vsepr_molecule(formula)
+    result = optimize_geometry(molecule)
+    assert result.energy == pytest.approx(0.0, abs=1e-6)
+    assert np.allclose(result.molecule.coords, molecule.coords, atol=1e-4)
+
+
+def test_progress_callback_can_stop_optimization():
+    molecule = smiles_to_3d("CCCCCCCCCC", seed=0)
+    steps = []
+    result = optimize_geometry(molecule, callback=lambda step, coords, energy: steps.append(step) or step >= 10,
+                               callback_interval=5)
+    assert steps == [5, 10] and result.steps == 10 and not result.converged
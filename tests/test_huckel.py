@@ -0,0 +1,78 @@
+# chem_assistant/tests/test_huckel.py
+
+import numpy as np
+import pytest
+
+from core.structure.embedding import smiles_to_3d
+from core.structure.huckel import solve_huckel, solve_huckel_batch, huckel_matrix, orbital_label
+from core.structure.smiles import parse_smiles
+from utils.visualization.scene import huckel_scene, orbital_lobes
+
+
+def test_butadiene_and_benzene_textbook_values():
+    butadiene = solve_huckel(parse_smiles("C=CC=C"))
+    assert np.allclose(butadiene.energies, [1.618, 0.618, -0.618, -1.618], atol=1e-3)
+    assert butadiene.pi_energy == pytest.approx(4.472, abs=1e-3)
+    # Coulson 键级：C1-C2 0.894，C2-C3 0.447
+    assert butadiene.bond_orders[0, 1] == pytest.approx(0.894, abs=1e-3)
+    assert butadiene.bond_orders[1, 2] == pytest.approx(0.447, abs=1e-3)
+
+    benzene = solve_huckel(parse_smiles("c1ccccc1"))
+    assert np.allclose(benzene.energies, [2, 1, 1, -1, -1, -2])
+    assert (benzene.homo, benzene.lumo) == (2, 3)
+    assert orbital_label(benzene, 1) == "HOMO-1" and orbital_label(benzene, 4) == "LUMO+1"
+    assert np.allclose(benzene.charges, 0, atol=1e-12)
+
+
+def test_degenerate_open_shell_and_charge():
+    cyclobutadiene = solve_huckel(parse_smiles("C1=CC=C1"))
+    assert cyclobutadiene.occupations.tolist() == [2.0, 1.0, 1.0, 0.0]
+    allyl_cation = solve_huckel(parse_smiles("C=C[CH2]"), charge=1)
+    assert allyl_cation.n_electrons == 2 and allyl_cation.pi_energy == pytest.approx(2 * 2 ** 0.5)
+    with pytest.raises(ValueError):
+        solve_huckel(parse_smiles("C=C"), charge=-5)
+    with pytest.raises(ValueError):
+        solve_huckel(parse_smiles("CCO"))
+
+
+def test_heteroatoms():
+    atoms, matrix, electrons, _ = huckel_matrix(parse_smiles("c1cc[nH]c1"))
+    assert len(atoms) == 5 and electrons == 6
+    assert sorted(np.diag(matrix).tolist()) == [0, 0, 0, 0, 1.5]
+    pyridine = solve_huckel(parse_smiles("c1ccncc1"))
+    nitrogen = int(np.flatnonzero(parse_smiles("c1ccncc1").elements[pyridine.atoms] == 'N')[0])
+    assert pyridine.charges[nitrogen] < -0.1  # 电负性更大的 N 上 π 电子密度更高
+    # 呋喃的 O、噻吩的 S 作为 2 电子给体进入 π 体系：5 个 π 中心、6 个 π 电子
+    for smiles, donor, h in (("c1ccoc1", 'O', 2.0), ("c1ccsc1", 'S', 1.11)):
+        molecule = parse_smiles(smiles)
+        atoms, matrix, electrons, _ = huckel_matrix(molecule)
+        assert len(atoms) == 5 and electrons == 6 and donor in molecule.elements[atoms]
+        assert sorted(np.diag(matrix).tolist()) == [0, 0, 0, 0, h]
+
+
+def test_batch_matches_single_solves():
+    smiles = ["C=CC=C", "c1ccccc1", "CCO", "C=CC=O", "c1ccc2ccccc2c1", "C=CC=C"]
+    molecules = [parse_smiles(s) for s in smiles]
+    results = solve_huckel_batch(molecules)
+    assert results[2] is None
+    for molecule, result in zip(molecules, results):
+        if result is not None:
+            single = solve_huckel(molecule)
+            assert np.allclose(result.energies, single.energies)
+            assert np.allclose(result.coefficients, single.coefficients)
+    # 系数矩阵正交归一
+    naphthalene = results[4].coefficients
+    assert np.allclose(naphthalene.T @ naphthalene, np.eye(10))
+
+
+def test_orbital_lobes_scene():
+    molecule = smiles_to_3d("C=CC=C", seed=0)
+    result = solve_huckel(molecule)
+    lobes = orbital_lobes(molecule, result, result.homo)
+    assert lobes['centers'].shape == (8, 3) and lobes['colors'].shape == (8, 3)
+    # 同一原子上下两个波瓣相位相反，到原子核的距离等于半径
+    coords = molecule.coords[result.atoms]
+    assert np.allclose(np.linalg.norm(lobes['centers'][:4] - coords, axis=1), lobes['radii'][:4], atol=1e-5)
+    assert not np.any(np.all(lobes['colors'][:4] == lobes['colors'][4:], axis=1))
+    scene = huckel_scene(molecule, result, result.lumo)
+    assert scene['info'].startswith("LUMO")
@@ -0,0 +1,155 @@
+# chem_assistant/tests/test_jcamp_reader.py
+
+import numpy as np
+import pytest
+
+from utils.file_io.jcamp_reader import decode_asdf, parse_jcamp, read_jcamp
+from utils.file_io.spectrum_reader import read_spectrum
+
+EXPECTED = [1, 2, 3, 3, 2, 1, 0, -1, -2, -3]
+
+
+def _sqz(value):
+    digits = str(abs(value))
+    return ('@ABCDEFGHI' if value >= 0 else '@abcdefghi')[int(digits[0])] + digits[1:]
+
+
+def _dif(value):
+    digits = str(abs(value))
+    return ('%JKLMNOPQR' if value >= 0 else '%jklmnopqr')[int(digits[0])] + digits[1:]
+
+
+def _dup(count):
+    digits = str(count)
+    return 'STUVWXYZs'[int(digits[0]) - 1] + digits[1:]
+
+
+def _encode_difdup(x0, dx, y, per_line=12, final_check=False):
+    """DIFDUP 编码：每行以 SQZ 起始值开头，下一行重复上一行的最后一个值作为 Y 校验"""
+    lines, start = [], 0
+    while True:
+        end = min(start + per_line, len(y) - 1)
+        tokens = [_sqz(int(y[start]))]
+        difs = np.diff(y[start:end + 1]).astype(int)
+        k = 0
+        while k < len(difs):
+            run = k
+            while run + 1 < len(difs) and difs[run + 1] == difs[k]:
+                run += 1
+            tokens.append(_dif(difs[k]) + (_dup(run - k + 1) if run > k else ''))
+            k = run + 1
+        lines.append(f"{x0 + start * dx:g}" + ''.join(tokens))
+        if end >= len(y) - 1:
+            break
+        start = end
+    if final_check:
+        lines.append(f"{x0 + (len(y) - 1) * dx:g}{_sqz(int(y[-1]))}")
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("text", [
+    "100 1 2 3 3 2 1 0 -1 -2 -3\n",  # AFFN
+    "100+1+2+3+3+2+1+0-1-2-3\n",  # PAC
+    "100ABCCBA@abc\n",  # SQZ
+    "100AJJ%jjjjjj\n",  # DIF
+    "100AJT%jX\n",  # DIFDUP
+    "100AJT%j\n105BjW\n",  # 两行，第二行开头为 Y 校验值
+    "100ABC $$ 注释\n103Cjjjjjj\n",  # 第一行以 SQZ 结尾，没有校验值
+])
+def test_asdf_forms(text):
+    line_x, y, anchors = decode_asdf(text)
+    assert y.tolist() == EXPECTED and line_x[0] == 100.0 and anchors[0] == 0
+    if len(line_x) == 2:
+        assert anchors[1] == (4 if text.startswith("100AJT") else 3)
+
+
+def test_y_check_and_dup_errors():
+    with pytest.raises(ValueError, match="Y 校验"):
+        decode_asdf("100AJT%j\n105CjW\n", line_offset=20)
+    with pytest.raises(ValueError, match="第 22 行"):
+        decode_asdf("100AJT%j\n105CjW\n", line_offset=20)
+    with pytest.raises(ValueError):
+        decode_asdf("100 T\n")
+    with pytest.raises(ValueError):
+        decode_asdf("100AJ#\n")
+    with pytest.raises(ValueError):
+        decode_asdf("100J\n")
+
+
+def test_large_difdup_roundtrip():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.integers(-50, 51, 200_000)) + 10_000
+    y[1000:1300] = y[1000]  # 长段重复
+    text = _encode_difdup(400.0, 0.5, y, per_line=80, final_check=True)
+    line_x, decoded, anchors = decode_asdf(text)
+    assert np.array_equal(decoded, y)
+    assert np.allclose(400.0 + 0.5 * anchors, line_x)
+
+
+def _jcamp(y, extra="", form="(X++(Y..Y))"):
+    return (f"##TITLE=test spectrum\n##JCAMP-DX=4.24\n##DATA TYPE=INFRARED SPECTRUM\n##XUNITS=1/CM\n"
+            f"##YUNITS=ABSORBANCE\n##XFACTOR=0.5\n##YFACTOR=0.001\n##FIRSTX=200\n##LASTX={200 + 0.5 * (len(y) - 1)}\n"
+            f"##NPOINTS={len(y)}\n{extra}##XYDATA={form}\n" + _encode_difdup(400, 1, y) + "##END=\n")
+
+
+def test_xydata_block_and_read_spectrum(tmp_path):
+    y = np.arange(50) ** 2 % 97
+    block, = parse_jcamp(_jcamp(y, "##$CUSTOM=a\n  continued\n"))
+    assert block.title == "test spectrum" and block.columns == ("1/CM", "ABSORBANCE")
+    assert np.allclose(block.data[:, 0], 200 + 0.5 * np.arange(50)) and np.allclose(block.data[:, 1], y * 0.001)
+    assert block.metadata['DATATYPE'] == "INFRARED SPECTRUM" and block.metadata['$CUSTOM'] == "a continued"
+    path = tmp_path / "ir.jdx"
+    path.write_text(_jcamp(y))
+    spectrum = read_spectrum(str(path))
+    assert spectrum.dialect is None and spectrum.column_name(0) == "1/CM" and np.allclose(spectrum.y, y * 0.001)
+    # 扩展名不是 .jdx 时按文件开头识别；大文件走缓存
+    other = tmp_path / "ir.txt"
+    other.write_text(_jcamp(y))
+    cached = read_spectrum(str(other), cache_dir=str(tmp_path / "cache"), cache_threshold=0)
+    again = read_spectrum(str(other), cache_dir=str(tmp_path / "cache"), cache_threshold=0)
+    assert again.cached and again.dialect is None and np.allclose(again.y, cached.y)
+    with pytest.raises(ValueError, match="NPOINTS"):
+        parse_jcamp(_jcamp(y).replace("##NPOINTS=50", "##NPOINTS=51"))
+
+
+def test_x_from_line_abscissas_without_firstx():
+    text = "##TITLE=t\n##XYDATA=(X++(Y..Y))\n" + _encode_difdup(1000, -2, np.arange(30), per_line=7) + "##END=\n"
+    block, = parse_jcamp(text)
+    assert np.allclose(block.data[:, 0], 1000 - 2 * np.arange(30)) and block.data[-1, 1] == 29
+
+
+def test_peak_table_xypoints_and_link_blocks():
+    text = ("##TITLE=compound\n##JCAMP-DX=5.01\n##BLOCKS=2\n"
+            "##TITLE=peaks\n##XUNITS=M/Z\n##YUNITS=RELATIVE ABUNDANCE\n##YFACTOR=10\n"
+            "##PEAK TABLE=(XYW..XYW)\n15,1.5,0.1 27,2;0.2\n 43, 10, 0.3\n##END=\n"
+            "##TITLE=points\n##XYPOINTS=(XY..XY)\n1.0, 2.0; 3.0, ?\n5.0E+00, -1.5e-1\n##END=\n"
+            "##END=\n")
+    peaks, points = parse_jcamp(text)
+    assert peaks.title == "peaks" and peaks.columns == ("M/Z", "RELATIVE ABUNDANCE", "W")
+    assert peaks.data.tolist() == [[15, 15, 0.1], [27, 20, 0.2], [43, 100, 0.3]]
+    assert points.data[:, 0].tolist() == [1.0, 3.0, 5.0] and np.isnan(points.data[1, 1]) and points.data[2, 1] == -0.15
+
+
+def test_ntuples_nmr_pages_are_merged(tmp_path):
+    n = 40
+    real, imag = (np.arange(n) * 3) % 11 - 5, np.arange(n) % 7
+    text = ("##TITLE=nmr\n##JCAMP-DX=5.00\n##DATA TYPE=NMR SPECTRUM\n##NTUPLES=NMR SPECTRUM\n"
+            "##VAR_NAME=FREQUENCY, SPECTRUM/REAL, SPECTRUM/IMAG, PAGE NUMBER\n##SYMBOL=X, R, I, N\n"
+            f"##VAR_DIM={n}, {n}, {n}, 2\n##UNITS=HZ, ARBITRARY UNITS, ARBITRARY UNITS,\n"
+            f"##FIRST=100.0, 0, 0, 1\n##LAST={100 + n - 1}.0, 0, 0, 2\n##FACTOR=1.0, 2.0, 0.5, 1\n"
+            "##PAGE=N=1\n##DATA TABLE=(X++(R..R)), XYDATA\n" + _encode_difdup(100, 1, real, per_line=9) +
+            "##PAGE=N=2\n##DATA TABLE=(X++(I..I)), XYDATA\n" + _encode_difdup(100, 1, imag, per_line=9) +
+            "##END NTUPLES=NMR SPECTRUM\n##END=\n")
+    block, = parse_jcamp(text)
+    assert block.columns == ("FREQUENCY", "SPECTRUM/REAL", "SPECTRUM/IMAG") and block.data.shape == (n, 3)
+    assert np.allclose(block.data[:, 0], 100 + np.arange(n))
+    assert np.allclose(block.data[:, 1], 2 * real) and np.allclose(block.data[:, 2], 0.5 * imag)
+    path = tmp_path / "nmr.dx"
+    path.write_text(text)
+    assert np.allclose(read_spectrum(str(path), y_column=2).y, 0.5 * imag)
+    assert len(read_jcamp(str(path))) == 1
+
+
+def test_no_data():
+    with pytest.raises(ValueError):
+        parse_jcamp("##TITLE=empty\n##END=\n")
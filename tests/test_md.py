@@ -0,0 +1,106 @@
+# chem_assistant/tests/test_md.py
+
+import numpy as np
+import pytest
+
+from core.dynamics import md
+from core.dynamics.md import (MDSystem, MDSimulation, BerendsenThermostat, LangevinThermostat, RDFAccumulator, fcc_system,
+                              rocksalt_system, periodic_pairs, minimum_image)
+
+
+def test_periodic_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    box = np.array([12.0, 14.0, 16.0])
+    positions = rng.random((300, 3)) * box
+    i, j, d2 = periodic_pairs(positions, box, 3.5)
+    found = {(min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist())}
+    assert len(found) == len(i)
+
+    a, b = np.triu_indices(len(positions), k=1)
+    distances = np.linalg.norm(minimum_image(positions[a] - positions[b], box), axis=1)
+    expected = {(x, y) for x, y, r in zip(a.tolist(), b.tolist(), distances) if r < 3.5}
+    assert found == expected
+
+
+def test_system_validation():
+    with pytest.raises(ValueError):
+        MDSystem(['Na', 'Na'], [[0, 0, 0], [2, 2, 2]], [10, 10, 10])  # 不电中性
+    with pytest.raises(ValueError):
+        MDSystem(['U'], [[0, 0, 0]], [10, 10, 10])  # 没有 LJ 参数
+    with pytest.raises(ValueError):
+        MDSimulation(MDSystem(['Ar'], [[0, 0, 0]], [1.5, 1.5, 1.5]))  # 盒子容不下截断
+
+
+def test_nve_conserves_energy():
+    system = fcc_system('Ar', 5.7, cells=4)
+    system.assign_velocities(120.0, seed=0)
+    result = MDSimulation(system, timestep=5.0).run(400, rdf_interval=0)
+    total = result.traces['total']
+    assert np.ptp(total) / len(system) < 1e-5  # 每原子能量漂移远小于 ε ≈ 0.01 eV
+    assert result.steps == 400 and result.particle_steps_per_second > 0
+
+
+@pytest.mark.parametrize("thermostat", [BerendsenThermostat(90.0, tau=50.0), LangevinThermostat(90.0, friction=0.02, seed=1)])
+def test_thermostats_reach_target_temperature(thermostat):
+    system = fcc_system('Ar', 5.7, cells=4)
+    system.assign_velocities(40.0, seed=2)
+    result = MDSimulation(system, timestep=5.0, thermostat=thermostat).run(800, rdf_interval=0)
+    assert np.mean(result.traces['temperature'][-40:]) == pytest.approx(90.0, rel=0.1)
+
+
+def test_rocksalt_energy_and_rdf():
+    system = rocksalt_system('Na', 'Cl', 5.64, cells=3)
+    simulation = MDSimulation(system, timestep=2.0)
+    # 静态晶格能约 -8 eV/离子对 (实验晶格能 7.9 eV)
+    assert simulation.potential_energy / (len(system) / 2) == pytest.approx(-7.9, abs=0.5)
+
+    system.assign_velocities(300.0, seed=3)
+    r, rdf = simulation.run(100, rdf_interval=10).rdf
+    assert set(rdf) == {('Cl', 'Cl'), ('Cl', 'Na'), ('Na', 'Na'), 'total'}
+    assert r[np.argmax(rdf[('Cl', 'Na')])] == pytest.approx(2.82, abs=0.15)
+    assert r[np.argmax(rdf[('Na', 'Na')])] == pytest.approx(3.99, abs=0.2)
+
+
+def test_callback_streams_frames_and_stops():
+    system = fcc_system('Ar', 5.7, cells=3)
+    system.assign_velocities(100.0, seed=4)
+    frames = []
+    result = MDSimulation(system).run(100, callback=lambda step, positions, sample: frames.append(step) or step >= 40,
+                                      frame_interval=20)
+    assert frames == [20, 40] and result.steps == 40
+
+
+def test_callback_between_samples():
+    system = fcc_system('Ar', 5.7, cells=3)
+    system.assign_velocities(100.0, seed=4)
+    samples = []
+    result = MDSimulation(system).run(20, sample_interval=10, frame_interval=5, rdf_interval=0,
+                                      callback=lambda step, positions, sample: samples.append(sample))
+    assert [s['step'] for s in samples] == [5, 10, 15, 20] and list(result.traces['step']) == [10, 20]
+    assert samples[1]['total'] == pytest.approx(result.traces['total'][0])
+
+
+def test_rdf_uses_cell_list(monkeypatch):
+    system = fcc_system('Ar', 5.7, cells=6)
+    rdf = RDFAccumulator(system.elements, system.box, r_max=1e3)
+    assert rdf.r_max < system.box.min() / 3 and np.all(np.floor(system.box / rdf.r_max) >= 3)
+    assert RDFAccumulator(system.elements, system.box * 10).r_max == md.RDF_R_MAX
+    monkeypatch.setattr(md.np, 'triu_indices', lambda *a, **k: pytest.fail("退化为全部原子对"))
+    rdf.add(system.positions)
+    r, g = rdf.result()
+    assert r[np.argmax(g['total'])] == pytest.approx(5.7 / 2 ** 0.5, abs=0.1)
+
+
+def test_parallel_forces_match_serial():
+    forces = []
+    for workers in (1, 2):
+        system = rocksalt_system('Na', 'Cl', 5.64, cells=3)
+        system.assign_velocities(1000.0, seed=5)
+        simulation = MDSimulation(system, timestep=2.0, workers=workers)
+        try:
+            simulation.run(20, rdf_interval=0)
+            forces.append((simulation.potential_energy, simulation.forces.copy()))
+        finally:
+            simulation.close()
+    assert forces[0][0] == pytest.approx(forces[1][0], rel=1e-10)
+    assert np.allclose(forces[0][1], forces[1][1], atol=1e-8)
@@ -0,0 +1,227 @@
+# chem_assistant/tests/test_mzml_reader.py
+
+import base64
+import tracemalloc
+import zlib
+
+import numpy as np
+import pytest
+
+from utils.file_io.mzml_reader import MSRun, decode_binary, detect_format, iter_scans
+
+
+def _encode(array, dtype='<f8', compress=True):
+    raw = np.asarray(array).astype(dtype).tobytes()
+    return base64.b64encode(zlib.compress(raw) if compress else raw).decode('ascii')
+
+
+def _run(n=60, seed=0, peaks=(50, 200)):
+    """交替的一级/二级扫描；一级扫描中 300.0 和 450.5 附近有随保留时间变化的峰"""
+    rng = np.random.default_rng(seed)
+    scans = []
+    for k in range(n):
+        level = 1 if k % 3 == 0 else 2
+        mz = np.sort(rng.uniform(100.0, 1000.0, rng.integers(*peaks)))
+        intensity = rng.uniform(0.0, 100.0, len(mz))
+        if level == 1:
+            mz = np.concatenate([mz, [300.0 + 0.002, 450.5 - 0.003]])
+            intensity = np.concatenate([intensity, [1000.0 * np.exp(-0.5 * ((k - 20) / 5.0) ** 2), 500.0]])
+            order = np.argsort(mz)
+            mz, intensity = mz[order], intensity[order]
+        scans.append({'id': f"scan={k + 1}", 'level': level, 'rt': 6.0 * k, 'mz': mz, 'intensity': intensity,
+                      'precursor': 300.0 + k if level == 2 else None})
+    return scans
+
+
+def _write_mzml(path, scans, summary=True, index=True, groups=False):
+    parts = ['<?xml version="1.0" encoding="utf-8"?>\n',
+             '<indexedmzML xmlns="http://psi.hupo.org/ms/mzml">\n' if index else '',
+             '<mzML xmlns="http://psi.hupo.org/ms/mzml" version="1.1.0">\n']
+    if groups:
+        parts.append('<referenceableParamGroupList count="2">\n'
+                     '<referenceableParamGroup id="mzArray"><cvParam accession="MS:1000514" name="m/z array"/>'
+                     '<cvParam accession="MS:1000521" name="32-bit float"/><cvParam accession="MS:1000576"/></referenceableParamGroup>\n'
+                     '<referenceableParamGroup id="intArray"><cvParam accession="MS:1000515" name="intensity array"/>'
+                     '<cvParam accession="MS:1000521" name="32-bit float"/><cvParam accession="MS:1000576"/></referenceableParamGroup>\n'
+                     '</referenceableParamGroupList>\n')
+    parts.append(f'<run id="r"><spectrumList count="{len(scans)}">\n')
+    offsets = []
+    for k, s in enumerate(scans):
+        offsets.append(sum(len(p.encode()) for p in parts))
+        xml = [f'<spectrum index="{k}" id="{s["id"]}" defaultArrayLength="{len(s["mz"])}">\n',
+               f'<cvParam accession="MS:1000511" name="ms level" value="{s["level"]}"/>\n']
+        if summary:
+            top = int(np.argmax(s['intensity']))
+            xml.append(f'<cvParam accession="MS:1000285" value="{float(s["intensity"].sum())!r}"/>'
+                       f'<cvParam accession="MS:1000504" value="{float(s["mz"][top])!r}"/>'
+                       f'<cvParam accession="MS:1000505" value="{float(s["intensity"][top])!r}"/>\n')
+        xml.append(f'<scanList count="1"><scan><cvParam accession="MS:1000016" name="scan start time" value="{s["rt"]}" '
+                   f'unitAccession="UO:0000010" unitName="second"/></scan></scanList>\n')
+        if s['precursor'] is not None:
+            xml.append('<precursorList count="1"><precursor><selectedIonList count="1"><selectedIon>'
+                       f'<cvParam accession="MS:1000744" value="{s["precursor"]}"/></selectedIon></selectedIonList></precursor></precursorList>\n')
+        xml.append('<binaryDataArrayList count="2">\n')
+        for kind, accession in (('mz', 'MS:1000514'), ('intensity', 'MS:1000515')):
+            if groups:
+                params = f'<referenceableParamGroupRef ref="{"mzArray" if kind == "mz" else "intArray"}"/>'
+                text = _encode(s[kind], '<f4', compress=False)
+            else:
+                params = f'<cvParam accession="MS:1000523"/><cvParam accession="MS:1000574"/><cvParam accession="{accession}"/>'
+                text = _encode(s[kind])
+            xml.append(f'<binaryDataArray encodedLength="{len(text)}">{params}\n<binary>{text}</binary></binaryDataArray>\n')
+        xml.append('</binaryDataArrayList>\n</spectrum>\n')
+        parts.append(''.join(xml))
+    parts.append('</spectrumList></run>\n</mzML>\n')
+    if index:
+        start = sum(len(p.encode()) for p in parts)
+        entries = ''.join(f'<offset idRef="{s["id"]}">{o}</offset>\n' for s, o in zip(scans, offsets))
+        parts.append(f'<indexList count="1">\n<index name="spectrum">\n{entries}</index>\n</indexList>\n'
+                     f'<indexListOffset>{start}</indexListOffset>\n</indexedmzML>\n')
+    path.write_bytes(''.join(parts).encode())
+    return path
+
+
+def _write_mzxml(path, scans):
+    """二级扫描嵌套在前一个一级扫描内 (老版本转换器的写法)，峰数组为网络字节序的 32 位浮点数"""
+    parts = ['<?xml version="1.0" encoding="ISO-8859-1"?>\n<mzXML xmlns="http://sashimi.sourceforge.net/schema_revision/mzXML_3.2">\n',
+             f'<msRun scanCount="{len(scans)}">\n']
+    offsets, open_parent = [], False
+    for s in scans:
+        if s['level'] == 1 and open_parent:
+            parts.append('</scan>\n')
+        offsets.append(sum(len(p.encode()) for p in parts))
+        pairs = np.column_stack([s['mz'], s['intensity']]).ravel()
+        parts.append(f'<scan num="{s["id"][5:]}" msLevel="{s["level"]}" peaksCount="{len(s["mz"])}" retentionTime="PT{s["rt"]}S">\n')
+        if s['precursor'] is not None:
+            parts.append(f'<precursorMz precursorIntensity="1">{s["precursor"]}</precursorMz>\n')
+        parts.append(f'<peaks precision="32" byteOrder="network" contentType="m/z-int" compressionType="zlib">'
+                     f'{_encode(pairs, ">f4")}</peaks>\n')
+        if s['level'] == 1:
+            open_parent = True
+        else:
+            parts.append('</scan>\n')
+    parts.append('</scan>\n</msRun>\n')
+    start = sum(len(p.encode()) for p in parts)
+    entries = ''.join(f'<offset id="{s["id"][5:]}">{o}</offset>\n' for s, o in zip(scans, offsets))
+    parts.append(f'<index name="scan">\n{entries}</index>\n<indexOffset>{start}</indexOffset>\n</mzXML>\n')
+    path.write_bytes(''.join(parts).encode())
+    return path
+
+
+def test_decode_binary():
+    values = np.linspace(0.0, 1.0, 7)
+    assert np.array_equal(decode_binary(_encode(values), '<f8', 'zlib'), values)
+    assert np.array_equal(decode_binary(_encode(values, '>f4', compress=False), '>f4'), values.astype('>f4'))
+    assert len(decode_binary('', '<f4', 'zlib')) == 0
+    with pytest.raises(ValueError):
+        decode_binary(_encode(values, '<f4', compress=False), '<f8')
+
+
+@pytest.mark.parametrize("groups", [False, True])
+def test_iter_scans_mzml(tmp_path, groups):
+    scans = _run()
+    path = _write_mzml(tmp_path / "run.mzML", scans, groups=groups)
+    assert detect_format(str(path)) == 'mzml'
+    dtype = np.float32 if groups else np.float64
+    for scan, s in zip(iter_scans(str(path)), scans, strict=True):
+        assert scan.scan_id == s['id'] and scan.ms_level == s['level'] and scan.retention_time == pytest.approx(s['rt'] / 60.0)
+        assert scan.precursor_mz == s['precursor']
+        assert np.array_equal(scan.mz, s['mz'].astype(dtype)) and np.array_equal(scan.intensity, s['intensity'].astype(dtype))
+        assert scan.tic == pytest.approx(s['intensity'].sum(), rel=1e-6)
+    # 只解码一级扫描
+    ms1 = list(iter_scans(str(path), ms_level=1, decode=True))
+    assert all((scan.mz is None) == (scan.ms_level != 1) for scan in ms1)
+
+
+def test_random_access_and_index_fallback(tmp_path):
+    scans = _run(peaks=(50, 8000))  # 较大的谱图跨越多个读取块
+    streamed = list(iter_scans(str(_write_mzml(tmp_path / "a.mzML", scans))))
+    with MSRun(str(tmp_path / "a.mzML")) as run:
+        indexed = run.offsets.copy()
+        assert len(run) == len(scans)
+        for k in (0, 17, len(scans) - 1, -2):
+            scan = run.scan(k)
+            assert scan.index == k % len(scans) and scan.scan_id == streamed[k].scan_id
+            assert np.array_equal(scan.mz, streamed[k].mz) and scan.precursor_mz == streamed[k].precursor_mz
+        with pytest.raises(IndexError):
+            run.scan(len(scans))
+    # 没有索引，或者索引偏移失效时，扫描文件得到同样的偏移
+    with MSRun(str(_write_mzml(tmp_path / "b.mzML", scans, index=False))) as run:
+        assert np.array_equal(run.offsets + len('<indexedmzML xmlns="http://psi.hupo.org/ms/mzml">\n'), indexed)
+    text = (tmp_path / "a.mzML").read_bytes().replace(b'<offset idRef="scan=1">', b'<offset idRef="scan=1">1')
+    (tmp_path / "c.mzML").write_bytes(text)
+    with MSRun(str(tmp_path / "c.mzML")) as run:
+        assert np.array_equal(run.offsets, indexed) and run.scan(5).scan_id == "scan=6"
+
+
+@pytest.mark.parametrize("summary", [True, False])
+def test_chromatograms_single_pass(tmp_path, summary):
+    scans = _run()
+    path = _write_mzml(tmp_path / "run.mzML", scans, summary=summary)
+    ms1 = [s for s in scans if s['level'] == 1]
+    with MSRun(str(path)) as run:
+        progress = []
+        chrom = run.chromatograms(callback=lambda done, total: progress.append((done, total)))
+        assert progress[-1][0] == progress[-1][1] == path.stat().st_size
+        assert chrom.scan_index.tolist() == [k for k, s in enumerate(scans) if s['level'] == 1]
+        assert np.allclose(chrom.retention_time, [s['rt'] / 60.0 for s in ms1])
+        assert np.allclose(chrom.tic, [s['intensity'].sum() for s in ms1])
+        assert np.allclose(chrom.bpc, [s['intensity'].max() for s in ms1])
+        assert np.allclose(chrom.bpc_mz, [s['mz'][np.argmax(s['intensity'])] for s in ms1])
+        assert chrom.xic.shape == (len(ms1), 0) and run.ms_levels.tolist() == [s['level'] for s in scans]
+        targets = [300.0, 450.5, 999.0]
+        chrom = run.chromatograms(targets, tolerance_ppm=20.0)
+        for row, s in zip(chrom.xic, ms1):
+            for value, target in zip(row, targets):
+                window = np.abs(s['mz'] - target) <= target * 20e-6
+                assert value == pytest.approx(s['intensity'][window].sum(), abs=1e-9)
+        # 300.0 处的峰在第 20 个扫描 (第 7 个一级扫描) 达到最大
+        assert chrom.scan_index[np.argmax(chrom.xic[:, 0])] == 21 and np.all(chrom.xic[:, 1] > 500.0 - 1e-9)
+        ms2 = run.chromatograms(ms_level=2)
+        assert len(ms2.scan_index) == len(scans) - len(ms1)
+        with pytest.raises(ValueError):
+            run.chromatograms(targets, tolerance_ppm=0)
+
+
+def test_mzxml_nested_scans(tmp_path):
+    scans = _run(30)
+    path = _write_mzxml(tmp_path / "run.mzXML", scans)
+    streamed = list(iter_scans(str(path)))
+    assert [scan.scan_id for scan in streamed] == [s['id'][5:] for s in scans]
+    for scan, s in zip(streamed, scans):
+        assert scan.ms_level == s['level'] and scan.retention_time == pytest.approx(s['rt'] / 60.0)
+        assert np.array_equal(scan.mz, s['mz'].astype(np.float32)) and scan.precursor_mz == s['precursor']
+    with MSRun(str(path)) as run:
+        assert run.format == 'mzxml' and len(run) == 30
+        for k in (0, 4, 29):  # 一级扫描 (包含嵌套的二级扫描) 和嵌套的二级扫描
+            scan = run.scan(k)
+            assert scan.scan_id == streamed[k].scan_id and np.array_equal(scan.intensity, streamed[k].intensity)
+        chrom = run.chromatograms([300.0])
+        assert len(chrom.tic) == 10 and chrom.scan_index[np.argmax(chrom.xic[:, 0])] == 21
+
+
+def test_streaming_memory_is_flat(tmp_path):
+    scans = _run(1500, peaks=(800, 1200))
+    path = _write_mzml(tmp_path / "big.mzML", scans, summary=False)
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_scans(str(path)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert count == 1500 and path.stat().st_size > 20e6 and peak < 2e6
+
+
+def test_invalid_files(tmp_path):
+    bad = tmp_path / "bad.xml"
+    bad.write_text("<root/>")
+    with pytest.raises(ValueError):
+        detect_format(str(bad))
+    scans = _run(3)
+    text = _write_mzml(tmp_path / "np.mzML", scans).read_text().replace("MS:1000574", "MS:1002312")
+    (tmp_path / "np.mzML").write_text(text)
+    with pytest.raises(ValueError, match="Numpress"):
+        list(iter_scans(str(tmp_path / "np.mzML")))
+    (tmp_path / "empty.mzML").write_text('<mzML><run><spectrumList count="0"></spectrumList></run></mzML>')
+    with pytest.raises(ValueError):
+        MSRun(str(tmp_path / "empty.mzML"))
@@ -0,0 +1,115 @@
+# chem_assistant/tests/test_scene_export.py
+
+import json
+import struct
+import zipfile
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyvista")
+
+from core.structure.molecule import Molecule
+from core.structure.symmetry import detect_point_group
+from utils.file_io.cube_reader import CubeData
+from utils.visualization.scene import make_scene, vsepr_scene, volume_scene, symmetry_overlays
+from utils.visualization.scene_export import export_scene, export_gltf, scene_parts, expand_instances
+
+
+def _read_glb(path):
+    data = path.read_bytes()
+    magic, version, length = struct.unpack('<III', data[:12])
+    assert (magic, version, length) == (0x46546C67, 2, len(data))
+    json_length, json_type = struct.unpack('<II', data[12:20])
+    gltf = json.loads(data[20:20 + json_length])
+    bin_length, bin_type = struct.unpack('<II', data[20 + json_length:28 + json_length])
+    assert json_type == 0x4E4F534A and bin_type == 0x004E4942 and bin_length == gltf['buffers'][0]['byteLength']
+    binary = data[28 + json_length:]
+
+    def accessor(index):
+        acc = gltf['accessors'][index]
+        view = gltf['bufferViews'][acc['bufferView']]
+        dtype = np.float32 if acc['componentType'] == 5126 else np.uint32
+        width = {'SCALAR': 1, 'VEC3': 3, 'VEC4': 4}[acc['type']]
+        raw = np.frombuffer(binary, dtype=dtype, count=acc['count'] * width, offset=view['byteOffset'])
+        return raw.reshape(acc['count'], width) if width > 1 else raw
+
+    return gltf, accessor
+
+
+def test_glb_instances_reproduce_atoms(tmp_path):
+    scene, molecule = vsepr_scene("SF6")
+    summary = export_scene(scene, tmp_path / "sf6.glb")
+    gltf, accessor = _read_glb(tmp_path / "sf6.glb")
+    assert gltf['extensionsUsed'] == ['EXT_mesh_gpu_instancing'] and summary.instances == 7 + 6
+    centers = []
+    for node in gltf['nodes']:
+        attributes = node['extensions']['EXT_mesh_gpu_instancing']['attributes']
+        if node['name'].startswith('atoms'):
+            centers.append(accessor(attributes['TRANSLATION']))
+        else:
+            # 键：单位圆柱 (+y 方向) 经旋转、缩放后应从一个原子指向另一个原子
+            rotations, scales = accessor(attributes['ROTATION']), accessor(attributes['SCALE'])
+            assert np.allclose(np.linalg.norm(rotations, axis=1), 1, atol=1e-6)
+            assert np.allclose(scales[:, 0], 0.08)
+    assert np.allclose(np.sort(np.vstack(centers), axis=0), np.sort(scene['coords'], axis=0))
+
+    # 展开实例后的普通网格与实例化表示一致
+    bonds = next(p for p in scene_parts(scene) if p.name == 'bonds')
+    expanded = expand_instances(bonds).points.reshape(len(scene['bonds']), -1, 3)
+    midpoints = scene['coords'][scene['bonds']].mean(axis=1)
+    assert np.allclose(expanded.mean(axis=1), midpoints, atol=1e-5)
+    export_gltf(scene, tmp_path / "flat.glb", instancing=False)
+    assert 'extensionsUsed' not in _read_glb(tmp_path / "flat.glb")[0]
+
+
+def test_large_structure_exports_compactly(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 50000
+    coords = rng.uniform(0, 80, (n, 3))
+    bonds = np.stack([np.arange(n - 1), np.arange(1, n)], axis=1)
+    scene = make_scene(rng.choice(['C', 'N', 'O', 'H'], n), coords, bonds, style='ball_and_stick')
+    glb = export_scene(scene, tmp_path / "big.glb")
+    # 每个原子只有 12 字节平移，每个键 40 字节平移/旋转/缩放
+    assert glb.instances == 2 * n - 1 and glb.size < 3_000_000 and glb.triangles < 1000
+    vtkjs = export_scene(scene, tmp_path / "big.vtkjs", triangle_budget=200_000)
+    assert vtkjs.triangles == 0 and vtkjs.size < 2_000_000  # 预算放不下球模板，退化为点 + 线段
+
+
+def test_vtkjs_archive_layout(tmp_path):
+    scene, molecule = vsepr_scene("CH4")
+    scene['overlays'] = symmetry_overlays(detect_point_group(molecule), molecule.coords)
+    summary = export_scene(scene, tmp_path / "ch4.vtkjs")
+    with zipfile.ZipFile(tmp_path / "ch4.vtkjs") as archive:
+        names = set(archive.namelist())
+        index = json.loads(archive.read('index.json'))
+        assert [item['name'] for item in index['scene']][:3] == ['atoms_0', 'atoms_1', 'bonds']
+        assert any(item['name'].startswith('mirror_planes') and item['property']['opacity'] == 0.25 for item in index['scene'])
+        triangles = 0
+        for item in index['scene']:
+            dataset = json.loads(archive.read(f"{item['httpDataSetReader']['url']}/index.json"))
+            for key in ('points', 'polys', 'lines'):
+                if key in dataset:
+                    ref = dataset[key]['ref']
+                    assert f"{item['httpDataSetReader']['url']}/data/{ref['id']}" in names
+            if 'polys' in dataset:
+                triangles += dataset['polys']['size'] // 4
+    assert triangles == summary.triangles
+    with pytest.raises(ValueError):
+        export_scene(scene, tmp_path / "ch4.obj")
+
+
+def test_isosurface_decimated_to_budget(tmp_path):
+    axis = np.linspace(-4, 4, 60)
+    x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+    values = (z * np.exp(-np.sqrt(x * x + y * y + z * z))).astype(np.float32)
+    molecule = Molecule(np.array(['C']), np.zeros((1, 3)))
+    cube = CubeData("pz", "", molecule, [-4, -4, -4], np.eye(3) * (axis[1] - axis[0]), values, orbital_ids=(1,))
+    scene = volume_scene(cube, isovalue=0.02)
+    full = sum(len(p.cells) for p in scene_parts(scene, triangle_budget=10 ** 8) if p.name.startswith('isosurface'))
+    parts = [p for p in scene_parts(scene, triangle_budget=8000) if p.name.startswith('isosurface')]
+    assert len(parts) == 2 and full > 8000
+    assert sum(len(p.cells) for p in parts) <= 4000 * 1.05
+    export_scene(scene, tmp_path / "volume.glb", triangle_budget=8000)
+    gltf, _ = _read_glb(tmp_path / "volume.glb")
+    assert gltf['materials'][-1]['alphaMode'] == 'BLEND'
@@ -0,0 +1,100 @@
+# chem_assistant/tests/test_spectral_library.py
+
+import numpy as np
+import pytest
+
+from core.spectroscopy import library
+from core.spectroscopy.library import LibraryWriter, SpectralLibrary, build_library, bin_spectrum, top_peaks
+
+GRID = np.linspace(400.0, 4000.0, 1024)
+
+
+def _random_library(count=3000, seed=0):
+    """每条谱图 3-8 个随机位置、宽度的高斯峰"""
+    rng = np.random.default_rng(seed)
+    rows = np.zeros((count, len(GRID)))
+    for row in rows:
+        for center in rng.uniform(450.0, 3950.0, rng.integers(3, 9)):
+            row += rng.uniform(0.2, 1.0) * np.exp(-0.5 * ((GRID - center) / rng.uniform(4.0, 15.0)) ** 2)
+    return rows
+
+
+def _build(directory, rows, **kwargs):
+    with LibraryWriter(directory, GRID, capacity=100, **kwargs) as writer:
+        for start in range(0, len(rows), 700):  # 分批写入，容量需要多次扩展
+            block = rows[start:start + 700]
+            writer.add([f"ref{k}" for k in range(start, start + len(block))], block / np.linalg.norm(block, axis=1, keepdims=True))
+    return SpectralLibrary(directory)
+
+
+def test_top_peaks():
+    row = np.zeros(20)
+    row[[3, 8, 15]] = [1.0, 3.0, 2.0]
+    assert sorted(top_peaks(row, 2)[0]) == [8, 15]
+    assert sorted(top_peaks(row, 5)[0]) == [-1, -1, 3, 8, 15]
+    assert top_peaks(np.zeros((2, 20)), 3).tolist() == [[-1] * 3] * 2
+
+
+def test_search_finds_shifted_noisy_query(tmp_path):
+    rows = _random_library()
+    lib = _build(tmp_path / "lib", rows)
+    assert len(lib) == 3000 and lib.matrix.shape == (3000, 1024)
+    assert (tmp_path / "lib" / "spectra.f32").stat().st_size == 3000 * 1024 * 4
+    rng = np.random.default_rng(1)
+    for target in (5, 1234, 2999):
+        # 未知谱：横轴偏移半个 bin、强度缩放、加噪声，点距更密且为降序
+        x = np.linspace(4000.0, 400.0, 5000)
+        y = 3.0 * np.interp(x - 1.5, GRID, rows[target]) + rng.normal(scale=0.01, size=len(x))
+        matches = lib.search(x, y, top_k=5)
+        assert matches[0].index == target and matches[0].name == f"ref{target}" and matches[0].score > 0.95
+        assert [m.score for m in matches] == sorted((m.score for m in matches), reverse=True)
+        # 倒排表预筛选与全库扫描的第一名和分数一致
+        exhaustive = lib.search(x, y, top_k=5, prefilter=False)
+        assert exhaustive[0].index == target and exhaustive[0].score == pytest.approx(matches[0].score, rel=1e-6)
+        assert exhaustive[0].shared_peaks == matches[0].shared_peaks
+    ids, shared = lib.candidates(lib.vectorize(GRID, rows[7]))
+    assert 7 in ids and len(ids) < 300 and np.all(shared >= library.MIN_SHARED_PEAKS)
+
+
+def test_dot_metric_and_max_normalization(tmp_path):
+    rows = _random_library(200)
+    with LibraryWriter(tmp_path / "lib", GRID, normalization='max') as writer:
+        writer.add([f"r{k}" for k in range(200)], rows / rows.max(axis=1, keepdims=True))
+    lib = SpectralLibrary(tmp_path / "lib")
+    cosine = lib.search(GRID, rows[42], top_k=3)
+    assert cosine[0].index == 42 and cosine[0].score == pytest.approx(1.0, abs=1e-5)
+    dot = lib.search(GRID, rows[42], top_k=3, metric='dot', prefilter=False)
+    expected = (rows / rows.max(axis=1, keepdims=True)) @ (rows[42] / rows[42].max())
+    assert dot[0].score == pytest.approx(expected.max(), rel=1e-5)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_from_files(tmp_path, workers):
+    rows = _random_library(20, seed=3)
+    for k, row in enumerate(rows):
+        np.savetxt(tmp_path / f"s{k:02d}.csv", np.column_stack([GRID[::-1], row[::-1]]), delimiter=',')
+    (tmp_path / "bad.csv").write_text("not,a,spectrum\n")
+    progress = []
+    lib, errors = build_library(tmp_path, tmp_path / "lib", n_bins=512, workers=workers,
+                                callback=lambda done, total: progress.append((done, total)))
+    assert len(lib) == 20 and lib.names[0] == "s00.csv" and [e.path.endswith("bad.csv") for e in errors] == [True]
+    assert progress[-1] == (21, 21) and lib.grid[0] == 400.0 and lib.grid[-1] == 4000.0
+    assert np.allclose(lib.spectrum(3)[1], bin_spectrum(GRID, rows[3], lib.grid), atol=1e-6)
+    assert lib.search(GRID, rows[11], top_k=1)[0].name == "s11.csv"
+
+
+def test_invalid_input(tmp_path):
+    with pytest.raises(ValueError):
+        LibraryWriter(tmp_path / "a", GRID, normalization='area')
+    with pytest.raises(ValueError):
+        with LibraryWriter(tmp_path / "b", GRID):
+            pass
+    with pytest.raises(ValueError):
+        SpectralLibrary(tmp_path / "b")
+    with pytest.raises(ValueError):
+        bin_spectrum(np.array([0.0, 10.0]), np.array([1.0, 1.0]), GRID)
+    lib = _build(tmp_path / "c", _random_library(20))
+    with pytest.raises(ValueError):
+        lib.search(GRID, GRID, metric='euclidean')
+    with pytest.raises(ValueError):
+        build_library([], tmp_path / "d")
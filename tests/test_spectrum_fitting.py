@@ -0,0 +1,124 @@
+# chem_assistant/tests/test_spectrum_fitting.py
+
+import numpy as np
+import pytest
+from scipy.special import wofz
+
+from core.spectroscopy import fitting
+from core.spectroscopy.fitting import fit_peaks, fit_components, peak_profiles, peak_tails, peak_fwhm, PARAM_NAMES
+
+PARAMS = {
+    'gaussian': np.array([[10.0, 3.0, 1.5], [13.0, 1.0, 0.8]]),
+    'lorentzian': np.array([[10.0, 3.0, 1.5], [13.0, 1.0, 0.8]]),
+    'voigt': np.array([[10.0, 3.0, 0.6, 0.4], [13.0, 1.0, 0.3, 0.05]]),
+}
+
+
+def test_faddeeva_matches_wofz():
+    z = np.linspace(-40.0, 40.0, 8001)[:, None] + 1j * np.array([0.0, 1e-3, 0.5, 3.0, 10.0])
+    assert np.max(np.abs(fitting._faddeeva(z) - wofz(z)) / np.abs(wofz(z))) < 1e-6
+
+
+@pytest.mark.parametrize("shape", sorted(PARAMS))
+def test_analytic_jacobian_matches_finite_differences(shape, monkeypatch):
+    # 差分跨过渐近展开的切换点时有 ~1e-7 的跳变，这里全部用 wofz
+    monkeypatch.setattr(fitting, 'FADDEEVA_ASYMPTOTIC', np.inf)
+    x = np.linspace(0.0, 25.0, 2001)
+    params = PARAMS[shape]
+    values, derivatives = peak_profiles(shape, x, params, jacobian=True)
+    assert len(derivatives) == len(PARAM_NAMES[shape])
+    # 面积归一化：数值积分 ≈ 面积 (洛伦兹翼部收敛慢，只比较近似值)
+    assert np.allclose(np.trapezoid(values, x, axis=0), params[:, 1], rtol=0.1 if shape != 'gaussian' else 1e-6)
+    for j, derivative in enumerate(derivatives):
+        step = np.zeros_like(params)
+        step[:, j] = 1e-6
+        numeric = (peak_profiles(shape, x, params + step) - peak_profiles(shape, x, params - step)) / 2e-6
+        assert np.allclose(derivative, numeric, rtol=1e-5, atol=1e-7)
+
+
+def test_tails_match_profile_far_from_center():
+    # 两个峰的 8 倍半高宽之外
+    x = np.concatenate([np.linspace(-200.0, -6.0, 500), np.linspace(30.0, 200.0, 500)])
+    for shape in ('lorentzian', 'voigt'):
+        assert np.allclose(peak_tails(shape, x, PARAMS[shape]), peak_profiles(shape, x, PARAMS[shape]), rtol=3e-6, atol=0)
+    assert peak_tails('gaussian', x, PARAMS['gaussian']) is None
+
+
+@pytest.mark.parametrize("shape", ['lorentzian', 'voigt'])
+def test_interpolated_tail_sum_matches_exact(shape):
+    # 不等间距数据、中间有一段空缺；插值得到的翼部之和与逐点计算的相差远小于峰高
+    rng = np.random.default_rng(5)
+    x = np.sort(np.concatenate([rng.uniform(0.0, 400.0, 40_000), rng.uniform(600.0, 1000.0, 40_000)]))
+    params = fitting.initial_params(shape, np.sort(rng.uniform(20.0, 980.0, 12)), np.ones(12), rng.uniform(2.0, 8.0, 12))
+    model = fitting._Model(shape, x, x, len(params), 1)
+    model.update_windows(np.concatenate([params.ravel(), [0.0, 0.0]]))
+    lo, hi = model.windows
+    rows = np.arange(len(x))[:, None]
+    exact = (peak_tails(shape, x, params) * ((rows < lo) | (rows >= hi))).sum(axis=1)
+    approx = model.tail_sum(params)
+    assert np.max(np.abs(approx - exact) / exact) < 1e-3
+    assert np.max(np.abs(approx - exact)) < 1e-5 * fitting.peak_heights(shape, params).max()
+
+
+@pytest.mark.parametrize("shape", sorted(PARAMS))
+def test_recovers_overlapping_peaks_on_sloped_baseline(shape):
+    rng = np.random.default_rng(2)
+    x = np.linspace(0.0, 25.0, 20_000)
+    params = PARAMS[shape]
+    clean = peak_profiles(shape, x, params).sum(axis=1) + 0.2 + 0.01 * x
+    noise = 0.005
+    # 初值：位置偏 0.2，峰高、半高宽都偏离真值
+    fwhm = peak_fwhm(shape, params)
+    result = fit_peaks(x[::-1], clean[::-1] + rng.normal(scale=noise, size=len(x)), params[:, 0] + 0.2,
+                       [1.5, 0.8], fwhm * 1.3, shape=shape)
+    assert result.converged and result.chi2 == pytest.approx(noise ** 2, rel=0.05)
+    assert np.all(np.abs(result.areas - params[:, 1]) < 4 * result.area_errors)
+    assert np.all(np.abs(result.centers - params[:, 0]) < 4 * result.center_errors)
+    assert np.allclose(result.fwhm, fwhm, rtol=0.01)
+    components, base = fit_components(result, x)
+    assert np.allclose(components.sum(axis=1) + base, result.fitted)
+    assert np.allclose(base, 0.2 + 0.01 * x, atol=0.01)
+
+
+@pytest.mark.parametrize("shape", ['lorentzian', 'voigt'])
+def test_errors_include_tail_derivatives(shape):
+    # 数据范围远大于峰宽，大部分点在窗口外；不确定度应与完整差分雅可比给出的一致
+    rng = np.random.default_rng(4)
+    x = np.linspace(0.0, 400.0, 40_000)
+    params = {'lorentzian': np.array([[150.0, 30.0, 1.5], [250.0, 10.0, 0.8]]),
+              'voigt': np.array([[150.0, 30.0, 0.6, 0.6], [250.0, 10.0, 0.3, 0.3]])}[shape]
+    y = peak_profiles(shape, x, params).sum(axis=1) + 0.2 + rng.normal(scale=0.005, size=len(x))
+    result = fit_peaks(x, y, params[:, 0], [10.0, 5.0], peak_fwhm(shape, params), shape=shape)
+    theta = np.concatenate([result.params.ravel(), result.baseline])
+    basis = fitting._polynomial_basis(x, 1, result.x_range)
+
+    def model(t):
+        return peak_profiles(shape, x, t[:params.size].reshape(params.shape)).sum(axis=1) + basis @ t[params.size:]
+
+    jac = np.column_stack([(model(theta + h) - model(theta - h)) / 2e-6 for h in np.eye(len(theta)) * 1e-6])
+    errors = np.sqrt(np.diag(np.linalg.pinv(jac.T @ jac)) * result.chi2)
+    assert np.allclose(result.errors.ravel(), errors[:params.size], rtol=1e-4)
+    assert np.allclose(result.baseline_errors, errors[params.size:], rtol=1e-4)
+
+
+def test_bounds_keep_centers_near_seeds_and_areas_nonnegative():
+    x = np.linspace(0.0, 50.0, 5001)
+    y = peak_profiles('gaussian', x, np.array([[20.0, 5.0, 2.0]]))[:, 0]
+    y = y + np.random.default_rng(3).normal(scale=0.01, size=len(x))
+    # 第二个初值处没有峰，面积应停在下限 0；第一个峰的中心只允许在初值 ± 0.5 个半高宽内移动
+    result = fit_peaks(x, y, [23.0, 40.0], [1.0, 1.0], [2.0, 2.0], shape='gaussian', center_tolerance=0.5, baseline_degree=0)
+    assert result.centers[0] == pytest.approx(22.0) and result.areas[1] >= 0.0
+    assert result.areas[1] < 5 * max(result.area_errors[1], 1e-3)
+
+
+def test_invalid_input():
+    x = np.linspace(0.0, 10.0, 100)
+    y = np.zeros_like(x)
+    with pytest.raises(ValueError):
+        fit_peaks(x, y, [5.0], [1.0], [1.0], shape='pseudo-voigt')
+    with pytest.raises(ValueError):
+        fit_peaks(x, y, [], [], [])
+    with pytest.raises(ValueError):
+        fit_peaks(x, y, [5.0], [1.0], [0.0])
+    with pytest.raises(ValueError):
+        fit_peaks(x[:5], y[:5], [5.0], [1.0], [1.0], baseline_degree=2)
@@ -0,0 +1,66 @@
+# chem_assistant/tests/test_spectrum_lod.py
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from utils.visualization.spectrum_lod import SpectrumLOD, LODLine
+
+
+def _spectrum(n=200_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(100.0, 2000.0, n)
+    y = rng.normal(scale=0.01, size=n)
+    # 峰间距大于一个像素桶，各峰都应单独保留
+    peaks = np.arange(30) * (n // 30) + rng.integers(0, n // 60, 30)
+    y[peaks] += rng.uniform(1, 10, 30)
+    return x, y, peaks
+
+
+def test_view_keeps_extrema_and_pixel_budget():
+    x, y, peaks = _spectrum()
+    lod = SpectrumLOD(x, y)
+    assert [b for b, _ in lod.levels[:3]] == [4, 16, 64]
+    for xmin, xmax in [(100.0, 2000.0), (500.0, 900.0), (1000.0, 1003.0)]:
+        xs, ys = lod.view(xmin, xmax, 800)
+        inside = (x >= xmin) & (x <= xmax)
+        assert len(xs) <= 2 * 800 + 2 and np.all(np.diff(xs) >= 0)
+        # 每个可见的峰都原样保留
+        assert set(np.flatnonzero(inside)[np.isin(np.flatnonzero(inside), peaks)]) <= set(np.searchsorted(x, xs))
+        assert ys.max() == y[inside].max() and ys.min() == y[inside].min()
+    # 可见点少于目标时直接返回原始点
+    xs, ys = lod.view(1000.0, 1000.5, 800)
+    assert np.array_equal(ys, y[np.searchsorted(x, xs)]) and len(xs) < 200
+
+
+def test_descending_and_nonfinite_input():
+    x, y, _ = _spectrum(5000)
+    y[10] = np.nan
+    lod = SpectrumLOD(x[::-1], y[::-1])
+    assert len(lod) == 4999 and np.all(np.diff(lod.x) > 0)
+    xs, ys = lod.view(2000.0, 100.0, 300)
+    assert xs[0] == 100.0 and xs[-1] == 2000.0 and np.isfinite(ys).all()
+    assert len(SpectrumLOD([], []).view(0, 1, 100)[0]) == 0
+
+
+def test_line_redecimates_on_zoom():
+    x, y, _ = _spectrum()
+    fig = Figure(figsize=(6, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    line = LODLine(ax, x, y, color="red")
+    full = line.line.get_xdata()
+    assert len(full) <= 2 * ax.get_window_extent().width + 2 and ax.get_xlim() == (100.0, 2000.0)
+    ax.set_xlim(600.0, 610.0)
+    zoomed = line.line.get_xdata()
+    assert zoomed[1] >= 600.0 - 1 and zoomed[-2] <= 610.0 + 1 and len(zoomed) > 100
+    ax.invert_xaxis()
+    assert np.array_equal(line.line.get_xdata(), zoomed)
+    fig.canvas.draw()
+    line.disconnect()
+    ax.set_xlim(100.0, 2000.0)
+    assert np.array_equal(line.line.get_xdata(), zoomed)
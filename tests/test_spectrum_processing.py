@@ -0,0 +1,81 @@
+# chem_assistant/tests/test_spectrum_processing.py
+
+import numpy as np
+import pytest
+from scipy.signal import find_peaks, peak_prominences as scipy_prominences
+
+from core.spectroscopy import processing
+from core.spectroscopy.processing import SpectrumPipeline, baseline, peak_prominences, pick_peaks
+
+
+def _synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(400.0, 4000.0, n)
+    drift = 1.0 + 0.5 * np.sin(x / 900.0) + 1e-4 * (x - 400.0)
+    centers = np.linspace(600.0, 3800.0, 8)
+    heights = rng.uniform(0.5, 3.0, 8)
+    signal = sum(h * np.exp(-0.5 * ((x - c) / 8.0) ** 2) for h, c in zip(heights, centers))
+    return x, drift + signal + rng.normal(scale=0.01, size=n), drift, centers, heights
+
+
+# AsLS 的基线落在噪声下沿 (约低 2~3σ)，arPLS 贴近噪声中线
+@pytest.mark.parametrize("method, tolerance", [('arpls', 0.01), ('asls', 0.04)])
+def test_baseline_follows_drift_under_peaks(method, tolerance):
+    x, y, drift, _, _ = _synthetic(3000)
+    assert np.abs(baseline(y, method, lam=1e6) - drift).max() < tolerance
+    assert not baseline(y, 'none').any()
+    with pytest.raises(ValueError):
+        baseline(y, 'polynomial')
+
+
+def test_coarse_baseline_matches_full_resolution(monkeypatch):
+    x, y, drift, _, _ = _synthetic(40_000)
+    coarse = baseline(y, lam=1e6 * 20 ** 4)
+    monkeypatch.setattr(processing, 'BASELINE_MAX_POINTS', 10 ** 6)
+    full = baseline(y, lam=1e6 * 20 ** 4)
+    assert np.abs(coarse - full).max() < 0.005 and np.abs(coarse - drift).max() < 0.01
+
+
+def test_prominences_match_scipy():
+    rng = np.random.default_rng(1)
+    for trial in range(100):
+        y = np.round(rng.normal(size=rng.integers(3, 400)).cumsum(), 1)
+        if trial % 3 == 0:
+            y = rng.integers(0, 4, len(y)).astype(float)  # 大量平台和相等的峰
+        peaks, _ = find_peaks(y)
+        ours, left, right = peak_prominences(y, peaks)
+        expected = scipy_prominences(y, peaks)
+        assert np.allclose(ours, expected[0])
+        assert np.array_equal(y[left], y[expected[1]]) and np.array_equal(y[right], y[expected[2]])
+
+
+def test_pick_peaks_thresholds():
+    x = np.linspace(0.0, 100.0, 2001)
+    y = 5 * np.exp(-0.5 * ((x - 30) / 1.0) ** 2) + 0.5 * np.exp(-0.5 * ((x - 60) / 0.1) ** 2)
+    peaks = pick_peaks(x, y, noise=0.05)
+    assert np.allclose(peaks.position, [30, 60]) and np.allclose(peaks.snr, [100, 10], rtol=1e-3)
+    assert peaks.fwhm[0] == pytest.approx(2.3548, rel=1e-2)
+    assert np.allclose(pick_peaks(x, y, noise=0.05, min_width=1.0).position, [30])
+    assert np.allclose(pick_peaks(x, y, noise=0.05, min_snr=20).position, [30])
+
+
+def test_pipeline_recomputes_only_downstream_stages():
+    x, y, _, centers, heights = _synthetic(5000)
+    pipeline = SpectrumPipeline(x[::-1], y[::-1], smooth={'window': 21})
+    result = pipeline.run()
+    assert np.all(np.diff(result.x) > 0) and result.noise == pytest.approx(0.01, rel=0.15)
+    assert np.allclose(result.peaks.position, centers, atol=1.0)
+    assert np.allclose(result.peaks.height, heights, rtol=0.05, atol=0.02)
+
+    pipeline.set_params('peaks', min_snr=100)
+    assert len(pipeline.run().peaks.index) == np.count_nonzero(heights > 1.0)
+    assert pipeline.runs == {'baseline': 1, 'smooth': 1, 'peaks': 2}
+    pipeline.set_params('smooth', window=31)
+    pipeline.run()
+    pipeline.run()
+    assert pipeline.runs == {'baseline': 1, 'smooth': 2, 'peaks': 3}
+    with pytest.raises(ValueError):
+        pipeline.set_params('smooth', width=5)
+    pipeline.set_params('smooth', window=10)
+    with pytest.raises(ValueError):
+        pipeline.run()
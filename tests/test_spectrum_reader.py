@@ -0,0 +1,114 @@
+# chem_assistant/tests/test_spectrum_reader.py
+
+import os
+
+import numpy as np
+import pytest
+
+from utils.file_io import spectrum_reader
+from utils.file_io.spectrum_reader import read_spectrum, sniff_spectrum, parse_metadata, prune_spectrum_cache
+
+
+def test_instrument_export_with_decimal_comma(tmp_path):
+    text = ("Instrument: FTIR-8400\r\nDate: 2024-03-01 12:30:00\r\nResolution: 4,0\r\nScans;32\r\n"
+            "Wavenumber;Absorbance\r\n4000,0;0,0123\r\n3998,5;0,0125\r\n3997,0;-1,5E-03\r\n3995,5;0,0130\r\n"
+            "[End]\r\nOperator: 张三\r\n")
+    path = tmp_path / "ftir.csv"
+    path.write_bytes(text.encode('gb18030'))
+    spectrum = read_spectrum(str(path))
+    assert spectrum.dialect == spectrum_reader.Dialect('gb18030', ';', ',', 2, 5, 2)
+    assert np.allclose(spectrum.x, [4000, 3998.5, 3997, 3995.5]) and spectrum.y[2] == pytest.approx(-1.5e-3)
+    assert spectrum.columns == ('Wavenumber', 'Absorbance')
+    assert spectrum.metadata['Date'] == "2024-03-01 12:30:00" and spectrum.metadata['Resolution'] == 4.0
+    assert spectrum.metadata['Scans'] == 32.0 and spectrum.metadata['Operator'] == "张三"
+
+
+@pytest.mark.parametrize("content, delimiter, columns", [
+    ('"x","y"\n1.0,"2.0"\n2.0,3.0\n3.0,4.0\n', ',', 2),
+    ("x\ty\tz\n1\t2\t3\n2\t3\t4\n3\t4\t5\n", '\t', 3),
+    ("# title = test\n\n 1.0   2.0\n 2.0   3.0\n\n 3.0   4.0\n", None, 2),
+    ("1|2\n2|4\n3|6\n", '|', 2),
+])
+def test_delimiters(tmp_path, content, delimiter, columns):
+    path = tmp_path / "data.txt"
+    path.write_text(content)
+    spectrum = read_spectrum(str(path))
+    assert spectrum.dialect.delimiter == delimiter and spectrum.data.shape == (3, columns)
+    assert np.array_equal(spectrum.x, [1, 2, 3])
+
+
+def test_missing_values_bom_and_utf16(tmp_path):
+    path = tmp_path / "missing.csv"
+    path.write_text("a,b\n1,2\n3,\n5,6\n7,8\n")
+    spectrum = read_spectrum(str(path))
+    assert spectrum.columns == ('a', 'b') and np.isnan(spectrum.data[1, 1]) and spectrum.data[3, 1] == 8
+
+    path.write_bytes("\ufeffx,y\n1,2\n3,4\n".encode('utf-8'))
+    assert sniff_spectrum(str(path)).encoding == 'utf-8-sig'
+    assert read_spectrum(str(path)).columns == ('x', 'y')
+    path.write_bytes("波数\t强度\n1,5\t2\n3,5\t4\n".encode('utf-16'))
+    spectrum = read_spectrum(str(path))
+    assert spectrum.columns == ('波数', '强度') and np.array_equal(spectrum.x, [1.5, 3.5])
+
+    path.write_text("no numbers here\njust text\n")
+    with pytest.raises(ValueError):
+        read_spectrum(str(path))
+
+
+def test_large_file_bulk_paths_match_loadtxt(tmp_path, monkeypatch):
+    # 嗅探样本缩小，让测试文件走 "只读头尾样本 + 流式解析" 的路径
+    monkeypatch.setattr(spectrum_reader, 'SNIFF_BYTES', 256)
+    rng = np.random.default_rng(0)
+    data = np.column_stack([np.linspace(400, 4000, 5000), rng.normal(size=5000)])
+    body = "\n".join(f"{a:.4f},{b:.6e}" for a, b in data)
+    path = tmp_path / "big.csv"
+    path.write_text("Title: test\nx,y\n" + body + "\n\nEnd\nPoints: 5000\n")
+    spectrum = read_spectrum(str(path))
+    expected = np.loadtxt(body.splitlines(), delimiter=',')
+    assert np.array_equal(spectrum.data, expected) and spectrum.metadata['Points'] == 5000
+    assert spectrum.dialect.header_lines == 2 and spectrum.dialect.footer_lines == 2
+
+    path.write_text("Title: test\n" + body.replace(',', ';').replace('.', ',') + "\n")
+    assert np.array_equal(read_spectrum(str(path)).data, expected)
+
+
+def test_parse_metadata_forms():
+    metadata = parse_metadata(["##TITLE=Benzene", "Range,400,4000", "Time: 12:30", "free text", "% Gain = 2"], ',', '.')
+    assert metadata == {'TITLE': "Benzene", 'Range': [400.0, 4000.0], 'Time': "12:30", 'comments': ["free text"],
+                        'Gain': 2.0}
+
+
+def test_cache_hit_is_memory_mapped_and_invalidated(tmp_path):
+    path = tmp_path / "ms.csv"
+    path.write_text("Scan: 7\nmz,intensity\n" + "\n".join(f"{100 + k * 0.01:.2f},{k % 97}" for k in range(2000)) + "\n")
+    cache = tmp_path / "cache"
+    first = read_spectrum(str(path), cache_dir=str(cache), cache_threshold=0)
+    second = read_spectrum(str(path), cache_dir=str(cache), cache_threshold=0)
+    assert not first.cached and second.cached and isinstance(second.data, np.memmap)
+    assert not second.data.flags.writeable
+    assert np.array_equal(first.data, second.data) and second.metadata == {'Scan': 7.0}
+    assert second.columns == ('mz', 'intensity') and second.dialect == first.dialect
+
+    # 文件内容改变 (大小、修改时间、摘要都变了) 后缓存失效
+    path.write_text("mz,intensity\n1,2\n3,4\n")
+    os.utime(path, ns=(1, 1))
+    assert read_spectrum(str(path), cache_dir=str(cache), cache_threshold=0).data.shape == (2, 2)
+    assert len(list(cache.glob("*.npy"))) == 2
+
+
+def test_cache_lru_budget(tmp_path):
+    cache = tmp_path / "cache"
+    entries = []
+    for k in range(3):
+        path = tmp_path / f"s{k}.csv"
+        path.write_text("\n".join(f"{i},{i * k}" for i in range(1000)) + "\n")
+        read_spectrum(str(path), cache_dir=str(cache), cache_threshold=0)
+        entry = spectrum_reader._cache_base(str(path), str(cache)) + ".npy"
+        os.utime(entry, ns=(k * 10 ** 9, k * 10 ** 9))
+        entries.append((path, entry))
+    # 再次打开 s0 (命中) 使它成为最近使用的条目
+    assert read_spectrum(str(entries[0][0]), cache_dir=str(cache), cache_threshold=0).cached
+    entry_size = os.path.getsize(entries[0][1]) + os.path.getsize(entries[0][1][:-4] + ".json")
+    prune_spectrum_cache(str(cache), max_bytes=2 * entry_size + 10)
+    assert sorted(str(p) for p in cache.glob("*.npy")) == sorted([entries[0][1], entries[2][1]])
+    assert not os.path.exists(entries[1][1][:-4] + ".json")
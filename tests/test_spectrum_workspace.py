@@ -0,0 +1,88 @@
+# chem_assistant/tests/test_spectrum_workspace.py
+
+import numpy as np
+import pytest
+
+from core.spectroscopy import workspace
+from core.spectroscopy.workspace import SpectraWorkspace, common_grid, resample, load_workspace
+
+
+def _write_series(directory, count=6, points=400):
+    for i in range(count):
+        x = np.linspace(400.0 + i, 2000.0 - i, points + 10 * i)[::-1]  # 降序、范围和点数各不相同
+        y = (1.0 + i) * np.exp(-0.5 * ((x - 1200.0) / 20.0) ** 2) + 0.1 * i
+        np.savetxt(directory / f"s{i:02d}.csv", np.column_stack([x, y]), delimiter=',', header='x,y', comments='')
+    (directory / "notes.txt").write_text("no numbers here\n")
+    (directory / "image.png").write_bytes(b"\x89PNG")
+
+
+def test_resample_interpolates_or_bin_averages():
+    x = np.linspace(0.0, 10.0, 10_001)
+    y = np.random.default_rng(1).normal(size=len(x))
+    fine = resample(x[::10], np.sin(x[::10]), np.linspace(-1.0, 5.0, 1201))
+    assert np.isnan(fine[:200]).all() and np.allclose(fine[200:], np.sin(np.linspace(0.0, 5.0, 1001)), atol=1e-4)
+    # 粗网格：每个网格点是约 100 个原始点的平均，噪声降为 1/10
+    coarse = resample(x, y, np.linspace(0.0, 10.0, 101))
+    assert np.isfinite(coarse).all() and np.std(coarse) == pytest.approx(0.1, rel=0.2)
+    assert coarse[50] == pytest.approx(y[(x >= 4.95) & (x < 5.05)].mean(), abs=0.02)
+
+
+def test_common_grid_span_and_memory_budget():
+    spectra = [(np.linspace(0.0, 10.0, 101), None), (np.linspace(2.0, 12.0, 1001), None)]
+    grid = common_grid(spectra)
+    assert grid[0] == 2.0 and grid[-1] == 10.0 and np.diff(grid)[0] == pytest.approx(0.01)
+    assert common_grid(spectra, 'all')[[0, -1]].tolist() == [0.0, 12.0]
+    assert len(common_grid(spectra, max_bytes=8 * 2 * 100)) == 100
+    with pytest.raises(ValueError):
+        common_grid([(np.linspace(0.0, 1.0, 5), None), (np.linspace(2.0, 3.0, 5), None)])
+    with pytest.raises(ValueError):
+        common_grid(spectra, 'overlap')
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_directory(tmp_path, workers):
+    _write_series(tmp_path)
+    progress = []
+    ws = load_workspace(tmp_path, workers=workers, cache_dir=str(tmp_path / "cache"),
+                        callback=lambda done, total: progress.append((done, total)))
+    assert ws.names == [f"s{i:02d}.csv" for i in range(6)] and len(ws) == 6
+    assert [e.path.endswith("notes.txt") for e in ws.errors] == [True]
+    assert progress[-1] == (7, 7) and ws.grid[0] == 405.0 and ws.grid[-1] == 1995.0
+    assert np.all(np.diff(ws.grid) > 0) and np.isfinite(ws.data).all()
+    i = np.arange(6)[:, None]
+    assert np.allclose(ws.data, (1.0 + i) * np.exp(-0.5 * ((ws.grid - 1200.0) / 20.0) ** 2) + 0.1 * i, atol=0.01)
+    with pytest.raises(ValueError):
+        load_workspace([tmp_path / "notes.txt"])
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(ValueError):
+        load_workspace(tmp_path / "empty")
+
+
+def test_whole_array_operations():
+    grid = np.linspace(0.0, 4.0, 5)
+    data = np.array([[0.0, 1.0, 2.0, 1.0, 0.0],
+                     [1.0, 3.0, 5.0, 3.0, 1.0],
+                     [np.nan, 2.0, 2.0, 2.0, np.nan]])
+    ws = SpectraWorkspace(grid, data, ["a", "b", "c"])
+    assert np.allclose(np.nanmax(ws.normalized('max'), axis=1), 1.0)
+    assert np.allclose(np.nansum(ws.normalized('area')[:2], axis=1), 1.0)
+    minmax = ws.normalized('minmax')
+    assert np.allclose(minmax[1], [0, 0.5, 1, 0.5, 0]) and np.allclose(minmax[2, 1:4], 0.0)  # 常数谱只平移不缩放
+    snv = ws.normalized('snv')[:2]
+    assert np.allclose(snv.mean(axis=1), 0.0) and np.allclose(snv.std(axis=1), 1.0)
+    assert ws.normalized('none') is ws.data
+    assert np.allclose(ws.average(), [0.5, 2.0, 3.0, 2.0, 0.5])
+    assert np.allclose(ws.difference(0)[1], [1, 2, 3, 2, 1]) and np.isnan(ws.difference('mean')[2, 0])
+    stacked = ws.stacked(offset=10.0)
+    assert np.allclose(stacked[2, 1:4] - data[2, 1:4], 20.0)
+    for call in (lambda: ws.normalized('l2'), lambda: ws.difference(5), lambda: ws.difference('median'),
+                 lambda: SpectraWorkspace(grid, data[:, :4], ["a", "b", "c"])):
+        with pytest.raises(ValueError):
+            call()
+
+
+def test_small_batches_stay_in_threads(tmp_path, monkeypatch):
+    _write_series(tmp_path, count=1)
+    # 只有一个需要解析的文件时不启动进程池
+    monkeypatch.setattr(workspace, 'ProcessPoolExecutor', None)
+    assert len(load_workspace([tmp_path / "s00.csv"], workers=4)) == 1
@@ -0,0 +1,86 @@
+# chem_assistant/tests/test_structure_io.py
+
+import numpy as np
+
+from core.structure.bonds import perceive_bonds, find_neighbor_pairs
+from utils.file_io.molecule_reader import read_structure, normalize_elements
+
+ETHANOL_XYZ = """9
+ethanol
+C   -0.0017  1.0856  0.0000
+C   -0.0017 -0.4400  0.0000
+O    1.3400 -0.9000  0.0000
+H   -1.0300  1.4500  0.0000
+H    0.5100  1.4600  0.8900
+H    0.5100  1.4600 -0.8900
+H   -0.5200 -0.8100  0.8900
+H   -0.5200 -0.8100 -0.8900
+H    1.3400 -1.8700  0.0000
+"""
+
+WATER_MOL = """water
+  test
+
+  3  2  0  0  0  0  0  0  0  0999 V2000
+    0.0000    0.0000    0.1173 O   0  0  0  0  0  0  0  0  0  0  0  0
+    0.0000    0.7572   -0.4692 H   0  0  0  0  0  0  0  0  0  0  0  0
+    0.0000   -0.7572   -0.4692 H   0  0  0  0  0  0  0  0  0  0  0  0
+  1  2  1  0
+  1  3  1  0
+M  END
+$$$$
+"""
+
+
+def pdb_line(serial, name, x, y, z, element=""):
+    return "HETATM%5d %-4s HOH A   1    %8.3f%8.3f%8.3f  1.00  0.00          %2s  \n" % (serial, name, x, y, z, element)
+
+
+def test_read_xyz_perceives_bonds(tmp_path):
+    path = tmp_path / "ethanol.xyz"
+    path.write_text(ETHANOL_XYZ)
+    molecule = read_structure(str(path))
+
+    assert molecule.formula == "C2H6O"
+    assert len(molecule.bonds) == 8
+    assert [0, 1] in molecule.bonds.tolist() and [1, 2] in molecule.bonds.tolist()
+
+
+def test_read_mol_uses_file_bonds(tmp_path):
+    path = tmp_path / "water.sdf"
+    path.write_text(WATER_MOL)
+    molecule = read_structure(str(path))
+
+    assert list(molecule.elements) == ['O', 'H', 'H']
+    assert molecule.bonds.tolist() == [[0, 1], [0, 2]]
+    assert np.allclose(molecule.coords[1], [0.0, 0.7572, -0.4692])
+
+
+def test_read_pdb_infers_missing_elements(tmp_path):
+    path = tmp_path / "water.pdb"
+    path.write_text(pdb_line(1, " O", 0.0, 0.0, 0.117, "O") + pdb_line(2, " H1", 0.0, 0.757, -0.469)
+                    + pdb_line(3, " H2", 0.0, -0.757, -0.469) + "END\n")
+    molecule = read_structure(str(path))
+
+    assert list(molecule.elements) == ['O', 'H', 'H']
+    assert molecule.bonds.tolist() == [[0, 1], [0, 2]]
+
+
+def test_normalize_elements():
+    assert list(normalize_elements(['CL', 'c', '8', 'Fe2', '1HB'])) == ['Cl', 'C', 'O', 'Fe', 'H']
+
+
+def test_cell_list_matches_all_pairs():
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(0, 12, size=(600, 3))
+    i, j, d = find_neighbor_pairs(coords, 2.0)
+    found = set(zip(i.tolist(), j.tolist()))
+
+    diff = np.linalg.norm(coords[:, None, :] - coords[None, :, :], axis=2)
+    ref_i, ref_j = np.nonzero(np.triu(diff < 2.0, k=1))
+    assert found == set(zip(ref_i.tolist(), ref_j.tolist()))
+    assert np.allclose(d, np.linalg.norm(coords[i] - coords[j], axis=1))
+
+    elements = np.array(['C'] * len(coords), dtype=object)
+    bonds = perceive_bonds(elements, coords)
+    assert np.all(bonds[:, 0] < bonds[:, 1])
@@ -0,0 +1,54 @@
+# chem_assistant/tests/test_surface.py
+
+import numpy as np
+import pytest
+
+from core.structure import surface
+from core.structure.molecule import Molecule
+from core.structure.surface import molecular_surface, atom_accessible_areas, voxel_volume
+from utils.visualization.scene import surface_scene, exposure_colors, EXPOSURE_COLORMAP
+
+
+def test_isolated_atom_matches_sphere():
+    result = molecular_surface(Molecule(['C'], [[1.0, 2.0, 3.0]]))
+    assert result.total_area == pytest.approx(4 * np.pi * (1.70 + 1.4) ** 2)
+    assert result.volume == pytest.approx(4 / 3 * np.pi * 1.70 ** 3, rel=0.01)
+    assert result.exposure.tolist() == [1.0]
+
+
+def test_overlapping_pair_matches_analytic_values():
+    radius, distance = 1.70, 1.5
+    cap = radius - distance / 2
+    pair = Molecule(['C', 'C'], [[0, 0, 0], [distance, 0, 0]])
+    result = molecular_surface(pair, probe_radius=0.0, n_points=2000, spacing=0.25)
+    assert result.total_area == pytest.approx(2 * (4 * np.pi * radius ** 2 - 2 * np.pi * radius * cap), rel=0.01)
+    lens = 2 * np.pi * cap ** 2 * (3 * radius - cap) / 3
+    assert result.volume == pytest.approx(2 * 4 / 3 * np.pi * radius ** 3 - lens, rel=0.01)
+
+
+def test_buried_atom_and_batching(monkeypatch):
+    grid = np.stack(np.meshgrid(*[np.arange(5) * 1.6] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    coords = grid + np.random.default_rng(0).normal(scale=0.05, size=grid.shape)
+    radii = np.full(len(coords), 1.7)
+    areas, exposure = atom_accessible_areas(coords, radii)
+    assert exposure[62] == 0.0  # 5×5×5 立方块正中的原子
+    assert exposure.max() > 0.2
+
+    # 分批边界不影响结果
+    monkeypatch.setattr(surface, '_BATCH_TESTS', 1000)
+    assert np.array_equal(atom_accessible_areas(coords, radii)[0], areas)
+    assert voxel_volume(coords, radii) == pytest.approx(voxel_volume(coords, radii, spacing=0.15), rel=0.01)
+
+
+def test_surface_scene_colors_by_exposure():
+    molecule = Molecule(['O', 'H', 'H'], [[0, 0, 0.117], [0, 0.757, -0.469], [0, -0.757, -0.469]])
+    result = molecular_surface(molecule)
+    scene = surface_scene(molecule, result)
+    assert scene['style'] == 'spheres'
+    assert np.allclose(scene['radii'], [1.52, 1.20, 1.20])
+    assert result.exposure[1] == pytest.approx(result.exposure[2], abs=0.05)
+    assert scene['colors'].shape == (3, 3)
+    colors = exposure_colors([0.0, 0.5, 1.0], vmax=1.0)
+    assert np.array_equal(colors, EXPOSURE_COLORMAP.astype(np.uint8))
+    with pytest.raises(ValueError):
+        molecular_surface(molecule, probe_radius=-1.0)
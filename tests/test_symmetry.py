@@ -0,0 +1,111 @@
+# chem_assistant/tests/test_symmetry.py
+
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from core.structure.embedding import smiles_to_3d
+from core.structure.forcefield import optimize_geometry
+from core.structure.molecule import Molecule
+from core.structure.symmetry import detect_point_group, format_symmetry_elements
+from core.structure.vsepr import classify_formula, vsepr_molecule
+from utils.visualization.scene import symmetry_overlays
+
+
+def _fullerene():
+    """C60 (截角二十面体)：(0, ±1, ±3φ)、(±1, ±(2+φ), ±2φ)、(±φ, ±2, ±φ³) 的循环置换"""
+    phi = (1 + 5 ** 0.5) / 2
+    points = set()
+    for base in [(0, 1, 3 * phi), (1, 2 + phi, 2 * phi), (phi, 2, phi ** 3)]:
+        for shift in range(3):
+            rotated = base[shift:] + base[:shift]
+            for signs in itertools.product((1, -1), repeat=3):
+                points.add(tuple(round(s * x, 9) for s, x in zip(signs, rotated)))
+    return Molecule(['C'] * 60, np.array(sorted(points)) * 0.7)
+
+
+@pytest.mark.parametrize("formula, group", [
+    ("H2O", "C2v"), ("NH3", "C3v"), ("CH4", "Td"), ("SF6", "Oh"), ("XeF4", "D4h"), ("PCl5", "D3h"),
+    ("BF3", "D3h"), ("SF4", "C2v"), ("IF5", "C4v"), ("IF7", "D5h"), ("CO2", "D∞h"), ("HCN", "C∞v"),
+])
+def test_vsepr_point_groups(formula, group):
+    assert detect_point_group(vsepr_molecule(classify_formula(formula))).point_group == group
+
+
+@pytest.mark.parametrize("smiles, group", [
+    ("c1ccccc1", "D6h"), ("CC", "D3d"), ("Cl/C=C/Cl", "C2h"), ("C12C3C4C1C5C2C3C45", "Oh"),
+    ("FC(Cl)(Br)I", "C1"),
+])
+def test_optimized_molecule_point_groups(smiles, group):
+    molecule = optimize_geometry(smiles_to_3d(smiles, seed=0)).molecule
+    assert detect_point_group(molecule).point_group == group
+
+
+@pytest.mark.parametrize("smiles, group, counts", [
+    ("CC", "D3d", {'C3': 1, 'C2': 3, 'S6': 1, 'σd': 3, 'i': 1}),
+    ("ClC(Cl)(Cl)Cl", "Td", {'C3': 4, 'C2': 3, 'S4': 3, 'σd': 6}),
+    ("C", "Td", {'C3': 4, 'C2': 3, 'S4': 3, 'σd': 6}),
+    ("C=C", "D2h", {'C2': 3, 'σh': 1, 'σv': 2, 'i': 1}),
+    ("N", "C3v", {'C3': 1, 'σv': 3}),
+    ("c1ccccc1", "D6h", {'C6': 1, 'C2': 6, 'S6': 1, 'σh': 1, 'σv': 3, 'σd': 3, 'i': 1}),
+    ("C12C3C4C1C5C2C3C45", "Oh", {'C4': 3, 'C3': 4, 'C2': 6, 'S4': 3, 'S6': 4, 'σh': 3, 'σd': 6, 'i': 1}),
+])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_optimized_molecule_element_counts(smiles, group, counts, seed):
+    # 力场优化的结构不是严格对称的：容差内成立的近重复轴/镜面必须合并成一个
+    result = detect_point_group(optimize_geometry(smiles_to_3d(smiles, seed=seed)).molecule)
+    assert result.point_group == group
+    assert Counter(e.symbol for e in result.symmetry_elements) == counts
+
+
+@pytest.mark.parametrize("formula, counts", [
+    ("XeF4", {'C4': 1, 'C2': 4, 'S4': 1, 'σh': 1, 'σv': 2, 'σd': 2, 'i': 1}),
+    ("IF5", {'C4': 1, 'σv': 2, 'σd': 2}),
+    ("PCl5", {'C3': 1, 'C2': 3, 'S3': 1, 'σh': 1, 'σv': 3}),
+])
+def test_vertical_mirror_classes(formula, counts):
+    # σv 经过 C2' (配体所在方向)，σd 平分相邻的 σv
+    molecule = vsepr_molecule(classify_formula(formula))
+    result = detect_point_group(molecule)
+    assert Counter(e.symbol for e in result.symmetry_elements) == counts
+    on_plane = {'σv': set(), 'σd': set()}
+    for e in result.symmetry_elements:
+        if e.symbol in on_plane:
+            on_plane[e.symbol].add(np.count_nonzero(np.abs((molecule.coords - result.center) @ e.vector) < 1e-3))
+    assert not on_plane['σd'] or min(on_plane['σv']) > max(on_plane['σd'])
+
+
+def test_symmetry_elements_of_common_groups():
+    elements = detect_point_group(vsepr_molecule(classify_formula("CH4"))).symmetry_elements
+    assert Counter(e.symbol for e in elements) == {'C3': 4, 'C2': 3, 'S4': 3, 'σd': 6}
+
+    fullerene = detect_point_group(_fullerene())
+    assert fullerene.point_group == "Ih"
+    assert Counter(e.symbol for e in fullerene.symmetry_elements) == {'C5': 6, 'C3': 10, 'C2': 15, 'S10': 6,
+                                                                      'S6': 10, 'σ': 15, 'i': 1}
+    assert format_symmetry_elements(detect_point_group(vsepr_molecule(classify_formula("H2O"))).symmetry_elements) \
+        == "E, C2, 2σv"
+
+
+def test_tolerance_absorbs_coordinate_noise():
+    molecule = optimize_geometry(smiles_to_3d("CC(C)(C)C", seed=0)).molecule
+    molecule.coords += np.random.default_rng(0).normal(scale=0.02, size=molecule.coords.shape)
+    assert detect_point_group(molecule).point_group == "Td"
+    assert detect_point_group(molecule, tolerance=0.01).point_group == "C1"
+    with pytest.raises(ValueError):
+        detect_point_group(molecule, tolerance=0)
+
+
+def test_symmetry_overlays():
+    molecule = vsepr_molecule(classify_formula("BF3"))
+    result = detect_point_group(molecule)
+    overlays = symmetry_overlays(result, molecule.coords)
+    # 与 C3 重合的 S3 合并成一条轴
+    assert sorted(overlays['axis_labels']) == ['C2', 'C2', 'C2', 'C3/S3']
+    assert overlays['axis_points'].shape == (4, 2, 3) and overlays['plane_corners'].shape == (4, 4, 3)
+    assert overlays['inversion_center'] is None
+    normals = np.array([e.vector for e in result.symmetry_elements if e.symbol.startswith('σ')])
+    corners = overlays['plane_corners'] - result.center
+    assert np.allclose(np.einsum('pkj,pj->pk', corners, normals), 0, atol=1e-5)
@@ -0,0 +1,87 @@
+# chem_assistant/tests/test_trajectory.py
+
+import struct
+import numpy as np
+import pytest
+
+from utils.file_io.trajectory_reader import open_trajectory, XYZTrajectory
+
+
+def write_xyz(path, frames, elements, fmt="%12.6f"):
+    with open(path, 'w') as f:
+        for k, frame in enumerate(frames):
+            f.write(f"{len(frame)}\nframe {k}\n")
+            for element, xyz in zip(elements, frame):
+                f.write(f"{element:2s} " + " ".join(fmt % v for v in xyz) + "\n")
+
+
+def write_dcd(path, frames, cell=False):
+    n_frames, n_atoms = frames.shape[:2]
+    ints = [0] * 20
+    ints[0], ints[10], ints[19] = n_frames, int(cell), 24
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<i4s20ii', 84, b'CORD', *ints, 84))
+        f.write(struct.pack('<ii', 84, 1) + b'test'.ljust(80) + struct.pack('<i', 84))
+        f.write(struct.pack('<iii', 4, n_atoms, 4))
+        for frame in frames:
+            if cell:
+                f.write(struct.pack('<i6di', 48, 10, 90, 10, 90, 90, 10, 48))
+            for axis in range(3):
+                f.write(struct.pack('<i', 4 * n_atoms) + frame[:, axis].astype('<f4').tobytes() + struct.pack('<i', 4 * n_atoms))
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(1)
+    return rng.uniform(-5, 5, size=(12, 7, 3))
+
+
+def test_xyz_fixed_width_frames(tmp_path, frames):
+    path = tmp_path / "traj.xyz"
+    write_xyz(path, frames, ['O', 'H', 'H', 'C', 'N', 'H', 'H'])
+    with open_trajectory(str(path), cache_frames=3) as trajectory:
+        assert trajectory.n_frames == 12 and trajectory.n_atoms == 7
+        assert list(trajectory.elements[:3]) == ['O', 'H', 'H']
+        for index in (0, 5, 11, -1, 3):
+            assert np.allclose(trajectory[index], frames[index], atol=1e-6)
+        assert len(trajectory._cache) == 3
+        assert trajectory.frame_title(7) == "frame 7"
+        with pytest.raises(IndexError):
+            trajectory.get_frame(12)
+
+
+def test_xyz_variable_width_frames(tmp_path, frames):
+    """各帧字节长度不同时应退回逐行扫描"""
+    path = tmp_path / "traj.xyz"
+    write_xyz(path, frames, ['C'] * 7, fmt="%g")
+    trajectory = XYZTrajectory(str(path))
+    assert trajectory.n_frames == 12
+    assert np.allclose(trajectory[6], frames[6], atol=1e-4)
+    trajectory.close()
+
+
+def test_xyz_ignores_truncated_last_frame(tmp_path, frames):
+    path = tmp_path / "traj.xyz"
+    write_xyz(path, frames, ['C'] * 7)
+    text = path.read_text()
+    path.write_text(text[:len(text) - 60])
+    with open_trajectory(str(path)) as trajectory:
+        assert trajectory.n_frames == 11
+
+
+@pytest.mark.parametrize("cell", [False, True])
+def test_dcd_memmap_frames(tmp_path, frames, cell):
+    path = tmp_path / "traj.dcd"
+    write_dcd(path, frames, cell=cell)
+    with open_trajectory(str(path), topology=['C'] * 7) as trajectory:
+        assert trajectory.n_frames == 12 and trajectory.n_atoms == 7
+        assert np.allclose(trajectory[9], frames[9], atol=1e-5)
+
+
+def test_dcd_requires_topology(tmp_path, frames):
+    path = tmp_path / "traj.dcd"
+    write_dcd(path, frames)
+    with pytest.raises(ValueError):
+        open_trajectory(str(path))
+    with pytest.raises(ValueError):
+        open_trajectory(str(path), topology=['C'] * 3)
@@ -0,0 +1,50 @@
+# chem_assistant/tests/test_viewer_ipc.py
+
+import numpy as np
+
+from core.crystallography.crystal import UnitCell, CrystalStructure
+from core.structure.molecule import Molecule
+from utils.visualization.scene import molecule_scene, crystal_scene, LARGE_STRUCTURE_ATOMS
+from utils.visualization.shared_arrays import SharedArrayWriter, SharedArrayReader, SharedArrayRef
+
+
+def test_shared_arrays_round_trip():
+    writer, reader = SharedArrayWriter(), SharedArrayReader()
+    try:
+        coords = np.random.default_rng(0).random((50000, 3)).astype(np.float32)
+        small = np.arange(6, dtype=np.int32).reshape(3, 2)
+        message = ('scene', {'coords': coords, 'bonds': small, 'lines': (coords[:10], small), 'title': "test"})
+        encoded = writer.encode(message)
+        assert isinstance(encoded[1]['coords'], SharedArrayRef)
+        assert encoded[1]['bonds'] is small  # 小数组直接随消息传递
+
+        decoded = reader.decode(encoded)
+        assert np.array_equal(decoded[1]['coords'], coords)
+        assert decoded[1]['title'] == "test"
+        # 解码得到的是副本，发送端复用共享内存不会影响已收到的数据
+        writer.encode(('coords', coords + 1.0))
+        assert np.array_equal(decoded[1]['coords'], coords)
+
+        # 容量不够时换一块更大的共享内存
+        bigger = np.ones((200000, 3))
+        decoded = reader.decode(writer.encode(('coords', bigger)))
+        assert np.array_equal(decoded[1], bigger)
+    finally:
+        reader.close(); writer.close()
+
+
+def test_scene_builders():
+    water = Molecule(['O', 'H', 'H'], [[0, 0, 0.117], [0, 0.757, -0.469], [0, -0.757, -0.469]], bonds=[[0, 1], [0, 2]])
+    scene = molecule_scene(water)
+    assert scene['style'] == 'ball_and_stick'
+    assert scene['coords'].dtype == np.float32 and scene['colors'].shape == (3, 3)
+    assert scene['bonds'].tolist() == [[0, 1], [0, 2]]
+
+    crowd = Molecule(['C'] * (LARGE_STRUCTURE_ATOMS + 1), np.zeros((LARGE_STRUCTURE_ATOMS + 1, 3)))
+    assert molecule_scene(crowd)['style'] == 'points'
+
+    nacl = CrystalStructure(UnitCell(5.64, 5.64, 5.64), ['Na', 'Cl'], [[0, 0, 0], [0.5, 0.5, 0.5]])
+    scene = crystal_scene(nacl, (2, 2, 2))
+    points, segments = scene['lines']
+    assert len(points) == 8 and len(segments) == 12
+    assert scene['style'] == 'spheres' and len(scene['bonds']) == 0
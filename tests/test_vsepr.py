@@ -0,0 +1,82 @@
+# chem_assistant/tests/test_vsepr.py
+
+import numpy as np
+import pytest
+
+from core.structure.vsepr import classify_formula, classify_formulas, vsepr_molecule, lone_pair_directions
+from utils.chem_utils.element_data import covalent_radius
+from utils.chem_utils.formula import parse_formula, normalize_case
+
+
+@pytest.mark.parametrize("formula, center, shape, lone_pairs", [
+    ("H2O", "O", "Bent (Tetrahedral)", 2),
+    ("NH3", "N", "Trigonal pyramidal", 1),
+    ("CO2", "C", "Linear", 0),
+    ("SO2", "S", "Bent (Trigonal)", 1),
+    ("H2SO4", "S", "Tetrahedral", 0),
+    ("HNO3", "N", "Trigonal planar", 0),
+    ("SF4", "S", "Seesaw", 1),
+    ("ClF3", "Cl", "T-shaped", 2),
+    ("XeF2", "Xe", "Linear", 3),
+    ("BrF5", "Br", "Square pyramidal", 1),
+    ("XeF4", "Xe", "Square planar", 2),
+    ("NH4+", "N", "Tetrahedral", 0),
+    ("ClO3-", "Cl", "Trigonal pyramidal", 1),
+    ("IF7", "I", "Pentagonal bipyramidal", 0),
+    ("N2O", "N", "Linear", 0),
+    ("ON2", "N", "Linear", 0),
+    ("S2O", "S", "Bent (Trigonal)", 1),
+    ("Cl2O", "O", "Bent (Tetrahedral)", 2),
+    ("HF2-", "H", "Linear", 0),
+])
+def test_classify_formula(formula, center, shape, lone_pairs):
+    result = classify_formula(formula)
+    assert (result.center, result.shape, result.lone_pairs) == (center, shape, lone_pairs)
+
+
+def test_classification_is_cached_per_composition():
+    assert classify_formula("OH2") is classify_formula("H2O")
+
+
+def test_batch_classification():
+    results = classify_formulas(["CH4", "C2H6", "CH4", "Xx2"])
+    assert results[0].shape == "Tetrahedral" and results[2] is results[0]
+    assert results[1] is None and results[3] is None
+    with pytest.raises(ValueError):
+        classify_formulas(["C2H6"], skip_errors=False)
+
+
+def test_ideal_geometry_uses_covalent_radii():
+    molecule = vsepr_molecule("CH4")
+    bonds = molecule.coords[1:]
+    assert np.allclose(np.linalg.norm(bonds, axis=1), covalent_radius('C') + covalent_radius('H'))
+    unit = bonds / np.linalg.norm(bonds, axis=1, keepdims=True)
+    angles = np.degrees(np.arccos(np.clip(unit @ unit.T, -1, 1)))[np.triu_indices(4, 1)]
+    assert np.allclose(angles, 109.4712, atol=1e-3)
+
+    # 三角双锥中电负性大的 F 占轴向
+    molecule = vsepr_molecule("PCl3F2")
+    assert list(molecule.elements[1:3]) == ['F', 'F']
+    assert np.allclose(molecule.coords[1], -molecule.coords[2])
+    assert len(lone_pair_directions(classify_formula("XeF4"))) == 2
+
+
+def test_parse_formula():
+    assert parse_formula("Ca(OH)2") == ((('Ca', 1), ('O', 2), ('H', 2)), 0)
+    assert dict(parse_formula("CuSO4·5H2O")[0]) == {'Cu': 1, 'S': 1, 'O': 9, 'H': 10}
+    assert parse_formula("SO4^2-")[1] == -2 and parse_formula("NH4+")[1] == 1
+    with pytest.raises(ValueError):
+        parse_formula("H2O)")
+
+
+def test_normalize_case():
+    assert [normalize_case(f) for f in ("h2o", "xef4", "nacl", "pcl5", "so4^2-", "brf5", "H2O", "Co", "Sn")] == \
+        ["H2O", "XeF4", "NaCl", "PCl5", "SO4^2-", "BrF5", "H2O", "Co", "Sn"]
+    assert classify_formula(normalize_case("h2o")).shape == "Bent (Tetrahedral)"
+    with pytest.raises(ValueError, match="大小写"):
+        normalize_case("qq")
+    # 拆法不唯一时不猜：SiCl4/SICl4、Sn/SN、CO2/Co2
+    for formula, options in [("sicl4", ("SiCl", "SICl")), ("sn", ("Sn", "SN")), ("co2", ("Co", "CO"))]:
+        with pytest.raises(ValueError, match="多种拆法") as error:
+            normalize_case(formula)
+        assert all(option in str(error.value) for option in options)
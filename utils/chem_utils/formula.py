@@ -0,0 +1,119 @@
+# chem_assistant/utils/chem_utils/formula.py
+# 纯 Python 的化学式解析 (不依赖 chempy)：支持括号、水合物和离子电荷
+
+import re
+from functools import lru_cache
+
+from utils.chem_utils.element_data import ATOMIC_NUMBERS
+
+_TOKEN = re.compile(r'([A-Z][a-z]?)|(\d+)|([(\[{])|([)\]}])|(\s+)')
+# 电荷写法: "NH4+", "SO4--", "SO4^2-", "SO4 2-", "Fe^3+"
+_CHARGE = re.compile(r'(?:\^|\s+)(\d*)([+-])$|(\++|-+)$')
+
+
+def _split_charge(formula):
+    match = _CHARGE.search(formula)
+    if not match:
+        return formula, 0
+    if match.group(3):
+        signs = match.group(3)
+        charge = len(signs) if signs[0] == '+' else -len(signs)
+    else:
+        charge = int(match.group(1) or 1) * (1 if match.group(2) == '+' else -1)
+    return formula[:match.start()], charge
+
+
+def _parse_part(text, formula):
+    stack = [{}]
+    position = 0
+    last = None  # 最近一个可被下标修饰的项: 元素符号或括号组的组成
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"化学式 '{formula}' 中有无法识别的字符 '{text[position]}'。")
+        element, number, opening, closing, _ = match.groups()
+        position = match.end()
+        if element:
+            if element not in ATOMIC_NUMBERS:
+                raise ValueError(f"化学式 '{formula}' 中有未知元素 '{element}'。")
+            stack[-1][element] = stack[-1].get(element, 0) + 1
+            last = {element: 1}
+        elif number:
+            if last is None:
+                raise ValueError(f"化学式 '{formula}' 中的数字位置不正确。")
+            # 下标 n 表示再加 (n-1) 份前一项
+            for symbol, count in last.items():
+                stack[-1][symbol] = stack[-1].get(symbol, 0) + count * (int(number) - 1)
+            last = None
+        elif opening:
+            stack.append({})
+            last = None
+        elif closing:
+            if len(stack) == 1:
+                raise ValueError(f"化学式 '{formula}' 的括号不匹配。")
+            group = stack.pop()
+            for symbol, count in group.items():
+                stack[-1][symbol] = stack[-1].get(symbol, 0) + count
+            last = group
+    if len(stack) != 1:
+        raise ValueError(f"化学式 '{formula}' 的括号不匹配。")
+    return stack[0]
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(formula):
+    """
+    解析化学式，例如 "H2O"、"Ca(OH)2"、"CuSO4·5H2O"、"SO4^2-"。
+    :return: (组成, 电荷)，组成为按首次出现顺序排列的 ((元素, 个数), ...) 元组
+    """
+    text, charge = _split_charge(formula.strip())
+    composition = {}
+    for part in re.split(r'[·•*]', text):
+        part = part.strip()
+        # 开头的数字只能是系数 (如水合物中的 5H2O)
+        coefficient = re.match(r'\d+', part)
+        multiplier = int(coefficient.group()) if coefficient else 1
+        if coefficient:
+            part = part[coefficient.end():]
+        for symbol, count in _parse_part(part, formula).items():
+            composition[symbol] = composition.get(symbol, 0) + count * multiplier
+    if not composition:
+        raise ValueError(f"化学式 '{formula}' 为空。")
+    return tuple(composition.items()), charge
+
+
+def _split_letters(letters, formula):
+    """把一段小写字母拆成元素符号；拆法不唯一 (如 "co" 可以是 CO 或 Co) 时报错，不替用户猜"""
+    n = len(letters)
+    # feasible[i]: letters[i:] 能否拆成元素符号
+    feasible = [False] * n + [True]
+    for i in range(n - 1, -1, -1):
+        feasible[i] = (letters[i].upper() in ATOMIC_NUMBERS and feasible[i + 1]) or \
+            (i + 1 < n and letters[i].upper() + letters[i + 1] in ATOMIC_NUMBERS and feasible[i + 2])
+    if not feasible[0]:
+        raise ValueError(f"无法把化学式 '{formula}' 中的 '{letters}' 拆成元素符号，请区分大小写输入 (如 H2O、XeF4)。")
+    # 只沿可行的分支展开，找到两种拆法即可停止
+    splits, stack = [], [(0, "")]
+    while stack and len(splits) < 2:
+        i, prefix = stack.pop()
+        if i == n:
+            splits.append(prefix)
+            continue
+        for size in (2, 1):
+            symbol = letters[i].upper() + letters[i + 1:i + size]
+            if i + size <= n and symbol in ATOMIC_NUMBERS and feasible[i + size]:
+                stack.append((i + size, prefix + symbol))
+    if len(splits) > 1:
+        raise ValueError(f"化学式 '{formula}' 中的 '{letters}' 有多种拆法 (如 {splits[0]}、{splits[1]})，"
+                         f"请区分大小写输入。")
+    return splits[0]
+
+
+def normalize_case(formula):
+    """
+    纠正全小写输入的大小写，如 "h2o" -> "H2O"、"xef4" -> "XeF4"、"nacl" -> "NaCl"；含大写字母的化学式原样返回。
+    拆成元素符号的方式不唯一时 ("co2"：CO2 还是 Co2？"sicl4"：SiCl4 还是 SICl4？) 抛出 ValueError
+    """
+    if any(c.isupper() for c in formula):
+        return formula
+    return re.sub(r'[a-z]+', lambda match: _split_letters(match.group(), formula), formula)
@@ -0,0 +1,244 @@
+# chem_assistant/utils/file_io/cif_reader.py
+# CIF 晶体结构文件读取 (流式解析 + 批量对称操作展开)
+
+import re
+from functools import lru_cache
+import numpy as np
+from scipy.spatial import cKDTree
+
+from core.crystallography.crystal import UnitCell, CrystalStructure
+from utils.chem_utils.element_data import ATOMIC_NUMBERS
+
+SYMOP_TAGS = ('_symmetry_equiv_pos_as_xyz', '_space_group_symop_operation_xyz')
+CELL_TAGS = ('_cell_length_a', '_cell_length_b', '_cell_length_c',
+             '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma')
+
+# CIF 词法单元：单/双引号字符串 (引号后须紧跟空白或行尾) 或普通非空白串
+_TOKEN_RE = re.compile(r"'(.*?)'(?=\s|$)|\"(.*?)\"(?=\s|$)|(\S+)")
+_SYMOP_TERM_RE = re.compile(r'([+-]?)([^+-]+)')
+# element_data 只收录到 86 号元素，这里补上锕系等重元素
+ELEMENT_SYMBOLS = frozenset(ATOMIC_NUMBERS) | {'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk', 'Cf'}
+
+
+def parse_cif_number(value):
+    """解析CIF数值，去掉标准不确定度，例如 '5.6402(3)' -> 5.6402"""
+    if value in ('.', '?'):
+        return np.nan
+    paren = value.find('(')
+    return float(value[:paren] if paren >= 0 else value)
+
+
+def element_from_label(type_symbol):
+    """
+    从 'Na1+'、'O2-'、'Cl1'、'CL1' 等标记中提取元素符号。
+    前两个字母构成元素符号时取两个字母，否则只取首字母 ('OW1' 为水中的 O，而不是 'Ow')
+    """
+    match = re.match(r'([A-Za-z])([A-Za-z]?)', type_symbol.strip())
+    if not match:
+        raise ValueError(f"无法识别的原子类型 '{type_symbol}'。")
+    first, second = match.group(1).upper(), match.group(2).lower()
+    if second and first + second in ELEMENT_SYMBOLS:
+        return first + second
+    if first in ELEMENT_SYMBOLS or not second:
+        return first
+    return first + second
+
+
+def _tokenize(line):
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [m.group(1) if m.group(1) is not None else m.group(2) if m.group(2) is not None else m.group(3)
+            for m in _TOKEN_RE.finditer(line)]
+
+
+def iter_cif_entries(filepath):
+    """
+    逐行流式解析CIF的第一个数据块，不会把整个文件读入内存。
+    产生 ('item', 标签, 值) 或 ('loop', 标签列表, 值列表)。
+    """
+    in_block = False
+    loop_tags, loop_values, reading_loop_values = None, None, False
+    pending_tag = None
+
+    def flush_loop():
+        if loop_tags:
+            return ('loop', loop_tags, loop_values)
+        return None
+
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            line = raw.strip()
+            if raw.startswith(';'):
+                # 多行文本字段：作为一个整体值
+                text_value = [raw[1:].strip()]
+                for raw in f:
+                    if raw.startswith(';'):
+                        break
+                    text_value.append(raw.strip())
+                text_value = "\n".join(text_value).strip()
+                if loop_tags is not None:
+                    reading_loop_values = True
+                    loop_values.append(text_value)
+                elif pending_tag:
+                    yield ('item', pending_tag, text_value)
+                    pending_tag = None
+                continue
+            if not line or line.startswith('#'):
+                continue
+
+            lower = line.lower()
+            if lower.startswith('data_'):
+                if in_block:
+                    break
+                in_block = True
+                continue
+
+            if lower == 'loop_' or lower.startswith('loop_ '):
+                entry = flush_loop()
+                if entry:
+                    yield entry
+                loop_tags, loop_values, reading_loop_values = [], [], False
+                continue
+
+            if line.startswith('_'):
+                if loop_tags is not None and not reading_loop_values:
+                    loop_tags.append(line.split()[0].lower())
+                    continue
+                entry = flush_loop()
+                if entry:
+                    yield entry
+                loop_tags, loop_values, reading_loop_values = None, None, False
+                tokens = _tokenize(line)
+                if len(tokens) >= 2:
+                    yield ('item', tokens[0].lower(), tokens[1])
+                else:
+                    pending_tag = tokens[0].lower()
+                continue
+
+            if loop_tags is not None:
+                reading_loop_values = True
+                loop_values.extend(_tokenize(line))
+            elif pending_tag:
+                tokens = _tokenize(line)
+                if tokens:
+                    yield ('item', pending_tag, tokens[0])
+                pending_tag = None
+
+    entry = flush_loop()
+    if entry:
+        yield entry
+
+
+@lru_cache(maxsize=4096)
+def parse_symop(op):
+    """把 '-x+1/2,y,z' 形式的对称操作解析为 (3x3旋转矩阵, 平移向量)，结果会被缓存"""
+    rotation = np.zeros((3, 3))
+    translation = np.zeros(3)
+    rows = op.replace(' ', '').lower().split(',')
+    if len(rows) != 3:
+        raise ValueError(f"无法解析对称操作 '{op}'。")
+    for row, expr in enumerate(rows):
+        for sign, term in _SYMOP_TERM_RE.findall(expr):
+            factor = -1.0 if sign == '-' else 1.0
+            if term[-1] in 'xyz':
+                coeff = term[:-1].rstrip('*')
+                rotation[row, 'xyz'.index(term[-1])] += factor * (float(coeff) if coeff else 1.0)
+            elif '/' in term:
+                num, den = term.split('/')
+                translation[row] += factor * float(num) / float(den)
+            else:
+                translation[row] += factor * float(term)
+    rotation.setflags(write=False); translation.setflags(write=False)
+    return rotation, translation
+
+
+def symops_to_arrays(symops):
+    """把对称操作字符串列表一次性转换为 (n_ops, 3, 3) 和 (n_ops, 3) 数组"""
+    parsed = [parse_symop(op) for op in symops]
+    return np.array([p[0] for p in parsed]), np.array([p[1] for p in parsed])
+
+
+def expand_symmetry(frac_coords, rotations, translations, tolerance=1e-3):
+    """
+    把所有对称操作以一次批量矩阵乘法作用到全部原子上，并按周期性距离去重。
+    :return: (展开后的分数坐标 (m, 3), 每个坐标对应的原始原子序号 (m,))
+    """
+    frac_coords = np.asarray(frac_coords, dtype=float).reshape(-1, 3)
+    n_sites, n_ops = len(frac_coords), len(rotations)
+    # (n_sites, n_ops, 3) = Σ_j R[o, i, j]·x[s, j] + t[o, i]，所有操作的旋转矩阵堆叠成 (3·n_ops, 3)，一次矩阵乘法完成
+    images = (frac_coords @ rotations.reshape(-1, 3).T).reshape(n_sites, n_ops, 3)
+    images += translations[None, :, :]
+    images = images.reshape(-1, 3) % 1.0 % 1.0
+
+    # 等价位置只可能来自同一个原子：原子序号作为第四个坐标 (不同原子相距至少 1)，
+    # 在周期性边界下找出距离不超过容差的像对，每对中序号较大的那个视为重复
+    site_index = np.repeat(np.arange(n_sites), n_ops)
+    tree = cKDTree(np.column_stack([images, site_index]), boxsize=[1.0, 1.0, 1.0, n_sites + 1])
+    pairs = tree.query_pairs(tolerance, output_type='ndarray')
+    keep = np.ones(len(images), dtype=bool)
+    keep[pairs.max(axis=1)] = False
+
+    expanded = images[keep]
+    expanded[expanded > 1.0 - 1e-8] = 0.0
+    return expanded, site_index[keep]
+
+
+def read_cif(filepath, tolerance=1e-3):
+    """
+    流式读取CIF文件中的晶胞、原子位置和对称操作，并展开为完整晶胞内的原子。
+    :return: CrystalStructure 对象
+    """
+    items, site_loop, symops = {}, None, None
+    for kind, key, value in iter_cif_entries(filepath):
+        if kind == 'item':
+            items[key] = value
+        elif '_atom_site_fract_x' in key and site_loop is None:
+            site_loop = (key, value)
+        elif symops is None:
+            for tag in SYMOP_TAGS:
+                if tag in key:
+                    col, width = key.index(tag), len(key)
+                    symops = value[col::width]
+                    break
+    if symops is None:
+        symops = [items[tag] for tag in SYMOP_TAGS if tag in items] or ['x,y,z']
+
+    try:
+        cell = UnitCell(*(parse_cif_number(items[tag]) for tag in CELL_TAGS))
+    except KeyError as e:
+        raise ValueError(f"CIF文件缺少晶胞参数 {e}。")
+    if site_loop is None:
+        raise ValueError("CIF文件中没有找到原子坐标 (_atom_site_fract_x)。")
+
+    tags, values = site_loop
+    width = len(tags)
+    n_sites = len(values) // width
+    columns = {tag: values[i:n_sites * width:width] for i, tag in enumerate(tags)}
+
+    def numeric(tag, default):
+        if tag not in columns:
+            return np.full(n_sites, default)
+        return np.array([parse_cif_number(v) for v in columns[tag]])
+
+    labels = columns.get('_atom_site_label') or columns.get('_atom_site_type_symbol')
+    if labels is None:
+        raise ValueError("CIF文件的原子坐标表中既没有 _atom_site_label 也没有 _atom_site_type_symbol，无法确定元素。")
+    type_symbols = columns.get('_atom_site_type_symbol', labels)
+    symbol_map = {t: element_from_label(t) for t in set(type_symbols)}
+    elements = np.array([symbol_map[t] for t in type_symbols], dtype=object)
+    frac = np.column_stack([numeric(f'_atom_site_fract_{axis}', np.nan) for axis in 'xyz'])
+    if np.isnan(frac).any():
+        raise ValueError("CIF文件中存在缺失的原子坐标。")
+    occupancies = np.nan_to_num(numeric('_atom_site_occupancy', 1.0), nan=1.0)
+    if '_atom_site_u_iso_or_equiv' in columns:
+        b_iso = 8.0 * np.pi ** 2 * numeric('_atom_site_u_iso_or_equiv', np.nan)
+    else:
+        b_iso = numeric('_atom_site_b_iso_or_equiv', np.nan)
+
+    rotations, translations = symops_to_arrays(tuple(symops))
+    expanded, site_index = expand_symmetry(frac, rotations, translations, tolerance)
+
+    title = items.get('_chemical_formula_sum', items.get('_chemical_name_systematic', ''))
+    labels = np.asarray(labels, dtype=object)
+    return CrystalStructure(cell, elements[site_index], expanded, occupancies[site_index], b_iso[site_index],
+                            labels[site_index], title=title)
@@ -0,0 +1,162 @@
+# chem_assistant/utils/file_io/cube_reader.py
+# Gaussian cube 体数据 (分子轨道 / 电子密度) 读取：数值直接解析进 NumPy 数组，大网格写入磁盘缓存并以内存映射方式打开
+
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+from core.structure.molecule import Molecule
+from core.structure.bonds import perceive_bonds
+from utils.file_io.molecule_reader import normalize_elements
+
+BOHR_TO_ANGSTROM = 0.529177210903
+# 数值个数超过该值 (约 128³) 时把网格缓存为 .npy 并内存映射，避免每次重新解析文本
+CUBE_MMAP_THRESHOLD = 2_000_000
+# 解析大文件时每次读入的数值个数，限制临时内存
+_CHUNK_VALUES = 4_000_000
+
+
+class CubeData:
+    """
+    一个 cube 文件的内容。坐标统一换算为 Å。
+    values 的形状为 (nx, ny, nz)；一个文件包含多个轨道时为 (nx, ny, nz, 轨道数)，用 grid(k) 取第 k 个。
+    """
+
+    def __init__(self, title, comment, molecule, origin, axes, values, orbital_ids=(), filepath=None):
+        self.title = title
+        self.comment = comment
+        self.molecule = molecule
+        self.origin = np.asarray(origin, dtype=float)
+        self.axes = np.asarray(axes, dtype=float)  # 三行分别为 i/j/k 方向相邻格点的位移向量
+        self.values = values
+        self.orbital_ids = tuple(orbital_ids)
+        self.filepath = filepath
+
+    @property
+    def shape(self):
+        return tuple(self.values.shape[:3])
+
+    @property
+    def n_sets(self):
+        return 1 if self.values.ndim == 3 else self.values.shape[3]
+
+    @property
+    def is_orbital(self):
+        """头部声明了轨道编号即为轨道；否则有负值的网格 (如密度差) 也按正负两相处理"""
+        return bool(self.orbital_ids) or float(np.min(self.values)) < 0
+
+    def grid(self, index=0):
+        if not 0 <= index < self.n_sets:
+            raise IndexError(f"数据集序号 {index} 超出范围 (共 {self.n_sets} 个)。")
+        return self.values if self.values.ndim == 3 else self.values[..., index]
+
+    def __repr__(self):
+        return f"CubeData({self.title!r}, grid={self.shape}, sets={self.n_sets}, atoms={len(self.molecule)})"
+
+
+def _read_header(f):
+    """解析头部 (二进制文件句柄)，返回 (标题, 注释, 原子数, 原点, 各方向格点数, 格点向量, 原子表, 轨道编号, 单位换算系数)"""
+    def fields(expected):
+        line = f.readline()
+        parts = line.split()
+        if len(parts) < expected:
+            raise ValueError("Cube 文件头部不完整。")
+        return parts
+
+    title = f.readline().decode('utf-8', 'replace').strip()
+    comment = f.readline().decode('utf-8', 'replace').strip()
+    try:
+        parts = fields(4)
+        n_atoms = int(parts[0])
+        origin = np.array(parts[1:4], dtype=float)
+        counts, axes = [], []
+        for _ in range(3):
+            parts = fields(4)
+            counts.append(int(parts[0]))
+            axes.append(np.array(parts[1:4], dtype=float))
+        # 格点数为负表示坐标单位已是 Å，否则为 Bohr
+        scale = 1.0 if counts[0] < 0 else BOHR_TO_ANGSTROM
+        counts = [abs(n) for n in counts]
+        atoms = np.array([fields(5)[:5] for _ in range(abs(n_atoms))], dtype=float).reshape(-1, 5)
+        orbital_ids = ()
+        if n_atoms < 0:
+            # 原子数为负时紧跟一行：轨道个数 + 各轨道编号 (可能折行)
+            ids = [int(v) for v in fields(1)]
+            while len(ids) < ids[0] + 1:
+                ids += [int(v) for v in fields(1)]
+            orbital_ids = tuple(ids[1:ids[0] + 1])
+    except ValueError as e:
+        if "不完整" in str(e):
+            raise
+        raise ValueError(f"无法解析 Cube 文件头部: {e}")
+    if min(counts) < 1:
+        raise ValueError("Cube 文件的格点数必须为正整数。")
+    return title, comment, n_atoms, origin, counts, np.array(axes), atoms, orbital_ids, scale
+
+
+def _cache_path(filepath, cache_dir):
+    """缓存文件名由绝对路径、大小和修改时间决定，源文件改变后自动失效"""
+    stat = os.stat(filepath)
+    key = f"{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')
+    return os.path.join(cache_dir, f"cube_{hashlib.sha1(key).hexdigest()[:20]}.npy")
+
+
+def _read_values(f, shape, total):
+    values = np.fromfile(f, dtype=np.float32, count=total, sep=' ')
+    if len(values) < total:
+        raise ValueError(f"Cube 文件数据不完整：需要 {total} 个数值，只读到 {len(values)} 个。")
+    return values.reshape(shape)
+
+
+def _read_values_to_cache(f, shape, total, path):
+    """分块解析文本直接写入 .npy 内存映射文件，先写临时文件再改名，中途失败不会留下半个缓存"""
+    partial = f"{path}.{os.getpid()}.part"
+    target = None
+    try:
+        target = np.lib.format.open_memmap(partial, mode='w+', dtype=np.float32, shape=(total,))
+        done = 0
+        while done < total:
+            chunk = np.fromfile(f, dtype=np.float32, count=min(_CHUNK_VALUES, total - done), sep=' ')
+            if len(chunk) == 0:
+                raise ValueError(f"Cube 文件数据不完整：需要 {total} 个数值，只读到 {done} 个。")
+            target[done:done + len(chunk)] = chunk
+            done += len(chunk)
+        target.flush()
+        target = None  # 改名前释放内存映射 (Windows 下映射中的文件不能改名)
+        os.replace(partial, path)
+    except BaseException:
+        target = None
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return np.load(path, mmap_mode='r').reshape(shape)
+
+
+def read_cube(filepath, cache_dir=None, mmap_threshold=CUBE_MMAP_THRESHOLD):
+    """
+    读取 Gaussian cube 文件。
+    :param cache_dir: 大网格的 .npy 缓存目录，缺省为系统临时目录下的 chem_assistant_cube
+    :param mmap_threshold: 数值个数超过该值时使用磁盘缓存 + 内存映射；小网格直接读入内存
+    :return: CubeData (网格数值为 float32，cube 文件本身只有 5-6 位有效数字)
+    """
+    with open(filepath, 'rb') as f:
+        title, comment, n_atoms, origin, counts, axes, atoms, orbital_ids, scale = _read_header(f)
+        shape = tuple(counts) + ((len(orbital_ids),) if len(orbital_ids) > 1 else ())
+        total = int(np.prod(shape))
+        if total <= mmap_threshold:
+            values = _read_values(f, shape, total)
+        else:
+            cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'chem_assistant_cube')
+            os.makedirs(cache_dir, exist_ok=True)
+            path = _cache_path(filepath, cache_dir)
+            if os.path.exists(path):
+                values = np.load(path, mmap_mode='r').reshape(shape)
+            else:
+                values = _read_values_to_cache(f, shape, total, path)
+
+    elements = normalize_elements(atoms[:, 0].astype(int).astype(str)) if len(atoms) else np.zeros(0, dtype=object)
+    coords = atoms[:, 2:5] * scale
+    molecule = Molecule(elements, coords, perceive_bonds(elements, coords) if len(atoms) > 1 else None,
+                        title=title or os.path.basename(filepath))
+    return CubeData(title, comment, molecule, origin * scale, axes * scale, values, orbital_ids, filepath)
@@ -0,0 +1,336 @@
+# chem_assistant/utils/file_io/jcamp_reader.py
+# JCAMP-DX 谱图读取 (XYDATA / XYPOINTS / PEAK TABLE / NTUPLES，含 LINK 复合文件)。ASDF 压缩数据 (PAC/SQZ/DIF/DUP)
+# 的解压不逐字符走 Python：按字节查表找出各数值的起点，伪数字换成普通数字后由 np.fromstring 一次解析，
+# DUP 用 np.repeat 展开，DIF 用分段累加和还原，Y 校验值在行边界上向量化比较
+
+import re
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+JCAMP_EXTENSIONS = ('.jdx', '.dx', '.jcamp')
+
+# form: 数据所在的记录及其格式，如 "XYDATA=(X++(Y..Y))"；metadata 的键为去掉空格、连字符、斜杠、下划线后的大写标签
+JcampBlock = namedtuple('JcampBlock', ['title', 'data', 'columns', 'metadata', 'form'])
+
+_LDR = re.compile(r'^[ \t]*##([^=\n]*)=([^\n]*)', re.M)
+_COMMENT = re.compile(r'\$\$[^\n]*')
+_DATA_LABELS = ('XYDATA', 'XYPOINTS', 'PEAKTABLE', 'DATATABLE')
+# (X++(Y..Y)) 形式：第一个符号为横坐标，第二个为纵坐标
+_ASDF_FORM = re.compile(r'\(\s*(\w+)\s*\+\+\s*\(\s*(\w+)\s*\.\.\s*\w+\s*\)\s*\)')
+# (XY..XY) / (XYW..XYW) / (R,I..R,I) 等成组数值
+_GROUP_FORM = re.compile(r'\(\s*([\w,\s]+?)\s*\.\.\s*[\w,\s]+\)')
+
+# 字节类别
+_SEP, _NEWLINE, _DIGIT, _DOT, _SIGN, _SQZ, _DIF, _DUP, _MISSING, _BAD = range(10)
+_CLASS = np.full(256, _BAD, dtype=np.uint8)
+_TRANSLATE = np.arange(256, dtype=np.uint8)
+for _char in b' \t\r,;':
+    _CLASS[_char], _TRANSLATE[_char] = _SEP, ord(' ')
+_CLASS[ord('\n')], _TRANSLATE[ord('\n')] = _NEWLINE, ord(' ')
+_CLASS[ord('0'):ord('9') + 1] = _DIGIT
+_CLASS[ord('.')] = _DOT
+_CLASS[[ord('+'), ord('-')]] = _SIGN
+_CLASS[ord('?')], _TRANSLATE[ord('?')] = _MISSING, ord('0')
+# 伪数字：SQZ @ A-I a-i (起始值)，DIF % J-R j-r (与前一个值的差)，DUP S-Z s (重复次数 1-9)
+for _chars, _kind in (('@ABCDEFGHI', _SQZ), ('@abcdefghi', _SQZ), ('%JKLMNOPQR', _DIF), ('%jklmnopqr', _DIF)):
+    for _digit, _char in enumerate(_chars):
+        _CLASS[ord(_char)], _TRANSLATE[ord(_char)] = _kind, ord('0') + _digit
+for _digit, _char in enumerate('STUVWXYZs', start=1):
+    _CLASS[ord(_char)], _TRANSLATE[ord(_char)] = _DUP, ord('0') + _digit
+_NEGATIVE = np.zeros(256, dtype=bool)
+_NEGATIVE[list(b'abcdefghijklmnopqr')] = True
+
+
+def _normalize_label(label):
+    return re.sub(r'[\s\-/_]', '', label).upper()
+
+
+def _tokenize(text, line_offset=0):
+    """
+    把数据行切成数值。:return: (数值, 类别 (_SQZ 表示绝对值，含普通数字和 ?；_DIF；_DUP), 所在的行号 (从 0 起))
+    """
+    buf = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+    classes = _CLASS[buf]
+    out = _TRANSLATE[buf]
+    # 普通数字中的指数 (数字后的 E/e 紧跟正负号)；压缩数据不使用指数
+    exponent = np.flatnonzero(((buf[:-1] == ord('E')) | (buf[:-1] == ord('e'))) & (classes[1:] == _SIGN))
+    exponent = exponent[(exponent > 0) & np.isin(classes[exponent - 1], (_DIGIT, _DOT))]
+    classes[exponent], classes[exponent + 1] = _DIGIT, _DIGIT
+    out[exponent] = ord('e')
+    bad = np.flatnonzero(classes == _BAD)
+    if len(bad):
+        line = line_offset + int(np.count_nonzero(buf[:bad[0]] == ord('\n'))) + 1
+        raise ValueError(f"第 {line} 行有无法识别的字符 '{chr(buf[bad[0]])}'。")
+    previous = np.concatenate([[_SEP], classes[:-1]])
+    starts = np.flatnonzero((classes >= _SIGN) | (((classes == _DIGIT) | (classes == _DOT)) & (previous <= _NEWLINE)))
+    if not len(starts):
+        return np.empty(0), np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.int64)
+    # 每个数值前插入空格，负的伪数字再插入负号
+    negative = starts[_NEGATIVE[buf[starts]]]
+    positions = np.concatenate([starts, negative])
+    inserted = np.concatenate([np.full(len(starts), ord(' '), np.uint8), np.full(len(negative), ord('-'), np.uint8)])
+    order = np.argsort(positions, kind='stable')
+    out = np.insert(out, positions[order], inserted[order])
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            values = np.fromstring(out.tobytes(), dtype=float, sep=' ')
+    except (ValueError, DeprecationWarning):
+        values = None
+    if values is None or len(values) != len(starts):
+        raise ValueError(f"第 {line_offset + 1} 行起的数据中有格式错误的数值。")
+    kinds = classes[starts]
+    values[kinds == _MISSING] = np.nan
+    kinds[(kinds != _DIF) & (kinds != _DUP)] = _SQZ
+    lines = np.cumsum(classes == _NEWLINE)[starts]
+    return values, kinds, lines
+
+
+def decode_asdf(text, line_offset=0):
+    """
+    解压 (X++(Y..Y)) 形式的数据行，AFFN/PAC/SQZ/DIF/DUP 可任意混合。每行第一个数为横坐标；
+    以 DIF 结尾的行，下一行的第一个纵坐标是 Y 校验值，必须等于上一行的最后一个值，校验后丢弃。
+    :param line_offset: text 第一行在文件中的行号 (从 0 起)，用于错误信息
+    :return: (各行横坐标, 纵坐标, 各行横坐标对应的纵坐标下标)
+    """
+    values, kinds, lines = _tokenize(_COMMENT.sub('', text), line_offset)
+    if not len(values):
+        raise ValueError("数据区为空。")
+    first = np.concatenate([[True], lines[1:] != lines[:-1]])
+    if np.any(first & (kinds != _SQZ)):
+        line = line_offset + int(lines[np.flatnonzero(first & (kinds != _SQZ))[0]]) + 1
+        raise ValueError(f"第 {line} 行开头应为横坐标。")
+
+    # DUP：前一个数 (绝对值或差值) 共出现 n 次
+    dup = np.flatnonzero(kinds == _DUP)
+    if len(dup):
+        if np.any(first[dup - 1]) or np.any(kinds[dup - 1] == _DUP) or np.any(values[dup] < 1):
+            line = line_offset + int(lines[dup[0]]) + 1
+            raise ValueError(f"第 {line} 行附近的 DUP 重复计数无效。")
+        repeats = np.ones(len(values), dtype=np.int64)
+        repeats[dup - 1] += values[dup].astype(np.int64) - 1
+        repeats[dup] = 0
+        values, kinds, lines, first = (np.repeat(a, repeats) for a in (values, kinds, lines, first))
+
+    line_x = values[first]
+    y, y_kinds, y_lines = values[~first], kinds[~first], lines[~first]
+    if not len(y):
+        raise ValueError("数据区中没有纵坐标。")
+    # DIF：每个绝对值开始一段，段内累加差值
+    is_dif = y_kinds == _DIF
+    if is_dif[0]:
+        raise ValueError("DIF 数据缺少起始值。")
+    index = np.arange(len(y))
+    segment = np.maximum.accumulate(np.where(is_dif, 0, index))
+    steps = np.cumsum(np.where(is_dif, y, 0.0))
+    y = y[segment] + steps - steps[segment]
+
+    # 各行第一个和最后一个纵坐标；没有纵坐标的行 (只有横坐标) 不参与
+    line_first = np.flatnonzero(np.concatenate([[True], y_lines[1:] != y_lines[:-1]]))
+    line_last = np.concatenate([line_first[1:] - 1, [len(y) - 1]])
+    line_x = line_x[np.searchsorted(lines[first], y_lines[line_first])]
+    check = np.concatenate([[False], is_dif[line_last[:-1]]])
+    previous_last = np.concatenate([[0], line_last[:-1]])
+    expected, found = y[previous_last[check]], y[line_first[check]]
+    wrong = np.flatnonzero(~np.isclose(found, expected, rtol=1e-9, atol=1e-9, equal_nan=True))
+    if len(wrong):
+        k = np.flatnonzero(check)[wrong[0]]
+        line = line_offset + int(y_lines[line_first[k]]) + 1
+        raise ValueError(f"Y 校验失败：第 {line} 行的校验值 {found[wrong[0]]:g} 与上一行末尾的 {expected[wrong[0]]:g} 不一致。")
+    keep = np.ones(len(y), dtype=bool)
+    keep[line_first[check]] = False
+    position = np.cumsum(keep) - 1
+    anchors = np.where(check, position[previous_last], position[line_first])
+    return line_x, y[keep], anchors
+
+
+def _numbers(text, line_offset=0):
+    """(XY..XY) 等形式的成组数值 (AFFN，以空格、逗号或分号分隔，? 为缺失值)"""
+    values, kinds, lines = _tokenize(_COMMENT.sub('', text), line_offset)
+    if np.any(kinds != _SQZ):
+        raise ValueError(f"第 {line_offset + 1} 行起的数值表中不应有压缩数据。")
+    return values
+
+
+def _float(metadata, key, default=None):
+    value = metadata.get(key)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value.split()[0])
+    except ValueError:
+        raise ValueError(f"##{key}= 的值 '{value}' 不是数值。")
+
+
+def _list(metadata, key):
+    return [field.strip() for field in metadata.get(key, '').split(',')]
+
+
+def _xydata(body, line_offset, first_x, last_x, x_factor, y_factor, n_points, delta_x=None):
+    """(X++(Y..Y)) -> (x, y)；FIRSTX/LASTX 已知时横坐标等距排布，否则由各行横坐标线性拟合"""
+    line_x, y, anchors = decode_asdf(body, line_offset)
+    if n_points is not None and int(n_points) != len(y):
+        raise ValueError(f"解出 {len(y)} 个点，与 NPOINTS={int(n_points)} 不一致。")
+    if first_x is not None and last_x is not None:
+        x = np.linspace(first_x, last_x, len(y))
+    elif len(np.unique(anchors)) >= 2:
+        slope, intercept = np.polyfit(anchors, line_x * x_factor, 1)
+        x = intercept + slope * np.arange(len(y))
+    else:
+        x = line_x[0] * x_factor + (delta_x or 0.0) * (np.arange(len(y)) - anchors[0])
+    return x, y * y_factor
+
+
+def _group_symbols(form):
+    """(XYW..XYW) -> [X, Y, W]；以逗号分隔时按逗号切分，如 (R,I..R,I)"""
+    match = _GROUP_FORM.search(form)
+    if not match:
+        return ['X', 'Y']
+    group = match.group(1)
+    return [s.strip().upper() for s in group.split(',')] if ',' in group else list(group.replace(' ', '').upper())
+
+
+def _groups(body, line_offset, symbols, factors):
+    """成组数值表 -> (点数, 组大小) 数组，各列乘以对应的因子"""
+    values = _numbers(body, line_offset)
+    if len(values) % len(symbols):
+        raise ValueError(f"第 {line_offset + 1} 行起的数值表中数值个数不是 {len(symbols)} 的倍数。")
+    return values.reshape(-1, len(symbols)) * np.array([factors.get(s, 1.0) for s in symbols])
+
+
+def _convert_block(block):
+    """把一个 ##TITLE= ... ##END= 块的记录转换为若干 JcampBlock"""
+    meta, title, results = block['meta'], block['title'], []
+    x_units, y_units = meta.get('XUNITS', 'X'), meta.get('YUNITS', 'Y')
+    x_factor, y_factor = _float(meta, 'XFACTOR', 1.0), _float(meta, 'YFACTOR', 1.0)
+    ntuple_pages = []
+    for label, form, body, line_offset, page in block['tables']:
+        name = f"{label}={form.strip()}"
+        if page is not None:
+            ntuple_pages.append((form, body, line_offset, page))
+            continue
+        asdf = _ASDF_FORM.search(form)
+        if label == 'XYDATA' and asdf:
+            x, y = _xydata(body, line_offset, _float(meta, 'FIRSTX'), _float(meta, 'LASTX'), x_factor, y_factor,
+                           _float(meta, 'NPOINTS'), _float(meta, 'DELTAX'))
+            results.append(JcampBlock(title, np.column_stack([x, y]), (x_units, y_units), meta, name))
+        else:
+            symbols = _group_symbols(form)
+            data = _groups(body, line_offset, symbols, {'X': x_factor, 'Y': y_factor})
+            columns = (x_units, y_units) + tuple(symbols[2:])
+            results.append(JcampBlock(title, data, columns, meta, name))
+    if ntuple_pages:
+        results += _convert_ntuples(title, meta, ntuple_pages)
+    return results
+
+
+def _convert_ntuples(title, meta, pages):
+    """
+    NTUPLES：各变量的 FIRST/LAST/FACTOR/VARDIM 为逗号分隔的列表，按 SYMBOL 对应。
+    (X++(Y..Y)) 形式的各页横坐标相同时合并为一个多列数组 (如 NMR 的实部/虚部)，成组数值的各页分别作为一条谱图。
+    """
+    symbols = [s.upper() for s in _list(meta, 'SYMBOL')]
+    if not symbols or symbols == ['']:
+        raise ValueError("NTUPLES 缺少 ##SYMBOL= 记录。")
+
+    def column(key, symbol, default=None):
+        values = _list(meta, key)
+        k = symbols.index(symbol) if symbol in symbols else -1
+        if 0 <= k < len(values) and values[k]:
+            try:
+                return float(values[k])
+            except ValueError:
+                raise ValueError(f"##{key}= 中 {symbol} 的值 '{values[k]}' 无效。")
+        return default
+
+    def label_of(symbol):
+        """列名：VARNAME，没有时用 UNITS，再没有时用符号本身"""
+        k = symbols.index(symbol) if symbol in symbols else -1
+        for names in (_list(meta, 'VARNAME'), _list(meta, 'UNITS')):
+            if 0 <= k < len(names) and names[k]:
+                return names[k]
+        return symbol
+
+    merged, results, combined = [], [], []
+    for form, body, line_offset, page in pages:
+        asdf = _ASDF_FORM.search(form)
+        if asdf:
+            x_symbol, y_symbol = asdf.group(1).upper(), asdf.group(2).upper()
+            n_points = _float(page, 'NPOINTS') or column('VARDIM', y_symbol)
+            x, y = _xydata(body, line_offset, column('FIRST', x_symbol), column('LAST', x_symbol),
+                           column('FACTOR', x_symbol, default=1.0), column('FACTOR', y_symbol, default=1.0), n_points)
+            merged.append((x, y, label_of(y_symbol), x_symbol, form, page))
+        else:
+            group_symbols = _group_symbols(form)
+            data = _groups(body, line_offset, group_symbols, {s: column('FACTOR', s, default=1.0) for s in group_symbols})
+            results.append(JcampBlock(f"{title} ({page.get('PAGE', '').strip()})", data,
+                                      tuple(label_of(s) for s in group_symbols), {**meta, **page}, f"DATATABLE={form.strip()}"))
+    # 横坐标相同的各页合并
+    while merged:
+        x, _, _, x_symbol, form, page = merged[0]
+        same = [m for m in merged if len(m[0]) == len(x) and np.allclose(m[0], x)]
+        merged = [m for m in merged if not any(m is s for s in same)]
+        data = np.column_stack([x] + [m[1] for m in same])
+        columns = (label_of(x_symbol),) + tuple(m[2] for m in same)
+        combined.append(JcampBlock(title, data, columns, {**meta, **page}, f"DATATABLE={form.strip()}"))
+    return combined + results
+
+
+def parse_jcamp(text):
+    """
+    解析 JCAMP-DX 文本。:return: [JcampBlock]，按文件中的顺序；LINK 复合文件的各子块分别返回
+    """
+    matches = list(_LDR.finditer(text))
+    stack, blocks, finished = [], [], []
+    for k, match in enumerate(matches):
+        label = _normalize_label(match.group(1))
+        end = matches[k + 1].start() if k + 1 < len(matches) else len(text)
+        value, body = _COMMENT.sub('', match.group(2)).strip(), text[match.end():end]
+        if label == 'TITLE':
+            stack.append({'title': value, 'meta': {}, 'tables': [], 'page': None})
+            continue
+        if not stack:
+            continue
+        block = stack[-1]
+        if label == 'END':
+            finished.append(stack.pop())
+            continue
+        if label in _DATA_LABELS:
+            block['tables'].append((label, value, body, text.count('\n', 0, match.end()), block['page']))
+            continue
+        full = (value + ' ' + _COMMENT.sub('', body).strip()).strip() if body.strip() else value
+        if label == 'PAGE':
+            block['page'] = {'PAGE': full}
+        elif label == 'ENDNTUPLES':
+            block['page'] = None
+        elif block['page'] is not None:
+            block['page'][label] = full
+        else:
+            block['meta'][label] = full
+    finished += stack  # 缺少 ##END= 时仍然使用已读到的内容
+    for block in finished:
+        blocks += _convert_block(block)
+    if not blocks:
+        raise ValueError("文件中没有找到 JCAMP-DX 谱图数据。")
+    return blocks
+
+
+def read_jcamp(filepath):
+    """读取 JCAMP-DX 文件 (UTF-8，失败时按 Latin-1)，返回 [JcampBlock]"""
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = raw.decode('latin-1')
+    return parse_jcamp(text.replace('\r\n', '\n'))
+
+
+def is_jcamp(filepath):
+    """按扩展名或文件开头的 ##TITLE= 等记录判断"""
+    if filepath.lower().endswith(JCAMP_EXTENSIONS):
+        return True
+    with open(filepath, 'rb') as f:
+        return f.read(256).lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'##')
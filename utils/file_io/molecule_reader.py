@@ -0,0 +1,175 @@
+# chem_assistant/utils/file_io/molecule_reader.py
+# 分子结构文件读取：XYZ、MOL/SDF、PDB
+
+import os
+import numpy as np
+
+from core.structure.molecule import Molecule
+from core.structure.bonds import perceive_bonds
+from utils.chem_utils.element_data import ELEMENT_SYMBOLS
+
+SUPPORTED_EXTENSIONS = ('.xyz', '.mol', '.sdf', '.sd', '.pdb', '.ent')
+
+
+def normalize_elements(raw_symbols):
+    """把 'CL'、'cl'、'17'、'C1' 等写法统一为标准元素符号 (按不同取值只处理一次)"""
+    raw = np.asarray(raw_symbols).astype(str)
+    unique, inverse = np.unique(raw, return_inverse=True)
+    mapped = []
+    for symbol in unique:
+        symbol = symbol.strip()
+        if symbol.isdigit():
+            z = int(symbol)
+            if not 1 <= z <= len(ELEMENT_SYMBOLS):
+                raise ValueError(f"无效的原子序数 '{symbol}'。")
+            mapped.append(ELEMENT_SYMBOLS[z - 1])
+            continue
+        letters = ''.join(ch for ch in symbol if ch.isalpha())
+        if not letters:
+            raise ValueError(f"无法识别的元素 '{symbol}'。")
+        candidate = letters[:2].capitalize()
+        mapped.append(candidate if candidate in ELEMENT_SYMBOLS else letters[0].upper())
+    return np.array(mapped, dtype=object)[inverse.ravel()]
+
+
+def read_xyz(filepath):
+    """读取 XYZ 文件的第一帧"""
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        try:
+            n_atoms = int(f.readline().split()[0])
+        except (ValueError, IndexError):
+            raise ValueError("XYZ文件第一行应为原子数。")
+        title = f.readline().strip()
+        lines = [f.readline() for _ in range(n_atoms)]
+    if len(lines) < n_atoms or not lines[-1].strip():
+        raise ValueError("XYZ文件中的原子行数少于声明的原子数。")
+    # 只取每行的前4列 (元素 x y z)，忽略可能附加的电荷/速度等列
+    table = np.array([line.split()[:4] for line in lines])
+    elements = normalize_elements(table[:, 0])
+    coords = table[:, 1:4].astype(float)
+    return Molecule(elements, coords, perceive_bonds(elements, coords), title=title)
+
+
+def _read_mol_block(lines):
+    """解析一个 MOL 记录 (V2000 或 V3000)"""
+    if len(lines) < 4:
+        raise ValueError("MOL记录不完整。")
+    title = lines[0].strip()
+    counts_line = lines[3]
+    if 'V3000' in counts_line:
+        return _read_mol_v3000(lines, title)
+
+    n_atoms, n_bonds = int(counts_line[0:3]), int(counts_line[3:6])
+    atom_lines = lines[4:4 + n_atoms]
+    bond_lines = lines[4 + n_atoms:4 + n_atoms + n_bonds]
+    if len(atom_lines) < n_atoms or len(bond_lines) < n_bonds:
+        raise ValueError("MOL记录中的原子或键数目与计数行不符。")
+    # V2000 为固定列宽：x(0-10) y(10-20) z(20-30) 元素(31-34)
+    coords = np.array([[line[0:10], line[10:20], line[20:30]] for line in atom_lines]).astype(float)
+    elements = normalize_elements([line[31:34] for line in atom_lines])
+    if n_bonds:
+        bond_table = np.array([[line[0:3], line[3:6], line[6:9]] for line in bond_lines]).astype(int)
+        bonds, orders = bond_table[:, :2] - 1, bond_table[:, 2]
+    else:
+        bonds, orders = None, None
+    return Molecule(elements, coords, bonds, orders, title=title)
+
+
+def _read_mol_v3000(lines, title):
+    atoms, bonds, section = [], [], None
+    for line in lines[4:]:
+        if not line.startswith('M  V30'):
+            if line.startswith('M  END'):
+                break
+            continue
+        body = line[6:].split()
+        if body[:2] == ['BEGIN', 'ATOM']: section = 'atom'
+        elif body[:2] == ['BEGIN', 'BOND']: section = 'bond'
+        elif body[:1] == ['END']: section = None
+        elif section == 'atom': atoms.append(body[1:5])
+        elif section == 'bond': bonds.append(body[1:4])
+    if not atoms:
+        raise ValueError("V3000 MOL记录中没有原子。")
+    atoms = np.array(atoms)
+    elements = normalize_elements(atoms[:, 0])
+    coords = atoms[:, 1:4].astype(float)
+    if bonds:
+        bond_table = np.array(bonds).astype(int)
+        return Molecule(elements, coords, bond_table[:, 1:3] - 1, bond_table[:, 0], title=title)
+    return Molecule(elements, coords, title=title)
+
+
+def read_mol(filepath):
+    """读取 MOL 文件，或 SDF 文件中的第一个分子"""
+    lines = []
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith('M  END') or line.startswith('$$$$'):
+                break
+            lines.append(line)
+    return _read_mol_block(lines)
+
+
+def read_pdb(filepath):
+    """
+    读取 PDB 文件中的 ATOM/HETATM 记录 (第一个 MODEL)。
+    固定列宽的记录被整体转换为定长字符数组后按列切片，避免逐行拆分字符串。
+    """
+    records, conect, title = [], [], ""
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            tag = line[:6]
+            if tag == 'ATOM  ' or tag == 'HETATM':
+                records.append(line)
+            elif tag == 'CONECT':
+                conect.append(line)
+            elif tag == 'ENDMDL':
+                break
+            elif tag == 'HEADER' and not title:
+                title = line[10:50].strip()
+            elif tag == 'TITLE ' and not title:
+                title = line[10:80].strip()
+    if not records:
+        raise ValueError("PDB文件中没有 ATOM/HETATM 记录。")
+
+    table = np.array([line.rstrip('\r\n').ljust(80) for line in records], dtype='U80')
+    raw = table.view('U1').reshape(len(table), 80)
+
+    def column(start, end):
+        return raw[:, start:end].copy().view(f'U{end - start}').ravel()
+
+    coords = np.column_stack([column(30, 38), column(38, 46), column(46, 54)]).astype(float)
+    element_field = np.char.strip(column(76, 78))
+    # 缺少元素列时，从原子名的前两列 (12-14列，右对齐的元素符号) 推断元素
+    missing = element_field == ''
+    if missing.any():
+        element_field[missing] = np.char.strip(column(12, 14))[missing]
+    elements = normalize_elements(element_field)
+
+    bonds = perceive_bonds(elements, coords)
+    if conect:
+        serials = column(6, 11).astype(int)
+        serial_to_index = dict(zip(serials.tolist(), range(len(serials))))
+        extra = []
+        for line in conect:
+            fields = [line[p:p + 5].strip() for p in range(6, 31, 5)]
+            ids = [int(v) for v in fields if v]
+            for partner in ids[1:]:
+                if ids[0] in serial_to_index and partner in serial_to_index:
+                    a, b = serial_to_index[ids[0]], serial_to_index[partner]
+                    extra.append((min(a, b), max(a, b)))
+        if extra:
+            bonds = np.unique(np.vstack([bonds, np.array(extra)]), axis=0)
+    return Molecule(elements, coords, bonds, title=title or os.path.basename(filepath))
+
+
+def read_structure(filepath):
+    """根据扩展名选择读取器，返回 Molecule 对象"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.xyz':
+        return read_xyz(filepath)
+    if ext in ('.mol', '.sdf', '.sd'):
+        return read_mol(filepath)
+    if ext in ('.pdb', '.ent'):
+        return read_pdb(filepath)
+    raise ValueError(f"不支持的结构文件格式 '{ext}'，支持: {', '.join(SUPPORTED_EXTENSIONS)}")
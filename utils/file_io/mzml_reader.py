@@ -0,0 +1,418 @@
+# chem_assistant/utils/file_io/mzml_reader.py
+# LC-MS 数据 (mzML / mzXML) 流式读取：iterparse 逐个谱图解析，处理完的元素立即清空并从树上摘下，内存占用与文件大小无关；
+# 二进制数组 base64 (+ zlib) 直接解码为 NumPy 数组；按字节偏移索引随机读取单个扫描；一次遍历得到 TIC/BPC 和提取离子色谱
+
+import base64
+import mmap
+import os
+import re
+import threading
+import zlib
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+import numpy as np
+
+MS_EXTENSIONS = ('.mzml', '.mzxml')
+XIC_TOLERANCE_PPM = 10.0  # 提取离子色谱的缺省质量窗口 (±ppm)
+READ_CHUNK = 1 << 16  # 随机读取单个扫描时每次喂给解析器的字节数
+INDEX_TAIL = 4096  # 在文件末尾这么多字节内查找索引位置 (indexListOffset / indexOffset)
+PROGRESS_INTERVAL = 256  # 每解析这么多个扫描回调一次进度
+
+Scan = namedtuple('Scan', ['index', 'scan_id', 'ms_level', 'retention_time', 'precursor_mz', 'tic',
+                           'base_peak_mz', 'base_peak_intensity', 'mz', 'intensity'])
+Chromatograms = namedtuple('Chromatograms', ['scan_index', 'retention_time', 'tic', 'bpc', 'bpc_mz', 'targets', 'xic'])
+
+# mzML 受控词表 (PSI-MS CV) 中用到的条目
+_CV_MS_LEVEL = 'MS:1000511'
+_CV_SCAN_TIME = 'MS:1000016'
+_CV_TIC = 'MS:1000285'
+_CV_BASE_PEAK_MZ = 'MS:1000504'
+_CV_BASE_PEAK_INTENSITY = 'MS:1000505'
+_CV_SELECTED_MZ = 'MS:1000744'
+_CV_ARRAYS = {'MS:1000514': 'mz', 'MS:1000515': 'intensity'}
+_CV_DTYPES = {'MS:1000521': '<f4', 'MS:1000523': '<f8', 'MS:1000519': '<i4', 'MS:1000522': '<i8'}
+_CV_COMPRESSION = {'MS:1000574': 'zlib', 'MS:1000576': None}
+_CV_NUMPRESS = {'MS:1002312', 'MS:1002313', 'MS:1002314', 'MS:1002746', 'MS:1002747', 'MS:1002748'}
+_MINUTE_UNITS = ('minute', 'UO:0000031')
+
+_DURATION = re.compile(r'-?PT?(?:([\d.]+)H)?(?:([\d.]+)M)?(?:([\d.]+)S)?')
+
+
+def decode_binary(text, dtype='<f8', compression=None):
+    """base64 (+ zlib) 编码的二进制数组解码为 NumPy 数组 (直接引用解码后的字节，不再复制)"""
+    raw = base64.b64decode(text) if text else b''
+    if compression == 'zlib' and raw:
+        raw = zlib.decompress(raw)
+    dtype = np.dtype(dtype)
+    if len(raw) % dtype.itemsize:
+        raise ValueError(f"二进制数组长度 {len(raw)} 字节不是 {dtype.itemsize} 的整数倍。")
+    return np.frombuffer(raw, dtype=dtype)
+
+
+def _duration_minutes(text):
+    """mzXML 的保留时间 (xs:duration，如 PT12.5S) 换算为分钟"""
+    text = text.strip()
+    match = _DURATION.fullmatch(text)
+    if match is None or not any(match.groups()):
+        return float(text) / 60.0  # 有些转换器直接写秒数
+    hours, minutes, seconds = (float(value) if value else 0.0 for value in match.groups())
+    return 60.0 * hours + minutes + seconds / 60.0
+
+
+def _summary(mz, intensity):
+    """由峰数组计算总离子流和基峰"""
+    if len(intensity) == 0:
+        return 0.0, np.nan, 0.0
+    top = int(np.argmax(intensity))
+    return float(intensity.sum()), float(mz[top]), float(intensity[top])
+
+
+class _ScanHandler:
+    """
+    按 start/end 事件收集一个扫描的信息，扫描完整时由 end() 返回 Scan。
+    decode 为 True 时总是解码峰数组；否则只在谱图缺少 TIC/基峰信息时解码。ms_level 以外的扫描不解码。
+    """
+    item = None  # 处理完后清空并摘下的元素
+    container = None  # 该元素结束即说明后面没有扫描了
+
+    def __init__(self, decode=True, ms_level=None, index=0):
+        self.decode = decode
+        self.ms_level = ms_level
+        self.index = index
+
+    def _wanted(self, level):
+        return self.ms_level is None or level == self.ms_level
+
+    def _scan(self, fields, mz, intensity):
+        level = fields.get('ms_level', 1)
+        tic, base_mz, base_intensity = fields.get('tic'), fields.get('base_peak_mz'), fields.get('base_peak_intensity')
+        if mz is not None and (tic is None or base_intensity is None):
+            tic, base_mz, base_intensity = _summary(mz, intensity)
+        scan = Scan(self.index, fields.get('scan_id'), level, fields.get('retention_time', np.nan), fields.get('precursor_mz'),
+                    tic, base_mz, base_intensity, mz, intensity)
+        self.index += 1
+        return scan
+
+    def _needs_arrays(self, fields):
+        if not self._wanted(fields.get('ms_level', 1)):
+            return False
+        return self.decode or 'tic' not in fields or 'base_peak_intensity' not in fields
+
+
+class _MzMLHandler(_ScanHandler):
+    item = 'spectrum'
+    container = 'spectrumList'
+
+    def __init__(self, decode=True, ms_level=None, index=0, groups=None):
+        super().__init__(decode, ms_level, index)
+        self.groups = {} if groups is None else groups  # referenceableParamGroup: id -> [(accession, value, unit)]
+        self.fields = None  # 当前谱图 (谱图之外为 None)
+        self.arrays = {}
+        self.array = None  # 当前 binaryDataArray 的参数
+        self.group = None
+
+    def start(self, tag, elem):
+        if tag == 'spectrum':
+            self.fields, self.arrays = {'scan_id': elem.get('id')}, {}
+        elif tag == 'binaryDataArray' and self.fields is not None:
+            self.array = {'dtype': '<f8', 'compression': None}
+        elif tag == 'referenceableParamGroup':
+            self.group = self.groups.setdefault(elem.get('id'), [])
+
+    def end(self, tag, elem):
+        if tag == 'cvParam':
+            param = (elem.get('accession'), elem.get('value'), elem.get('unitName') or elem.get('unitAccession'))
+            if self.group is not None:
+                self.group.append(param)
+            elif self.fields is not None:
+                self._param(*param)
+        elif tag == 'referenceableParamGroupRef' and self.fields is not None:
+            for param in self.groups.get(elem.get('ref'), ()):
+                self._param(*param)
+        elif tag == 'referenceableParamGroup':
+            self.group = None
+        elif tag == 'binary' and self.array is not None:
+            kind = self.array.get('kind')
+            if kind is not None and self._needs_arrays(self.fields):
+                if self.array.get('numpress'):
+                    raise ValueError(f"谱图 {self.fields['scan_id']} 使用 MS-Numpress 压缩，暂不支持。")
+                self.arrays[kind] = decode_binary(elem.text, self.array['dtype'], self.array['compression'])
+            elem.clear()
+        elif tag == 'binaryDataArray':
+            self.array = None
+        elif tag == 'spectrum' and self.fields is not None:
+            mz, intensity = self.arrays.get('mz'), self.arrays.get('intensity')
+            if mz is None or intensity is None or len(mz) != len(intensity):
+                mz = intensity = None
+            else:
+                mz, intensity = mz.astype(np.float64, copy=False), intensity.astype(np.float64, copy=False)
+            scan = self._scan(self.fields, mz, intensity)
+            self.fields = None
+            return scan
+        return None
+
+    def _param(self, accession, value, unit):
+        fields, array = self.fields, self.array
+        if array is not None:
+            if accession in _CV_ARRAYS:
+                array['kind'] = _CV_ARRAYS[accession]
+            elif accession in _CV_DTYPES:
+                array['dtype'] = _CV_DTYPES[accession]
+            elif accession in _CV_COMPRESSION:
+                array['compression'] = _CV_COMPRESSION[accession]
+            elif accession in _CV_NUMPRESS:
+                array['numpress'] = True
+        elif accession == _CV_MS_LEVEL:
+            fields['ms_level'] = int(value)
+        elif accession == _CV_SCAN_TIME and 'retention_time' not in fields:
+            time = float(value)
+            fields['retention_time'] = time if unit in _MINUTE_UNITS else time / 60.0
+        elif accession == _CV_TIC:
+            fields['tic'] = float(value)
+        elif accession == _CV_BASE_PEAK_MZ:
+            fields['base_peak_mz'] = float(value)
+        elif accession == _CV_BASE_PEAK_INTENSITY:
+            fields['base_peak_intensity'] = float(value)
+        elif accession == _CV_SELECTED_MZ and 'precursor_mz' not in fields:
+            fields['precursor_mz'] = float(value)
+
+
+class _MzXMLHandler(_ScanHandler):
+    """mzXML：扫描的信息都在 <scan> 的属性里；二级扫描可能嵌套在一级扫描内，因此在 <peaks> 结束时产出扫描"""
+    item = 'scan'
+    container = 'msRun'
+
+    def __init__(self, decode=True, ms_level=None, index=0):
+        super().__init__(decode, ms_level, index)
+        self.stack = []  # 尚未结束的 (可能嵌套的) 扫描
+
+    def start(self, tag, elem):
+        if tag != 'scan':
+            return
+        fields = {'scan_id': elem.get('num'), 'ms_level': int(elem.get('msLevel', 1)), 'done': False}
+        if elem.get('retentionTime'):
+            fields['retention_time'] = _duration_minutes(elem.get('retentionTime'))
+        for key, attribute in (('tic', 'totIonCurrent'), ('base_peak_mz', 'basePeakMz'),
+                               ('base_peak_intensity', 'basePeakIntensity')):
+            if elem.get(attribute):
+                fields[key] = float(elem.get(attribute))
+        self.stack.append(fields)
+
+    def end(self, tag, elem):
+        if not self.stack:
+            return None
+        fields = self.stack[-1]
+        if tag == 'precursorMz' and elem.text and 'precursor_mz' not in fields:
+            fields['precursor_mz'] = float(elem.text)
+        elif tag == 'peaks' and not fields['done']:
+            mz = intensity = None
+            if self._needs_arrays(fields):
+                precision = elem.get('precision', '32')
+                order = '<' if elem.get('byteOrder', 'network') in ('little', 'little-endian') else '>'
+                compression = 'zlib' if elem.get('compressionType', 'none') == 'zlib' else None
+                pairs = decode_binary(elem.text, f"{order}f{8 if precision == '64' else 4}", compression)
+                if len(pairs) % 2:
+                    raise ValueError(f"扫描 {fields['scan_id']} 的峰数组长度为奇数。")
+                pairs = pairs.astype(np.float64)
+                mz, intensity = pairs[0::2], pairs[1::2]
+            elem.clear()
+            fields['done'] = True
+            return self._scan(fields, mz, intensity)
+        elif tag == 'scan':
+            self.stack.pop()
+            if not fields['done']:
+                return self._scan(fields, None, None)
+        return None
+
+
+def _handle(events, handler):
+    """把 (事件, 元素) 交给处理器并产出完整的扫描；处理完的谱图元素被清空并从父元素上摘下，内存占用不随扫描数增长"""
+    parents = []
+    for event, elem in events:
+        tag = elem.tag.rpartition('}')[2]
+        if event == 'start':
+            handler.start(tag, elem)
+            parents.append(elem)
+            continue
+        parents.pop()
+        scan = handler.end(tag, elem)
+        if tag == handler.item:
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+        if scan is not None:
+            yield scan
+        if tag == handler.container:
+            return
+
+
+def detect_format(filepath):
+    """根据文件开头的根元素 (其次是扩展名) 判断是 'mzml' 还是 'mzxml'"""
+    with open(filepath, 'rb') as f:
+        head = f.read(INDEX_TAIL)
+    if b'<mzXML' in head:
+        return 'mzxml'
+    if b'<mzML' in head or b'<indexedmzML' in head:
+        return 'mzml'
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension in MS_EXTENSIONS:
+        return extension[1:]
+    raise ValueError("不是 mzML/mzXML 文件。")
+
+
+def _handler(format_name, **kwargs):
+    return _MzMLHandler(**kwargs) if format_name == 'mzml' else _MzXMLHandler(**kwargs)
+
+
+def iter_scans(filepath, ms_level=None, decode=True, callback=None):
+    """
+    流式逐个产出扫描 (Scan)，整个文件只读一遍。保留时间单位为分钟。
+    ms_level 以外的扫描照常产出但不解码峰数组；decode=False 时只在缺少 TIC/基峰信息时解码。
+    callback(已读字节数, 文件大小) 每解析 PROGRESS_INTERVAL 个扫描调用一次。
+    """
+    handler = _handler(detect_format(filepath), decode=decode, ms_level=ms_level)
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        for scan in _handle(ET.iterparse(f, events=('start', 'end')), handler):
+            yield scan
+            if callback is not None and scan.index % PROGRESS_INTERVAL == 0:
+                callback(f.tell(), size)
+        if callback is not None:
+            callback(size, size)
+
+
+class MSRun:
+    """
+    一个 LC-MS 数据文件。打开时只读取扫描的字节偏移索引 (优先用文件自带的 indexList / index，缺失或失效时扫描文件)，
+    单个扫描按偏移随机读取；色谱图需要遍历整个文件一次。
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.format = detect_format(filepath)
+        self._file = open(filepath, 'rb')
+        self._lock = threading.Lock()
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.offsets = self._read_index()
+        if self.offsets is None:
+            self.offsets = self._scan_offsets()
+        if len(self.offsets) == 0:
+            self._file.close()
+            raise ValueError("文件中没有扫描。")
+        self._groups = self._read_param_groups()
+        # 扫描概要 (由 chromatograms() 的遍历填充)
+        self.scan_ids = self.ms_levels = self.retention_times = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _starts_scan(self, offset):
+        self._file.seek(int(offset))
+        head = self._file.read(16)
+        return head.startswith(b'<spectrum' if self.format == 'mzml' else b'<scan')
+
+    def _read_index(self):
+        """读取文件末尾的偏移索引；首尾两个偏移不指向扫描开头时视为失效，返回 None"""
+        self._file.seek(max(0, self.size - INDEX_TAIL))
+        match = re.search(rb'<(?:indexListOffset|indexOffset)>\s*(\d+)\s*<', self._file.read())
+        if match is None or not 0 < int(match.group(1)) < self.size:
+            return None
+        self._file.seek(int(match.group(1)))
+        section = re.search(rb'<index\s+name="(?:spectrum|scan)"\s*>(.*?)</index>', self._file.read(), re.S)
+        if section is None:
+            return None
+        offsets = np.sort(np.array([int(value) for value in re.findall(rb'<offset[^>]*>\s*(\d+)\s*</offset>', section.group(1))],
+                                   dtype=np.int64))
+        if len(offsets) == 0 or not (offsets[-1] < self.size and self._starts_scan(offsets[0]) and self._starts_scan(offsets[-1])):
+            return None
+        return offsets
+
+    def _scan_offsets(self):
+        """没有可用索引时在内存映射上用正则查找每个扫描的起始位置 (不把文件读入内存)"""
+        if self.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        pattern = rb'<spectrum[\s>]' if self.format == 'mzml' else rb'<scan[\s>]'
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return np.fromiter((match.start() for match in re.finditer(pattern, mapped)), dtype=np.int64)
+
+    def _read_param_groups(self):
+        """mzML 文件头中的 referenceableParamGroup (谱图可能引用其中的数组类型、精度和压缩方式)"""
+        if self.format != 'mzml':
+            return {}
+        self._file.seek(0)
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        parser.feed(self._file.read(int(self.offsets[0])))
+        handler = _MzMLHandler()
+        for _ in _handle(parser.read_events(), handler):
+            pass
+        return handler.groups
+
+    def scan(self, index):
+        """按偏移随机读取第 index 个扫描 (解码峰数组)，只解析该扫描所在的字节"""
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"扫描序号 {index} 超出范围 (共 {len(self)} 个扫描)。")
+        index %= len(self)
+        kwargs = {'groups': self._groups} if self.format == 'mzml' else {}
+        handler = _handler(self.format, index=index, **kwargs)
+        with self._lock:
+            self._file.seek(int(self.offsets[index]))
+            for scan in _handle(self._fragment_events(), handler):
+                return scan
+        raise ValueError(f"扫描 {index} 不完整。")
+
+    def _fragment_events(self):
+        """从当前位置起分块喂给增量解析器；片段之后的闭合标签会让解析器报错，但那在所需扫描的事件之后"""
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        while True:
+            chunk = self._file.read(READ_CHUNK)
+            if not chunk:
+                return
+            parser.feed(chunk)
+            yield from parser.read_events()
+
+    def chromatograms(self, targets=(), tolerance_ppm=XIC_TOLERANCE_PPM, ms_level=1, callback=None):
+        """
+        一次遍历得到 ms_level 扫描的总离子流色谱 (TIC)、基峰色谱 (BPC) 和各目标 m/z (±tolerance_ppm) 的提取离子色谱。
+        没有目标 m/z 且谱图自带 TIC/基峰信息时不解码峰数组。同时记录全部扫描的编号、级数和保留时间。
+        """
+        targets = np.asarray(targets, dtype=float).ravel()
+        if tolerance_ppm <= 0:
+            raise ValueError("质量窗口必须为正数。")
+        half = targets * tolerance_ppm * 1e-6
+        low, high = targets - half, targets + half
+        ids, levels, times = [], [], []
+        rows, xic = [], []
+        for scan in iter_scans(self.filepath, ms_level=ms_level, decode=len(targets) > 0, callback=callback):
+            ids.append(scan.scan_id)
+            levels.append(scan.ms_level)
+            times.append(scan.retention_time)
+            if ms_level is not None and scan.ms_level != ms_level:
+                continue
+            rows.append((scan.index, scan.retention_time, scan.tic, scan.base_peak_intensity, scan.base_peak_mz))
+            if len(targets):
+                mz, intensity = scan.mz, scan.intensity
+                if mz is None:
+                    xic.append(np.zeros(len(targets)))
+                    continue
+                if np.any(mz[1:] < mz[:-1]):
+                    order = np.argsort(mz, kind='stable')
+                    mz, intensity = mz[order], intensity[order]
+                # 窗口内强度之和 = 累加和在两端的差
+                cumulative = np.concatenate(([0.0], np.cumsum(intensity)))
+                xic.append(cumulative[np.searchsorted(mz, high, 'right')] - cumulative[np.searchsorted(mz, low, 'left')])
+        self.scan_ids, self.ms_levels, self.retention_times = ids, np.array(levels), np.array(times, dtype=float)
+        if len(ids) != len(self.offsets):
+            # 自带索引与实际扫描数不符 (例如文件被改写过)，改用扫描文件得到的偏移
+            self.offsets = self._scan_offsets()
+        table = np.array(rows, dtype=float).reshape(-1, 5)
+        return Chromatograms(table[:, 0].astype(np.int64), table[:, 1], table[:, 2], table[:, 3], table[:, 4], targets,
+                             np.array(xic, dtype=float).reshape(len(table), len(targets)))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
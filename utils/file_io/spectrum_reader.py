@@ -0,0 +1,457 @@
+# chem_assistant/utils/file_io/spectrum_reader.py
+# 仪器导出的文本谱图 (CSV/TSV/TXT) 读取：只读文件头尾的样本嗅探编码、分隔符、小数点和表头/表尾，
+# 中间的数值区整体交给 NumPy 的 C 解析器，不逐行走 Python；大文件解析结果缓存为 .npy，再次打开时内存映射
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+from utils.file_io.jcamp_reader import read_jcamp, is_jcamp, JCAMP_EXTENSIONS
+
+SPECTRUM_EXTENSIONS = ('.csv', '.tsv', '.txt', '.dat', '.asc', '.prn', '.xy') + JCAMP_EXTENSIONS
+# 文件头、尾各读取这么多字节用于嗅探
+SNIFF_BYTES = 64 * 1024
+# 各候选方言只在样本的前这么多行上比较 (逐行解析是纯 Python，批量读取小文件时是主要开销)，
+# 选定方言后再在整个样本上找数值区；前面这些行里没有数值时退回到整个样本上比较
+SNIFF_SCORE_LINES = 200
+# 候选 (分隔符, 小数点)，分隔符 None 表示任意空白；得分相同时取靠前的
+_DIALECTS = ((',', '.'), (';', '.'), (';', ','), ('\t', '.'), ('\t', ','), ('|', '.'), (None, '.'), (None, ','))
+# 依次尝试的编码 (没有 BOM 时)；latin-1 不会失败，作为最后的兜底
+_ENCODINGS = ('utf-8', 'gb18030', 'latin-1')
+# 文件超过该字节数时把解析结果缓存为 .npy (再次打开时内存映射，不占内存、不重新解析)
+SPECTRUM_CACHE_THRESHOLD = 1_000_000
+# 缓存目录的总大小上限，超出时按最近使用时间 (LRU) 删除
+SPECTRUM_CACHE_BYTES = 2 * 1024 ** 3
+# 表头/表尾注释行的前缀
+_COMMENT_CHARS = '#%!*/'
+_KEY_VALUE = re.compile(r'^\s*([^:=]{1,80}?)\s*[:=]\s*(.*)$')
+
+# n_columns: 数值列数；header_lines / footer_lines: 数值区前后的行数 (含列名行)
+Dialect = namedtuple('Dialect', ['encoding', 'delimiter', 'decimal', 'n_columns', 'header_lines', 'footer_lines'])
+
+
+class SpectrumData:
+    """
+    一个谱图文件的内容。data 为 (点数, 列数) 的 float64 数组，x / y 为其中两列 (只有一列时 x 为点序号)；
+    columns 为列名 (没有列名行时为空元组)，metadata 为表头和表尾中的 "键: 值" 信息。
+    JCAMP-DX 文件的 dialect 为 None，metadata 为其标签记录 (##XUNITS= 等)。
+    从缓存打开时 (cached=True) data 是只读的内存映射数组。
+    """
+
+    def __init__(self, data, columns, metadata, dialect, filepath=None, x_column=0, y_column=1, cached=False):
+        self.data = data
+        self.cached = cached
+        self.columns = tuple(columns)
+        self.metadata = metadata
+        self.dialect = dialect
+        self.filepath = filepath
+        n_columns = data.shape[1]
+        if n_columns == 1:
+            self.x, self.y = np.arange(len(data), dtype=float), data[:, 0]
+        else:
+            for column in (x_column, y_column):
+                if not -n_columns <= column < n_columns:
+                    raise ValueError(f"列序号 {column} 超出范围 (文件共 {n_columns} 列数值)。")
+            self.x, self.y = data[:, x_column], data[:, y_column]
+
+    def column_name(self, index):
+        return self.columns[index] if -len(self.columns) <= index < len(self.columns) else ""
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"SpectrumData({os.path.basename(self.filepath or '')!r}, points={len(self.data)}, columns={self.data.shape[1]})"
+
+
+def _decode_sample(sample):
+    """样本 -> 编码名 (数值区都是 ASCII，编码只影响表头里的文字)"""
+    for encoding in _ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def _split_fields(text, delimiter):
+    text = text.strip()
+    parts = text.split() if delimiter is None else [p.strip().strip('"\'') for p in text.split(delimiter)]
+    # 行尾多一个分隔符时最后一项为空
+    while len(parts) > 1 and parts[-1] == '':
+        parts.pop()
+    return parts
+
+
+def _to_float(field, decimal):
+    try:
+        return float(field.replace(',', '.') if decimal == ',' else field)
+    except ValueError:
+        return None
+
+
+def _numeric_columns(line, delimiter, decimal):
+    """一行 (bytes 或 str) 能按该方言解析为几个数值；空行返回 None，含非数值字段返回 0"""
+    text = line.decode('latin-1') if isinstance(line, bytes) else line
+    if not text.strip():
+        return None
+    parts = _split_fields(text, delimiter)
+    if decimal == ',' and delimiter != ',' and any('.' in p for p in parts):
+        return 0
+    return len(parts) if all(_to_float(p, decimal) is not None for p in parts) else 0
+
+
+def _longest_run(lines, delimiter, decimal):
+    """连续数值行 (列数相同，空行不打断) 的最长一段 -> (行数, 列数, 起始行号)"""
+    best = (0, 0, -1)
+    run, columns, start = 0, 0, -1
+    for index, line in enumerate(lines):
+        count = _numeric_columns(line, delimiter, decimal)
+        if count is None:
+            continue
+        if count and count == columns:
+            run += 1
+        else:
+            run, columns, start = (1, count, index) if count else (0, 0, -1)
+        if (run, columns) > best[:2]:
+            best = (run, columns, start)
+    return best
+
+
+def _convert_value(value, delimiter, decimal):
+    value = value.strip().strip('"\'')
+    parts = _split_fields(value, delimiter) if delimiter is not None and delimiter in value else [value]
+    converted = [v if (number := _to_float(v, decimal)) is None else number for v in parts]
+    return converted[0] if len(converted) == 1 else converted
+
+
+def parse_metadata(lines, delimiter, decimal):
+    """
+    表头/表尾文本行 -> dict。支持 "键: 值"、"键=值" (含 JCAMP 的 ##键=值) 和 "键<分隔符>值"，
+    以先出现的分隔方式为准；数值转换为 float，多个值为列表；无法识别的行放在 'comments' 列表中
+    """
+    metadata = {}
+    for line in lines:
+        text = line.strip().lstrip(_COMMENT_CHARS).strip()
+        if not text:
+            continue
+        at_delimiter = text.find(delimiter) if delimiter is not None else -1
+        match = _KEY_VALUE.match(text)
+        if match and (at_delimiter < 0 or len(match.group(1)) <= at_delimiter):
+            key, value = match.groups()
+        elif at_delimiter > 0:
+            key, value = text[:at_delimiter], text[at_delimiter + 1:]
+        else:
+            metadata.setdefault('comments', []).append(text)
+            continue
+        key = key.strip().strip('"\'')
+        if _to_float(key, decimal) is not None:
+            metadata.setdefault('comments', []).append(text)
+            continue
+        metadata[key] = _convert_value(value, delimiter, decimal)
+    return metadata
+
+
+def _lines_with_offsets(chunk, base):
+    """按 \\n 切分，返回 [(行字节, 起始偏移, 结束偏移 (含换行))]"""
+    result, position = [], 0
+    for line in chunk.split(b'\n'):
+        end = position + len(line) + 1
+        result.append((line.rstrip(b'\r'), base + position, base + min(end, len(chunk))))
+        position = end
+    return result
+
+
+def _read_samples(filepath):
+    """
+    读取嗅探所需的样本：(头部字节, 尾部字节, 尾部起始偏移, 整个文件字节或 None, 编码)。
+    UTF-16 文件和只用 \\r 换行的文件先整体转换为 UTF-8 / \\n，此时返回整个文件内容，后续在内存中解析
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        raw, encoding = None, None
+        if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+            f.seek(0)
+            raw, encoding = f.read().decode('utf-16').encode('utf-8'), 'utf-16'
+        elif head.startswith(b'\xef\xbb\xbf'):
+            f.seek(0)
+            raw, encoding = f.read()[3:], 'utf-8-sig'
+        elif b'\n' not in head and b'\r' in head:
+            f.seek(0)
+            raw = f.read().replace(b'\r', b'\n')
+        if raw is None and size > 2 * SNIFF_BYTES:
+            f.seek(size - SNIFF_BYTES)
+            tail = f.read()
+            tail_start = size - SNIFF_BYTES + tail.find(b'\n') + 1
+            tail = tail[tail.find(b'\n') + 1:]
+            # 头部样本的最后一行可能不完整
+            head = head[:head.rfind(b'\n') + 1]
+            return head, tail, tail_start, None, encoding or _decode_sample(head + tail)
+    if raw is None:
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+    head = raw[:SNIFF_BYTES]
+    if len(raw) > SNIFF_BYTES:
+        head = head[:head.rfind(b'\n') + 1]
+    tail_start = max(len(raw) - SNIFF_BYTES, 0)
+    if tail_start:
+        tail_start = raw.index(b'\n', tail_start) + 1
+    tail = raw[tail_start:]
+    return head, tail, tail_start, raw, encoding or _decode_sample(head + tail)
+
+
+def _sniff(head, tail, tail_start):
+    """-> (方言参数 (分隔符, 小数点, 列数), 表头行, 表尾行, 数值区起止字节偏移)"""
+    head_lines = _lines_with_offsets(head, 0)
+    lines = [line for line, _, _ in head_lines]
+    for sample in (lines[:SNIFF_SCORE_LINES], lines):
+        scores = [(_longest_run(sample, d, p), k) for k, (d, p) in enumerate(_DIALECTS)]
+        # 谱图至少有 x、y 两列：优先多列的解释 (如 "1,2" 不当作小数逗号的单列)
+        (run, n_columns, start_line), best = max(scores, key=lambda item: (item[0][1] >= 2, item[0][0], item[0][1], -item[1]))
+        if run or len(sample) == len(lines):
+            break
+    if run == 0:
+        raise ValueError("文件中没有找到数值数据。")
+    delimiter, decimal = _DIALECTS[best]
+    if len(lines) > SNIFF_SCORE_LINES:
+        run, n_columns, start_line = _longest_run(lines, delimiter, decimal)
+    # 最长一段之前紧邻的数值行 (如有缺失值、列数不同的行) 也属于数值区
+    while start_line > 0 and _numeric_columns(head_lines[start_line - 1][0], delimiter, decimal) != 0:
+        start_line -= 1
+    while _numeric_columns(head_lines[start_line][0], delimiter, decimal) is None:
+        start_line += 1
+    header = [line for line, _, _ in head_lines[:start_line]]
+    start = head_lines[start_line][1]
+
+    # 从文件末尾往前找最后一个数值行，之后的都是表尾
+    footer, end = [], None
+    tail_lines = _lines_with_offsets(tail, tail_start)
+    if tail_lines and tail_lines[-1][0] == b'' and tail.endswith(b'\n'):
+        tail_lines.pop()
+    for line, line_start, line_end in reversed(tail_lines):
+        if line_start < start:
+            break
+        count = _numeric_columns(line, delimiter, decimal)
+        if count == n_columns:
+            end = line_end
+            break
+        if count is not None:
+            footer.insert(0, line)
+    if end is None:
+        raise ValueError("无法确定数值数据的结束位置 (文件末尾的非数值内容过长)。")
+    return (delimiter, decimal, n_columns), header, footer, start, end
+
+
+def _column_names(header, delimiter, n_columns, decimal):
+    """数值区前最后一个非空表头行的字段数等于列数且不全是数值时，作为列名"""
+    for line in reversed(header):
+        if line.strip():
+            return None if _numeric_columns(line, delimiter, decimal) else _split_fields(line, delimiter)
+    return None
+
+
+def _parse_lines(block, delimiter, decimal, n_columns):
+    """逐行解析 (数值区有空行、注释行或缺失值时的后备路径)：非数值行跳过，缺少的列填 NaN"""
+    rows = []
+    for line in block.split(b'\n'):
+        text = line.decode('latin-1')
+        if not text.strip():
+            continue
+        values = [_to_float(p, decimal) for p in _split_fields(text, delimiter)]
+        if not values or values[0] is None:
+            continue
+        values = [np.nan if v is None else v for v in values[:n_columns]]
+        rows.append(values + [np.nan] * (n_columns - len(values)))
+    return np.array(rows, dtype=float).reshape(-1, n_columns)
+
+
+def _parse_block(block, delimiter, decimal, n_columns):
+    """内存中的数值区：分隔符和引号替换为空格、小数逗号替换为点后由 np.fromstring 一次解析"""
+    table = bytearray(range(256))
+    for char in ('"', "'") + ((delimiter,) if delimiter is not None else ()):
+        table[ord(char)] = ord(' ')
+    if decimal == ',':
+        table[ord(',')] = ord('.')
+    rows = block.count(b'\n') + (not block.endswith(b'\n'))
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            values = np.fromstring(block.translate(bytes(table)), dtype=float, sep=' ')
+    except (ValueError, DeprecationWarning):
+        values = None
+    if values is None or values.size != rows * n_columns:
+        return _parse_lines(block, delimiter, decimal, n_columns)
+    return values.reshape(rows, n_columns)
+
+
+def _load_region(filepath, raw, header_count, start, end, delimiter, decimal, n_columns):
+    """
+    常见情形 (小数点、原始文件可直接按行读取) 用 np.loadtxt 跳过表头、只读数值区的行数，
+    NumPy ≥ 1.23 的 loadtxt 是 C 实现，直接流式读取文件比先读入再解析更快；其余情形读入数值区后整体解析
+    """
+    if raw is None and decimal == '.':
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            block = f.read(end - start)
+        rows = block.count(b'\n') + (not block.endswith(b'\n'))
+        try:
+            data = np.loadtxt(filepath, delimiter=delimiter, skiprows=header_count, max_rows=rows, comments=None,
+                              quotechar='"', encoding='latin-1', ndmin=2)
+            if data.shape == (rows, n_columns):
+                return data
+        except ValueError:
+            pass
+        return _parse_block(block, delimiter, decimal, n_columns)
+    if raw is None:
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            return _parse_block(f.read(end - start), delimiter, decimal, n_columns)
+    return _parse_block(raw[start:end], delimiter, decimal, n_columns)
+
+
+def sniff_spectrum(filepath):
+    """只嗅探文件格式，不解析数值区"""
+    head, tail, tail_start, _, encoding = _read_samples(filepath)
+    (delimiter, decimal, n_columns), header, footer, _, _ = _sniff(head, tail, tail_start)
+    return Dialect(encoding, delimiter, decimal, n_columns, len(header), len(footer))
+
+
+def _cache_base(filepath, cache_dir):
+    """
+    缓存文件名 (不含扩展名) 由绝对路径、大小、修改时间和内容摘要决定。摘要只取文件头尾各 SNIFF_BYTES 字节，
+    这样判断缓存是否有效不必读完整个文件；被原样覆盖、修改时间也被还原的文件才会漏判
+    """
+    stat = os.stat(filepath)
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(SNIFF_BYTES))
+        if stat.st_size > SNIFF_BYTES:
+            f.seek(max(stat.st_size - SNIFF_BYTES, SNIFF_BYTES))
+            digest.update(f.read())
+    key = f"{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}|{digest.hexdigest()}".encode('utf-8')
+    return os.path.join(cache_dir, f"spectrum_{hashlib.sha1(key).hexdigest()[:20]}")
+
+
+def _spectrum_cache_dir(cache_dir):
+    return cache_dir or os.path.join(tempfile.gettempdir(), 'chem_assistant_spectra')
+
+
+def is_spectrum_cached(filepath, cache_dir=None, cache_threshold=SPECTRUM_CACHE_THRESHOLD):
+    """read_spectrum 是否会直接从缓存内存映射 (不需要解析)；批量加载时据此决定在线程还是进程中读取"""
+    if cache_threshold is None or os.path.getsize(filepath) <= cache_threshold:
+        return False
+    return os.path.exists(_cache_base(filepath, _spectrum_cache_dir(cache_dir)) + '.json')
+
+
+def _load_cached(base):
+    """命中时返回 (只读内存映射数组, 信息 dict)，并刷新 .npy 的修改时间作为 LRU 的使用记录"""
+    try:
+        with open(base + '.json', encoding='utf-8') as f:
+            info = json.load(f)
+        data = np.load(base + '.npy', mmap_mode='r')
+        os.utime(base + '.npy')
+    except (OSError, ValueError):
+        return None
+    return data, info
+
+
+def _store_cached(base, data, info):
+    """先写临时文件再改名，中途失败不会留下半个缓存；.json 最后写入，它存在才表示缓存完整"""
+    partial = f"{base}.{os.getpid()}.part"
+    try:
+        with open(partial, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data, dtype=np.float64))
+        os.replace(partial, base + '.npy')
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(partial, base + '.json')
+    except OSError:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def prune_spectrum_cache(cache_dir, max_bytes=SPECTRUM_CACHE_BYTES, keep=None):
+    """缓存总大小超过 max_bytes 时，从最久未使用的条目开始删除 (keep 指定的条目除外)"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith('spectrum_') and name.endswith('.npy'):
+            base = os.path.join(cache_dir, name[:-4])
+            try:
+                stat = os.stat(base + '.npy')
+                size = stat.st_size + (os.path.getsize(base + '.json') if os.path.exists(base + '.json') else 0)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, size, base))
+    total = sum(size for _, size, _ in entries)
+    for _, size, base in sorted(entries):
+        if total <= max_bytes:
+            break
+        if base == keep:
+            continue
+        for ext in ('.json', '.npy'):
+            try:
+                os.remove(base + ext)
+            except OSError:
+                pass
+        total -= size
+    return total
+
+
+def read_spectrum(filepath, x_column=0, y_column=1, cache_dir=None, cache_threshold=SPECTRUM_CACHE_THRESHOLD,
+                  cache_bytes=SPECTRUM_CACHE_BYTES):
+    """
+    读取文本谱图文件 (JCAMP-DX 文件交给 jcamp_reader)。自动识别：编码 (BOM / UTF-8 / GB18030 / Latin-1)、分隔符 (逗号、分号、制表符、竖线、空白)、
+    小数点 (. 或 ,)、表头 (仪器信息、列名) 和表尾。
+    :param x_column / y_column: 作为横、纵坐标的数值列
+    :param cache_dir: 解析结果的缓存目录，缺省为系统临时目录下的 chem_assistant_spectra
+    :param cache_threshold: 文件超过该字节数才使用缓存；None 表示不使用缓存
+    :param cache_bytes: 缓存目录的大小上限
+    :return: SpectrumData
+    """
+    base = None
+    if cache_threshold is not None and os.path.getsize(filepath) > cache_threshold:
+        cache_dir = _spectrum_cache_dir(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        base = _cache_base(filepath, cache_dir)
+        cached = _load_cached(base)
+        if cached is not None:
+            data, info = cached
+            dialect = Dialect(*info['dialect']) if info['dialect'] else None
+            return SpectrumData(data, info['columns'], info['metadata'], dialect, filepath, x_column, y_column, cached=True)
+
+    if is_jcamp(filepath):
+        # 有连续谱时不取峰表；NTUPLES 的多页 (如实部/虚部) 为多列
+        blocks = read_jcamp(filepath)
+        block = next((b for b in blocks if not b.form.startswith('PEAKTABLE')), blocks[0])
+        metadata = dict(block.metadata, TITLE=block.title, FORM=block.form)
+        if base is not None:
+            _store_cached(base, block.data, {'columns': list(block.columns), 'metadata': metadata, 'dialect': None})
+            prune_spectrum_cache(cache_dir, cache_bytes, keep=base)
+        return SpectrumData(block.data, block.columns, metadata, None, filepath, x_column, y_column)
+
+    head, tail, tail_start, raw, encoding = _read_samples(filepath)
+    (delimiter, decimal, n_columns), header, footer, start, end = _sniff(head, tail, tail_start)
+    data = _load_region(filepath, raw, len(header), start, end, delimiter, decimal, n_columns)
+    if len(data) == 0:
+        raise ValueError("文件中没有找到数值数据。")
+    # UTF-16 / 带 BOM 的文件已转换为 UTF-8
+    text_encoding = 'utf-8' if encoding in ('utf-16', 'utf-8-sig') else encoding
+    header = [line.decode(text_encoding, 'replace') for line in header]
+    footer = [line.decode(text_encoding, 'replace') for line in footer]
+    columns = _column_names(header, delimiter, n_columns, decimal)
+    if columns is not None and len(columns) != n_columns:
+        columns = None
+    metadata = parse_metadata((header[:-1] if columns else header) + footer, delimiter, decimal)
+    dialect = Dialect(encoding, delimiter, decimal, n_columns, len(header), len(footer))
+    if base is not None:
+        _store_cached(base, data, {'columns': list(columns or ()), 'metadata': metadata, 'dialect': list(dialect)})
+        prune_spectrum_cache(cache_dir, cache_bytes, keep=base)
+    return SpectrumData(data, columns or (), metadata, dialect, filepath, x_column, y_column)
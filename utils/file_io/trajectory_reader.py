@@ -0,0 +1,224 @@
+# chem_assistant/utils/file_io/trajectory_reader.py
+# 多帧轨迹读取 (多帧XYZ / CHARMM-NAMD DCD)：首次打开时建立帧偏移索引，按需读取单帧
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from utils.file_io.molecule_reader import normalize_elements, read_structure
+
+TRAJECTORY_EXTENSIONS = ('.xyz', '.dcd')
+
+
+class Trajectory:
+    """轨迹基类：只在内存中保留少量最近访问的帧"""
+
+    def __init__(self, filepath, cache_frames=4):
+        self.filepath = filepath
+        self.cache_frames = cache_frames
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # 播放时可能有后台线程预读下一帧
+        self.elements = None
+        self.n_atoms = 0
+        self.n_frames = 0
+
+    def __len__(self):
+        return self.n_frames
+
+    def get_frame(self, index):
+        """返回第 index 帧的坐标 (n_atoms, 3)，最近用过的帧直接从缓存返回"""
+        if not -self.n_frames <= index < self.n_frames:
+            raise IndexError(f"帧序号 {index} 超出范围 (共 {self.n_frames} 帧)。")
+        index %= self.n_frames
+        with self._lock:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+            coords = self._read_frame(index)
+            self._cache[index] = coords
+            if len(self._cache) > self.cache_frames:
+                self._cache.popitem(last=False)
+            return coords
+
+    def __getitem__(self, index):
+        return self.get_frame(index)
+
+    def _read_frame(self, index):
+        raise NotImplementedError
+
+    def close(self):
+        self._cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class XYZTrajectory(Trajectory):
+    """多帧 XYZ 轨迹"""
+
+    def __init__(self, filepath, cache_frames=4):
+        super().__init__(filepath, cache_frames)
+        self._file = open(filepath, 'rb')
+        self.offsets, self.titles = self._build_index()
+        self.n_frames = len(self.offsets)
+        if self.n_frames == 0:
+            raise ValueError("XYZ轨迹中没有完整的帧。")
+        block = self._read_block(0)
+        self._columns = len(block.split(b'\n', 1)[0].split())
+        table = np.array(block.split()).reshape(self.n_atoms, -1)
+        self.elements = normalize_elements(table[:, 0].astype(str))
+
+    def _build_index(self):
+        """
+        记录每一帧的字节偏移。若各帧字节长度相同 (常见的定宽输出)，按帧长直接跳跃并只核对原子数行；
+        否则退回逐行扫描。
+        """
+        f = self._file
+        file_size = os.fstat(f.fileno()).st_size
+        offsets, titles = [], []
+        position = 0
+        frame_size = None
+        while position < file_size:
+            f.seek(position)
+            header = f.readline()
+            if not header.strip():
+                break
+            try:
+                n_atoms = int(header.split()[0])
+            except ValueError:
+                raise ValueError(f"XYZ轨迹在偏移 {position} 处格式错误。")
+            if self.n_atoms and n_atoms != self.n_atoms:
+                raise ValueError("XYZ轨迹中各帧原子数不一致。")
+            self.n_atoms = n_atoms
+
+            if frame_size is not None:
+                # 快速路径：假设与上一帧等长，检查下一帧起始位置是否仍是原子数行
+                candidate = position + frame_size
+                if candidate == file_size or (candidate < file_size and self._looks_like_header(candidate)):
+                    offsets.append(position); titles.append(None)
+                    position = candidate
+                    continue
+                frame_size = None
+                f.seek(position); f.readline()
+
+            title = f.readline()
+            for _ in range(n_atoms):
+                if not f.readline():
+                    return offsets, titles  # 末尾不完整的帧被忽略
+            offsets.append(position); titles.append(title.decode('utf-8', 'replace').strip())
+            new_position = f.tell()
+            frame_size = new_position - position
+            position = new_position
+        return offsets, titles
+
+    def _looks_like_header(self, offset):
+        self._file.seek(offset)
+        fields = self._file.readline().split()
+        return len(fields) >= 1 and fields[0].isdigit() and int(fields[0]) == self.n_atoms
+
+    def _read_block(self, index):
+        """读取第 index 帧的原子行 (不含原子数行和标题行)"""
+        f = self._file
+        f.seek(self.offsets[index])
+        f.readline(); f.readline()
+        if index + 1 < self.n_frames:
+            return f.read(self.offsets[index + 1] - f.tell())
+        return b''.join(f.readline() for _ in range(self.n_atoms))
+
+    def _read_frame(self, index):
+        tokens = self._read_block(index).split()
+        table = np.array(tokens[:self.n_atoms * self._columns]).reshape(self.n_atoms, self._columns)
+        return table[:, 1:4].astype(float)
+
+    def frame_title(self, index):
+        if self.titles[index] is None:
+            with self._lock:
+                self._file.seek(self.offsets[index]); self._file.readline()
+                self.titles[index] = self._file.readline().decode('utf-8', 'replace').strip()
+        return self.titles[index]
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class DCDTrajectory(Trajectory):
+    """
+    CHARMM/NAMD 二进制 DCD 轨迹。每帧记录长度固定，直接内存映射整个文件，读取某帧只是切片。
+    DCD 中没有元素信息，需要提供拓扑 (元素数组或结构文件路径)。
+    """
+
+    def __init__(self, filepath, topology, cache_frames=4):
+        super().__init__(filepath, cache_frames)
+        self._parse_header()
+        if isinstance(topology, str):
+            topology = read_structure(topology).elements
+        self.elements = np.asarray(topology, dtype=object)
+        if len(self.elements) != self.n_atoms:
+            raise ValueError(f"拓扑原子数 ({len(self.elements)}) 与DCD原子数 ({self.n_atoms}) 不一致。")
+
+    def _parse_header(self):
+        with open(self.filepath, 'rb') as f:
+            head = f.read(4)
+            endian = '<' if struct.unpack('<i', head)[0] == 84 else '>'
+            if struct.unpack(endian + 'i', head)[0] != 84:
+                raise ValueError("不是有效的DCD文件。")
+            block = f.read(84)
+            if block[:4] != b'CORD':
+                raise ValueError("不是有效的DCD坐标文件。")
+            ints = struct.unpack(endian + '20i', block[4:84])
+            n_frames_header, has_cell = ints[0], ints[10]
+            f.read(4)
+            title_size = struct.unpack(endian + 'i', f.read(4))[0]
+            f.seek(title_size + 4, 1)
+            f.read(4)
+            self.n_atoms = struct.unpack(endian + 'i', f.read(4))[0]
+            f.read(4)
+            self._data_offset = f.tell()
+            file_size = os.fstat(f.fileno()).st_size
+
+        self._endian = endian
+        self._has_cell = bool(has_cell)
+        coord_record = 4 * self.n_atoms + 8
+        # 可选的晶胞记录：6个float64 (48字节) + 前后记录长度 (8字节)
+        self._cell_bytes = 56 if self._has_cell else 0
+        self._frame_bytes = 3 * coord_record + self._cell_bytes
+        n_frames = (file_size - self._data_offset) // self._frame_bytes
+        self.n_frames = min(n_frames, n_frames_header) if n_frames_header > 0 else n_frames
+        if self.n_frames == 0:
+            raise ValueError("DCD文件中没有坐标帧。")
+        # 以 float32 视图映射全部帧：(n_frames, 每帧的float32个数)
+        self._frames = np.memmap(self.filepath, dtype=endian + 'f4', mode='r', offset=self._data_offset,
+                                 shape=(self.n_frames, self._frame_bytes // 4))
+
+    def _read_frame(self, index):
+        frame = self._frames[index]
+        start = self._cell_bytes // 4
+        n = self.n_atoms
+        coords = np.empty((n, 3), dtype=float)
+        for axis in range(3):
+            # 每个坐标记录前后各有 4 字节的 Fortran 记录长度
+            begin = start + axis * (n + 2) + 1
+            coords[:, axis] = frame[begin:begin + n]
+        return coords
+
+    def close(self):
+        super().close()
+        self._frames = None
+
+
+def open_trajectory(filepath, topology=None, cache_frames=4):
+    """根据扩展名打开轨迹文件"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.xyz':
+        return XYZTrajectory(filepath, cache_frames)
+    if ext == '.dcd':
+        if topology is None:
+            raise ValueError("DCD轨迹需要提供拓扑文件 (PDB/XYZ/MOL)。")
+        return DCDTrajectory(filepath, topology, cache_frames)
+    raise ValueError(f"不支持的轨迹格式 '{ext}'，支持: {', '.join(TRAJECTORY_EXTENSIONS)}")
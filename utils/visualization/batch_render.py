@@ -0,0 +1,157 @@
+# chem_assistant/utils/visualization/batch_render.py
+# 无界面批量出图：每个工作进程持有一个离屏 plotter，按化学式或结构文件生成 PNG
+# 命令行: python -m utils.visualization.batch_render H2O CH4 NaCl mol.xyz -o images/
+
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pyvista as pv
+from PIL import Image
+
+from utils.file_io.cif_reader import read_cif
+from utils.file_io.molecule_reader import read_structure, SUPPORTED_EXTENSIONS
+from utils.visualization.renderer import SceneRenderer
+from utils.visualization.scene import vsepr_scene, nacl_scene, molecule_scene, crystal_scene
+
+IMAGE_SIZE = (600, 500)
+# 每次提交给工作进程的任务数，减少进程间往返
+_CHUNK_SIZE = 8
+# PNG 压缩级别：1 比默认的 6 编码快数倍，文件只大一点
+PNG_COMPRESS_LEVEL = 1
+
+# path 为输出的 PNG 路径，失败时为 None，error 为错误信息
+RenderResult = namedtuple('RenderResult', ['item', 'path', 'error'])
+BatchSummary = namedtuple('BatchSummary', ['results', 'elapsed', 'images_per_second'])
+
+# 工作进程内的离屏渲染器，由 _init_worker 创建，之后每张图都复用
+_renderer = None
+
+
+@lru_cache(maxsize=256)
+def _formula_scene(formula):
+    """化学式 -> 场景 (NaCl 为晶胞，其余按 VSEPR)；同一化学式在一个进程内只构建一次"""
+    if formula.upper() == 'NACL':
+        return nacl_scene()
+    return vsepr_scene(formula)[0]
+
+
+def scene_for_item(item):
+    """批量条目 -> 场景：存在的 .cif / 分子结构文件按文件读取，否则当作化学式"""
+    if os.path.isfile(item):
+        ext = os.path.splitext(item)[1].lower()
+        if ext == '.cif':
+            structure = read_cif(item)
+            return crystal_scene(structure, title=structure.title or os.path.basename(item))
+        if ext in SUPPORTED_EXTENSIONS:
+            molecule = read_structure(item)
+            return molecule_scene(molecule, title=molecule.title or os.path.basename(item))
+        raise ValueError(f"不支持的文件格式 '{ext}'。")
+    return _formula_scene(item)
+
+
+def output_names(items):
+    """每个条目的 PNG 文件名：化学式原样，文件取主文件名；非法字符替换为 _，重名时追加序号"""
+    names, used = [], {}
+    for item in items:
+        stem = os.path.splitext(os.path.basename(item))[0] if os.path.isfile(item) else item
+        stem = re.sub(r'[^\w\-.()+]', '_', stem) or 'structure'
+        count = used.get(stem.lower(), 0)
+        used[stem.lower()] = count + 1
+        names.append(f"{stem}.png" if count == 0 else f"{stem}_{count + 1}.png")
+    return names
+
+
+def _init_worker(size):
+    """每个工作进程启动时创建一次离屏 plotter；SceneRenderer 内的球面模板网格也随之在进程内复用"""
+    global _renderer
+    pv.OFF_SCREEN = True
+    plotter = pv.Plotter(off_screen=True, window_size=list(size))
+    plotter.background_color = 'white'
+    _renderer = SceneRenderer(plotter)
+
+
+def _close_worker():
+    global _renderer
+    if _renderer is not None:
+        _renderer.plotter.close()
+        _renderer = None
+
+
+def _render_items(tasks):
+    results = []
+    for item, path in tasks:
+        try:
+            _renderer.show(scene_for_item(item))
+            image = _renderer.plotter.screenshot(None, return_img=True)
+            Image.fromarray(image).save(path, compress_level=PNG_COMPRESS_LEVEL)
+            results.append(RenderResult(item, path, None))
+        except Exception as e:
+            results.append(RenderResult(item, None, str(e)))
+    return results
+
+
+def render_batch(items, output_dir, size=IMAGE_SIZE, workers=None, callback=None):
+    """
+    把一组化学式 / 结构文件渲染成 PNG，无需显示器。
+    :param workers: 工作进程数，缺省为 CPU 核数 (不超过任务块数)；明确指定为 1 时不建进程池，直接在当前进程内渲染
+    :param callback: 每完成一块调用 callback(已完成数, 总数)
+    :return: BatchSummary(每个条目的 RenderResult, 总耗时 s, 每秒图片数)
+    """
+    items = [str(item).strip() for item in items if str(item).strip()]
+    if not items:
+        raise ValueError("没有需要渲染的条目。")
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(item, os.path.join(output_dir, name)) for item, name in zip(items, output_names(items))]
+    chunks = [tasks[k:k + _CHUNK_SIZE] for k in range(0, len(tasks), _CHUNK_SIZE)]
+    in_process = workers == 1
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+    start = time.perf_counter()
+    results = []
+    if in_process:
+        _init_worker(size)
+        try:
+            for chunk in chunks:
+                results += _render_items(chunk)
+                if callback is not None:
+                    callback(len(results), len(tasks))
+        finally:
+            _close_worker()
+    else:
+        # VTK 的 OpenGL 上下文不能跨 fork 继承，工作进程一律用 spawn 启动
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(tuple(size),)) as pool:
+            for chunk_results in pool.map(_render_items, chunks):
+                results += chunk_results
+                if callback is not None:
+                    callback(len(results), len(tasks))
+    elapsed = time.perf_counter() - start
+    rendered = sum(r.path is not None for r in results)
+    return BatchSummary(results, elapsed, rendered / elapsed if elapsed > 0 else float('inf'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成分子/晶体结构图片 (PNG)")
+    parser.add_argument('items', nargs='+', help="化学式 (如 H2O、NaCl) 或结构文件 (.xyz/.mol/.sdf/.pdb/.cif)")
+    parser.add_argument('-o', '--output', default='structure_images', help="输出目录")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="进程数 (缺省为 CPU 核数)")
+    parser.add_argument('--size', type=int, nargs=2, default=IMAGE_SIZE, metavar=('W', 'H'), help="图片尺寸 (像素)")
+    args = parser.parse_args(argv)
+    summary = render_batch(args.items, args.output, size=args.size, workers=args.workers)
+    for result in summary.results:
+        if result.error is not None:
+            print(f"失败: {result.item}: {result.error}")
+    done = sum(r.path is not None for r in summary.results)
+    print(f"已生成 {done}/{len(summary.results)} 张图片，用时 {summary.elapsed:.1f} s ({summary.images_per_second:.1f} 张/秒)")
+    return 0 if done == len(summary.results) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
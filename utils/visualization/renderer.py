@@ -0,0 +1,214 @@
+# chem_assistant/utils/visualization/renderer.py
+# 把场景字典 (见 scene.py) 画到 PyVista plotter 上，并支持原地更新坐标
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkFiltersCore import vtkFlyingEdges3D
+
+# 拖动等值面滑块时用抽稀后的网格预览，抽稀步长使预览网格不超过该点数，松开后再用完整网格
+PREVIEW_POINTS = 64 ** 3
+
+
+def _line_cells(segments):
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+    return np.hstack([np.full((len(segments), 1), 2), segments]).ravel()
+
+
+def volume_image(values, origin, axes, stride=1):
+    """(nx, ny, nz) 网格 -> pv.ImageData；格点向量不沿坐标轴时写入方向矩阵"""
+    values = np.asarray(values)[::stride, ::stride, ::stride]
+    axes = np.asarray(axes, dtype=float)
+    lengths = np.linalg.norm(axes, axis=1)
+    image = pv.ImageData(dimensions=values.shape, spacing=lengths * stride, origin=np.asarray(origin, dtype=float))
+    image.direction_matrix = (axes / lengths[:, None]).T
+    # VTK 的点序 x 变化最快，cube 文件是 z 变化最快
+    image.point_data['values'] = np.ravel(values, order='F').astype(np.float32, copy=False)
+    return image
+
+
+class SceneRenderer:
+    """
+    一个 plotter 对应一个 SceneRenderer。show() 切换模型，update_coords() 只改坐标
+    (用于优化/动力学过程中的实时刷新)，不重建 actor。
+    """
+
+    def __init__(self, plotter):
+        self.plotter = plotter
+        self.scene = None
+        self._sphere = pv.Sphere(radius=1.0, theta_resolution=20, phi_resolution=20)
+        self._axes_added = False
+        self._contours = []
+        self._volume_images = None
+        self._isovalue = None
+        self._slider = None
+
+    def show(self, scene, reset_camera=True):
+        # 逐个添加 actor 时 PyVista 每次都会重绘，这里先暂停，全部添加完后只渲染一次
+        plotter = self.plotter
+        plotter.suppress_rendering = True
+        try:
+            self._build(scene, reset_camera)
+        finally:
+            plotter.suppress_rendering = False
+        plotter.render()
+
+    def _build(self, scene, reset_camera):
+        plotter = self.plotter
+        plotter.clear()
+        plotter.clear_slider_widgets()
+        self._contours = []
+        self._volume_images = None
+        self._slider = None
+        self.scene = scene
+        self.atoms = pv.PolyData(np.asarray(scene['coords'], dtype=float))
+        self.atoms['colors'] = scene['colors']
+        self.atoms['radius'] = scene['radii']
+        bonds = scene['bonds']
+        self.spheres = self.tubes = self.bond_lines = None
+
+        if scene['style'] == 'points':
+            plotter.add_points(self.atoms, scalars='colors', rgb=True, render_points_as_spheres=True, point_size=6)
+            if len(bonds):
+                # 与原子共享 vtkPoints，更新坐标时键自动跟随
+                self.bond_lines = pv.PolyData()
+                self.bond_lines.SetPoints(self.atoms.GetPoints())
+                self.bond_lines.lines = _line_cells(bonds)
+                plotter.add_mesh(self.bond_lines, color='grey', line_width=1)
+        else:
+            self.spheres = self._glyph_atoms()
+            plotter.add_mesh(self.spheres, scalars='colors', rgb=True, smooth_shading=True)
+            if len(bonds):
+                self.tubes = self._bond_tubes()
+                plotter.add_mesh(self.tubes, color='grey', smooth_shading=True)
+
+        if scene.get('lines') is not None:
+            points, segments = scene['lines']
+            plotter.add_mesh(pv.PolyData(np.asarray(points, dtype=float), lines=_line_cells(segments)), color='gray', line_width=2)
+        if scene.get('overlays') is not None:
+            self._add_overlays(scene['overlays'])
+        if scene.get('volume') is not None:
+            self._add_volume(scene['volume'])
+        if scene.get('lobes') is not None:
+            self._add_lobes(scene['lobes'])
+        if scene.get('legend') and len(scene['elements']):
+            symbols, first = np.unique(scene['elements'], return_index=True)
+            plotter.add_legend(labels=[[s, tuple(scene['colors'][i] / 255.0)] for s, i in zip(symbols, first)],
+                               bcolor=None, face='circle')
+        if scene.get('info'):
+            plotter.add_text(scene['info'], position='lower_left', color='black', font_size=8, name='info')
+        if scene.get('title'):
+            plotter.add_text(f"{scene['title']} 3D 模型", position='upper_left', color='black', font_size=12, name='title')
+        plotter.background_color = 'white'
+        if not self._axes_added:
+            plotter.add_axes(); self._axes_added = True
+        if reset_camera:
+            plotter.reset_camera()
+
+    def _add_overlays(self, overlays):
+        """对称轴 (彩色线段 + 标注)、镜面 (半透明方块) 和对称中心"""
+        plotter = self.plotter
+        axis_points = np.asarray(overlays['axis_points'], dtype=float).reshape(-1, 2, 3)
+        if len(axis_points):
+            axes = pv.PolyData(axis_points.reshape(-1, 3), lines=_line_cells(np.arange(2 * len(axis_points)).reshape(-1, 2)))
+            axes.cell_data['colors'] = overlays['axis_colors']
+            plotter.add_mesh(axes, scalars='colors', rgb=True, line_width=4)
+            plotter.add_point_labels(axis_points[:, 1], list(overlays['axis_labels']), font_size=14, text_color='black',
+                                     shape=None, show_points=False, always_visible=True)
+        corners = np.asarray(overlays['plane_corners'], dtype=float).reshape(-1, 4, 3)
+        if len(corners):
+            faces = np.hstack([np.full((len(corners), 1), 4), np.arange(4 * len(corners)).reshape(-1, 4)]).ravel()
+            planes = pv.PolyData(corners.reshape(-1, 3), faces=faces)
+            planes.cell_data['colors'] = overlays['plane_colors']
+            plotter.add_mesh(planes, scalars='colors', rgb=True, opacity=0.25, show_edges=True)
+        if overlays.get('inversion_center') is not None:
+            plotter.add_points(np.asarray(overlays['inversion_center'], dtype=float).reshape(1, 3), color='purple',
+                               point_size=14, render_points_as_spheres=True)
+
+    def _add_lobes(self, lobes):
+        """轨道波瓣：半透明的彩色球"""
+        if not len(lobes['centers']):
+            return
+        centers = pv.PolyData(np.asarray(lobes['centers'], dtype=float))
+        centers['radius'] = lobes['radii']
+        centers['colors'] = lobes['colors']
+        spheres = centers.glyph(geom=self._sphere, scale='radius', orient=False)
+        self.plotter.add_mesh(spheres, scalars='colors', rgb=True, opacity=0.6, smooth_shading=True)
+
+    def _add_volume(self, volume):
+        """
+        正/负等值面各由一个 vtkFlyingEdges3D (多线程的 marching cubes) 生成，直接作为 actor 的数据源；
+        改变等值或切换完整/预览网格只需修改过滤器参数，渲染时管线自动重新计算。
+        """
+        plotter = self.plotter
+        values = volume['values']
+        full = volume_image(values, volume['origin'], volume['axes'])
+        stride = max(int(np.ceil((np.size(values) / PREVIEW_POINTS) ** (1.0 / 3.0))), 1)
+        preview = volume_image(values, volume['origin'], volume['axes'], stride) if stride > 1 else full
+        self._volume_images = (full, preview)
+        self._isovalue = float(volume['isovalue'])
+        for sign, color in zip((1.0, -1.0), volume['colors']):
+            contour = vtkFlyingEdges3D()
+            contour.SetInputData(full)
+            contour.SetInputArrayToProcess(0, 0, 0, 0, 'values')
+            contour.ComputeNormalsOn(); contour.ComputeScalarsOff()
+            contour.SetValue(0, sign * self._isovalue)
+            plotter.add_mesh(contour, color=tuple(np.asarray(color) / 255.0), opacity=0.7, specular=0.3)
+            self._contours.append((sign, contour))
+
+        low, high = np.log10(volume['range'])
+        slider = plotter.add_slider_widget(lambda value: self.set_isovalue(10.0 ** value, preview=True),
+                                           [low, high], value=np.log10(self._isovalue), title=self._isovalue_title(),
+                                           pointa=(0.55, 0.9), pointb=(0.95, 0.9), style='modern',
+                                           interaction_event='always')
+        slider.GetRepresentation().ShowSliderLabelOff()
+        # 松开滑块时换回完整网格 (创建滑块时 PyVista 会以预览方式先调用一次回调，这里也要换回来)
+        slider.AddObserver('EndInteractionEvent', lambda *args: self.set_isovalue(self._isovalue))
+        self._slider = slider
+        self.set_isovalue(self._isovalue)
+
+    def _isovalue_title(self):
+        sign = '±' if len(self._contours) > 1 else ''
+        return f"等值面 {sign}{self._isovalue:.4g}"
+
+    def set_isovalue(self, isovalue, preview=False):
+        """重新提取等值面；preview=True 时在抽稀网格上计算 (用于拖动滑块时的实时反馈)"""
+        if not self._contours:
+            return
+        self._isovalue = float(isovalue)
+        image = self._volume_images[1 if preview else 0]
+        for sign, contour in self._contours:
+            contour.SetInputData(image)
+            contour.SetValue(0, sign * self._isovalue)
+        if self._slider is not None:
+            self._slider.GetRepresentation().SetTitleText(self._isovalue_title())
+        self.plotter.render()
+
+    def isosurfaces(self):
+        """当前等值面网格 (按正、负顺序)，供测试和导出使用"""
+        meshes = []
+        for _, contour in self._contours:
+            contour.Update()
+            meshes.append(pv.wrap(contour.GetOutput()))
+        return meshes
+
+    def _glyph_atoms(self):
+        return self.atoms.glyph(geom=self._sphere, scale='radius', orient=False)
+
+    def _bond_tubes(self):
+        lines = pv.PolyData(self.atoms.points, lines=_line_cells(self.scene['bonds']))
+        return lines.tube(radius=0.08, n_sides=12)
+
+    def update_coords(self, coords):
+        """原地替换当前模型的坐标 (原子数必须不变)"""
+        if self.scene is None:
+            return
+        coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        if len(coords) != self.atoms.n_points:
+            raise ValueError(f"坐标数 ({len(coords)}) 与当前模型原子数 ({self.atoms.n_points}) 不一致。")
+        self.atoms.points[:] = coords
+        # 球/管是由原子坐标派生的网格，重新生成后写回同一个 actor 的数据集
+        if self.spheres is not None:
+            self.spheres.copy_from(self._glyph_atoms())
+        if self.tubes is not None:
+            self.tubes.copy_from(self._bond_tubes())
+        self.plotter.render()
@@ -0,0 +1,265 @@
+# chem_assistant/utils/visualization/scene.py
+# 3D 场景描述：只包含坐标、元素、颜色等纯数组，不依赖 PyVista，可直接在进程间传递
+
+import numpy as np
+
+from core.structure.bonds import covalent_radii_array
+from core.structure.surface import vdw_radii_array
+from core.structure.huckel import orbital_label
+from core.structure.vsepr import classify_formula, vsepr_molecule
+from core.structure.symmetry import detect_point_group
+from core.crystallography.crystal import UnitCell, CrystalStructure
+from core.crystallography.lattice import generate_lattice, cell_edges
+from utils.chem_utils.element_data import element_rgb
+
+# 超过该原子数时改用点精灵 + 线段绘制
+LARGE_STRUCTURE_ATOMS = 5000
+
+# 对称元素叠加层的颜色 (RGB)：旋转轴红色，只有映转轴的方向蓝色，镜面按类型着色
+PROPER_AXIS_COLOR = (214, 39, 40)
+IMPROPER_AXIS_COLOR = (31, 119, 180)
+MIRROR_COLORS = {'σh': (31, 119, 180), 'σv': (44, 160, 44), 'σd': (255, 127, 14), 'σ': (44, 160, 44)}
+# 原子暴露程度配色：埋藏 (蓝) -> 半暴露 (白) -> 完全暴露 (红)
+EXPOSURE_COLORMAP = np.array([[49, 54, 149], [245, 245, 245], [165, 0, 38]], dtype=float)
+# 体数据等值面：缺省等值 (原子单位)，正相红、负相蓝
+ORBITAL_ISOVALUE = 0.02
+DENSITY_ISOVALUE = 0.002
+ISOSURFACE_COLORS = ((214, 39, 40), (31, 119, 180))
+# Hückel 轨道波瓣：系数为 1 时的球半径 (Å)，系数绝对值小于 LOBE_CUTOFF 的原子不画
+LOBE_SCALE = 1.4
+LOBE_CUTOFF = 1e-3
+
+
+def element_colors(elements):
+    """元素符号数组 -> (n, 3) uint8 RGB 颜色 (对不同元素只查一次表)"""
+    symbols, inverse = np.unique(np.asarray(elements).astype(str), return_inverse=True)
+    palette = (np.array([element_rgb(s) for s in symbols]).reshape(-1, 3) * 255).astype(np.uint8)
+    return palette[inverse.ravel()]
+
+
+def make_scene(elements, coords, bonds=None, radii=None, style='auto', title="", info="", lines=None, legend=True,
+               overlays=None, colors=None):
+    """
+    组装一个场景字典。
+    :param style: 'ball_and_stick' (球棍)、'spheres' (只画原子球) 、'points' (点精灵) 或 'auto' (按原子数选择)
+    :param lines: 额外的线段 (如晶胞外框)，(points, segments) 二元组
+    :param overlays: 对称轴/镜面叠加层，见 symmetry_overlays
+    :param colors: (n, 3) uint8 的逐原子颜色，缺省按元素着色
+    """
+    elements = np.asarray(elements).astype(str)
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    if style == 'auto':
+        style = 'ball_and_stick' if len(coords) <= LARGE_STRUCTURE_ATOMS else 'points'
+    if radii is None:
+        radii = 0.3 * covalent_radii_array(elements) + 0.1 if len(elements) else np.zeros(0)
+    scene = {
+        'title': title,
+        'info': info,
+        'style': style,
+        'elements': elements,
+        'coords': coords,
+        'colors': (element_colors(elements) if len(elements) else np.zeros((0, 3), dtype=np.uint8)) if colors is None
+                  else np.asarray(colors, dtype=np.uint8).reshape(-1, 3),
+        'radii': np.asarray(radii, dtype=np.float32),
+        'bonds': np.zeros((0, 2), dtype=np.int32) if bonds is None else np.asarray(bonds, dtype=np.int32).reshape(-1, 2),
+        'lines': None,
+        'legend': legend,
+        'overlays': overlays,
+        'volume': None,
+        'lobes': None,
+    }
+    if lines is not None:
+        points, segments = lines
+        scene['lines'] = (np.asarray(points, dtype=np.float32), np.asarray(segments, dtype=np.int32))
+    return scene
+
+
+def molecule_scene(molecule, title=None):
+    """分子 -> 场景：小分子球棍模型，大体系点精灵"""
+    return make_scene(molecule.elements, molecule.coords, molecule.bonds, title=title or molecule.title or molecule.formula,
+                      info=f"{molecule.formula}\n原子数: {len(molecule)}  键数: {len(molecule.bonds)}", legend=False)
+
+
+def crystal_scene(structure, repeats=(1, 1, 1), title=None):
+    """晶体 -> 场景：超胞内全部原子 (按共价半径画球) 加晶胞外框"""
+    elements, coords, _ = generate_lattice(structure, repeats)
+    style = 'spheres' if len(coords) <= LARGE_STRUCTURE_ATOMS else 'points'
+    return make_scene(elements, coords, radii=0.5 * covalent_radii_array(elements), style=style,
+                      title=title or structure.title or structure.formula,
+                      info=f"{structure.cell!r}\n原子数: {len(coords)}", lines=cell_edges(structure.cell, repeats))
+
+
+def vsepr_scene(formula):
+    """VSEPR 理想构型 (判断逻辑见 core/structure/vsepr.py)，返回 (场景, 分子)"""
+    result = classify_formula(formula)
+    molecule = vsepr_molecule(result)
+    point_group = detect_point_group(molecule).point_group
+    scene = make_scene(molecule.elements, molecule.coords, molecule.bonds, style='ball_and_stick', title=formula,
+                       info=f'VSEPR Model: {result.shape}\nLone Pairs: {result.lone_pairs}\nPoint Group: {point_group}',
+                       legend=False)
+    return scene, molecule
+
+
+def nacl_scene():
+    """NaCl 立方晶胞 (岩盐结构)"""
+    nacl = CrystalStructure(UnitCell(5.6402, 5.6402, 5.6402), ['Na'] * 4 + ['Cl'] * 4,
+                            [[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0],
+                             [0.5, 0.5, 0.5], [0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5]], title="NaCl")
+    scene = crystal_scene(nacl)
+    scene['info'] = "晶胞模型 (NaCl)\n" + scene['info']
+    return scene
+
+
+def exposure_colors(exposure, vmax=None):
+    """每原子暴露比例 -> (n, 3) uint8 颜色；vmax 缺省取最大暴露比例 (小分子的原子很少超过一半暴露)"""
+    exposure = np.asarray(exposure, dtype=float)
+    if vmax is None:
+        vmax = float(exposure.max()) if len(exposure) else 1.0
+    exposure = np.clip(exposure / max(vmax, 1e-12), 0.0, 1.0)
+    stops = np.linspace(0.0, 1.0, len(EXPOSURE_COLORMAP))
+    return np.column_stack([np.interp(exposure, stops, EXPOSURE_COLORMAP[:, k]) for k in range(3)]).astype(np.uint8)
+
+
+def surface_scene(molecule, result, title=None):
+    """按范德华半径画出的空间填充模型 (即分子的范德华表面)，每个原子按溶剂暴露程度着色"""
+    return make_scene(molecule.elements, molecule.coords, radii=vdw_radii_array(molecule.elements), style='spheres',
+                      colors=exposure_colors(result.exposure), legend=False,
+                      title=title or molecule.title or molecule.formula,
+                      info=f"SASA: {result.total_area:.1f} Å² (探针 {result.probe_radius:.1f} Å)\n"
+                           f"范德华体积: {result.volume:.1f} Å³\n颜色: 蓝=埋藏 红=暴露")
+
+
+def volume_scene(cube, index=0, isovalue=None, title=None):
+    """
+    cube 体数据 (utils/file_io/cube_reader.py) -> 分子模型 + 等值面。
+    有正负相的轨道画 ±isovalue 两个面，密度只画正值面；isovalue 缺省按数据类型取常用值，并限制在滑块范围内。
+    """
+    values = cube.grid(index)
+    low, high = float(np.min(values)), float(np.max(values))
+    peak = max(-low, high)
+    if peak <= 0:
+        raise ValueError("网格数值全为零，无法绘制等值面。")
+    signed = bool(cube.orbital_ids) or low < 0
+    value_range = (peak * 1e-4, peak)
+    if isovalue is None:
+        isovalue = ORBITAL_ISOVALUE if signed else DENSITY_ISOVALUE
+    isovalue = float(np.clip(abs(isovalue), value_range[0], 0.5 * peak))
+
+    molecule = cube.molecule
+    label = f"轨道 {cube.orbital_ids[index]}" if cube.orbital_ids else ("体数据 (有正负值)" if signed else "密度")
+    scene = make_scene(molecule.elements, molecule.coords, molecule.bonds, title=title or cube.title or molecule.formula,
+                       info=f"{label}  网格: {'×'.join(str(n) for n in cube.shape)}\n"
+                            f"{molecule.formula}  原子数: {len(molecule)}", legend=False)
+    scene['volume'] = {
+        'values': values,
+        'origin': cube.origin.astype(np.float32),
+        'axes': cube.axes.astype(np.float32),
+        'isovalue': isovalue,
+        'range': value_range,
+        'signed': signed,
+        'colors': ISOSURFACE_COLORS if signed else ISOSURFACE_COLORS[:1],
+    }
+    return scene
+
+
+def p_orbital_axes(molecule, atoms):
+    """
+    π 原子 p 轨道的方向：取该原子与其邻居拟合平面的法向，只有一个邻居的端基原子取整个共轭体系的平均平面法向；
+    所有方向统一到与平均法向同侧，波瓣的相位颜色在整个分子上才有可比性
+    """
+    coords = molecule.coords
+    neighbors = molecule.neighbors()
+    region = np.unique(np.concatenate([np.asarray(atoms, dtype=np.int64)] + [np.asarray(neighbors[a], dtype=np.int64) for a in atoms]))
+    points = coords[region] - coords[region].mean(axis=0)
+    reference = np.linalg.svd(points)[2][-1] if len(points) >= 3 else _perpendicular(points[-1] - points[0])
+    axes = np.empty((len(atoms), 3))
+    for k, atom in enumerate(atoms):
+        if len(neighbors[atom]) >= 2:
+            local = coords[[atom] + neighbors[atom]]
+            axes[k] = np.linalg.svd(local - local.mean(axis=0))[2][-1]
+        else:
+            axes[k] = reference
+    axes[axes @ reference < 0] *= -1
+    return axes
+
+
+def _perpendicular(direction):
+    """与 direction 垂直的任一单位向量 (少于三个点、无法拟合平面时使用)"""
+    helper = np.array([1.0, 0.0, 0.0]) if abs(direction[0]) <= 0.9 * np.linalg.norm(direction) else np.array([0.0, 1.0, 0.0])
+    normal = np.cross(direction, helper)
+    return normal / (np.linalg.norm(normal) or 1.0)
+
+
+def orbital_lobes(molecule, result, index, scale=LOBE_SCALE):
+    """
+    Hückel 轨道 (core/structure/huckel.py) -> 波瓣：每个 π 原子沿 p 轨道方向上下各一个球，
+    半径正比于系数绝对值，颜色表示相位 (正相红、负相蓝)，两球在原子核处相切
+    """
+    coefficients = result.coefficients[:, index]
+    keep = np.abs(coefficients) > LOBE_CUTOFF
+    atoms, coefficients = result.atoms[keep], coefficients[keep]
+    axes = p_orbital_axes(molecule, atoms)
+    radii = scale * np.abs(coefficients)
+    offsets = axes * radii[:, None]
+    coords = molecule.coords[atoms]
+    phases = np.concatenate([np.sign(coefficients), -np.sign(coefficients)])
+    return {
+        'centers': np.vstack([coords + offsets, coords - offsets]).astype(np.float32),
+        'radii': np.concatenate([radii, radii]).astype(np.float32),
+        'colors': np.where(phases[:, None] > 0, ISOSURFACE_COLORS[0], ISOSURFACE_COLORS[1]).astype(np.uint8),
+    }
+
+
+def huckel_scene(molecule, result, index, title=None):
+    """分子球棍模型 + 第 index 个 Hückel 轨道的波瓣"""
+    scene = molecule_scene(molecule, title=title)
+    scene['lobes'] = orbital_lobes(molecule, result, index)
+    scene['info'] = (f"{orbital_label(result, index)}: E = α {result.energies[index]:+.3f}β  "
+                     f"占据 {result.occupations[index]:g}\n" + scene['info'])
+    return scene
+
+
+def symmetry_overlays(result, coords, margin=1.0):
+    """
+    点群分析结果 (core/structure/symmetry.py) -> 叠加层：对称轴画成过质心的彩色线段并标注阶次，
+    镜面画成半透明正方形，对称中心画成一个点。与旋转轴重合的映转轴合并到同一条线的标注里。
+    """
+    center = np.asarray(result.center, dtype=float)
+    extent = float(np.linalg.norm(np.asarray(coords, dtype=float) - center, axis=1).max()) + margin
+    proper = [e for e in result.symmetry_elements if e.symbol.startswith('C')]
+    improper = [e for e in result.symmetry_elements if e.symbol.startswith('S')]
+    mirrors = [e for e in result.symmetry_elements if e.symbol.startswith('σ')]
+
+    directions, labels, colors = [], [], []
+    merged = set()
+    for element in proper:
+        label = element.symbol
+        for k, other in enumerate(improper):
+            if abs(np.dot(other.vector, element.vector)) > 1 - 1e-3:
+                label += f"/{other.symbol}"
+                merged.add(k)
+        directions.append(element.vector); labels.append(label); colors.append(PROPER_AXIS_COLOR)
+    for k, element in enumerate(improper):
+        if k not in merged:
+            directions.append(element.vector); labels.append(element.symbol); colors.append(IMPROPER_AXIS_COLOR)
+    directions = np.asarray(directions, dtype=float).reshape(-1, 3)
+    axis_points = center + extent * np.stack([-directions, directions], axis=1)
+
+    normals = np.asarray([e.vector for e in mirrors], dtype=float).reshape(-1, 3)
+    # 镜面内两条正交的方向：先与一个不平行的坐标轴叉乘
+    helper = np.where(np.abs(normals[:, :1]) < 0.9, [[1.0, 0, 0]], [[0, 1.0, 0]])
+    u = np.cross(normals, helper)
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    v = np.cross(normals, u)
+    signs = np.array([(1, 1), (-1, 1), (-1, -1), (1, -1)], dtype=float)
+    plane_corners = center + extent * (signs[None, :, :1] * u[:, None] + signs[None, :, 1:] * v[:, None])
+
+    inversion = any(e.symbol == 'i' for e in result.symmetry_elements)
+    return {
+        'axis_points': axis_points.astype(np.float32),
+        'axis_colors': np.asarray(colors, dtype=np.uint8).reshape(-1, 3),
+        'axis_labels': labels,
+        'plane_corners': plane_corners.astype(np.float32),
+        'plane_colors': np.asarray([MIRROR_COLORS[e.symbol] for e in mirrors], dtype=np.uint8).reshape(-1, 3),
+        'inversion_center': center.astype(np.float32) if inversion else None,
+    }
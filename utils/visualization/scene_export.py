@@ -0,0 +1,416 @@
+# chem_assistant/utils/visualization/scene_export.py
+# 把场景字典 (见 scene.py) 导出为 glTF 二进制 (.glb) 或 VTK.js 场景 (.vtkjs)，可在浏览器中查看
+# glTF 中原子球和键用 EXT_mesh_gpu_instancing 实例化：只存一份模板网格 + 每个实例的平移/旋转/缩放；
+# 模板的细分程度和等值面的抽稀目标都由三角形预算决定
+
+import hashlib
+import json
+import os
+import struct
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+import pyvista as pv
+
+from utils.visualization.renderer import volume_image
+
+EXPORT_FORMATS = ('.glb', '.vtkjs')
+# 整个场景的三角形预算：实例化的原子/键与等值面等完整网格各占一半
+TRIANGLE_BUDGET = 1_000_000
+BOND_RADIUS = 0.08
+# 逐原子着色 (如按暴露程度) 的颜色种类超过该值时，按 4 位/通道量化后再分组，避免材质过多
+MAX_COLOR_GROUPS = 64
+# 模板网格的细分范围：二十面体细分 0~3 次 (20~1280 个三角形)，圆柱侧面 5~16 边
+_SPHERE_LEVELS = (0, 1, 2, 3)
+_CYLINDER_SIDES = (5, 16)
+
+# 导出的中间表示。kind: 'triangles' / 'lines' / 'points'；cells 为 (k, 3) 三角形或 (k, 2) 线段的顶点下标；
+# color 为 sRGB 0-255；instances 为 None (完整网格) 或 (平移 (m, 3), 旋转四元数 xyzw (m, 4) 或 None, 缩放 (m, 3) 或 None)
+Part = namedtuple('Part', ['name', 'kind', 'points', 'normals', 'cells', 'color', 'opacity', 'instances'])
+# 导出结果：文件路径、字节数、模板/网格的三角形总数、实例数
+ExportSummary = namedtuple('ExportSummary', ['path', 'size', 'triangles', 'instances'])
+
+
+def _mesh_arrays(mesh):
+    """pv.PolyData (三角网格) -> (点, 点法向, (k, 3) 三角形)"""
+    mesh = mesh.triangulate().compute_normals(cell_normals=False, split_vertices=False, auto_orient_normals=False)
+    faces = np.asarray(mesh.faces).reshape(-1, 4)[:, 1:] if mesh.n_cells else np.zeros((0, 3), dtype=np.int64)
+    return (np.asarray(mesh.points, dtype=np.float32), np.asarray(mesh.point_data['Normals'], dtype=np.float32),
+            faces.astype(np.uint32))
+
+
+def _sphere_template(max_triangles):
+    """单位球：在预算内细分次数最多的二十面体，法向即顶点坐标"""
+    level = max([k for k in _SPHERE_LEVELS if 20 * 4 ** k <= max_triangles] or [0])
+    sphere = pv.Icosphere(radius=1.0, nsub=level)
+    points = np.asarray(sphere.points, dtype=np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    faces = np.asarray(sphere.faces).reshape(-1, 4)[:, 1:].astype(np.uint32)
+    return points, points.copy(), faces
+
+
+def _cylinder_template(max_triangles):
+    """单位圆柱：半径 1，沿 +y 从 0 到 1，不封口 (两端被原子球挡住)"""
+    sides = int(np.clip(max_triangles // 2, *_CYLINDER_SIDES))
+    angles = 2 * np.pi * np.arange(sides) / sides
+    ring = np.stack([np.cos(angles), np.zeros(sides), np.sin(angles)], axis=1)
+    points = np.vstack([ring, ring + [0.0, 1.0, 0.0]]).astype(np.float32)
+    normals = np.vstack([ring, ring]).astype(np.float32)
+    a = np.arange(sides)
+    b = (a + 1) % sides
+    # 顶点顺序使法向朝外
+    faces = np.vstack([np.stack([a, a + sides, b], axis=1), np.stack([b, a + sides, b + sides], axis=1)])
+    return points, normals, faces.astype(np.uint32)
+
+
+def _color_groups(colors):
+    """逐对象颜色 -> [(颜色, 下标数组)]；颜色种类过多时先量化"""
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    palette, inverse = np.unique(colors, axis=0, return_inverse=True)
+    if len(palette) > MAX_COLOR_GROUPS:
+        palette, inverse = np.unique((colors & 0xF0) | 0x08, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    splits = np.cumsum(np.bincount(inverse, minlength=len(palette)))[:-1]
+    return list(zip(palette, np.split(order, splits)))
+
+
+def _rotations_from_y(directions):
+    """把 +y 转到各单位方向的四元数 (x, y, z, w)"""
+    d = np.asarray(directions, dtype=float)
+    # q = (y × d, 1 + y·d) 归一化；与 -y 反平行时改为绕 x 轴转 180°
+    q = np.stack([d[:, 2], np.zeros(len(d)), -d[:, 0], 1.0 + d[:, 1]], axis=1)
+    opposite = q[:, 3] < 1e-6
+    q[opposite] = [1.0, 0.0, 0.0, 0.0]
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _bond_instances(coords, bonds):
+    start, end = coords[bonds[:, 0]], coords[bonds[:, 1]]
+    vectors = end - start
+    lengths = np.linalg.norm(vectors, axis=1)
+    directions = vectors / np.where(lengths > 0, lengths, 1.0)[:, None]
+    scales = np.stack([np.full(len(bonds), BOND_RADIUS), lengths, np.full(len(bonds), BOND_RADIUS)], axis=1)
+    return start.astype(np.float32), _rotations_from_y(directions), scales.astype(np.float32)
+
+
+def _sphere_parts(name, centers, radii, colors, template, opacity=1.0):
+    """同色的球为一组；组内半径相同时把半径缩放进模板，只需存平移"""
+    parts = []
+    points, normals, faces = template
+    for k, (color, index) in enumerate(_color_groups(colors)):
+        group_radii = np.asarray(radii, dtype=np.float32)[index]
+        if np.ptp(group_radii) < 1e-6:
+            part_points, scales = points * group_radii[0], None
+        else:
+            part_points, scales = points, np.repeat(group_radii[:, None], 3, axis=1)
+        parts.append(Part(f"{name}_{k}", 'triangles', part_points, normals, faces, tuple(int(c) for c in color),
+                          opacity, (centers[index].astype(np.float32), None, scales)))
+    return parts
+
+
+def _decimate(mesh, max_triangles):
+    """三角形数超过 max_triangles 时用二次误差度量抽稀 (vtkQuadricDecimation)"""
+    mesh = mesh.triangulate()
+    if mesh.n_cells > max_triangles > 0:
+        mesh = mesh.decimate(1.0 - max_triangles / mesh.n_cells, volume_preservation=True)
+    return mesh
+
+
+def _isosurface_parts(volume, max_triangles):
+    image = volume_image(volume['values'], volume['origin'], volume['axes'])
+    meshes = []
+    for sign, color in zip((1.0, -1.0), volume['colors']):
+        mesh = image.contour([sign * float(volume['isovalue'])], scalars='values', method='flying_edges')
+        if mesh.n_cells:
+            meshes.append((mesh, color))
+    parts = []
+    for k, (mesh, color) in enumerate(meshes):
+        points, normals, faces = _mesh_arrays(_decimate(mesh, max_triangles // len(meshes)))
+        parts.append(Part(f"isosurface_{k}", 'triangles', points, normals, faces, tuple(color), 0.7, None))
+    return parts
+
+
+def _overlay_parts(overlays, sphere):
+    parts = []
+    axis_points = np.asarray(overlays['axis_points'], dtype=np.float32).reshape(-1, 2, 3)
+    for k, (color, index) in enumerate(_color_groups(overlays['axis_colors']) if len(axis_points) else []):
+        segments = np.arange(2 * len(index), dtype=np.uint32).reshape(-1, 2)
+        parts.append(Part(f"symmetry_axes_{k}", 'lines', axis_points[index].reshape(-1, 3), None, segments,
+                          tuple(int(c) for c in color), 1.0, None))
+    corners = np.asarray(overlays['plane_corners'], dtype=np.float32).reshape(-1, 4, 3)
+    for k, (color, index) in enumerate(_color_groups(overlays['plane_colors']) if len(corners) else []):
+        points = corners[index].reshape(-1, 3)
+        quads = np.arange(len(points), dtype=np.uint32).reshape(-1, 4)
+        faces = np.vstack([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+        normals = np.repeat(np.cross(corners[index, 1] - corners[index, 0], corners[index, 3] - corners[index, 0]), 4, axis=0)
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        parts.append(Part(f"mirror_planes_{k}", 'triangles', points, normals.astype(np.float32), faces,
+                          tuple(int(c) for c in color), 0.25, None))
+    if overlays.get('inversion_center') is not None:
+        center = np.asarray(overlays['inversion_center'], dtype=np.float32).reshape(1, 3)
+        parts += _sphere_parts('inversion_center', center, [0.15], [(128, 0, 128)], sphere)
+    return parts
+
+
+def scene_parts(scene, triangle_budget=TRIANGLE_BUDGET, instancing=True):
+    """
+    场景 -> Part 列表。
+    :param instancing: 目标格式是否支持实例化。不支持时点精灵风格的大结构，以及预算连最粗的球模板都放不下的结构，
+                       导出为点 + 线段，不生成球和圆柱
+    """
+    coords = np.asarray(scene['coords'], dtype=np.float32).reshape(-1, 3)
+    bonds = np.asarray(scene['bonds'], dtype=np.int64).reshape(-1, 2)
+    lobes = scene.get('lobes')
+    n_lobes = 0 if lobes is None else len(lobes['centers'])
+    draw_bonds = scene['style'] == 'ball_and_stick' and len(bonds) > 0
+
+    # 有等值面时一半预算给它，其余按对象数分给球和圆柱模板
+    mesh_budget = triangle_budget // 2 if scene.get('volume') is not None else 0
+    instance_budget = triangle_budget - mesh_budget
+    per_object = instance_budget / max(len(coords) + n_lobes + (len(bonds) if draw_bonds else 0), 1)
+    as_points = not instancing and (scene['style'] == 'points' or per_object < 20 * 4 ** _SPHERE_LEVELS[0])
+    if as_points:
+        draw_bonds = False
+        per_object = instance_budget / max(n_lobes, 1)
+    sphere = _sphere_template(per_object)
+
+    parts = []
+    if len(coords) and as_points:
+        for k, (color, index) in enumerate(_color_groups(scene['colors'])):
+            parts.append(Part(f"atoms_{k}", 'points', coords[index], None, None, tuple(int(c) for c in color), 1.0, None))
+    elif len(coords):
+        parts += _sphere_parts('atoms', coords, scene['radii'], scene['colors'], sphere)
+    if draw_bonds:
+        cylinder = _cylinder_template(per_object)
+        parts.append(Part('bonds', 'triangles', *cylinder, (128, 128, 128), 1.0, _bond_instances(coords, bonds)))
+    elif len(bonds):
+        parts.append(Part('bonds', 'lines', coords, None, bonds.astype(np.uint32), (128, 128, 128), 1.0, None))
+    if scene.get('lines') is not None:
+        points, segments = scene['lines']
+        parts.append(Part('lines', 'lines', np.asarray(points, dtype=np.float32), None,
+                          np.asarray(segments, dtype=np.uint32).reshape(-1, 2), (128, 128, 128), 1.0, None))
+    if scene.get('overlays') is not None:
+        parts += _overlay_parts(scene['overlays'], sphere)
+    if scene.get('volume') is not None:
+        parts += _isosurface_parts(scene['volume'], mesh_budget)
+    if n_lobes:
+        parts += _sphere_parts('lobes', np.asarray(lobes['centers'], dtype=np.float32), lobes['radii'], lobes['colors'],
+                               sphere, opacity=0.6)
+    return parts
+
+
+def _quaternion_matrices(q):
+    x, y, z, w = np.asarray(q, dtype=float).T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def expand_instances(part):
+    """实例化的 Part -> 把模板复制到每个实例后的完整网格 (供不支持实例化的格式使用)"""
+    if part.instances is None:
+        return part
+    translations, rotations, scales = part.instances
+    points, normals = part.points[None].astype(float), part.normals[None].astype(float)
+    if scales is not None:
+        points = points * scales[:, None, :]
+        # 非均匀缩放下法向按逆缩放变换
+        normals = normals / scales[:, None, :]
+    if rotations is not None:
+        matrices = _quaternion_matrices(rotations)
+        points = np.einsum('mij,mpj->mpi', matrices, points)
+        normals = np.einsum('mij,mpj->mpi', matrices, normals)
+    points = points + translations[:, None, :]
+    normals = np.broadcast_to(normals, points.shape)
+    normals = normals / np.maximum(np.linalg.norm(normals, axis=2, keepdims=True), 1e-12)
+    n_template = len(part.points)
+    cells = part.cells[None] + (n_template * np.arange(len(translations), dtype=np.uint32))[:, None, None]
+    return part._replace(points=points.reshape(-1, 3).astype(np.float32), normals=normals.reshape(-1, 3).astype(np.float32),
+                         cells=cells.reshape(-1, part.cells.shape[1]), instances=None)
+
+
+def _summary(path, parts):
+    triangles = sum(len(p.cells) for p in parts if p.kind == 'triangles')
+    instances = sum(len(p.instances[0]) for p in parts if p.instances is not None)
+    return ExportSummary(path, os.path.getsize(path), triangles, instances)
+
+
+# ---------------------------------------------------------------- glTF 2.0 (.glb)
+
+_GLB_MAGIC, _GLB_JSON, _GLB_BIN = 0x46546C67, 0x4E4F534A, 0x004E4942
+_FLOAT, _UNSIGNED_INT = 5126, 5125
+_ARRAY_BUFFER, _ELEMENT_ARRAY_BUFFER = 34962, 34963
+_MODE_POINTS, _MODE_LINES, _MODE_TRIANGLES = 0, 1, 4
+
+
+def _linear_rgb(color):
+    """glTF 的 baseColorFactor 是线性颜色，场景里的颜色是 sRGB"""
+    c = np.asarray(color, dtype=float) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4).tolist()
+
+
+class _GlbBuilder:
+    """收集 JSON 结构和二进制缓冲区；每个数组一个 bufferView，按 4 字节对齐"""
+
+    def __init__(self):
+        self.gltf = {'asset': {'version': '2.0', 'generator': 'Chemstation'}, 'scene': 0, 'scenes': [{'nodes': []}],
+                     'nodes': [], 'meshes': [], 'materials': [], 'accessors': [], 'bufferViews': [], 'buffers': []}
+        self.chunks = []
+        self.offset = 0
+
+    def accessor(self, array, kind, component=_FLOAT, target=None, bounds=False):
+        array = np.ascontiguousarray(array, dtype=np.float32 if component == _FLOAT else np.uint32)
+        data = array.tobytes()
+        view = {'buffer': 0, 'byteOffset': self.offset, 'byteLength': len(data)}
+        if target is not None:
+            view['target'] = target
+        self.gltf['bufferViews'].append(view)
+        padding = -len(data) % 4
+        self.chunks.append(data + b'\0' * padding)
+        self.offset += len(data) + padding
+        accessor = {'bufferView': len(self.gltf['bufferViews']) - 1, 'componentType': component,
+                    'count': len(array) if kind != 'SCALAR' else array.size, 'type': kind}
+        if bounds:
+            accessor['min'] = array.min(axis=0).tolist()
+            accessor['max'] = array.max(axis=0).tolist()
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    def add_part(self, part):
+        material = {'name': part.name, 'doubleSided': part.opacity < 1,
+                    'pbrMetallicRoughness': {'baseColorFactor': _linear_rgb(part.color) + [float(part.opacity)],
+                                             'metallicFactor': 0.0, 'roughnessFactor': 0.6}}
+        if part.opacity < 1:
+            material['alphaMode'] = 'BLEND'
+        self.gltf['materials'].append(material)
+        attributes = {'POSITION': self.accessor(part.points, 'VEC3', target=_ARRAY_BUFFER, bounds=True)}
+        if part.normals is not None:
+            attributes['NORMAL'] = self.accessor(part.normals, 'VEC3', target=_ARRAY_BUFFER)
+        primitive = {'attributes': attributes, 'material': len(self.gltf['materials']) - 1,
+                     'mode': {'points': _MODE_POINTS, 'lines': _MODE_LINES, 'triangles': _MODE_TRIANGLES}[part.kind]}
+        if part.cells is not None:
+            primitive['indices'] = self.accessor(part.cells.ravel(), 'SCALAR', _UNSIGNED_INT, target=_ELEMENT_ARRAY_BUFFER)
+        self.gltf['meshes'].append({'name': part.name, 'primitives': [primitive]})
+        node = {'name': part.name, 'mesh': len(self.gltf['meshes']) - 1}
+        if part.instances is not None:
+            translations, rotations, scales = part.instances
+            instanced = {'TRANSLATION': self.accessor(translations, 'VEC3')}
+            if rotations is not None:
+                instanced['ROTATION'] = self.accessor(rotations, 'VEC4')
+            if scales is not None:
+                instanced['SCALE'] = self.accessor(scales, 'VEC3')
+            node['extensions'] = {'EXT_mesh_gpu_instancing': {'attributes': instanced}}
+            self.gltf['extensionsUsed'] = ['EXT_mesh_gpu_instancing']
+        self.gltf['nodes'].append(node)
+        self.gltf['scenes'][0]['nodes'].append(len(self.gltf['nodes']) - 1)
+
+    def write(self, filepath):
+        self.gltf['buffers'] = [{'byteLength': self.offset}]
+        content = json.dumps(self.gltf, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        content += b' ' * (-len(content) % 4)
+        total = 12 + 8 + len(content) + 8 + self.offset
+        with open(filepath, 'wb') as f:
+            f.write(struct.pack('<III', _GLB_MAGIC, 2, total))
+            f.write(struct.pack('<II', len(content), _GLB_JSON))
+            f.write(content)
+            f.write(struct.pack('<II', self.offset, _GLB_BIN))
+            for chunk in self.chunks:
+                f.write(chunk)
+
+
+def export_gltf(scene, filepath, triangle_budget=TRIANGLE_BUDGET, instancing=True):
+    """
+    导出为 glTF 二进制文件。原子、键、轨道波瓣以实例化网格保存 (需要查看器支持 EXT_mesh_gpu_instancing，
+    three.js、Babylon.js 等均支持)；等值面按三角形预算抽稀。文字 (标题、对称元素标注) 不导出。
+    :param instancing: False 时把实例展开成普通网格，供不支持该扩展的查看器 (如 ParaView) 使用
+    """
+    builder = _GlbBuilder()
+    parts = scene_parts(scene, triangle_budget, instancing)
+    if not instancing:
+        parts = [expand_instances(part) for part in parts]
+    if scene.get('title'):
+        builder.gltf['scenes'][0]['name'] = str(scene['title'])
+    for part in parts:
+        builder.add_part(part)
+    builder.write(filepath)
+    return _summary(filepath, parts)
+
+
+# ---------------------------------------------------------------- VTK.js (.vtkjs)
+
+def _cell_array(cells, size):
+    """(k, size) 顶点下标 -> VTK 旧式单元数组 [size, i0, i1, ..., size, ...]"""
+    cells = np.asarray(cells, dtype=np.uint32).reshape(-1, size)
+    return np.hstack([np.full((len(cells), 1), size, dtype=np.uint32), cells]).ravel()
+
+
+def _vtkjs_array(files, prefix, name, array, vtk_class='vtkDataArray'):
+    array = np.ascontiguousarray(array)
+    data = array.tobytes()
+    digest = hashlib.md5(data).hexdigest()
+    files[f"{prefix}/data/{digest}"] = data
+    return {'vtkClass': vtk_class, 'name': name, 'numberOfComponents': array.shape[1] if array.ndim == 2 else 1,
+            'dataType': {np.dtype(np.float32): 'Float32Array', np.dtype(np.uint32): 'Uint32Array'}[array.dtype],
+            'size': int(array.size), 'ref': {'encode': 'LittleEndian', 'basepath': 'data', 'id': digest}}
+
+
+def _vtkjs_dataset(files, prefix, part):
+    dataset = {'vtkClass': 'vtkPolyData',
+               'points': _vtkjs_array(files, prefix, '_points', part.points.astype(np.float32), 'vtkPoints')}
+    if part.kind == 'points':
+        cells = ('verts', _cell_array(np.arange(len(part.points)), 1))
+    elif part.kind == 'lines':
+        cells = ('lines', _cell_array(part.cells, 2))
+    else:
+        cells = ('polys', _cell_array(part.cells, 3))
+    dataset[cells[0]] = _vtkjs_array(files, prefix, f"_{cells[0]}", cells[1], 'vtkCellArray')
+    if part.normals is not None:
+        dataset['pointData'] = {'vtkClass': 'vtkDataSetAttributes', 'activeNormals': 0, 'arrays': [
+            {'data': _vtkjs_array(files, prefix, 'Normals', part.normals.astype(np.float32))}]}
+    files[f"{prefix}/index.json"] = json.dumps(dataset).encode('utf-8')
+
+
+def export_vtkjs(scene, filepath, triangle_budget=TRIANGLE_BUDGET):
+    """
+    导出为 VTK.js 场景压缩包 (与 ParaView 的 “Export Scene” 相同的布局，可用 vtk.js 的 SceneExplorer 打开)。
+    格式不支持实例化，球和圆柱展开成完整网格；点精灵风格的大结构导出为点和线段，文件仍然很小。
+    """
+    parts = [expand_instances(part) for part in scene_parts(scene, triangle_budget, instancing=False)]
+    files, items = {}, []
+    for k, part in enumerate(parts):
+        _vtkjs_dataset(files, str(k), part)
+        items.append({
+            'name': part.name, 'type': 'httpDataSetReader', 'httpDataSetReader': {'url': str(k)},
+            'actor': {'origin': [0, 0, 0], 'scale': [1, 1, 1], 'position': [0, 0, 0]},
+            'actorRotation': [0, 0, 0, 1],
+            'mapper': {'colorByArrayName': '', 'colorMode': 0, 'scalarMode': 0, 'scalarVisibility': False},
+            'property': {'representation': 0 if part.kind == 'points' else 2, 'edgeVisibility': 0,
+                         'diffuseColor': (np.asarray(part.color) / 255.0).tolist(), 'opacity': float(part.opacity),
+                         'pointSize': 6, 'lineWidth': 2, 'ambient': 0.1, 'diffuse': 0.9, 'specular': 0.2},
+        })
+    points = np.vstack([p.points for p in parts]) if parts else np.zeros((1, 3), dtype=np.float32)
+    center = (points.min(axis=0) + points.max(axis=0)) / 2.0
+    radius = float(np.linalg.norm(points.max(axis=0) - points.min(axis=0))) / 2.0 or 1.0
+    index = {'version': 1.0, 'fetchGzip': False, 'background': [1, 1, 1], 'scene': items, 'lookupTables': {},
+             'centerOfRotation': center.tolist(),
+             'camera': {'focalPoint': center.tolist(), 'position': (center + [0.0, 0.0, 2.5 * radius]).tolist(),
+                        'viewUp': [0, 1, 0]}}
+    with zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        archive.writestr('index.json', json.dumps(index, ensure_ascii=False))
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return _summary(filepath, parts)
+
+
+def export_scene(scene, filepath, triangle_budget=TRIANGLE_BUDGET):
+    """按扩展名 (.glb / .vtkjs) 导出场景"""
+    ext = os.path.splitext(str(filepath))[1].lower()
+    if ext == '.glb':
+        return export_gltf(scene, filepath, triangle_budget)
+    if ext == '.vtkjs':
+        return export_vtkjs(scene, filepath, triangle_budget)
+    raise ValueError(f"不支持的导出格式 '{ext}'，请使用 {' 或 '.join(EXPORT_FORMATS)}。")
@@ -0,0 +1,116 @@
+# chem_assistant/utils/visualization/shared_arrays.py
+# 进程间传递大数组：数据写入共享内存，管道里只传 (名称, 偏移, 形状, dtype) 引用
+
+import os
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+
+# 小于该字节数的数组直接随消息 pickle，更大的走共享内存
+SHARED_MEMORY_THRESHOLD = 64 * 1024
+_ALIGNMENT = 64
+
+SharedArrayRef = namedtuple('SharedArrayRef', ['name', 'offset', 'shape', 'dtype'])
+
+
+def _is_large(value):
+    return isinstance(value, np.ndarray) and value.dtype != object and value.nbytes >= SHARED_MEMORY_THRESHOLD
+
+
+def _iter_large(obj):
+    if _is_large(obj):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from _iter_large(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            yield from _iter_large(value)
+
+
+def _map(obj, func):
+    """对嵌套的 dict/list/tuple 中的每个叶子调用 func，返回同结构的新对象"""
+    if isinstance(obj, dict):
+        return {key: _map(value, func) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)) and not isinstance(obj, SharedArrayRef):
+        return type(obj)(_map(value, func) for value in obj)
+    return func(obj)
+
+
+def _aligned(size):
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedArrayWriter:
+    """
+    发送端持有一块可复用的共享内存，容量不够时换一块更大的。
+    同一块内存会被下一条消息覆盖，因此接收端必须在确认 (ack) 之前把数组复制出去。
+    """
+
+    def __init__(self):
+        self._shm = None
+
+    def encode(self, message):
+        large = list(_iter_large(message))
+        if not large:
+            return message
+        needed = sum(_aligned(a.nbytes) for a in large)
+        if self._shm is None or self._shm.size < needed:
+            old_size = self._shm.size if self._shm is not None else 0
+            self.close()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(needed, 2 * old_size, 1 << 20))
+        buffer = self._shm.buf
+        offset = 0
+
+        def replace(value):
+            nonlocal offset
+            if not _is_large(value):
+                return value
+            array = np.ascontiguousarray(value)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=offset)[...] = array
+            ref = SharedArrayRef(self._shm.name, offset, array.shape, array.dtype.str)
+            offset += _aligned(array.nbytes)
+            return ref
+
+        return _map(message, replace)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+
+class SharedArrayReader:
+    """接收端：按名称打开共享内存 (只保留最近一块)，把引用还原成独立的数组副本"""
+
+    def __init__(self):
+        self._shm = None
+
+    def _attach(self, name):
+        if self._shm is not None and self._shm.name == name:
+            return self._shm
+        self.close()
+        self._shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            # 3.13 之前打开已有共享内存也会登记到 resource_tracker，退出时会被误删，这里撤销登记
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        return self._shm
+
+    def decode(self, message):
+        def restore(value):
+            if not isinstance(value, SharedArrayRef):
+                return value
+            shm = self._attach(value.name)
+            return np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf, offset=value.offset).copy()
+
+        return _map(message, restore)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
@@ -0,0 +1,145 @@
+# chem_assistant/utils/visualization/spectrum_lod.py
+# 百万点级谱图的分级抽稀 (LOD)：预先建立最小/最大值金字塔，缩放/平移时只取可见范围、按像素宽度抽稀后重画
+
+import numpy as np
+
+# 金字塔第 1 层每个桶的原始点数，之后每层合并 LOD_FACTOR 个桶
+LOD_BASE = 4
+LOD_FACTOR = 4
+# 每个像素保留的桶数 (每桶保留最小、最大两个点，约为 2 倍像素宽度的点数)
+BUCKETS_PER_PIXEL = 1
+
+
+def _minmax_candidates(indices, y, n_buckets):
+    """
+    把下标序列按顺序均分成 n_buckets 个桶，每桶保留 y 最小和最大的两个下标 (按原顺序排列)。
+    末尾不满一桶时用最后一个下标补齐，不影响最小/最大值。
+    """
+    size = -(-len(indices) // n_buckets)
+    padded = np.concatenate([indices, np.repeat(indices[-1:], size * n_buckets - len(indices))])
+    groups = padded.reshape(n_buckets, size)
+    values = y[groups]
+    rows = np.arange(n_buckets)
+    low = groups[rows, values.argmin(axis=1)]
+    high = groups[rows, values.argmax(axis=1)]
+    return np.stack([np.minimum(low, high), np.maximum(low, high)], axis=1).ravel()
+
+
+def _minmax_contiguous(y, size):
+    """_minmax_candidates 对连续原始点的特例：直接 reshape，不做花式索引 (建第一层时用)"""
+    full = len(y) // size
+    values = y[:full * size].reshape(full, size)
+    offsets = np.arange(full) * size
+    low, high = offsets + values.argmin(axis=1), offsets + values.argmax(axis=1)
+    if full * size < len(y):
+        tail = y[full * size:]
+        low = np.append(low, full * size + tail.argmin())
+        high = np.append(high, full * size + tail.argmax())
+    return np.stack([np.minimum(low, high), np.maximum(low, high)], axis=1).ravel()
+
+
+class SpectrumLOD:
+    """
+    x 单调的一条谱线 + 最小/最大值金字塔。第 k 层 (k ≥ 1) 每个桶覆盖 LOD_BASE·LOD_FACTOR^(k-1) 个原始点，
+    只保存桶内最小、最大值的下标，各层合计约为原始点数的 2/3 (int32 下标)。
+    查询时取桶数不少于目标点数的最粗一层，只在这一层的可见部分上再做一次精确的最小/最大抽稀，
+    因此耗时只与屏幕像素数有关，与总点数无关；峰值 (局部极值) 不会在抽稀中丢失。
+    """
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = np.isfinite(x) & np.isfinite(y)
+        if not keep.all():
+            x, y = x[keep], y[keep]
+        if len(x) > 1 and x[0] > x[-1]:
+            x, y = x[::-1], y[::-1]
+        if len(x) > 2 and np.any(np.diff(x) < 0):
+            order = np.argsort(x, kind='stable')
+            x, y = x[order], y[order]
+        self.x, self.y = x, y
+        dtype = np.int32 if len(x) < 2 ** 31 else np.int64
+        # levels[k-1] = (桶大小, 各桶最小/最大值下标，每桶两个)
+        self.levels = []
+        if len(x) <= 2 * LOD_BASE:
+            return
+        candidates, bucket = _minmax_contiguous(y, LOD_BASE).astype(dtype), LOD_BASE
+        self.levels.append((bucket, candidates))
+        while len(candidates) > 4 * LOD_FACTOR:
+            candidates = _minmax_candidates(candidates, y, -(-len(candidates) // (2 * LOD_FACTOR))).astype(dtype, copy=False)
+            bucket *= LOD_FACTOR
+            self.levels.append((bucket, candidates))
+
+    def __len__(self):
+        return len(self.x)
+
+    def view(self, xmin, xmax, width):
+        """
+        可见范围 [xmin, xmax] 在 width 像素宽度下的抽稀结果 (x, y)，点数约为 2·width；
+        两端各多带一个范围外的点，使折线延伸到坐标轴边缘
+        """
+        if len(self.x) == 0:
+            return self.x, self.y
+        xmin, xmax = min(xmin, xmax), max(xmin, xmax)
+        start = max(int(np.searchsorted(self.x, xmin, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(self.x, xmax, side='right')) + 1, len(self.x))
+        n_buckets = max(int(width * BUCKETS_PER_PIXEL), 1)
+        if stop - start <= 2 * n_buckets:
+            return self.x[start:stop], self.y[start:stop]
+        candidates = None
+        for bucket, level in reversed(self.levels):
+            if (stop - start) // bucket >= n_buckets:
+                # 完整落在范围内的桶用金字塔，两端不满一桶的部分用原始点 (均少于一个桶)
+                first, last = -(-start // bucket), stop // bucket
+                candidates = np.concatenate([np.arange(start, first * bucket), level[2 * first:2 * last],
+                                             np.arange(last * bucket, stop)])
+                break
+        if candidates is None:
+            candidates = np.arange(start, stop)
+        indices = _minmax_candidates(candidates, self.y, n_buckets)
+        indices = np.concatenate([[start], indices, [stop - 1]])
+        return self.x[indices], self.y[indices]
+
+
+class LODLine:
+    """
+    在 matplotlib 坐标轴上画一条按视野自动抽稀的谱线：导航工具栏的缩放/平移 (xlim_changed) 和窗口大小变化时，
+    用金字塔重新取可见范围的点。必须保留对该对象的引用 (matplotlib 只弱引用回调)。
+    """
+
+    def __init__(self, ax, x, y, **plot_kwargs):
+        self.ax = ax
+        self.lod = x if isinstance(x, SpectrumLOD) else SpectrumLOD(x, y)
+        xs, ys = self.lod.view(*self._full_range(), self._width())
+        self.line, = ax.plot(xs, ys, **plot_kwargs)
+        ax.set_xlim(*self._full_range())
+        self._xlim_cid = ax.callbacks.connect('xlim_changed', self._on_xlim)
+        self._resize_cid = ax.figure.canvas.mpl_connect('resize_event', self._on_resize)
+
+    def _full_range(self):
+        x = self.lod.x
+        return (float(x[0]), float(x[-1])) if len(x) else (0.0, 1.0)
+
+    def _width(self):
+        return max(int(self.ax.get_window_extent().width), 100)
+
+    def refresh(self):
+        xmin, xmax = self.ax.get_xlim()
+        self.line.set_data(*self.lod.view(xmin, xmax, self._width()))
+
+    def _on_xlim(self, ax):
+        self.refresh()
+
+    def _on_resize(self, event):
+        # 坐标轴被 clear() 之后这条线已不在图上，断开与画布的连接
+        if self.line.axes is None or self.line not in self.ax.lines:
+            self.disconnect()
+            return
+        self.refresh()
+        self.ax.figure.canvas.draw_idle()
+
+    def disconnect(self):
+        if self._resize_cid is not None:
+            self.ax.callbacks.disconnect(self._xlim_cid)
+            self.ax.figure.canvas.mpl_disconnect(self._resize_cid)
+            self._resize_cid = None
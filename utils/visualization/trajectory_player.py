@@ -0,0 +1,104 @@
+# chem_assistant/utils/visualization/trajectory_player.py
+# 轨迹播放：actor 只创建一次，之后逐帧原地更新点坐标
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pyvista as pv
+from PySide6 import QtWidgets, QtCore
+
+from core.structure.bonds import perceive_bonds
+from utils.chem_utils.element_data import element_rgb
+
+
+class TrajectoryPlayer:
+    """
+    在已有的 plotter 上显示轨迹。原子 (点精灵) 与键 (线段) 共享同一个 vtkPoints，
+    换帧时只需把新坐标写入该数组，不会重建任何网格。
+    """
+
+    def __init__(self, plotter, trajectory, point_size=8):
+        self.plotter = plotter
+        self.trajectory = trajectory
+        self.current = 0
+        self._prefetcher = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+        first = trajectory.get_frame(0)
+        symbols, inverse = np.unique(trajectory.elements.astype(str), return_inverse=True)
+        palette = np.array([element_rgb(s) for s in symbols])
+
+        plotter.clear()
+        self.atoms = pv.PolyData(first.copy())
+        self.atoms['colors'] = (palette[inverse.ravel()] * 255).astype(np.uint8)
+        plotter.add_points(self.atoms, scalars='colors', rgb=True, render_points_as_spheres=True, point_size=point_size)
+
+        # 键连关系按第一帧判断，之后保持不变
+        bonds = perceive_bonds(trajectory.elements, first)
+        self.bond_mesh = None
+        if len(bonds):
+            self.bond_mesh = pv.PolyData()
+            self.bond_mesh.SetPoints(self.atoms.GetPoints())
+            self.bond_mesh.lines = np.hstack([np.full((len(bonds), 1), 2), bonds]).ravel()
+            plotter.add_mesh(self.bond_mesh, color='grey', line_width=2)
+
+        self._update_label()
+        plotter.background_color = 'white'
+
+    def _update_label(self):
+        text = f"帧 {self.current + 1} / {self.trajectory.n_frames}  (原子数: {self.trajectory.n_atoms})"
+        # 同名文本会替换旧的 actor
+        self.plotter.add_text(text, position='lower_left', color='black', font_size=9, name='frame_label')
+
+    def show_frame(self, index):
+        """切换到第 index 帧：原地写入坐标并重新渲染，同时在后台预读下一帧"""
+        index %= self.trajectory.n_frames
+        if self._pending is not None and self._pending[0] == index:
+            coords = self._pending[1].result()
+        else:
+            coords = self.trajectory.get_frame(index)
+        self.atoms.points[:] = coords
+        self.current = index
+        self._update_label()
+        self.plotter.render()
+
+        next_index = (index + 1) % self.trajectory.n_frames
+        self._pending = (next_index, self._prefetcher.submit(self.trajectory.get_frame, next_index))
+
+    def close(self):
+        self._prefetcher.shutdown(wait=False)
+        self.trajectory.close()
+
+
+class PlaybackControls(QtWidgets.QWidget):
+    """播放/暂停按钮 + 帧滑块，由 QTimer 驱动播放"""
+
+    def __init__(self, player, fps=30, parent=None):
+        super().__init__(parent)
+        self.player = player
+        layout = QtWidgets.QHBoxLayout(self)
+        self.play_button = QtWidgets.QPushButton("播放")
+        self.play_button.clicked.connect(self.toggle)
+        self.slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.slider.setRange(0, player.trajectory.n_frames - 1)
+        self.slider.valueChanged.connect(self._on_slider)
+        self.fps_box = QtWidgets.QSpinBox()
+        self.fps_box.setRange(1, 120); self.fps_box.setValue(fps); self.fps_box.setSuffix(" fps")
+        self.fps_box.valueChanged.connect(lambda v: self.timer.setInterval(int(1000 / v)))
+        layout.addWidget(self.play_button); layout.addWidget(self.slider, stretch=1); layout.addWidget(self.fps_box)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(int(1000 / fps))
+        self.timer.timeout.connect(self._advance)
+
+    def toggle(self):
+        if self.timer.isActive():
+            self.timer.stop(); self.play_button.setText("播放")
+        else:
+            self.timer.start(); self.play_button.setText("暂停")
+
+    def _advance(self):
+        self.slider.setValue((self.slider.value() + 1) % self.player.trajectory.n_frames)
+
+    def _on_slider(self, value):
+        if value != self.player.current:
+            self.player.show_frame(value)
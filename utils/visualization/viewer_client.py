@@ -0,0 +1,138 @@
+# chem_assistant/utils/visualization/viewer_client.py
+# 主程序 (Tk) 一侧的 3D 查看器客户端：按需启动常驻子进程，通过本地管道/套接字发送场景
+
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Client
+
+import numpy as np
+
+from utils.visualization.shared_arrays import SharedArrayWriter
+
+# 子进程通过环境变量拿到连接口令，不出现在命令行里
+AUTHKEY_ENV = 'CHEM_VIEWER_AUTHKEY'
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ViewerClient:
+    """
+    所有发送都在后台线程完成，Tk 界面不会被查看器的启动或绘制阻塞。
+    查看器崩溃或被关闭后，下一条消息会自动重启它。
+    """
+
+    def __init__(self, ack_timeout=10.0):
+        self.ack_timeout = ack_timeout
+        self._process = None
+        self._conn = None
+        self._writer = SharedArrayWriter()
+        self._queue = queue.Queue()
+        # 最近发送的场景 (坐标随 update_coords 更新)，供导出使用；播放轨迹时为 None
+        self.current_scene = None
+        self._thread = threading.Thread(target=self._run, name="viewer-client", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def show_scene(self, scene):
+        """显示一个新模型 (见 scene.make_scene)"""
+        self.current_scene = scene
+        self._queue.put(('scene', scene))
+
+    def update_coords(self, coords):
+        """只更新当前模型的坐标；短时间内的多次更新只发送最新一次"""
+        coords = np.array(coords, dtype=np.float32)
+        scene = self.current_scene
+        if scene is not None and len(coords) == len(scene['coords']):
+            self.current_scene = dict(scene, coords=coords)
+        self._queue.put(('coords', coords))
+
+    def play_trajectory(self, filepath, topology=None):
+        self.current_scene = None
+        self._queue.put(('trajectory', filepath, topology))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _drain(self, first):
+        """取出队列中已有的全部消息，丢弃被后续消息覆盖的坐标更新"""
+        messages = [first]
+        while True:
+            try:
+                messages.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        stop = None in messages
+        messages = [m for m in messages if m is not None]
+        kept = [m for k, m in enumerate(messages)
+                if m[0] != 'coords' or all(later[0] != 'coords' for later in messages[k + 1:])]
+        return kept, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            messages, stop = self._drain(first)
+            for message in messages:
+                self._deliver(message)
+            if stop:
+                break
+        self._shutdown()
+
+    def _deliver(self, message):
+        # 坐标更新只对已打开的模型有意义，查看器不在时直接丢弃
+        if message[0] == 'coords' and not self.is_running:
+            return
+        for attempt in range(2):
+            try:
+                if not self.is_running:
+                    self._start()
+                self._conn.send(self._writer.encode(message))
+                if not self._conn.poll(self.ack_timeout):
+                    raise TimeoutError("3D查看器无响应。")
+                reply = self._conn.recv()
+                if reply[0] == 'error':
+                    logging.error(f"3D查看器无法解析消息: {reply[1]}")
+                return
+            except (OSError, EOFError, TimeoutError, ValueError) as e:
+                logging.warning(f"3D查看器连接失败 (第{attempt + 1}次): {e}")
+                self._kill()
+        logging.error("3D查看器无法启动，消息已丢弃。")
+
+    def _start(self):
+        authkey = os.urandom(16)
+        env = dict(os.environ, **{AUTHKEY_ENV: authkey.hex()})
+        self._process = subprocess.Popen([sys.executable, '-m', 'utils.visualization.viewer_process'],
+                                         cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        address = self._process.stdout.readline().strip()
+        self._process.stdout.close()
+        if not address:
+            self._kill()
+            raise OSError("3D查看器进程启动失败。")
+        self._conn = Client(address, authkey=authkey)
+
+    def _kill(self):
+        if self._conn is not None:
+            self._conn.close(); self._conn = None
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def _shutdown(self):
+        if self.is_running:
+            try:
+                self._conn.send(('quit',))
+                self._process.wait(timeout=3)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self._kill()
+        self._writer.close()
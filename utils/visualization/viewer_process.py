@@ -0,0 +1,130 @@
+# chem_assistant/utils/visualization/viewer_process.py
+# 常驻的 3D 查看器子进程：一个 QApplication、一个窗口、一个 plotter，收到新模型时原地切换
+# 启动方式: python -m utils.visualization.viewer_process (由 viewer_client 负责)
+
+import os
+import sys
+import threading
+from multiprocessing.connection import Listener
+
+import pyvista as pv
+from PySide6 import QtWidgets, QtCore
+from pyvistaqt import QtInteractor
+
+from utils.file_io.trajectory_reader import open_trajectory
+from utils.visualization.renderer import SceneRenderer
+from utils.visualization.shared_arrays import SharedArrayReader
+from utils.visualization.trajectory_player import TrajectoryPlayer, PlaybackControls
+from utils.visualization.viewer_client import AUTHKEY_ENV
+
+
+class _Inbox(QtCore.QObject):
+    """把读线程收到的消息转交给 Qt 主线程 (跨线程信号自动排队)"""
+    received = QtCore.Signal(object)
+
+
+class ViewerWindow(QtWidgets.QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("3D 专业查看器")
+        self.setGeometry(100, 100, 700, 600)
+        central_widget = QtWidgets.QWidget(); self.setCentralWidget(central_widget)
+        self.layout = QtWidgets.QVBoxLayout(central_widget)
+        self.plotter = QtInteractor(parent=central_widget, auto_update=True)
+        self.layout.addWidget(self.plotter.interactor)
+        self.renderer = SceneRenderer(self.plotter)
+        self.player = None
+        self.controls = None
+
+    def closeEvent(self, event):
+        # 关闭窗口只是隐藏，进程和 plotter 保留给下一次使用
+        self._stop_trajectory()
+        event.ignore()
+        self.hide()
+
+    def _present(self, title):
+        self.setWindowTitle(f"3D 专业查看器 - {title}")
+        self.showNormal(); self.raise_(); self.activateWindow()
+
+    def _stop_trajectory(self):
+        if self.controls is not None:
+            self.controls.timer.stop()
+            self.layout.removeWidget(self.controls); self.controls.deleteLater(); self.controls = None
+        if self.player is not None:
+            self.player.close(); self.player = None
+
+    def handle(self, message):
+        kind = message[0]
+        try:
+            if kind == 'scene':
+                self._stop_trajectory()
+                scene = message[1]
+                self.renderer.show(scene)
+                self._present(scene.get('title', ''))
+            elif kind == 'coords':
+                # 流式坐标可能在切换模型之后才到达，原子数对不上的旧帧直接丢弃
+                scene = self.renderer.scene
+                if self.player is None and scene is not None and len(message[1]) == len(scene['coords']):
+                    self.renderer.update_coords(message[1])
+            elif kind == 'trajectory':
+                self._stop_trajectory()
+                filepath, topology = message[1], message[2]
+                trajectory = open_trajectory(filepath, topology)
+                self.renderer.scene = None
+                self.plotter.clear_slider_widgets()
+                self.player = TrajectoryPlayer(self.plotter, trajectory)
+                self.controls = PlaybackControls(self.player)
+                self.layout.addWidget(self.controls)
+                self.plotter.reset_camera()
+                self._present(f"{os.path.basename(filepath)} ({trajectory.n_frames} 帧)")
+            elif kind == 'quit':
+                QtWidgets.QApplication.instance().quit()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "3D视图错误", f"无法显示模型。\n错误: {e}")
+
+
+def _read_messages(conn, inbox):
+    """读线程：接收消息、立即从共享内存复制数组并确认，然后交给 Qt 主线程绘制"""
+    reader = SharedArrayReader()
+    try:
+        while True:
+            message = conn.recv()
+            try:
+                message = reader.decode(message)
+                conn.send(('ack',))
+            except Exception as e:
+                conn.send(('error', str(e)))
+                continue
+            inbox.received.emit(message)
+            if message[0] == 'quit':
+                break
+    except (EOFError, OSError):
+        # 主程序已退出 (管道断开)，查看器随之结束
+        inbox.received.emit(('quit',))
+    finally:
+        reader.close()
+
+
+def main():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(False)
+    pv.global_theme.background = 'white'
+    window = ViewerWindow()
+
+    authkey = bytes.fromhex(os.environ.pop(AUTHKEY_ENV))
+    listener = Listener(authkey=authkey)
+    # 第一行标准输出告诉父进程连接地址，之后的输出转到 stderr，避免写满没人读的管道
+    print(listener.address, flush=True)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    conn = listener.accept()
+    listener.close()
+
+    inbox = _Inbox()
+    inbox.received.connect(window.handle)
+    threading.Thread(target=_read_messages, args=(conn, inbox), daemon=True).start()
+    app.exec()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()